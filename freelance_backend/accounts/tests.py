@@ -1,3 +1,27 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from .models import User
+
+
+class TokenBlacklistTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.api = APIClient()
+
+    def refresh(self, token):
+        return self.api.post('/api/auth/token/refresh/', {'refresh': token}, format='json')
+
+    def test_rotated_refresh_token_is_blacklisted(self):
+        token = str(RefreshToken.for_user(self.user))
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(response.json()['refresh']).status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_logout_blacklists_the_refresh_token(self):
+        token = str(RefreshToken.for_user(self.user))
+        self.api.force_authenticate(self.user)
+        self.assertEqual(self.api.post('/api/auth/logout/', {'refresh': token}, format='json').status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
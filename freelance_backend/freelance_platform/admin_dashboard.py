@@ -1,64 +1,75 @@
-from django.db.models import Count, Avg, Sum
-from django.utils import timezone
 from datetime import timedelta
-from accounts.models import User
-from projects.models import Project, ProjectProposal
-from profiles.models import Profile
-from messaging.models import Conversation, Message
+from django.utils import timezone
+from stats.counters import total as counter_total, totals
+from stats.rollups import live_delta, recent
+
+# Days of daily rollups charted (and summed for "this month")
+DAYS_SHOWN = 30
+
+
+def _since(rows, days, column, delta):
+    """`column` summed over the rollups of the last `days` days plus today's live delta"""
+    start = timezone.localdate() - timedelta(days=days)
+    return sum(getattr(row, column) for row in rows if row.date >= start) + delta[column]
+
+
+def _series(rows, column, label):
+    return {
+        "type": "line",
+        "data": {
+            "labels": [row.date.strftime('%b %d') for row in rows],
+            "datasets": [{"label": label, "data": [getattr(row, column) for row in rows]}],
+        },
+    }
+
 
 def dashboard_callback(request, context):
-    """Custom dashboard with platform statistics"""
-    
-    # Get current date for time-based queries
-    now = timezone.now()
-    last_30_days = now - timedelta(days=30)
-    last_7_days = now - timedelta(days=7)
-    
+    """
+    Custom dashboard with platform statistics: totals from the platform counters
+    (stats.counters), activity over time from the daily rollups (stats.rollups)
+    plus live counts of what was created since the latest one. Seven queries
+    however large the tables grow.
+    """
+    counts = totals()
+    rows = recent(DAYS_SHOWN)
+    latest = rows[-1] if rows else None
+    delta = live_delta(latest)
+
+    def rolled_up_total(column, total_column):
+        return (getattr(latest, total_column) if latest else 0) + delta[column]
+
     # User Statistics
-    total_users = User.objects.count()
-    clients_count = User.objects.filter(role='client').count()
-    freelancers_count = User.objects.filter(role='freelancer').count()
-    new_users_this_month = User.objects.filter(date_joined__gte=last_30_days).count()
-    
+    total_users = counter_total(counts, 'users')
+    clients_count = counts.get('users:client', 0)
+    freelancers_count = counts.get('users:freelancer', 0)
+    admins_count = counts.get('users:admin', 0)
+    new_users_this_month = _since(rows, 30, 'new_users', delta)
+
     # Project Statistics
-    total_projects = Project.objects.count()
-    open_projects = Project.objects.filter(status='open').count()
-    in_progress_projects = Project.objects.filter(status='in_progress').count()
-    completed_projects = Project.objects.filter(status='completed').count()
-    projects_this_month = Project.objects.filter(created_at__gte=last_30_days).count()
-    
+    total_projects = counter_total(counts, 'projects')
+    open_projects = counts.get('projects:open', 0)
+    in_progress_projects = counts.get('projects:in_progress', 0)
+    completed_projects = counts.get('projects:completed', 0)
+    projects_this_month = _since(rows, 30, 'new_projects', delta)
+
     # Proposal Statistics
-    total_proposals = ProjectProposal.objects.count()
-    recent_proposals = ProjectProposal.objects.filter(created_at__gte=last_7_days).count()
-    
+    total_proposals = counter_total(counts, 'proposals')
+    recent_proposals = _since(rows, 7, 'new_proposals', delta)
+
     # Financial Statistics
-    total_project_value = Project.objects.aggregate(total=Sum('budget'))['total'] or 0
-    avg_project_budget = Project.objects.aggregate(avg=Avg('budget'))['avg'] or 0
-    avg_proposal_budget = ProjectProposal.objects.aggregate(avg=Avg('proposed_budget'))['avg'] or 0
-    
+    total_project_value = rolled_up_total('project_budget', 'total_project_budget')
+    projects_budgeted = rolled_up_total('projects_budgeted', 'total_projects_budgeted')
+    avg_project_budget = total_project_value / projects_budgeted if projects_budgeted else 0
+
     # Messaging Statistics
-    total_conversations = Conversation.objects.count()
-    total_messages = Message.objects.count()
-    messages_this_week = Message.objects.filter(created_at__gte=last_7_days).count()
-    unread_messages = Message.objects.filter(is_read=False).count()
-    
-    # Profile Statistics
-    profiles_with_rating = Profile.objects.filter(rating__isnull=False).count()
-    avg_freelancer_rating = Profile.objects.filter(
-        user__role='freelancer', 
-        rating__isnull=False
-    ).aggregate(avg=Avg('rating'))['avg'] or 0
-    
-    # Top performing freelancers
-    top_freelancers = Profile.objects.filter(
-        user__role='freelancer',
-        rating__isnull=False
-    ).order_by('-rating')[:5]
-    
-    # Recent activity
-    recent_projects = Project.objects.order_by('-created_at')[:5]
-    recent_users = User.objects.order_by('-date_joined')[:5]
-    
+    total_messages = counts.get('messages', 0)
+    messages_this_week = _since(rows, 7, 'new_messages', delta)
+    unread_messages = counts.get('messages:unread', 0)
+
+    # Profile Statistics, as of the latest rollup
+    profiles_with_rating = latest.rated_profiles if latest else 0
+    avg_freelancer_rating = latest.avg_freelancer_rating if latest else 0
+
     # Add dashboard data to context
     context.update({
         'dashboard_stats': [
@@ -71,11 +82,7 @@ def dashboard_callback(request, context):
                     "data": {
                         "labels": ["Clients", "Freelancers", "Admins"],
                         "datasets": [{
-                            "data": [
-                                clients_count,
-                                freelancers_count,
-                                User.objects.filter(role='admin').count()
-                            ]
+                            "data": [clients_count, freelancers_count, admins_count]
                         }]
                     }
                 }
@@ -107,16 +114,8 @@ def dashboard_callback(request, context):
             {
                 "title": "Messaging Activity",
                 "metric": f"{total_messages:,}",
-                "footer": f"{messages_this_week} messages this week",
-                "chart": {
-                    "type": "line",
-                    "data": {
-                        "labels": ["Total", "This Week", "Unread"],
-                        "datasets": [{
-                            "data": [total_messages, messages_this_week, unread_messages]
-                        }]
-                    }
-                }
+                "footer": f"{messages_this_week} messages this week, {unread_messages} unread",
+                "chart": _series(rows, 'new_messages', "Messages per day"),
             },
             {
                 "title": "Quality Metrics",
@@ -127,8 +126,18 @@ def dashboard_callback(request, context):
                 "title": "Recent Activity",
                 "metric": f"{new_users_this_month}",
                 "footer": "New users this month",
-            }
+                "chart": _series(rows, 'new_users', "Sign-ups per day"),
+            },
+            {
+                "title": "Project Growth",
+                "metric": f"{projects_this_month}",
+                "footer": (
+                    f"Rolled up {timezone.localtime(latest.computed_at):%b %d %H:%M}" if latest
+                    else "No rollups yet: run rollup_platform_stats"
+                ),
+                "chart": _series(rows, 'new_projects', "Projects per day"),
+            },
         ]
     })
-    
-    return context 
\ No newline at end of file
+
+    return context
@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'freelance_platform.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since it pulls in models
+from messaging.websocket import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Route WebSocket connections to the messaging push channel, everything else to Django"""
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
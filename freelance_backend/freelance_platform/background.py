@@ -0,0 +1,56 @@
+"""
+Bounded thread pools for best-effort background work in the web process (avatar
+renditions, video demo thumbnails).
+
+Jobs are not durable: anything that doesn't fit the queue or dies with the process
+must be recoverable by a management command that scans for unfinished rows.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedPool:
+    """
+    Runs `func(*args)` on up to `max_workers()` threads, dropping jobs once
+    `max_queued` are waiting or running
+    """
+
+    def __init__(self, func, max_workers, name, max_queued=64):
+        self._func = func
+        # A callable, so the setting is read when the first job arrives rather than at import
+        self._max_workers = max_workers
+        self._name = name
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_queued)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers(), thread_name_prefix=self._name)
+            return self._executor
+
+    def submit(self, *args):
+        """Queue a job; returns its Future, or None if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            logger.warning('%s queue full; dropping job %r', self._name, args)
+            return None
+        try:
+            return self._get_executor().submit(self._run, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _run(self, *args):
+        try:
+            self._func(*args)
+        except Exception:
+            logger.exception('%s job %r failed', self._name, args)
+        finally:
+            self._slots.release()
+            close_old_connections()
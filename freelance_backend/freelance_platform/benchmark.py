@@ -0,0 +1,321 @@
+"""
+In-process endpoint benchmarks.
+
+ROUTES holds one or more calls for every route in the accounts, projects, profiles
+and messaging URLconfs. run() drives each through the Django test client, signed
+in with a JWT like a real client, against whatever data is in the database (the
+`benchmark_endpoints` command seeds it with freelance_platform.seeding). Per call
+it reports:
+- p50/p95/p99 and mean latency in milliseconds, and sequential throughput
+- the most statements one request ran (freelance_platform.querycount)
+- the peak Python memory one request allocated, measured with tracemalloc in a
+  separate pass so the tracing overhead stays out of the latencies
+
+Write endpoints get fresh objects for every request (a new project to propose
+to, a new upload to complete, ...); that setup runs outside the timed region.
+Caches are warm: every call is made `warmup` times before it is timed.
+
+Results are plain dicts, written as JSON by the command, and compare() checks
+them against a stored baseline.
+"""
+import io
+import math
+import time
+import tracemalloc
+from dataclasses import dataclass
+from importlib import import_module
+from typing import Callable
+
+from django.core.files.storage import default_storage
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from messaging import uploads
+from messaging.models import AttachmentUpload, Conversation, MessageAttachment
+from messaging.sync import encode_cursor
+from profiles.models import Profile, VideoDemo
+from projects.models import Project
+from .querycount import record_queries
+
+URLCONFS = ('accounts.urls', 'projects.urls', 'profiles.urls', 'messaging.urls')
+# Latency changes smaller than this are noise, whatever the percentage
+NOISE_FLOOR_MS = 1.0
+# Metrics compare() checks; query counts are exact, the others use the threshold
+COMPARED = ('p50_ms', 'p95_ms', 'peak_memory_kb', 'queries')
+
+
+@dataclass(frozen=True)
+class Route:
+    """
+    One call to a named route. `args`, `data` and `query` take the Fixtures and
+    are evaluated before the request is timed.
+    """
+    name: str
+    method: str = 'get'
+    user: str = 'client'
+    args: Callable = None
+    data: Callable = None
+    query: Callable = None
+    status: int = 200
+    format: str = 'json'
+    # Tells apart several calls to one route
+    variant: str = ''
+
+    @property
+    def label(self):
+        label = f'{self.method.upper()} {self.name}'
+        return f'{label} ({self.variant})' if self.variant else label
+
+
+ROUTES = [
+    # accounts
+    Route('register', 'post', user=None, status=201, data=lambda fixtures: fixtures.registration()),
+    Route('login', 'post', user=None, data=lambda fixtures: {
+        'email': fixtures.client.email, 'password': fixtures.password,
+    }),
+    Route('logout', 'post', data=lambda fixtures: {'refresh': str(RefreshToken.for_user(fixtures.client))}),
+    Route('user_profile'),
+    Route('token_refresh', 'post', user=None, data=lambda fixtures: {
+        'refresh': str(RefreshToken.for_user(fixtures.client)),
+    }),
+    # projects
+    Route('project-list-create'),
+    Route('project-list-create', variant='search', query=lambda fixtures: {'search': 'online store'}),
+    Route('project-list-create', variant='filtered', query=lambda fixtures: {
+        'category': 'web-development', 'status': 'open', 'skills': 'python',
+    }),
+    Route('project-list-create', 'post', status=201, data=lambda fixtures: {
+        'title': 'Benchmark project', 'description': 'Details', 'category': 'web-development',
+        'skills': ['Python', 'Django'], 'budget': '900',
+    }),
+    Route('project-facets', query=lambda fixtures: {'category': 'web-development'}),
+    Route('project-detail', args=lambda fixtures: [fixtures.project.id]),
+    Route('project-matches', args=lambda fixtures: [fixtures.project.id]),
+    Route('recommended-projects', user='freelancer'),
+    Route('project-proposals', args=lambda fixtures: [fixtures.project.id]),
+    Route('proposal-list-create'),
+    Route('proposal-list-create', 'post', user='freelancer', status=201, data=lambda fixtures: {
+        'project': fixtures.new_project().id, 'message': 'Hello', 'proposed_budget': '500', 'timeline': '1 week',
+    }),
+    Route('my-projects'),
+    Route('my-proposals', user='freelancer'),
+    Route('my-active-projects'),
+    Route('my-active-projects', user='freelancer', variant='freelancer'),
+    # profiles
+    Route('profile-list'),
+    Route('profile-detail', args=lambda fixtures: [fixtures.freelancer.profile.id]),
+    Route('my-profile', user='freelancer'),
+    Route('update-my-profile', 'put', user='freelancer', data=lambda fixtures: {'headline': 'Django developer'}),
+    Route('top-freelancers', user=None),
+    Route('newcomer-freelancers', user=None),
+    Route('featured-freelancers', user=None),
+    Route('leaderboard-stats', user='admin'),
+    Route('video-demo-list-create', user='freelancer'),
+    Route('video-demo-detail', user='freelancer', args=lambda fixtures: [fixtures.demo.id]),
+    Route('video-demo-file', user='freelancer', args=lambda fixtures: [fixtures.demo.id]),
+    # messaging
+    Route('conversation-list'),
+    Route('start-conversation', 'post', status=201, data=lambda fixtures: {'user_id': fixtures.new_freelancer().id}),
+    Route('conversation-detail', args=lambda fixtures: [fixtures.conversation.id]),
+    Route('conversation-messages', args=lambda fixtures: [fixtures.conversation.id]),
+    Route('send-message', 'post', status=201, args=lambda fixtures: [fixtures.conversation.id],
+          data=lambda fixtures: {'content': 'Any news?'}),
+    Route('unread-messages-count'),
+    Route('messaging-sync', query=lambda fixtures: {'since': fixtures.sync_cursor}),
+    Route('message-search', query=lambda fixtures: {'q': 'invoice'}),
+    Route('attachment-upload-start', 'post', status=201, data=lambda fixtures: {'filename': 'brief.txt', 'size': 5}),
+    Route('attachment-upload', args=lambda fixtures: [fixtures.new_upload().id]),
+    Route('attachment-upload', 'put', args=lambda fixtures: [fixtures.new_upload().id],
+          query=lambda fixtures: {'offset': 0}, data=lambda fixtures: b'hello', format=None),
+    Route('attachment-upload-complete', 'post', status=201, args=lambda fixtures: [fixtures.new_upload(received=True).id],
+          data=lambda fixtures: {'message_id': fixtures.client_message.id}),
+    Route('message-attachment-file', args=lambda fixtures: [fixtures.attachment.id]),
+]
+
+
+class Fixtures:
+    """
+    The users and objects the routes act on. The client and freelancer are the two
+    sides of the busiest conversation, so the benchmarks see the heaviest inboxes.
+    """
+
+    def __init__(self, password):
+        self.password = password
+        self.created = 0
+        self.conversation = Conversation.objects.annotate(
+            message_count=Count('messages'),
+        ).filter(project__isnull=False).order_by('-message_count', 'id').select_related('client', 'freelancer', 'project').first()
+        if self.conversation is None:
+            raise ValueError('Benchmarks need seeded data with at least one project conversation')
+        self.client = self.conversation.client
+        self.freelancer = self.conversation.freelancer
+        self.project = self.conversation.project
+        self.client_message = self.conversation.messages.filter(sender=self.client).order_by('-id').first()
+        self.admin = User.objects.create_user(
+            username='bench-admin', email='bench-admin@example.com', password=password, role='admin', is_staff=True,
+        )
+        self.attachment = MessageAttachment.objects.create(
+            message=self.client_message, filename='brief.pdf', file_size=9,
+            file=default_storage.save('message_attachments/benchmark', io.BytesIO(b'%PDF-data')),
+        )
+        self.demo = VideoDemo.objects.create(
+            profile=self.freelancer.profile, title='Demo', category='web-development',
+            video_file=default_storage.save('videos/benchmark.mp4', io.BytesIO(b'\x00' * 64)),
+        )
+        self.sync_cursor = encode_cursor(timezone.now() - timezone.timedelta(days=1), 0, 0)
+
+    def unique(self):
+        self.created += 1
+        return self.created
+
+    def registration(self):
+        number = self.unique()
+        return {
+            'username': f'bench{number}', 'email': f'bench{number}@example.com', 'name': 'Bench',
+            'role': 'freelancer', 'password': self.password, 'password_confirm': self.password,
+        }
+
+    def new_project(self):
+        return Project.objects.create(
+            title='Benchmark project', description='Details', category='web-development',
+            skills=['Python'], budget=800, client=self.client,
+        )
+
+    def new_freelancer(self):
+        number = self.unique()
+        user = User.objects.create(username=f'bench-freelancer{number}', email=f'bench-freelancer{number}@example.com',
+                                   role='freelancer')
+        Profile.objects.create(user=user)
+        return user
+
+    def new_upload(self, received=False):
+        upload = AttachmentUpload.objects.create(
+            uploader=self.client, filename='brief.txt', total_size=5, received_size=5 if received else 0,
+        )
+        uploads.part_path(upload).write_bytes(b'hello' if received else b'')
+        return upload
+
+
+def route_names(urlconfs=URLCONFS):
+    """Names of every route in `urlconfs`"""
+    return {pattern.name for urlconf in urlconfs for pattern in import_module(urlconf).urlpatterns}
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of `values`"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+class _Caller:
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+        self.tokens = {}
+
+    def client_for(self, role):
+        api = APIClient()
+        if role:
+            if role not in self.tokens:
+                self.tokens[role] = str(RefreshToken.for_user(getattr(self.fixtures, role)).access_token)
+            api.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens[role]}')
+        return api
+
+    def prepare(self, route):
+        """Everything a request needs, built before it is timed"""
+        fixtures = self.fixtures
+        path = reverse(route.name, args=route.args(fixtures) if route.args else None)
+        if route.query:
+            path = f"{path}?{'&'.join(f'{key}={value}' for key, value in route.query(fixtures).items())}"
+        data = route.data(fixtures) if route.data else None
+        return self.client_for(route.user), path, data
+
+    def call(self, route, prepared):
+        api, path, data = prepared
+        if route.format is None:
+            response = getattr(api, route.method)(path, data, content_type='application/octet-stream')
+        else:
+            response = getattr(api, route.method)(path, data, format=route.format)
+        if hasattr(response, 'streaming_content'):
+            b''.join(response.streaming_content)
+        if response.status_code != route.status:
+            raise RuntimeError(f'{route.label} returned {response.status_code}: {getattr(response, "data", None)}')
+
+
+def measure(route, caller, requests, warmup, memory_requests):
+    for _ in range(warmup):
+        caller.call(route, caller.prepare(route))
+
+    latencies = []
+    queries = 0
+    for _ in range(requests):
+        prepared = caller.prepare(route)
+        with record_queries() as recorder:
+            started = time.perf_counter()
+            caller.call(route, prepared)
+            latencies.append(time.perf_counter() - started)
+        queries = max(queries, recorder.count)
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(memory_requests):
+            prepared = caller.prepare(route)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            caller.call(route, prepared)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    milliseconds = [latency * 1000 for latency in latencies]
+    return {
+        'endpoint': route.label,
+        'requests': requests,
+        'p50_ms': round(percentile(milliseconds, 50), 3),
+        'p95_ms': round(percentile(milliseconds, 95), 3),
+        'p99_ms': round(percentile(milliseconds, 99), 3),
+        'mean_ms': round(sum(milliseconds) / len(milliseconds), 3),
+        'throughput_rps': round(len(latencies) / sum(latencies), 1),
+        'queries': queries,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(password, routes=ROUTES, requests=50, warmup=5, memory_requests=3, log=lambda result: None):
+    """Benchmark `routes` against the current database; returns a result dict per route"""
+    caller = _Caller(Fixtures(password))
+    results = []
+    for route in routes:
+        result = measure(route, caller, requests, warmup, memory_requests)
+        log(result)
+        results.append(result)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    [(size, endpoint, metric, baseline value, current value)] for every result
+    more than `threshold` (a fraction) worse than the same size and endpoint in
+    `baseline`, or running more queries. Both are lists of result dicts with a 'size'.
+    """
+    previous = {(result['size'], result['endpoint']): result for result in baseline}
+    regressions = []
+    for result in results:
+        base = previous.get((result['size'], result['endpoint']))
+        if base is None:
+            continue
+        for metric in COMPARED:
+            old, new = base[metric], result[metric]
+            if metric == 'queries':
+                worse = new > old
+            else:
+                worse = new > old * (1 + threshold)
+                if metric.endswith('_ms'):
+                    worse = worse and new - old > NOISE_FLOOR_MS
+            if worse:
+                regressions.append((result['size'], result['endpoint'], metric, old, new))
+    return regressions
@@ -0,0 +1,200 @@
+"""
+Serving stored media files (video demos, message attachments) from views that
+check access first.
+
+serve_file() answers GET/HEAD with conditional and byte-range support, so players
+can seek without re-downloading. settings.MEDIA_SERVE_MODE picks who moves the bytes:
+- 'django': a FileResponse. Under gunicorn it is sent with os.sendfile; the file is
+  positioned at the range start and Content-Length bounds the transfer. Other
+  servers stream it in blocks.
+- 'x-accel': an empty response with X-Accel-Redirect to MEDIA_ACCEL_PREFIX + name,
+  for nginx to serve (and range) from an `internal` location.
+- 'x-sendfile': an empty response with X-Sendfile set to the absolute path, for
+  Apache mod_xsendfile or lighttpd.
+
+Browsers can't send the API's bearer token from <video> or <a> tags, so
+serializers hand out URLs carrying a short-lived signature (signed_query) for
+objects the requesting user may see; views accept either that or a normal
+authenticated request that passes their access rules.
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+SIGNATURE_PARAM = 'sig'
+_SIGNATURE_SALT = 'freelance_platform.media'
+_RANGE = re.compile(r'^\s*bytes=(\d*)-(\d*)\s*$')
+
+
+def _signer():
+    return signing.TimestampSigner(salt=_SIGNATURE_SALT)
+
+
+def signed_query(kind, pk):
+    """Query string granting access to object `pk` of `kind` for settings.MEDIA_URL_MAX_AGE seconds"""
+    value = f'{kind}:{pk}'
+    signature = _signer().sign(value)[len(value) + 1:]
+    return f'{SIGNATURE_PARAM}={signature}'
+
+
+def has_valid_signature(request, kind, pk):
+    signature = request.GET.get(SIGNATURE_PARAM)
+    if not signature:
+        return False
+    try:
+        _signer().unsign(f'{kind}:{pk}:{signature}', max_age=settings.MEDIA_URL_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class _FileRange:
+    """Read-only view of `length` bytes of `file` starting at `start`"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self._file = file
+        self._remaining = length
+        self.name = file.name
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # For wsgi.file_wrapper: sendfile starts at the current offset and sends Content-Length bytes
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+class _Unsatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    (start, end), inclusive, for a single byte-range `header`. None means serve the
+    whole file: no header, a malformed one, or several ranges, which we don't split.
+    """
+    match = _RANGE.match(header or '')
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise _Unsatisfiable
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise _Unsatisfiable
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _validators(stat_result):
+    etag = quote_etag(f'{int(stat_result.st_mtime_ns):x}-{stat_result.st_size:x}')
+    return etag, http_date(stat_result.st_mtime)
+
+
+def _range_applies(request, etag, mtime):
+    """If-Range: only honour Range when the client's copy is still current"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return since is not None and int(mtime) <= since
+
+
+def serve_file(request, name, *, filename=None, as_attachment=False, public=False, storage=default_storage):
+    """
+    Response serving stored file `name`. `filename` and `as_attachment` set
+    Content-Disposition; `public` lets shared caches keep it.
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storage (e.g. S3) serves ranges itself
+        return HttpResponseRedirect(storage.url(name))
+
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return HttpResponse(status=404)
+    if not stat.S_ISREG(stat_result.st_mode):
+        return HttpResponse(status=404)
+
+    content_type, encoding = mimetypes.guess_type(filename or name)
+    if encoding or not content_type:
+        # e.g. .tar.gz: a Content-Encoding header would make the client unpack it
+        content_type = 'application/octet-stream'
+    etag, last_modified = _validators(stat_result)
+    cache_control = 'public, max-age=3600' if public else 'private, max-age=3600'
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+    if mode in ('x-accel', 'x-sendfile'):
+        # The proxy answers Range and conditional requests itself
+        response = HttpResponse(content_type=content_type)
+        if mode == 'x-accel':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + name.lstrip('/')
+        else:
+            response['X-Sendfile'] = path
+    else:
+        size = stat_result.st_size
+        byte_range = None
+        if _range_applies(request, etag, stat_result.st_mtime):
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except _Unsatisfiable:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                response['Accept-Ranges'] = 'bytes'
+                return response
+
+        file = open(path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+            response['Content-Length'] = size
+        else:
+            start, end = byte_range
+            response = FileResponse(_FileRange(file, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Cache-Control'] = cache_control
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename or os.path.basename(name))
+    return response
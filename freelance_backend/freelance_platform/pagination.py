@@ -0,0 +1,237 @@
+"""
+Default pagination for list endpoints: page numbers unless the client opts into
+keyset pages.
+
+Page-number pages cost an OFFSET scan plus a COUNT(*) per request, both growing
+with the table. A request carrying `cursor` (empty for the first page) gets keyset
+pages instead: `{'next', 'previous', 'results'}`, where each link holds the sort
+key of the row it continues from, so every page is one index range read whatever
+its depth, and rows inserted meanwhile never shift or repeat a page.
+
+Pages follow the view's ordering (its OrderingFilter or `ordering`, else the
+model's Meta.ordering, else the primary key) with `id` appended as a tiebreak. The
+tiebreak runs in whichever direction lets the model's index on the leading column
+deliver the rows presorted: an index on `-created_at` is read forward as
+(created_at DESC, id ASC) and backward as (created_at ASC, id DESC). Only plain
+columns of the listed model and annotations (such as a search rank) can be
+keyset-ordered; NULLs sort first in ascending order, as SQLite stores them.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.ordering = keyset_ordering(queryset)
+        signature = ','.join(f'{"-" if desc else ""}{name}' for name, desc in self.ordering)
+        position, reverse = self.decode_cursor(request.query_params[self.cursor_query_param], signature)
+
+        ordering = [(name, desc != reverse) for name, desc in self.ordering]
+        queryset = queryset.order_by(*(f'-{name}' if desc else name for name, desc in ordering))
+        segments = [Q()] if position is None else keyset_segments(queryset, ordering, position)
+
+        # One extra row tells whether there is a page beyond this one, without a COUNT(*)
+        rows = []
+        for segment in segments:
+            rows += queryset.filter(segment)[:page_size + 1 - len(rows)]
+            if len(rows) > page_size:
+                break
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.signature = signature
+        self.has_next = has_more if not reverse else True
+        self.has_previous = position is not None if not reverse else has_more
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        if not rows and position is not None:
+            # An empty page past either end still links back to where it started
+            self.has_next, self.has_previous = reverse, not reverse
+            self.cursor_position = position
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'].pop('count', None)
+        return response_schema
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        position = self.row_position(self.last) if self.last is not None else self.cursor_position
+        return self.link(position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        position = self.row_position(self.first) if self.first is not None else self.cursor_position
+        return self.link(position, reverse=True)
+
+    def row_position(self, row):
+        return [_to_json(getattr(row, name)) for name, _ in self.ordering]
+
+    def link(self, position, reverse):
+        payload = {'o': self.signature, 'p': position}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, token, signature):
+        """(position, reverse) for a cursor token; an empty token starts at the first page"""
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            position, reverse = payload['p'], bool(payload.get('r'))
+            valid = payload['o'] == signature and isinstance(position, list) and len(position) == len(self.ordering)
+        except (ValueError, TypeError, KeyError):
+            valid = False
+        if not valid:
+            # Also raised for a cursor from a different ?ordering=
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+def _to_json(value):
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _field(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        field = None
+    if field is None or not field.concrete or field.many_to_many:
+        raise ValueError(f'Keyset pagination cannot order {model.__name__} by {name!r}')
+    return field
+
+
+def _column(queryset, name):
+    """(nullable, to_python) for a keyset column: a field of the model or an annotation"""
+    if name in queryset.query.annotations:
+        # e.g. a search rank; its JSON value is used as is
+        return True, lambda value: value
+    model = queryset.model
+    field = model._meta.pk if name == model._meta.pk.attname else _field(model, name)
+    return field.null, field.to_python
+
+
+def _indexed_directions(model, name):
+    """
+    Directions (True for DESC) in which the model's indexes store column `name`:
+    those of indexes leading with it if any, since only they can serve an
+    unfiltered sort, else of every index containing it
+    """
+    leading, anywhere = [], []
+    for index in model._meta.indexes:
+        for position, field_name in enumerate(index.fields):
+            if field_name.lstrip('-') == name:
+                (leading if position == 0 else anywhere).append(field_name.startswith('-'))
+    return leading or anywhere
+
+
+def keyset_ordering(queryset):
+    """[(column, descending)] the keyset pages of `queryset` are sorted by, ending in the id tiebreak"""
+    model = queryset.model
+    terms = queryset.query.order_by or (queryset.query.default_ordering and model._meta.ordering) or ()
+    ordering = []
+    for term in terms:
+        if not isinstance(term, str) or '__' in term or term.startswith('?'):
+            raise ValueError(f'Keyset pagination cannot order by {term!r}')
+        desc, name = term.startswith('-'), term.lstrip('-')
+        if name in queryset.query.annotations:
+            ordering.append((name, desc))
+            continue
+        field = model._meta.pk if name == 'pk' else _field(model, name)
+        ordering.append((field.attname, desc))
+        if field.primary_key:
+            return ordering
+
+    if not ordering:
+        return [(model._meta.pk.attname, False)]
+    leading, desc = ordering[0]
+    directions = _indexed_directions(model, leading)
+    # Forward over an index matching the requested direction yields ties in ascending id
+    # order; backward over an index in the other direction yields them descending
+    tiebreak_desc = bool(directions) and desc not in directions
+    return ordering + [(model._meta.pk.attname, tiebreak_desc)]
+
+
+def keyset_segments(queryset, ordering, position):
+    """
+    Filters selecting the rows that sort strictly after `position` under
+    `ordering`, to be read in turn. Each bounds the leading column to one range so
+    the database seeks into its index instead of filtering from the start; a
+    nullable leading column takes two, since its NULLs sit apart from the range.
+    """
+    columns = []
+    for (name, desc), value in zip(ordering, position):
+        null, to_python = _column(queryset, name)
+        columns.append((name, desc, null, None if value is None else to_python(value)))
+
+    # Rows tied on the leading column that sort after `position` on the others
+    tied_after = Q(pk__in=[])
+    equal = Q()
+    for name, desc, null, value in columns[1:]:
+        tied_after |= equal & _beyond(name, desc, null, value)
+        equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+
+    name, desc, null, value = columns[0]
+    if value is None:
+        nulls = Q(**{f'{name}__isnull': True}) & tied_after
+        # NULLs sort first: ascending, every value still follows them
+        return [nulls] if desc else [nulls, Q(**{f'{name}__isnull': False})]
+    lookup = 'lte' if desc else 'gte'
+    segments = [Q(**{f'{name}__{lookup}': value}) & (_beyond(name, desc, False, value) | Q(**{name: value}) & tied_after)]
+    if desc and null:
+        segments.append(Q(**{f'{name}__isnull': True}))
+    return segments
+
+
+def _beyond(name, desc, null, value):
+    """Rows whose `name` sorts strictly after `value`, with NULLs smallest"""
+    if desc:
+        if value is None:
+            return Q(pk__in=[])
+        beyond = Q(**{f'{name}__lt': value})
+        return beyond | Q(**{f'{name}__isnull': True}) if null else beyond
+    if value is None:
+        return Q(**{f'{name}__isnull': False})
+    return Q(**{f'{name}__gt': value})
@@ -0,0 +1,125 @@
+"""
+Per-request database accounting.
+
+QueryRecorder is a connection execute_wrapper that records every statement a
+block of code runs, with its parameters and duration, so it works whatever
+DEBUG is. It reports three numbers:
+- count: statements run
+- duplicates: statements identical, parameters included, to one run earlier,
+  i.e. work that could have been reused
+- repeats: statements whose SQL (without parameters) ran earlier, the signature
+  of an N+1: the same lookup issued once per row
+
+QueryCountMiddleware records each request. When settings.QUERY_COUNT_HEADERS is
+on (it follows DEBUG) the numbers go out as X-DB-Queries, X-DB-Duplicate-Queries
+and X-DB-Time (milliseconds) headers plus a Server-Timing entry that browser
+devtools show. Requests running more than settings.QUERY_COUNT_WARNING
+statements are logged with their most repeated SQL, whatever the headers setting.
+With the headers off a request only counts and times its statements until it
+passes the threshold, so production keeps no SQL or parameters for the rest.
+
+Tests enforce per-endpoint budgets with freelance_platform.testing.QueryBudgetTestMixin.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Statement:
+    sql: str
+    params: str
+    duration: float
+
+
+class QueryRecorder:
+    """
+    Counts and times every statement; keeps the statements themselves (for
+    duplicates, repeated() and report()) only past the first `record_after`, and
+    never when that is None
+    """
+
+    def __init__(self, record_after=0):
+        self.record_after = record_after
+        self.count = 0
+        self.duration = 0.0  # seconds spent in the database
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            if self.record_after is not None and self.count > self.record_after:
+                # repr() so list and dict parameters can be compared and hashed
+                self.statements.append(Statement(sql, repr(params), duration))
+
+    @property
+    def duplicates(self):
+        """Statements that ran with the same SQL and parameters as an earlier one"""
+        counts = Counter((statement.sql, statement.params) for statement in self.statements)
+        return sum(count - 1 for count in counts.values())
+
+    def repeated(self):
+        """[(sql, times run)] for SQL run more than once, most repeated first"""
+        counts = Counter(statement.sql for statement in self.statements)
+        return [(sql, count) for sql, count in counts.most_common() if count > 1]
+
+    def report(self):
+        """Every statement in order, followed by the repeated SQL"""
+        lines = [f'{index}. {statement.sql} {statement.params}' for index, statement in enumerate(self.statements, 1)]
+        repeated = self.repeated()
+        if repeated:
+            lines.append('Repeated:')
+            lines += [f'{count}x {sql}' for sql, count in repeated]
+        return '\n'.join(lines)
+
+
+@contextmanager
+def record_queries(using=DEFAULT_DB_ALIAS, record_after=0):
+    """Record the statements run on `using` (in this thread) inside the block"""
+    recorder = QueryRecorder(record_after)
+    with connections[using].execute_wrapper(recorder):
+        yield recorder
+
+
+class QueryCountMiddleware:
+    """Goes first in MIDDLEWARE so that session and authentication queries are counted"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        headers = getattr(settings, 'QUERY_COUNT_HEADERS', False)
+        warning = getattr(settings, 'QUERY_COUNT_WARNING', None)
+        # Without the headers only a request going over the warning threshold needs
+        # its SQL, and only the statements past the threshold are kept for the log
+        with record_queries(record_after=0 if headers else warning) as recorder:
+            response = self.get_response(request)
+            # Serialization queries run while a DRF response renders
+            if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                response.render()
+
+        if warning is not None and recorder.count > warning:
+            logger.warning(
+                '%s %s ran %d queries (%d duplicates) in %.1f ms; most repeated: %s',
+                request.method, request.path, recorder.count, recorder.duplicates, recorder.duration * 1000,
+                recorder.repeated()[:3],
+            )
+        if headers:
+            milliseconds = recorder.duration * 1000
+            response['X-DB-Queries'] = str(recorder.count)
+            response['X-DB-Duplicate-Queries'] = str(recorder.duplicates)
+            response['X-DB-Time'] = f'{milliseconds:.1f}'
+            response['Server-Timing'] = f'db;dur={milliseconds:.1f};desc="{recorder.count} queries"'
+        return response
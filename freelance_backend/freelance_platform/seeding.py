@@ -0,0 +1,319 @@
+"""
+Synthetic platform data for benchmarks and query-plan tests.
+
+seed() fills an empty database with clients and freelancers (each with a profile),
+projects across every category, proposals, conversations and their messages,
+all from one random.Random(seed): the same seed, Scale and `until` give the
+same rows.
+Timestamps are spread over the `days` before `until` with recent days busiest,
+and rows are inserted in creation order, so ids grow with time as they do in
+production.
+
+Everything goes in with batched bulk_create inside one transaction. Bulk inserts
+skip the model signals, so seed() then brings the derived data up to date itself:
+skill links, conversation summaries and read watermarks, platform counters
+(stats.counters), daily rollups (stats.rollups) and freelancer scores
+(profiles.scores). The search indexes are kept by their database triggers.
+
+`manage.py seed_platform` is the command-line front end.
+"""
+import datetime
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import User
+from messaging.models import Conversation, Message
+from messaging.summary import message_preview
+from profiles.models import Profile
+from profiles.scores import rebuild_scores
+from projects.models import Project, ProjectProposal
+from skills.models import ProfileSkill, ProjectSkill
+from skills.sync import normalize_skill, resolve_skill_ids
+from stats import counters, rollups
+
+EMAIL_DOMAIN = 'seed.example.com'
+INSERT_BATCH = 5000
+
+# Relative frequency of each Project.CATEGORY_CHOICES value, and the skills its projects ask for
+CATEGORIES = {
+    'web-development': (30, ['Python', 'Django', 'JavaScript', 'React', 'TypeScript', 'Node.js', 'PostgreSQL', 'CSS']),
+    'mobile-development': (15, ['Swift', 'Kotlin', 'Flutter', 'React Native', 'iOS', 'Android', 'Firebase']),
+    'graphic-design': (15, ['Figma', 'Photoshop', 'Illustrator', 'UI Design', 'Branding', 'Logo Design']),
+    'writing-translation': (10, ['Copywriting', 'Technical Writing', 'Translation', 'Proofreading', 'Spanish']),
+    'marketing-sales': (10, ['SEO', 'Google Ads', 'Social Media', 'Email Marketing', 'Content Strategy']),
+    'video-animation': (7, ['After Effects', 'Premiere Pro', 'Motion Graphics', 'Blender', 'Video Editing']),
+    'data-science-analytics': (8, ['Python', 'Pandas', 'SQL', 'Machine Learning', 'Tableau', 'Statistics']),
+    'other': (5, ['Excel', 'Project Management', 'Virtual Assistant', 'Customer Support']),
+}
+TOPICS = {
+    'web-development': ['online store', 'booking site', 'REST API', 'landing page', 'admin dashboard'],
+    'mobile-development': ['fitness app', 'delivery app', 'chat app', 'habit tracker', 'loyalty app'],
+    'graphic-design': ['brand identity', 'app mockups', 'pitch deck', 'packaging design', 'logo'],
+    'writing-translation': ['blog series', 'product documentation', 'website copy', 'user manual'],
+    'marketing-sales': ['SEO audit', 'ad campaign', 'newsletter', 'social media plan', 'sales funnel'],
+    'video-animation': ['explainer video', 'product demo', 'intro animation', 'YouTube edits'],
+    'data-science-analytics': ['sales forecast', 'churn model', 'KPI dashboard', 'data pipeline'],
+    'other': ['research project', 'spreadsheet cleanup', 'inbox management', 'support backlog'],
+}
+VERBS = ['Build', 'Redesign', 'Create', 'Improve', 'Launch', 'Fix', 'Migrate']
+LOCATIONS = ['Remote', 'Berlin', 'Lagos', 'Manila', 'São Paulo', 'Toronto', 'Kyiv', 'Bangalore', '']
+MESSAGES = [
+    "Hi! I'd love to help with your {topic}.",
+    'Could you share more details about the {topic}?',
+    'I have done similar work with {skill} before, happy to send examples.',
+    'What is the deadline for the {topic}?',
+    'The first draft of the {topic} is ready for review.',
+    "I've pushed the latest {skill} changes, let me know what you think.",
+    'Thanks, this looks great!',
+    'Can we schedule a quick call tomorrow?',
+    'I sent the invoice for this milestone.',
+    'Small change request: can we adjust the {topic} layout?',
+    'Sure, I will take care of it today.',
+    'Is {skill} a hard requirement or just a preference?',
+]
+# Project status by how old the project is: older projects have mostly finished
+STATUSES_NEW = (['open', 'in_progress', 'cancelled'], [70, 25, 5])
+STATUSES_OLD = (['open', 'in_progress', 'completed', 'cancelled'], [15, 20, 55, 10])
+
+
+@dataclass(frozen=True)
+class Scale:
+    clients: int = 1_000
+    freelancers: int = 4_000
+    projects: int = 10_000
+    # Mean proposals per project; the actual number varies a lot from project to project
+    proposals_per_project: float = 5
+    # Conversations are opened on proposals, so there are at most as many as proposals
+    conversations: int = 20_000
+    messages: int = 200_000
+    days: int = 365
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk_create write the generated auto_now/auto_now_add timestamps instead of now()"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class _Seeder:
+    def __init__(self, scale, seed, until, password, batch_size, log):
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.until = until
+        self.start = until - datetime.timedelta(days=scale.days)
+        self.password = make_password(password)
+        self.batch_size = batch_size
+        self.log = log
+        self.categories = list(CATEGORIES)
+        self.category_weights = [CATEGORIES[category][0] for category in self.categories]
+
+    def recent_time(self, after=None):
+        """A time between `after` (default: the start of the period) and `until`, recent ones likelier"""
+        after = max(after or self.start, self.start)
+        return self.until - (self.until - after) * self.rng.random() ** 2
+
+    def later(self, time, max_days):
+        return min(time + datetime.timedelta(days=max_days) * self.rng.random(), self.until)
+
+    def run(self):
+        self.skill_ids = resolve_skill_ids(name for _, skills in CATEGORIES.values() for name in skills)
+        self.create_users()
+        self.create_projects()
+        self.create_proposals()
+        self.create_conversations()
+        self.create_messages()
+
+    def create_users(self):
+        rng = self.rng
+        roles = ['client'] * self.scale.clients + ['freelancer'] * self.scale.freelancers
+        rng.shuffle(roles)
+        joined = sorted(self.recent_time() for _ in roles)
+        users = User.objects.bulk_create([
+            User(
+                username=f'seed-{role}{i}', email=f'{role}{i}@{EMAIL_DOMAIN}', name=f'Seed {role.title()} {i}',
+                role=role, password=self.password, date_joined=time, created_at=time, updated_at=time,
+            )
+            for i, (role, time) in enumerate(zip(roles, joined))
+        ], batch_size=self.batch_size)
+        self.clients = [user for user in users if user.role == 'client']
+        self.freelancers = [user for user in users if user.role == 'freelancer']
+
+        profiles = []
+        for user in users:
+            profile = Profile(user=user, created_at=user.date_joined, updated_at=user.date_joined)
+            if user.role == 'freelancer':
+                category = rng.choices(self.categories, self.category_weights)[0]
+                skills = CATEGORIES[category][1]
+                profile.skills = rng.sample(skills, rng.randint(1, min(5, len(skills))))
+                profile.headline = f'{profile.skills[0]} specialist'
+                profile.bio = f'Freelancer working on {rng.choice(TOPICS[category])} projects.' if rng.random() < 0.8 else ''
+                profile.hourly_rate = Decimal(min(round(rng.lognormvariate(3.7, 0.5)), 500)) if rng.random() < 0.9 else None
+                profile.location = rng.choice(LOCATIONS)
+                profile.rating = Decimal(f'{rng.triangular(3, 5, 4.6):.2f}') if rng.random() < 0.7 else Decimal('0')
+            profiles.append(profile)
+        Profile.objects.bulk_create(profiles, batch_size=self.batch_size)
+        self.link_skills(ProfileSkill, 'profile', [profile for profile in profiles if profile.skills])
+        self.log(f'{len(users)} users')
+
+    def create_projects(self):
+        rng = self.rng
+        # A few clients post most of the projects
+        weights = [rng.paretovariate(1.5) for _ in self.clients]
+        posted_by = rng.choices(self.clients, weights, k=self.scale.projects) if self.clients else []
+        planned = sorted(((self.recent_time(client.date_joined), client) for client in posted_by), key=lambda plan: plan[0])
+
+        projects = []
+        for created, client in planned:
+            category = rng.choices(self.categories, self.category_weights)[0]
+            skills = CATEGORIES[category][1]
+            topic = rng.choice(TOPICS[category])
+            statuses, weights = STATUSES_NEW if self.until - created < datetime.timedelta(days=30) else STATUSES_OLD
+            status = rng.choices(statuses, weights)[0]
+            projects.append(Project(
+                title=f'{rng.choice(VERBS)} {topic}', description=f'Looking for help with a {topic}.',
+                budget=Decimal(round(rng.lognormvariate(7, 1) / 50) * 50 + 50) if rng.random() < 0.85 else None,
+                category=category, skills=rng.sample(skills, rng.randint(1, min(4, len(skills)))),
+                client=client, status=status, created_at=created,
+                updated_at=created if status == 'open' else self.later(created, 60),
+            ))
+        self.projects = Project.objects.bulk_create(projects, batch_size=self.batch_size)
+        self.link_skills(ProjectSkill, 'project', self.projects)
+        self.log(f'{len(self.projects)} projects')
+
+    def create_proposals(self):
+        rng = self.rng
+        proposals = []
+        for project in self.projects if self.freelancers else []:
+            count = int(rng.expovariate(1 / self.scale.proposals_per_project))
+            if project.status in ('in_progress', 'completed'):
+                count = max(count, 1)
+            count = min(count, len(self.freelancers))
+            statuses = {
+                # One proposal won the projects that got going; the others were turned down
+                'in_progress': ['accepted'] + ['rejected'] * count,
+                'completed': ['accepted'] + ['rejected'] * count,
+                'cancelled': ['rejected'] * count,
+            }.get(project.status)
+            for index, freelancer in enumerate(rng.sample(self.freelancers, count)):
+                if statuses is not None:
+                    status = statuses[index]
+                else:
+                    status = 'rejected' if rng.random() < 0.2 else 'pending'
+                proposals.append(ProjectProposal(
+                    project=project, freelancer=freelancer, message=f'I can deliver the {project.title.lower()}.',
+                    proposed_budget=(project.budget or Decimal(500)) * Decimal(rng.choice([80, 90, 100, 110])) / 100,
+                    timeline=rng.choice(['3 days', '1 week', '2 weeks', '1 month']), status=status,
+                    created_at=self.later(project.created_at, 7),
+                ))
+        proposals.sort(key=lambda proposal: proposal.created_at)
+        self.proposals = ProjectProposal.objects.bulk_create(proposals, batch_size=self.batch_size)
+        self.log(f'{len(self.proposals)} proposals')
+
+    def create_conversations(self):
+        rng = self.rng
+        # Accepted proposals nearly always get a conversation, the others sometimes
+        candidates = sorted(self.proposals, key=lambda proposal: (proposal.status != 'accepted', rng.random()))
+        opened = sorted(candidates[:self.scale.conversations], key=lambda proposal: proposal.created_at)
+        # A long tail of messages: most conversations are short, a few run to thousands
+        weights = [rng.paretovariate(1.2) for _ in opened]
+        share = self.scale.messages / sum(weights) if opened else 0
+        self.message_counts = [int(weight * share) for weight in weights]
+        for index in rng.sample(range(len(opened)), self.scale.messages - sum(self.message_counts) if opened else 0):
+            self.message_counts[index] += 1
+
+        conversations = []
+        for proposal, count in zip(opened, self.message_counts):
+            created = self.later(proposal.created_at, 3)
+            conversations.append(Conversation(
+                client=proposal.project.client, freelancer=proposal.freelancer, project=proposal.project,
+                created_at=created, updated_at=self.later(created, 30) if count else created,
+            ))
+        self.conversations = Conversation.objects.bulk_create(conversations, batch_size=self.batch_size)
+        self.log(f'{len(self.conversations)} conversations')
+
+    def create_messages(self):
+        """Insert every conversation's messages in creation order, then its summary and read watermarks"""
+        rng = self.rng
+        threads = []
+        for conversation, count in zip(self.conversations, self.message_counts):
+            if not count:
+                continue
+            project = conversation.project
+            topic = project.title.split(' ', 1)[1]
+            span = conversation.updated_at - conversation.created_at
+            times = sorted(conversation.created_at + span * rng.random() for _ in range(count - 1))
+            times.append(conversation.updated_at)
+            sender = conversation.freelancer_id
+            messages = []
+            for time in times:
+                # Senders take turns, with the odd run of messages from one side
+                if rng.random() < 0.7:
+                    sender = conversation.client_id if sender == conversation.freelancer_id else conversation.freelancer_id
+                content = rng.choice(MESSAGES).format(topic=topic, skill=rng.choice(project.skills))
+                messages.append(Message(conversation=conversation, sender_id=sender, content=content, created_at=time))
+            threads.append((conversation, messages))
+        # Across conversations too, so message ids grow with created_at (stable, so each
+        # conversation's messages keep their order)
+        rows = sorted((message for _, messages in threads for message in messages), key=lambda message: message.created_at)
+        Message.objects.bulk_create(rows, batch_size=self.batch_size)
+        for conversation, messages in threads:
+            self.summarize(conversation, messages)
+        self.log(f'{len(rows)} messages')
+
+    def summarize(self, conversation, messages):
+        # One UPDATE per conversation: bulk_update() builds a CASE branch per row and
+        # column, which costs more in Python than it saves in round trips here
+        last = messages[-1]
+        summary = {
+            'last_message': last,
+            'last_message_preview': message_preview(last.content),
+            'last_message_sender': last.sender_id,
+            'last_message_at': last.created_at,
+        }
+        for role in ('client', 'freelancer'):
+            participant = getattr(conversation, f'{role}_id')
+            # Most people have read everything; the rest are a few messages behind
+            read = len(messages) if self.rng.random() < 0.7 else max(len(messages) - self.rng.randint(1, 5), 0)
+            summary[f'{role}_last_read_id'] = messages[read - 1].id if read else 0
+            summary[f'{role}_unread_count'] = sum(1 for message in messages[read:] if message.sender_id != participant)
+        Conversation.objects.filter(pk=conversation.pk).update(**summary)
+
+    def link_skills(self, link_model, owner_field, owners):
+        """What skills.sync does for one owner at a time, for every seeded owner at once"""
+        link_model.objects.bulk_create([
+            link_model(**{owner_field: owner, 'skill_id': self.skill_ids[normalize_skill(name)]})
+            for owner in owners for name in owner.skills
+        ], batch_size=self.batch_size)
+
+
+def seed(scale=Scale(), seed=0, until=None, password='seed-password', batch_size=INSERT_BATCH, log=lambda line: None):
+    """
+    Generate `scale` worth of platform data (see the module docstring) ending at `until`
+    (default: now). Seeded users log in with `password`. `log` gets a line per table.
+    """
+    if User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').exists():
+        raise ValueError('The database has already been seeded')
+    seeder = _Seeder(scale, seed, until or timezone.now(), password, batch_size, log)
+    with transaction.atomic():
+        with _explicit_timestamps(User, Profile, Project, ProjectProposal, Conversation, Message):
+            seeder.run()
+        counters.reconcile()
+        rollups.rebuild()
+    log(f'{rebuild_scores()} freelancer scores')
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     # Third party apps
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',  # BLACKLIST_AFTER_ROTATION and logout need it
     'corsheaders',
     'django_filters',
     
@@ -60,9 +61,12 @@ INSTALLED_APPS = [
     'projects',
     'profiles',
     'messaging',
+    'skills',
+    'stats',
 ]
 
 MIDDLEWARE = [
+    'freelance_platform.querycount.QueryCountMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -101,6 +105,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock up front so concurrent writers (e.g. the outbox
+            # worker thread) wait on the busy timeout instead of failing immediately
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -147,6 +157,34 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Demo videos and message attachments are served by access-checked views (see
+# freelance_platform.media): 'django' streams them from the app (sendfile under
+# gunicorn); 'x-accel' (nginx) or 'x-sendfile' (Apache) hands them to the proxy, which
+# must map MEDIA_ACCEL_PREFIX to an internal location aliasing MEDIA_ROOT.
+MEDIA_SERVE_MODE = config('MEDIA_SERVE_MODE', default='django')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Lifetime of the signed media URLs handed out in API responses, in seconds
+MEDIA_URL_MAX_AGE = config('MEDIA_URL_MAX_AGE', default=3600, cast=int)
+
+# Chunked message attachment uploads (see messaging.uploads); part files go to
+# MEDIA_ROOT/attachment_uploads unless ATTACHMENT_UPLOAD_TEMP_DIR names another directory
+ATTACHMENT_UPLOAD_TEMP_DIR = config('ATTACHMENT_UPLOAD_TEMP_DIR', default='')
+ATTACHMENT_MAX_SIZE = 100 * 1024 * 1024
+ATTACHMENT_CHUNK_MAX_SIZE = 5 * 1024 * 1024
+# Hours an unfinished upload may go without a chunk before `manage.py cleanup_uploads`
+# discards it and its part file
+ATTACHMENT_UPLOAD_EXPIRY_HOURS = config('ATTACHMENT_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
+# Avatar uploads and their background renditions (see profiles.avatars)
+AVATAR_MAX_SIZE = 10 * 1024 * 1024
+AVATAR_MAX_PIXELS = 40_000_000
+AVATAR_RENDER_WORKERS = config('AVATAR_RENDER_WORKERS', default=2, cast=int)
+
+# Video demo metadata and thumbnails (see profiles.videos); needs ffmpeg installed
+FFMPEG_BINARY = config('FFMPEG_BINARY', default='ffmpeg')
+FFPROBE_BINARY = config('FFPROBE_BINARY', default='ffprobe')
+VIDEO_PROCESS_WORKERS = config('VIDEO_PROCESS_WORKERS', default=1, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -163,7 +201,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Page numbers by default; ?cursor= opts into keyset pages
+    'DEFAULT_PAGINATION_CLASS': 'freelance_platform.pagination.KeysetPagination',
     'PAGE_SIZE': 20
 }
 
@@ -199,6 +238,38 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Real-time messaging events (see messaging.events). The in-process broker only
+# fans out within one ASGI process; point this at a shared broker when scaling out.
+MESSAGING_EVENT_BROKER = 'messaging.events.InProcessBroker'
+
+# Drain the messaging outbox from a background thread in each web process. Turn off
+# when `manage.py process_outbox --loop` runs as a separate worker.
+OUTBOX_LOCAL_WORKER = config('OUTBOX_LOCAL_WORKER', default=True, cast=bool)
+
+# Use a shared backend (Redis, Memcached) in production so cached leaderboards and
+# their recompute locks are shared across processes.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='freelance-platform'),
+    }
+}
+
+# Seconds a cached leaderboard response stays fresh (see profiles.leaderboards)
+LEADERBOARD_CACHE_TTL = config('LEADERBOARD_CACHE_TTL', default=300, cast=int)
+
+# Seconds project browser facet counts are cached for (see projects.facets)
+PROJECT_FACETS_CACHE_TTL = config('PROJECT_FACETS_CACHE_TTL', default=30, cast=int)
+
+# Per-request query count and DB time response headers, and the query count above
+# which a request is logged (see freelance_platform.querycount)
+QUERY_COUNT_HEADERS = config('QUERY_COUNT_HEADERS', default=DEBUG, cast=bool)
+QUERY_COUNT_WARNING = config('QUERY_COUNT_WARNING', default=50, cast=int)
+
+# Longest a process's freelancer-project matching index (projects.matching) may go
+# without picking up profile and project changes, in seconds
+MATCHING_SYNC_INTERVAL = config('MATCHING_SYNC_INTERVAL', default=1.0, cast=float)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
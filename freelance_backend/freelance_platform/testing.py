@@ -0,0 +1,82 @@
+"""
+Shared test helpers.
+
+QueryPlanTestMixin records every SELECT an endpoint runs and asserts on its
+SQLite query plan, so a dropped index or a query rewritten around one shows up
+as a test failure instead of a slow page on a large table.
+
+QueryBudgetTestMixin fails a test whose block runs more statements than its
+budget, listing them along with the SQL it repeated, so an N+1 shows up with
+the query to fix.
+"""
+import re
+import unittest
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .querycount import record_queries
+
+# "SCAN <table>" with nothing after it reads every row; "SCAN <table> USING INDEX"
+# walks an index in order and stops at the LIMIT
+_FULL_SCAN_RE = re.compile(r'\bSCAN (\w+)\s*$')
+_TEMP_SORT = 'USE TEMP B-TREE FOR'
+
+
+def query_plan(sql, using=DEFAULT_DB_ALIAS):
+    """Return the EXPLAIN QUERY PLAN detail lines for an already-interpolated statement"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plan assertions are written against SQLite plans')
+class QueryPlanTestMixin:
+    """
+    Mixin for TestCase. assertQueryPlansUseIndexes() calls a view and fails if any
+    SELECT it ran does a full table scan or sorts in a temporary B-tree, apart from
+    the tables and sorts a test explicitly allows.
+    """
+
+    def call_view(self, view, path, user, **kwargs):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, user=user)
+        with CaptureQueriesContext(connection) as captured:
+            response = view(request, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        self.assertEqual(response.status_code, 200, getattr(response, 'data', None))
+        return [query['sql'] for query in captured.captured_queries if query['sql'].startswith('SELECT')]
+
+    def plan_problems(self, sql, allow_scans=(), allow_temp_sort=False):
+        problems = []
+        for detail in query_plan(sql):
+            match = _FULL_SCAN_RE.search(detail)
+            if match and match.group(1) not in allow_scans:
+                problems.append(detail)
+            if _TEMP_SORT in detail and not allow_temp_sort:
+                problems.append(detail)
+        return problems
+
+    def assertQueryPlansUseIndexes(self, view, path, user, allow_scans=(), allow_temp_sort=False, **kwargs):
+        statements = self.call_view(view, path, user, **kwargs)
+        self.assertTrue(statements, f'{path} ran no queries')
+        for sql in statements:
+            problems = self.plan_problems(sql, allow_scans, allow_temp_sort)
+            self.assertFalse(problems, f'{path}: {problems} in plan for\n{sql}')
+
+
+class QueryBudgetTestMixin:
+    """
+    Mixin for TestCase. assertQueryBudget() is a context manager failing the test
+    if its block runs more than `budget` statements.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, label='Block', using=DEFAULT_DB_ALIAS):
+        with record_queries(using) as recorder:
+            yield recorder
+        if recorder.count > budget:
+            self.fail(f'{label} ran {recorder.count} queries, over its budget of {budget}:\n{recorder.report()}')
@@ -0,0 +1,401 @@
+import datetime
+import io
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Callable
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from messaging import uploads
+from messaging.models import AttachmentUpload, Conversation, Message, MessageAttachment
+from messaging.summary import rebuild_conversation_summaries, record_new_message
+from messaging.sync import encode_cursor
+from profiles.models import Profile, VideoDemo
+from profiles.scores import rebuild_scores
+from projects.models import Project, ProjectProposal
+from skills.models import ProfileSkill, ProjectSkill
+from stats import counters
+from . import benchmark, querycount, seeding
+from .testing import QueryBudgetTestMixin
+
+PASSWORD = 'budget-Pass-123'
+
+
+@dataclass
+class Endpoint:
+    """
+    One call to an API route and the most statements it may run. `args`, `data`
+    and `query` take the test case, so they can set up what the call needs; that
+    setup runs before the queries are counted.
+    """
+    name: str
+    budget: int
+    method: str = 'get'
+    user: str = 'client_user'
+    args: Callable = None
+    data: Callable = None
+    query: Callable = None
+    status: int = 200
+    format: str = 'json'
+
+
+def _project(case):
+    return [case.project.id]
+
+
+def _conversation(case):
+    return [case.conversation.id]
+
+
+# Counted with APIClient.force_authenticate; a JWT-authenticated request adds one user lookup
+ENDPOINTS = [
+    # accounts
+    Endpoint('register', 10, 'post', user=None, status=201, data=lambda case: case.registration()),
+    Endpoint('login', 2, 'post', user=None, data=lambda case: {'email': case.login_user.email, 'password': PASSWORD}),
+    Endpoint('logout', 7, 'post', data=lambda case: {'refresh': str(RefreshToken.for_user(case.client_user))}),
+    Endpoint('user_profile', 1),
+    Endpoint('token_refresh', 13, 'post', user=None, data=lambda case: {
+        'refresh': str(RefreshToken.for_user(case.client_user)),
+    }),
+    # projects
+    Endpoint('project-list-create', 2),
+    Endpoint('project-list-create', 8, 'post', status=201, data=lambda case: {
+        'title': 'New project', 'description': 'Details', 'category': 'web-development', 'skills': ['python'],
+    }),
+    Endpoint('project-facets', 1, query=lambda case: {'category': 'web-development'}),
+    Endpoint('project-detail', 1, args=_project),
+    Endpoint('project-matches', 10, args=_project),
+    Endpoint('recommended-projects', 7, user='freelancer'),
+    Endpoint('project-proposals', 2, args=_project),
+    Endpoint('proposal-list-create', 2),
+    Endpoint('proposal-list-create', 6, 'post', user='freelancer', status=201, data=lambda case: {
+        'project': case.new_project().id, 'message': 'Hello', 'proposed_budget': '500', 'timeline': '1 week',
+    }),
+    Endpoint('my-projects', 1),
+    Endpoint('my-proposals', 1, user='freelancer'),
+    Endpoint('my-active-projects', 1),
+    Endpoint('my-active-projects', 1, user='freelancer'),
+    # profiles
+    Endpoint('profile-list', 2),
+    Endpoint('profile-detail', 1, args=lambda case: [case.freelancer.profile.id]),
+    Endpoint('my-profile', 1, user='freelancer'),
+    Endpoint('update-my-profile', 9, 'put', user='freelancer', data=lambda case: {'headline': 'Django developer'}),
+    Endpoint('top-freelancers', 1, user=None),
+    Endpoint('newcomer-freelancers', 2, user=None),
+    Endpoint('featured-freelancers', 1, user=None),
+    Endpoint('leaderboard-stats', 0, user='admin'),
+    Endpoint('video-demo-list-create', 2, user='freelancer'),
+    Endpoint('video-demo-detail', 1, user='freelancer', args=lambda case: [case.demo.id]),
+    Endpoint('video-demo-file', 1, user='freelancer', args=lambda case: [case.demo.id]),
+    # messaging
+    Endpoint('conversation-list', 2),
+    Endpoint('start-conversation', 9, 'post', data=lambda case: {'user_id': case.new_freelancer().id}, status=201),
+    Endpoint('conversation-detail', 12, args=_conversation),
+    Endpoint('conversation-messages', 3, args=_conversation),
+    Endpoint('send-message', 9, 'post', args=_conversation, data=lambda case: {'content': 'Any news?'}, status=201),
+    Endpoint('unread-messages-count', 1),
+    Endpoint('messaging-sync', 3, query=lambda case: {'since': case.sync_cursor}),
+    Endpoint('message-search', 3, query=lambda case: {'q': 'django'}),
+    Endpoint('attachment-upload-start', 1, 'post', data=lambda case: {'filename': 'brief.txt', 'size': 5}, status=201),
+    Endpoint('attachment-upload', 1, args=lambda case: [case.new_upload().id]),
+    Endpoint('attachment-upload', 4, 'put', args=lambda case: [case.new_upload().id], query=lambda case: {'offset': 0},
+             data=lambda case: b'hello', format=None),
+    Endpoint('attachment-upload-complete', 7, 'post', args=lambda case: [case.new_upload(received=True).id],
+             data=lambda case: {'message_id': case.client_message.id}, status=201),
+    Endpoint('message-attachment-file', 1, args=lambda case: [case.attachment.id]),
+    # skills
+    Endpoint('skill-list', 2, user=None),
+]
+
+
+def _api_route_names(patterns=None, prefix=''):
+    """Names of every route under api/ in the root URLconf"""
+    names = set()
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            names |= _api_route_names(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern) and route.startswith('api/'):
+            names.add(pattern.name)
+    return names
+
+
+@override_settings(OUTBOX_LOCAL_WORKER=False, MATCHING_SYNC_INTERVAL=0)
+class EndpointQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """
+    Every API route runs at most its budgeted statements, and no more with larger
+    tables: the data is seeded at SMALL and then LARGE rows per relation and each
+    endpoint is called at both sizes.
+    """
+    SMALL = 2
+    LARGE = 8
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.created = 0
+        self.client_user = self.user('client')
+        self.freelancer = self.user('freelancer')
+        self.other_client = self.user('client')
+        self.admin = self.user('admin', is_staff=True)
+        self.login_user = User.objects.create_user(
+            username='login', email='login@example.com', password=PASSWORD, role='client',
+        )
+        self.project = self.new_project(title='Django API', budget=1000)
+        self.conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        self.client_message = self.send(self.conversation, self.client_user, 'Welcome to the Django project')
+        self.attachment = self.attach(self.client_message)
+        self.demo = self.new_demo()
+        self.sync_cursor = encode_cursor(timezone.now() - timezone.timedelta(days=1), 0, 0)
+        self.size = 0
+
+    def user(self, role, **fields):
+        self.created += 1
+        user = User.objects.create(
+            username=f'{role}{self.created}', email=f'{role}{self.created}@example.com', role=role,
+            name=f'{role.title()} {self.created}', **fields,
+        )
+        Profile.objects.create(user=user, skills=['python', 'django'], hourly_rate=40, rating=4)
+        return user
+
+    def registration(self):
+        self.created += 1
+        return {
+            'username': f'new{self.created}', 'email': f'new{self.created}@example.com', 'name': 'New',
+            'role': 'freelancer', 'password': PASSWORD, 'password_confirm': PASSWORD,
+        }
+
+    def new_project(self, client=None, **fields):
+        fields = {
+            'title': 'Django project', 'description': 'Build a Django API', 'category': 'web-development',
+            'skills': ['python', 'django'], 'budget': 800, **fields,
+        }
+        return Project.objects.create(client=client or self.client_user, **fields)
+
+    def new_freelancer(self):
+        return self.user('freelancer')
+
+    def new_demo(self):
+        return VideoDemo.objects.create(
+            profile=self.freelancer.profile, title='Demo', category='web-development',
+            video_file=default_storage.save('videos/demo.mp4', io.BytesIO(b'\x00' * 64)),
+        )
+
+    def new_upload(self, received=False):
+        upload = AttachmentUpload.objects.create(
+            uploader=self.client_user, filename='brief.txt', total_size=5, received_size=5 if received else 0,
+        )
+        uploads.part_path(upload).write_bytes(b'hello' if received else b'')
+        return upload
+
+    def send(self, conversation, sender, content):
+        message = Message.objects.create(conversation=conversation, sender=sender, content=content)
+        record_new_message(conversation, message)
+        return message
+
+    def attach(self, message):
+        return MessageAttachment.objects.create(
+            message=message, filename='brief.pdf', file_size=9,
+            file=default_storage.save('message_attachments/blob', io.BytesIO(b'%PDF-data')),
+        )
+
+    def grow(self, size):
+        """Bring every relation the endpoints read up to `size` rows"""
+        while self.size < size:
+            self.size += 1
+            freelancer = self.new_freelancer()
+            client = self.user('client')
+            project = self.new_project(title=f'Django project {self.size}')
+            for proposed_to in (project, self.project):
+                ProjectProposal.objects.create(
+                    project=proposed_to, freelancer=freelancer, message='Hi', proposed_budget=700, timeline='2 weeks',
+                )
+            active = self.new_project(client=client, status='in_progress')
+            ProjectProposal.objects.create(
+                project=active, freelancer=self.freelancer, message='Hi', proposed_budget=700, timeline='2 weeks',
+                status='accepted',
+            )
+            self.new_project(client=self.client_user, status='in_progress')
+
+            conversation = Conversation.objects.create(client=self.client_user, freelancer=freelancer)
+            self.send(conversation, freelancer, 'About your Django project')
+            for sender in (self.client_user, self.freelancer):
+                self.attach(self.send(self.conversation, sender, f'Django update {self.size}'))
+            self.new_demo()
+        rebuild_scores()
+
+    def call(self, endpoint):
+        api = APIClient()
+        if endpoint.user:
+            api.force_authenticate(getattr(self, endpoint.user))
+        path = reverse(endpoint.name, args=endpoint.args(self) if endpoint.args else None)
+        data = endpoint.data(self) if endpoint.data else None
+        if endpoint.query:
+            query = '&'.join(f'{key}={value}' for key, value in endpoint.query(self).items())
+            path = f'{path}?{query}'
+        cache.clear()
+
+        label = f'{endpoint.method.upper()} {endpoint.name} at size {self.size}'
+        with self.assertQueryBudget(endpoint.budget, label) as recorder:
+            if endpoint.format is None:
+                response = getattr(api, endpoint.method)(path, data, content_type='application/octet-stream')
+            else:
+                response = getattr(api, endpoint.method)(path, data, format=endpoint.format)
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, endpoint.status, f'{label}: {getattr(response, "data", None)}')
+        return recorder.count
+
+    def test_every_api_route_has_a_budget(self):
+        self.assertEqual(_api_route_names() - {endpoint.name for endpoint in ENDPOINTS}, set())
+
+    def test_endpoints_stay_within_budget_as_tables_grow(self):
+        counts = {}
+        for size in (self.SMALL, self.LARGE):
+            self.grow(size)
+            for index, endpoint in enumerate(ENDPOINTS):
+                with self.subTest(endpoint=endpoint.name, method=endpoint.method, size=size):
+                    counts.setdefault(index, []).append(self.call(endpoint))
+        for index, values in counts.items():
+            endpoint = ENDPOINTS[index]
+            # Endpoints that failed at either size were reported above
+            if len(values) == 2:
+                with self.subTest(endpoint=endpoint.name, method=endpoint.method):
+                    self.assertLessEqual(values[1], values[0], f'{endpoint.name} runs more queries on larger tables')
+
+
+class QueryCountMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    @override_settings(QUERY_COUNT_HEADERS=True)
+    def test_headers(self):
+        response = self.api.get('/api/auth/profile/')
+        self.assertEqual(response['X-DB-Queries'], '1')
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+        self.assertIn('X-DB-Time', response)
+        self.assertTrue(response['Server-Timing'].startswith('db;dur='))
+
+    @override_settings(QUERY_COUNT_HEADERS=False)
+    def test_headers_off(self):
+        self.assertNotIn('X-DB-Queries', self.api.get('/api/auth/profile/'))
+
+    @override_settings(QUERY_COUNT_WARNING=0)
+    def test_warns_over_the_threshold(self):
+        with self.assertLogs('freelance_platform.querycount', 'WARNING') as logs:
+            self.api.get('/api/auth/profile/')
+        self.assertIn('GET /api/auth/profile/ ran 1 queries', logs.output[0])
+
+    @override_settings(QUERY_COUNT_HEADERS=False, QUERY_COUNT_WARNING=1)
+    def test_headers_off_keep_only_statements_past_the_threshold(self):
+        with querycount.record_queries(record_after=1) as recorder:
+            User.objects.count()
+            User.objects.count()
+        self.assertEqual(recorder.count, 2)
+        self.assertEqual(len(recorder.statements), 1)
+
+        recorders = []
+        init = querycount.QueryRecorder.__init__
+
+        def spy(recorder, *args):
+            init(recorder, *args)
+            recorders.append(recorder)
+
+        with mock.patch.object(querycount.QueryRecorder, '__init__', spy):
+            self.api.get('/api/auth/profile/')
+        self.assertEqual((recorders[0].count, recorders[0].statements), (1, []))
+
+
+class SeedTests(TestCase):
+    SCALE = seeding.Scale(clients=5, freelancers=15, projects=40, conversations=30, messages=400, days=60)
+    UNTIL = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def seeded(self):
+        """A fingerprint of what seed() generated, rolled back afterwards"""
+        with transaction.atomic():
+            seeding.seed(self.SCALE, seed=7, until=self.UNTIL)
+            fingerprint = (
+                list(User.objects.order_by('id').values_list('email', 'role', 'date_joined')),
+                list(Profile.objects.order_by('id').values_list('skills', 'hourly_rate', 'rating')),
+                list(Project.objects.order_by('id').values_list('title', 'category', 'budget', 'status', 'created_at')),
+                list(ProjectProposal.objects.order_by('id').values_list('status', 'proposed_budget', 'created_at')),
+                list(Conversation.objects.order_by('id').values_list('client_unread_count', 'freelancer_unread_count')),
+                list(Message.objects.order_by('id').values_list('content', 'created_at')),
+            )
+            self.check_derived_data()
+            transaction.set_rollback(True)
+        return fingerprint
+
+    def check_derived_data(self):
+        self.assertEqual(Message.objects.count(), self.SCALE.messages)
+        self.assertEqual(Message.objects.filter(created_at__gt=self.UNTIL).count(), 0)
+        # Ids follow created_at across conversations, as the rollup watermarks expect
+        times = list(Message.objects.order_by('id').values_list('created_at', flat=True))
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(counters.reconcile(fix=False), [])
+        self.assertEqual(ProfileSkill.objects.count(), sum(len(skills) for skills in Profile.objects.values_list('skills', flat=True)))
+        self.assertEqual(ProjectSkill.objects.count(), sum(len(skills) for skills in Project.objects.values_list('skills', flat=True)))
+        self.assertFalse(Project.objects.filter(status='in_progress').exclude(proposals__status='accepted').exists())
+
+        summaries = list(Conversation.objects.order_by('id').values())
+        rebuild_conversation_summaries()
+        self.assertEqual(list(Conversation.objects.order_by('id').values()), summaries)
+
+    def test_same_seed_same_data(self):
+        self.assertEqual(self.seeded(), self.seeded())
+
+    def test_refuses_a_seeded_database(self):
+        seeding.seed(self.SCALE, until=self.UNTIL)
+        with self.assertRaises(ValueError):
+            seeding.seed(self.SCALE, until=self.UNTIL)
+
+
+@override_settings(OUTBOX_LOCAL_WORKER=False)
+class BenchmarkTests(TestCase):
+    def test_every_route_is_benchmarked(self):
+        self.assertEqual(benchmark.route_names() - {route.name for route in benchmark.ROUTES}, set())
+
+    def test_run_against_seeded_data(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        seeding.seed(SeedTests.SCALE, password=PASSWORD)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            results = benchmark.run(PASSWORD, requests=3, warmup=0, memory_requests=1)
+        self.assertEqual([result['endpoint'] for result in results], [route.label for route in benchmark.ROUTES])
+        for result in results:
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+            self.assertGreater(result['peak_memory_kb'], 0)
+
+    def test_compare(self):
+        def result(endpoint, **metrics):
+            return {'size': 'small', 'endpoint': endpoint, 'p50_ms': 10, 'p95_ms': 20, 'peak_memory_kb': 100,
+                    'queries': 3, **metrics}
+
+        baseline = [result('GET a'), result('GET b'), result('GET c', p50_ms=0.5)]
+        regressions = benchmark.compare([
+            result('GET a', p95_ms=30, queries=4),
+            # Within the threshold
+            result('GET b', p50_ms=11.5, p95_ms=20.8),
+            # More than doubled, but by less than the noise floor
+            result('GET c', p50_ms=1.2),
+            result('GET new', p50_ms=1000),
+        ], baseline, threshold=0.2)
+        self.assertEqual(regressions, [('small', 'GET a', 'p95_ms', 20, 30), ('small', 'GET a', 'queries', 3, 4)])
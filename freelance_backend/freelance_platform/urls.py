@@ -25,6 +25,7 @@ urlpatterns = [
     path('api/projects/', include('projects.urls')),
     path('api/profiles/', include('profiles.urls')),
     path('api/messaging/', include('messaging.urls')),
+    path('api/skills/', include('skills.urls')),
 ]
 
 # Serve media files during development
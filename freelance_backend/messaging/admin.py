@@ -3,11 +3,28 @@ from unfold.admin import ModelAdmin, TabularInline
 from unfold.contrib.filters.admin import RangeDateFilter, ChoicesDropdownFilter
 from unfold.decorators import display
 from .models import Conversation, Message, MessageAttachment
+from .search import filter_messages
+from .summary import mark_conversations_read, mark_messages_read, mark_messages_unread
+
+class ReadStatusFilter(admin.SimpleListFilter):
+    """Filter on the read state derived from the conversation watermarks"""
+    title = 'read'
+    parameter_name = 'is_read'
+    
+    def lookups(self, request, model_admin):
+        return [('1', 'Yes'), ('0', 'No')]
+    
+    def queryset(self, request, queryset):
+        if self.value() == '1':
+            return queryset.read()
+        if self.value() == '0':
+            return queryset.unread()
+        return queryset
 
 class MessageInline(TabularInline):
     model = Message
     extra = 0
-    readonly_fields = ['created_at']
+    readonly_fields = ['is_read', 'created_at']
     fields = ['sender', 'content', 'is_read', 'created_at']
     ordering = ['-created_at']
 
@@ -76,22 +93,20 @@ class ConversationAdmin(ModelAdmin):
     
     @admin.action(description='Mark all messages in selected conversations as read')
     def mark_all_messages_read(self, request, queryset):
-        total_updated = 0
-        for conversation in queryset:
-            updated = conversation.messages.filter(is_read=False).update(is_read=True)
-            total_updated += updated
-        self.message_user(request, f'{total_updated} messages marked as read across {queryset.count()} conversations.')
+        updated = mark_conversations_read(queryset)
+        self.message_user(request, f'All messages marked as read across {updated} conversations.')
 
 @admin.register(Message)
 class MessageAdmin(ModelAdmin):
-    list_display = ['get_conversation_title', 'sender', 'get_content_preview', 'is_read', 'get_attachments_count', 'created_at']
+    list_display = ['get_conversation_title', 'sender', 'get_content_preview', 'get_is_read', 'get_attachments_count', 'created_at']
+    list_select_related = ['sender', 'conversation__client', 'conversation__freelancer']
     list_filter = [
-        'is_read',
+        ReadStatusFilter,
         ('created_at', RangeDateFilter),
         'sender__role'
     ]
+    # Message content is matched through the full-text index in get_search_results
     search_fields = [
-        'content',
         'sender__email',
         'sender__first_name',
         'sender__last_name',
@@ -114,14 +129,24 @@ class MessageAdmin(ModelAdmin):
         }),
     )
     
-    readonly_fields = ['created_at']
+    readonly_fields = ['is_read', 'created_at']
     inlines = [MessageAttachmentInline]
     
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results = results | filter_messages(queryset, search_term)
+        return results, may_have_duplicates
+    
     # Custom display methods
     @display(description="Conversation", ordering="conversation__client__email")
     def get_conversation_title(self, obj):
         return f"{obj.conversation.client.first_name or obj.conversation.client.email} ↔ {obj.conversation.freelancer.first_name or obj.conversation.freelancer.email}"
     
+    @display(description="Read", boolean=True)
+    def get_is_read(self, obj):
+        return obj.is_read
+    
     @display(description="Content Preview")
     def get_content_preview(self, obj):
         return obj.content[:50] + "..." if len(obj.content) > 50 else obj.content
@@ -135,12 +160,14 @@ class MessageAdmin(ModelAdmin):
     
     @admin.action(description='Mark selected messages as read')
     def mark_as_read(self, request, queryset):
-        updated = queryset.update(is_read=True)
+        updated = queryset.count()
+        mark_messages_read(queryset)
         self.message_user(request, f'{updated} messages marked as read.')
     
     @admin.action(description='Mark selected messages as unread')
     def mark_as_unread(self, request, queryset):
-        updated = queryset.update(is_read=False)
+        updated = queryset.count()
+        mark_messages_unread(queryset)
         self.message_user(request, f'{updated} messages marked as unread.')
 
 @admin.register(MessageAttachment)
@@ -162,7 +189,7 @@ class MessageAttachmentAdmin(ModelAdmin):
             'fields': ('message', 'filename', 'file')
         }),
         ('File Information', {
-            'fields': ('file_size',)
+            'fields': ('file_size', 'sha256')
         }),
         ('Timestamps', {
             'fields': ('uploaded_at',),
@@ -170,7 +197,7 @@ class MessageAttachmentAdmin(ModelAdmin):
         }),
     )
     
-    readonly_fields = ['uploaded_at', 'file_size']
+    readonly_fields = ['uploaded_at', 'file_size', 'sha256']
     
     # Custom display methods
     @display(description="Message", ordering="message__created_at")
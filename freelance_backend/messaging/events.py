@@ -0,0 +1,138 @@
+"""
+Real-time messaging events.
+
+Views publish events for a set of user ids; the WebSocket endpoint in
+messaging.websocket subscribes each connection to its user's stream. The broker
+is pluggable through settings.MESSAGING_EVENT_BROKER (a dotted path to a Broker
+subclass). The default InProcessBroker fans out inside a single process, which is
+enough for single-node ASGI deployments and for local tests; multi-node setups
+plug in a broker backed by Redis pub/sub or similar with the same interface.
+"""
+import asyncio
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .summary import total_unread_count
+
+DEFAULT_BROKER = 'messaging.events.InProcessBroker'
+
+
+class Subscription:
+    """A single connection's event stream"""
+
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+
+    async def get(self):
+        raise NotImplementedError
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Interface every event broker implements"""
+
+    def publish(self, user_ids, event):
+        """Deliver `event` (a JSON-serializable dict) to every subscription of `user_ids`"""
+        raise NotImplementedError
+
+    def subscribe(self, user_id):
+        """Return a Subscription for `user_id`; must be called from the event loop that will read it"""
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class QueueSubscription(Subscription):
+    MAX_PENDING = 100
+
+    def __init__(self, broker, user_id):
+        super().__init__(broker, user_id)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.MAX_PENDING)
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop; a client too slow to drain its queue
+        # loses events and is expected to resync through the REST endpoints
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class InProcessBroker(Broker):
+    """Fans events out to subscriptions living in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            targets = [s for user_id in set(user_ids) for s in self._subscriptions.get(user_id, ())]
+        for subscription in targets:
+            # Publishers run in sync worker threads, subscribers on the ASGI loop
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+    def subscribe(self, user_id):
+        subscription = QueueSubscription(self, user_id)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(getattr(settings, 'MESSAGING_EVENT_BROKER', DEFAULT_BROKER))()
+
+
+def publish(user_ids, event):
+    """Publish once the surrounding transaction commits, so clients never see rolled-back state"""
+    transaction.on_commit(lambda: get_broker().publish(user_ids, event))
+
+
+def message_created(conversation, message, message_data):
+    recipient_id = conversation.freelancer_id if message.sender_id == conversation.client_id else conversation.client_id
+    publish([conversation.client_id, conversation.freelancer_id], {
+        'type': 'message.new',
+        'conversation_id': conversation.id,
+        'message': message_data,
+    })
+    unread_changed(recipient_id)
+
+
+def conversation_read(conversation, reader_id):
+    role = 'client' if reader_id == conversation.client_id else 'freelancer'
+    publish([conversation.client_id, conversation.freelancer_id], {
+        'type': 'message.read',
+        'conversation_id': conversation.id,
+        'reader_id': reader_id,
+        'last_read_id': getattr(conversation, f'{role}_last_read_id'),
+    })
+    unread_changed(reader_id)
+
+
+def unread_changed(user_id):
+    # The total is read after commit so it reflects the write that triggered it
+    transaction.on_commit(lambda: get_broker().publish([user_id], {
+        'type': 'unread.count',
+        'unread_count': total_unread_count(user_id),
+    }))
@@ -0,0 +1,23 @@
+"""Outbox handlers for messaging side effects; registered on import by MessagingConfig.ready"""
+from . import events, outbox
+from .models import Conversation, Message
+from .serializers import MessageSerializer
+from .summary import record_new_message
+
+
+@outbox.handler('message.created')
+def message_created(payload):
+    message = Message.objects.select_related('conversation', 'sender').filter(id=payload['message_id']).first()
+    if message is None:
+        # Deleted before delivery; rebuild_conversation_counters covers any drift
+        return
+    record_new_message(message.conversation, message)
+    events.message_created(message.conversation, message, MessageSerializer(message).data)
+
+
+@outbox.handler('conversation.read')
+def conversation_read(payload):
+    conversation = Conversation.objects.filter(id=payload['conversation_id']).first()
+    if conversation is None:
+        return
+    events.conversation_read(conversation, payload['reader_id'])
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from messaging import uploads
+
+
+class Command(BaseCommand):
+    help = 'Discard chunked attachment uploads that were abandoned, together with their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None,
+                            help='Idle time after which an upload is discarded '
+                                 '(default: settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS)')
+
+    def handle(self, *args, **options):
+        max_idle = timedelta(hours=options['hours']) if options['hours'] is not None else None
+        discarded = uploads.discard_expired(max_idle)
+        self.stdout.write(f'Discarded {discarded} abandoned uploads.')
@@ -0,0 +1,32 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from messaging import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending messaging outbox events (notifications, counters, cache invalidation)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling instead of exiting once the outbox is empty')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds between polls with --loop')
+        parser.add_argument('--purge-after-days', type=int, default=None,
+                            help='Also delete events delivered more than this many days ago')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = outbox.drain(options['batch_size'])
+            if processed or not options['loop']:
+                self.stdout.write(f'Processed {processed} outbox events.')
+            if options['purge_after_days'] is not None:
+                outbox.purge_processed(timedelta(days=options['purge_after_days']))
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from messaging.models import Conversation
+from messaging.summary import rebuild_conversation_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized last-message snapshot and unread counters on every conversation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversation', type=int, action='append', dest='conversation_ids',
+                            help='Only rebuild the given conversation id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        conversations = Conversation.objects.all()
+        if options['conversation_ids']:
+            conversations = conversations.filter(id__in=options['conversation_ids'])
+
+        total = rebuild_conversation_summaries(conversations, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt counters for {total} conversations.'))
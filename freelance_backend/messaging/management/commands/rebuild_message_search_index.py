@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from messaging.search import get_backend, install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Re-create the message full-text search index and re-index every message'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if backend is None:
+            raise CommandError(f'Message search is not supported on {connection.vendor}')
+
+        with connection.schema_editor() as schema_editor:
+            install_search_index(schema_editor)
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS('Message search index rebuilt.'))
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+    for conversation in Conversation.objects.all().iterator():
+        messages = Message.objects.filter(conversation=conversation)
+        last = messages.order_by('-created_at', '-id').first()
+        unread = messages.filter(is_read=False)
+        if last:
+            conversation.last_message = last
+            conversation.last_message_preview = last.content[:255]
+            conversation.last_message_sender_id = last.sender_id
+            conversation.last_message_at = last.created_at
+        conversation.client_unread_count = unread.exclude(sender_id=conversation.client_id).count()
+        conversation.freelancer_unread_count = unread.exclude(sender_id=conversation.freelancer_id).count()
+        conversation.save(update_fields=[
+            'last_message', 'last_message_preview', 'last_message_sender', 'last_message_at',
+            'client_unread_count', 'freelancer_unread_count',
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0002_message_conv_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='client_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='freelancer_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_watermarks(apps, schema_editor):
+    """
+    Derive each participant's watermark from the per-row flags: everything below their
+    oldest unread message is read, or everything if nothing is unread.
+    """
+    Conversation = apps.get_model('messaging', 'Conversation')
+    Message = apps.get_model('messaging', 'Message')
+    for conversation in Conversation.objects.all().iterator():
+        messages = Message.objects.filter(conversation=conversation)
+        last_id = messages.aggregate(last_id=models.Max('id'))['last_id'] or 0
+        for role, other in (('client', conversation.freelancer_id), ('freelancer', conversation.client_id)):
+            first_unread = messages.filter(sender_id=other, is_read=False).aggregate(first=models.Min('id'))['first']
+            setattr(conversation, f'{role}_last_read_id', first_unread - 1 if first_unread else last_id)
+        conversation.save(update_fields=['client_last_read_id', 'freelancer_last_read_id'])
+
+
+def restore_read_flags(apps, schema_editor):
+    """Reverse of backfill_watermarks: a message is read if it is at or below its recipient's watermark"""
+    Message = apps.get_model('messaging', 'Message')
+    Message.objects.filter(
+        sender_id=models.F('conversation__freelancer_id'), id__lte=models.F('conversation__client_last_read_id'),
+    ).update(is_read=True)
+    Message.objects.filter(
+        sender_id=models.F('conversation__client_id'), id__lte=models.F('conversation__freelancer_last_read_id'),
+    ).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_conversation_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='client_last_read_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='freelancer_last_read_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_watermarks, restore_read_flags),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='message_conv_id_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from messaging.search import get_backend
+
+    backend = get_backend(schema_editor.connection.vendor)
+    if backend is None:
+        return
+    backend.install(schema_editor)
+    if schema_editor.connection.vendor == 'sqlite':
+        # Index the messages that existed before the triggers
+        schema_editor.execute("INSERT INTO messaging_message_fts(messaging_message_fts) VALUES ('rebuild')")
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS messaging_message_fts_{trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS messaging_message_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS messaging_message_content_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0004_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
@@ -1,36 +1,108 @@
+import uuid
+
 from django.db import models
+from django.db.models import F, Q
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 class Conversation(models.Model):
     """A conversation between a client and freelancer"""
-    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='client_conversations')
-    freelancer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='freelancer_conversations')
+    # Indexed by the (participant, updated_at, id) indexes in Meta instead of single-column ones
+    client = models.ForeignKey(User, on_delete=models.CASCADE, related_name='client_conversations', db_index=False)
+    freelancer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='freelancer_conversations', db_index=False)
     project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='conversations', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Denormalized snapshot of the latest message, maintained by send_message
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    last_message_preview = models.CharField(max_length=255, blank=True)
+    last_message_sender = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    
+    # Per-participant unread counters, maintained by send_message and the read path
+    client_unread_count = models.PositiveIntegerField(default=0)
+    freelancer_unread_count = models.PositiveIntegerField(default=0)
+    
+    # Per-participant read watermarks: every message sent to that participant with an
+    # id at or below the watermark is read. Marking as read is a single-row write.
+    client_last_read_id = models.PositiveBigIntegerField(default=0)
+    freelancer_last_read_id = models.PositiveBigIntegerField(default=0)
+    
+    PREVIEW_LENGTH = 255
+    
     class Meta:
         unique_together = ['client', 'freelancer', 'project']
         ordering = ['-updated_at']
+        indexes = [
+            # Conversation lists and delta sync: one participant's conversations, most recent first
+            models.Index(fields=['client', '-updated_at', '-id'], name='conv_client_recent_idx'),
+            models.Index(fields=['freelancer', '-updated_at', '-id'], name='conv_freelancer_recent_idx'),
+        ]
     
     def __str__(self):
         return f"Conversation between {self.client.email} and {self.freelancer.email}"
+    
+    def participant_role(self, user):
+        """Return 'client' or 'freelancer' for a participant, None for anyone else"""
+        if user.id == self.client_id:
+            return 'client'
+        if user.id == self.freelancer_id:
+            return 'freelancer'
+        return None
+    
+    def unread_count_for(self, user):
+        role = self.participant_role(user)
+        return getattr(self, f'{role}_unread_count') if role else 0
+    
+    def last_read_id_for(self, user):
+        role = self.participant_role(user)
+        return getattr(self, f'{role}_last_read_id') if role else 0
+
+class MessageQuerySet(models.QuerySet):
+    """Read state is derived from the recipient's watermark on the conversation"""
+    
+    def _read_q(self):
+        return (
+            Q(sender=F('conversation__client'), id__lte=F('conversation__freelancer_last_read_id')) |
+            Q(sender=F('conversation__freelancer'), id__lte=F('conversation__client_last_read_id'))
+        )
+    
+    def read(self):
+        return self.filter(self._read_q())
+    
+    def unread(self):
+        return self.exclude(self._read_q())
 
 class Message(models.Model):
     """Individual messages within a conversation"""
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
-    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = MessageQuerySet.as_manager()
+    
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_conv_created_idx'),
+            # Unread counts are id ranges above a watermark within one conversation
+            models.Index(fields=['conversation', 'id'], name='message_conv_id_idx'),
+        ]
     
     def __str__(self):
         return f"Message from {self.sender.email} at {self.created_at}"
+    
+    @property
+    def is_read(self):
+        """Whether the recipient's read watermark has passed this message"""
+        conversation = self.conversation
+        if self.sender_id == conversation.client_id:
+            return self.id <= conversation.freelancer_last_read_id
+        return self.id <= conversation.client_last_read_id
 
 class MessageAttachment(models.Model):
     """File attachments for messages"""
@@ -38,7 +110,52 @@ class MessageAttachment(models.Model):
     file = models.FileField(upload_to='message_attachments/')
     filename = models.CharField(max_length=255)
     file_size = models.PositiveIntegerField()
+    # Content hash; attachments with the same hash share one stored blob
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"Attachment: {self.filename}"
+
+class AttachmentUpload(models.Model):
+    """An in-progress chunked attachment upload; chunks are appended to a part file on disk"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploader = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attachment_uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Upload {self.id}: {self.filename} ({self.received_size}/{self.total_size})"
+    
+    @property
+    def is_complete(self):
+        return self.received_size == self.total_size
+
+class OutboxEvent(models.Model):
+    """
+    A side effect recorded in the same transaction as the write that caused it and
+    delivered later by messaging.outbox (notifications, counters, cache invalidation)
+    """
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(
+                fields=['available_at', 'id'],
+                condition=Q(processed_at__isnull=True),
+                name='outbox_pending_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.topic} #{self.id}"
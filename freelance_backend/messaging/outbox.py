@@ -0,0 +1,150 @@
+"""
+Transactional outbox.
+
+Request handlers call enqueue() inside the transaction that performs the write, so
+the side effect is recorded if and only if the write commits. Handlers registered
+with @handler(topic) later run against the stored payload, each inside its own
+transaction together with marking the event processed, so database side effects
+apply exactly once; failures are retried with exponential backoff.
+
+Two drains share process_batch():
+- the local worker, a daemon thread in the web process woken on commit, which
+  keeps latency low and lets in-process event brokers reach this process's sockets
+  (enabled by settings.OUTBOX_LOCAL_WORKER);
+- `manage.py process_outbox`, for out-of-process draining and catching up.
+"""
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+
+_handlers = {}
+
+
+def handler(topic):
+    """Register the function handling events of `topic`; it receives the payload dict"""
+    def register(func):
+        _handlers[topic] = func
+        return func
+    return register
+
+
+def enqueue(topic, payload):
+    """Record a side effect; must be called inside the transaction of the originating write"""
+    event = OutboxEvent.objects.create(topic=topic, payload=payload)
+    if getattr(settings, 'OUTBOX_LOCAL_WORKER', False):
+        transaction.on_commit(local_worker.wake)
+    return event
+
+
+def _claim(batch_size):
+    pending = OutboxEvent.objects.filter(
+        processed_at__isnull=True,
+        available_at__lte=timezone.now(),
+        attempts__lt=MAX_ATTEMPTS,
+    ).order_by('available_at', 'id')
+    return list(pending.values_list('id', flat=True)[:batch_size])
+
+
+def _process(event_id):
+    with transaction.atomic():
+        query = OutboxEvent.objects.filter(id=event_id, processed_at__isnull=True)
+        if connection.features.has_select_for_update_skip_locked:
+            # Lets several workers drain concurrently without double-processing
+            query = query.select_for_update(skip_locked=True)
+        event = query.first()
+        if event is None:
+            return False
+        func = _handlers.get(event.topic)
+        if func is None:
+            raise LookupError(f'No outbox handler registered for {event.topic!r}')
+        func(event.payload)
+        event.processed_at = timezone.now()
+        event.attempts += 1
+        event.save(update_fields=['processed_at', 'attempts'])
+    return True
+
+
+def _record_failure(event_id, error):
+    event = OutboxEvent.objects.get(id=event_id)
+    event.attempts += 1
+    event.available_at = timezone.now() + timedelta(seconds=2 ** event.attempts)
+    event.last_error = error
+    event.save(update_fields=['attempts', 'available_at', 'last_error'])
+    logger.warning('Outbox event %s (%s) failed, attempt %s', event.id, event.topic, event.attempts)
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Deliver up to `batch_size` due events; returns how many were processed"""
+    event_ids = _claim(batch_size)
+    processed = 0
+    for event_id in event_ids:
+        try:
+            processed += _process(event_id)
+        except Exception:
+            _record_failure(event_id, traceback.format_exc())
+    return processed
+
+
+def drain(batch_size=BATCH_SIZE):
+    """Process batches until nothing is due; returns the total processed"""
+    total = 0
+    while True:
+        processed = process_batch(batch_size)
+        total += processed
+        if processed < batch_size:
+            return total
+
+
+def purge_processed(older_than):
+    """Delete delivered events older than `older_than` (a timedelta)"""
+    return OutboxEvent.objects.filter(
+        processed_at__lt=timezone.now() - older_than
+    ).delete()[0]
+
+
+class LocalWorker:
+    """Daemon thread draining the outbox in the current process, woken after each commit"""
+
+    POLL_INTERVAL = 5.0
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def wake(self):
+        self._ensure_started()
+        self._wakeup.set()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='outbox-worker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            # Also wakes periodically so retries with backoff get picked up
+            self._wakeup.wait(self.POLL_INTERVAL)
+            self._wakeup.clear()
+            try:
+                drain()
+            except Exception:
+                logger.exception('Outbox local worker failed to drain')
+            finally:
+                close_old_connections()
+
+
+local_worker = LocalWorker()
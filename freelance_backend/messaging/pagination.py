@@ -0,0 +1,66 @@
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a before/after cursor does not point at a message in the conversation"""
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a ?limit= query value to 1..maximum"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
+
+
+def _cursor_position(queryset, message_id):
+    try:
+        message_id = int(message_id)
+    except (TypeError, ValueError):
+        raise InvalidCursor(f'Invalid cursor: {message_id}')
+    created_at = queryset.filter(id=message_id).values_list('created_at', flat=True).first()
+    if created_at is None:
+        raise InvalidCursor(f'Message {message_id} not found in this conversation')
+    return created_at, message_id
+
+
+def paginate_messages(queryset, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return one newest-first page of messages plus cursors for the neighbouring pages.
+
+    Pages are keyed on (created_at, id) so every fetch is a bounded range scan of the
+    (conversation, created_at, id) index, no matter how long the conversation is:
+    - no cursor: the latest `limit` messages
+    - before=<id>: the `limit` messages immediately older than that message
+    - after=<id>: the `limit` messages immediately newer than that message
+    """
+    if before is not None:
+        created_at, message_id = _cursor_position(queryset, before)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id)
+        ).order_by('-created_at', '-id')
+    elif after is not None:
+        created_at, message_id = _cursor_position(queryset, after)
+        queryset = queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=message_id)
+        ).order_by('created_at', 'id')
+    else:
+        queryset = queryset.order_by('-created_at', '-id')
+
+    # Fetch one extra row to know whether another page exists without a COUNT(*)
+    messages = list(queryset[:limit + 1])
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if after is not None:
+        messages.reverse()
+
+    return {
+        'messages': messages,
+        'has_more': has_more,
+        'before': messages[-1].id if messages else None,
+        'after': messages[0].id if messages else None,
+    }
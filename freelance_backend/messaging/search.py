@@ -0,0 +1,286 @@
+"""
+Full-text search over message content.
+
+The backend is picked from the database vendor:
+- SQLite: an external-content FTS5 table (messaging_message_fts) kept in sync with
+  messaging_message by AFTER INSERT/UPDATE/DELETE triggers, ranked with bm25().
+- PostgreSQL: a GIN expression index on to_tsvector(content), ranked with ts_rank().
+- Anything else: unranked icontains matches, newest first, so search keeps working
+  (slowly) instead of failing.
+The first two keep the index in sync inside the database, so bulk_create, QuerySet.update and
+cascading deletes are covered as well as Message.save()/delete().
+
+SQLite drops triggers when Django remakes a table during a migration, so install()
+is idempotent and also runs on post_migrate (see MessagingConfig.ready).
+"""
+import html
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Message
+
+FTS_TABLE = 'messaging_message_fts'
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+# Control characters never appear in user text, so they are safe highlight markers
+# that survive HTML escaping and are swapped for <mark> tags afterwards
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class InvalidSearchCursor(ValueError):
+    pass
+
+
+def _terms(query):
+    return _TERM_RE.findall(query.lower())
+
+
+def render_snippet(raw):
+    escaped = html.escape(raw or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def encode_cursor(rank, message_id):
+    return f'{rank!r}:{message_id}'
+
+
+def decode_cursor(cursor):
+    try:
+        rank, message_id = cursor.split(':')
+        return float(rank), int(message_id)
+    except ValueError:
+        raise InvalidSearchCursor(f'Invalid search cursor: {cursor}')
+
+
+class SearchBackend:
+    """Interface for message search backends; ranks are 'lower is better'"""
+
+    def install(self, schema_editor):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def match_ids_sql(self, query):
+        """SQL selecting the ids of every matching message, for filtering querysets"""
+        raise NotImplementedError
+
+    def search(self, user_id, query, after=None, limit=DEFAULT_PAGE_SIZE):
+        """Return [(message_id, rank, raw_snippet)] for `user_id`'s conversations, best first"""
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(SearchBackend):
+
+    def _match_expression(self, query):
+        # Quote every term so user input can never be parsed as FTS5 syntax;
+        # the last term is a prefix so results update while typing
+        terms = _terms(query)
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def install(self, schema_editor):
+        for statement in (
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                content, content='messaging_message', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )""",
+            f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON messaging_message BEGIN
+                INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON messaging_message BEGIN
+                INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON messaging_message BEGIN
+                INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+                INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+            END""",
+        ):
+            schema_editor.execute(statement)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    def match_ids_sql(self, query):
+        expression = self._match_expression(query)
+        if expression is None:
+            return None
+        return f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression]
+
+    def search(self, user_id, query, after=None, limit=DEFAULT_PAGE_SIZE):
+        expression = self._match_expression(query)
+        if expression is None:
+            return []
+        params = [_MARK_START, _MARK_END, expression, user_id, user_id]
+        keyset = ''
+        if after is not None:
+            keyset = 'AND (hits.rank > %s OR (hits.rank = %s AND hits.id < %s))'
+            params += [after[0], after[0], after[1]]
+        sql = f"""
+            SELECT hits.id, hits.rank, hits.snippet FROM (
+                SELECT rowid AS id, bm25({FTS_TABLE}) AS rank,
+                       snippet({FTS_TABLE}, 0, %s, %s, '…', 16) AS snippet
+                FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s
+            ) hits
+            JOIN messaging_message m ON m.id = hits.id
+            JOIN messaging_conversation c ON c.id = m.conversation_id
+            WHERE (c.client_id = %s OR c.freelancer_id = %s) {keyset}
+            ORDER BY hits.rank, hits.id DESC
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+class PostgresSearchBackend(SearchBackend):
+    DOCUMENT = "to_tsvector('english', m.content)"
+    INDEX = 'messaging_message_content_fts'
+
+    def _tsquery(self, query):
+        # Prefix-match every term, AND-ed together, built from sanitized terms only
+        terms = _terms(query)
+        if not terms:
+            return None
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.INDEX} ON messaging_message "
+            f"USING GIN (to_tsvector('english', content))"
+        )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {self.INDEX}')
+
+    def match_ids_sql(self, query):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return None
+        return (
+            f"SELECT m.id FROM messaging_message m WHERE {self.DOCUMENT} @@ to_tsquery('english', %s)",
+            [tsquery],
+        )
+
+    def search(self, user_id, query, after=None, limit=DEFAULT_PAGE_SIZE):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return []
+        params = [f'StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=16, MinWords=4', tsquery, user_id, user_id]
+        keyset = ''
+        if after is not None:
+            keyset = 'WHERE hits.rank > %s OR (hits.rank = %s AND hits.id < %s)'
+            params += [after[0], after[0], after[1]]
+        sql = f"""
+            SELECT hits.id, hits.rank, hits.snippet FROM (
+                SELECT m.id, -ts_rank({self.DOCUMENT}, q.query)::double precision AS rank,
+                       ts_headline('english', m.content, q.query, %s) AS snippet
+                FROM messaging_message m
+                JOIN messaging_conversation c ON c.id = m.conversation_id,
+                     to_tsquery('english', %s) AS q(query)
+                WHERE {self.DOCUMENT} @@ q.query AND (c.client_id = %s OR c.freelancer_id = %s)
+            ) hits
+            {keyset}
+            ORDER BY hits.rank, hits.id DESC
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+class ContainsSearchBackend(SearchBackend):
+    """
+    Fallback for databases without a full-text index: every term must appear in the
+    content. Every hit ranks 0, so pages are ordered newest first.
+    """
+    SNIPPET_RADIUS = 60
+
+    def install(self, schema_editor):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def match_ids_sql(self, query):
+        return None
+
+    def _snippet(self, content, terms):
+        pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        first = pattern.search(content)
+        start = max(first.start() - self.SNIPPET_RADIUS, 0) if first else 0
+        end = start + 2 * self.SNIPPET_RADIUS
+        marked = pattern.sub(lambda match: f'{_MARK_START}{match.group(0)}{_MARK_END}', content[start:end])
+        return ('…' if start else '') + marked + ('…' if end < len(content) else '')
+
+    def search(self, user_id, query, after=None, limit=DEFAULT_PAGE_SIZE):
+        terms = _terms(query)
+        if not terms:
+            return []
+        messages = Message.objects.filter(Q(conversation__client_id=user_id) | Q(conversation__freelancer_id=user_id))
+        for term in terms:
+            messages = messages.filter(content__icontains=term)
+        if after is not None:
+            messages = messages.filter(id__lt=after[1])
+        rows = messages.order_by('-id').values_list('id', 'content')[:limit]
+        return [(message_id, 0.0, self._snippet(content, terms)) for message_id, content in rows]
+
+
+def get_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    if vendor == 'sqlite':
+        return SQLiteFTS5Backend()
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return None
+
+
+def install_search_index(schema_editor):
+    backend = get_backend(schema_editor.connection.vendor)
+    if backend is not None:
+        backend.install(schema_editor)
+
+
+def filter_messages(queryset, query):
+    """Restrict a Message queryset to full-text matches of `query` (used by the admin)"""
+    backend = get_backend()
+    match = backend.match_ids_sql(query) if backend else None
+    if match is None:
+        return queryset.none() if backend else queryset.filter(content__icontains=query)
+    sql, params = match
+    return queryset.filter(id__in=RawSQL(sql, params))
+
+
+def search_messages(user, query, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Ranked, highlighted, cursor-paginated search across `user`'s conversations.
+    Returns {'results': [(message, rank, snippet_html)], 'next': cursor or None}.
+    """
+    backend = get_backend() or ContainsSearchBackend()
+    after = decode_cursor(cursor) if cursor else None
+
+    hits = backend.search(user.id, query, after=after, limit=limit + 1)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    messages = Message.objects.select_related('conversation', 'sender').prefetch_related('attachments').in_bulk([hit[0] for hit in hits])
+    results = [
+        (messages[message_id], rank, render_snippet(snippet))
+        for message_id, rank, snippet in hits
+        if message_id in messages
+    ]
+    return {
+        'results': results,
+        'next': encode_cursor(hits[-1][1], hits[-1][0]) if has_more else None,
+    }
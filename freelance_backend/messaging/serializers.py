@@ -1,14 +1,32 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Conversation, Message, MessageAttachment
+from freelance_platform import media
+from .models import AttachmentUpload, Conversation, Message, MessageAttachment
+from .pagination import paginate_messages
 from accounts.serializers import UserSerializer
 
 class MessageAttachmentSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+    
     class Meta:
         model = MessageAttachment
-        fields = ['id', 'filename', 'file', 'file_size', 'uploaded_at']
+        fields = ['id', 'filename', 'file', 'url', 'file_size', 'uploaded_at']
+    
+    def get_url(self, obj):
+        """Signed download URL; attachments are only serialized for conversation participants"""
+        url = f"{reverse('message-attachment-file', args=[obj.pk])}?{media.signed_query('attachment', obj.pk)}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AttachmentUpload
+        fields = ['id', 'filename', 'total_size', 'received_size', 'created_at', 'updated_at']
 
 class MessageSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
+    # Derived from the conversation's read watermarks; load messages through the conversation
+    is_read = serializers.BooleanField(read_only=True)
     attachments = MessageAttachmentSerializer(many=True, read_only=True)
     
     class Meta:
@@ -16,27 +34,49 @@ class MessageSerializer(serializers.ModelSerializer):
         fields = ['id', 'sender', 'content', 'is_read', 'created_at', 'attachments']
 
 class ConversationSerializer(serializers.ModelSerializer):
+    """Conversation header plus the latest page of messages (older pages come from the messages endpoint)"""
     client = UserSerializer(read_only=True)
     freelancer = UserSerializer(read_only=True)
-    messages = MessageSerializer(many=True, read_only=True)
+    messages = serializers.SerializerMethodField()
+    messages_has_more = serializers.SerializerMethodField()
+    messages_before = serializers.SerializerMethodField()
     last_message = serializers.SerializerMethodField()
     unread_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Conversation
         fields = ['id', 'client', 'freelancer', 'project', 'created_at', 'updated_at', 
-                 'messages', 'last_message', 'unread_count']
+                 'messages', 'messages_has_more', 'messages_before', 'last_message', 'unread_count']
+    
+    def _latest_page(self, obj):
+        # Computed once per conversation and shared by the message-related fields
+        cache = self.context.setdefault('_latest_message_pages', {})
+        if obj.pk not in cache:
+            queryset = obj.messages.select_related('sender').prefetch_related('attachments')
+            cache[obj.pk] = paginate_messages(queryset)
+        return cache[obj.pk]
+    
+    def get_messages(self, obj):
+        # Oldest-first within the page, matching the order the chat UI renders
+        page = self._latest_page(obj)
+        return MessageSerializer(reversed(page['messages']), many=True).data
+    
+    def get_messages_has_more(self, obj):
+        return self._latest_page(obj)['has_more']
+    
+    def get_messages_before(self, obj):
+        return self._latest_page(obj)['before']
     
     def get_last_message(self, obj):
-        last_message = obj.messages.last()
-        if last_message:
-            return MessageSerializer(last_message).data
+        page = self._latest_page(obj)
+        if page['messages']:
+            return MessageSerializer(page['messages'][0]).data
         return None
     
     def get_unread_count(self, obj):
         request = self.context.get('request')
         if request and request.user:
-            return obj.messages.filter(is_read=False).exclude(sender=request.user).count()
+            return obj.unread_count_for(request.user)
         return 0
 
 class ConversationListSerializer(serializers.ModelSerializer):
@@ -51,17 +91,27 @@ class ConversationListSerializer(serializers.ModelSerializer):
         fields = ['id', 'client', 'freelancer', 'project', 'updated_at', 'last_message', 'unread_count']
     
     def get_last_message(self, obj):
-        last_message = obj.messages.last()
-        if last_message:
+        # Read from the denormalized snapshot so listing never touches the messages table
+        if obj.last_message_id:
             return {
-                'content': last_message.content,
-                'sender': last_message.sender.email,
-                'created_at': last_message.created_at
+                'content': obj.last_message_preview,
+                'sender': obj.last_message_sender.email if obj.last_message_sender else None,
+                'created_at': obj.last_message_at
             }
         return None
     
     def get_unread_count(self, obj):
         request = self.context.get('request')
         if request and request.user:
-            return obj.messages.filter(is_read=False).exclude(sender=request.user).count()
-        return 0 
\ No newline at end of file
+            return obj.unread_count_for(request.user)
+        return 0
+
+class SyncMessageSerializer(MessageSerializer):
+    class Meta(MessageSerializer.Meta):
+        fields = MessageSerializer.Meta.fields + ['conversation']
+
+class SyncConversationSerializer(ConversationListSerializer):
+    """Conversation row for delta sync, carrying both participants' read watermarks"""
+    
+    class Meta(ConversationListSerializer.Meta):
+        fields = ConversationListSerializer.Meta.fields + ['client_last_read_id', 'freelancer_last_read_id']
@@ -0,0 +1,200 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from stats import counters
+from .models import Conversation, Message
+
+
+def message_preview(content):
+    return content[:Conversation.PREVIEW_LENGTH]
+
+
+def record_new_message(conversation, message):
+    """
+    Fold a new message into its conversation's denormalized summary: the recipient's
+    unread counter, updated_at and, unless a newer message got there first, the
+    last-message snapshot. Runs from the outbox, so it may see messages out of order.
+    """
+    recipient_role = 'freelancer' if message.sender_id == conversation.client_id else 'client'
+    counter = f'{recipient_role}_unread_count'
+    watermark = f'{recipient_role}_last_read_id'
+    conversations = Conversation.objects.filter(pk=conversation.pk)
+    # A message already behind the recipient's watermark was read before we got here
+    with transaction.atomic():
+        if conversations.filter(**{f'{watermark}__lt': message.id}).update(**{counter: F(counter) + 1}):
+            counters.add({counters.UNREAD: 1})
+    conversations.filter(
+        Q(last_message__isnull=True) | Q(last_message__lt=message.id)
+    ).update(
+        last_message=message,
+        last_message_preview=message_preview(message.content),
+        last_message_sender=message.sender_id,
+        last_message_at=message.created_at,
+    )
+    conversations.update(updated_at=timezone.now())
+
+
+def _read_up_to_last_message(field):
+    # Watermarks only move forward. The newest message id comes from the
+    # (conversation, id) index rather than the last_message snapshot, which lags
+    # behind until the outbox has processed the message.
+    newest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-id').values('id')[:1]
+    return Greatest(F(field), Coalesce(Subquery(newest), Value(0)))
+
+
+def total_unread_count(user):
+    """Unread messages across all of `user`'s conversations, summed from the counters"""
+    return Conversation.objects.filter(
+        Q(client=user) | Q(freelancer=user)
+    ).aggregate(
+        total=Sum(Case(
+            When(client=user, then=F('client_unread_count')),
+            default=F('freelancer_unread_count'),
+        ))
+    )['total'] or 0
+
+
+def mark_conversation_read(conversation, user):
+    """
+    Mark every message sent to `user` in the conversation as read with a single-row write.
+    Returns whether the watermark moved, i.e. whether anything was unread.
+    """
+    role = conversation.participant_role(user)
+    if role is None:
+        return False
+    watermark = f'{role}_last_read_id'
+    # Compared against the messages table rather than the counter, which the outbox
+    # only increments once it has processed a new message
+    newest_incoming = Subquery(
+        Message.objects.filter(conversation=OuterRef('pk')).exclude(sender=user).order_by('-id').values('id')[:1]
+    )
+    now = timezone.now()
+    with transaction.atomic():
+        # The counter being zeroed comes off the platform's unread total
+        unread = Conversation.objects.select_for_update().filter(pk=conversation.pk).values_list(
+            f'{role}_unread_count', flat=True,
+        ).first()
+        # updated_at moves too so delta sync picks up the read receipt
+        updated = Conversation.objects.filter(
+            pk=conversation.pk, **{f'{watermark}__lt': newest_incoming}
+        ).update(**{
+            watermark: newest_incoming,
+            f'{role}_unread_count': 0,
+            'updated_at': now,
+        })
+        if updated:
+            counters.add({counters.UNREAD: -unread})
+    if not updated:
+        return False
+    conversation.refresh_from_db(fields=[watermark, f'{role}_unread_count', 'updated_at'])
+    return True
+
+
+def mark_conversations_read(conversations):
+    """Mark every message in `conversations` as read for both participants"""
+    with transaction.atomic():
+        unread = conversations.select_for_update().order_by().values_list(
+            'client_unread_count', 'freelancer_unread_count',
+        )
+        counters.add({counters.UNREAD: -sum(client + freelancer for client, freelancer in unread)})
+        return conversations.update(
+            client_last_read_id=_read_up_to_last_message('client_last_read_id'),
+            freelancer_last_read_id=_read_up_to_last_message('freelancer_last_read_id'),
+            client_unread_count=0,
+            freelancer_unread_count=0,
+            updated_at=timezone.now(),
+        )
+
+
+def _move_watermarks(messages, read):
+    groups = messages.order_by().values(
+        'conversation_id', 'sender_id', 'conversation__client_id'
+    ).annotate(max_id=Max('id'), min_id=Min('id'))
+
+    touched = set()
+    with transaction.atomic():
+        for group in groups:
+            recipient = 'freelancer' if group['sender_id'] == group['conversation__client_id'] else 'client'
+            watermark = f'{recipient}_last_read_id'
+            if read:
+                value = Greatest(F(watermark), Value(group['max_id']))
+            else:
+                value = Least(F(watermark), Value(group['min_id'] - 1))
+            Conversation.objects.filter(pk=group['conversation_id']).update(**{
+                watermark: value,
+                'updated_at': timezone.now(),
+            })
+            touched.add(group['conversation_id'])
+        rebuild_conversation_summaries(Conversation.objects.filter(pk__in=touched))
+
+
+def mark_messages_read(messages):
+    """Advance each recipient's watermark past the newest of the given messages"""
+    _move_watermarks(messages, read=True)
+
+
+def mark_messages_unread(messages):
+    """
+    Pull each recipient's watermark back below the oldest of the given messages.
+    Watermarks are prefixes, so later messages in the same conversation become unread too.
+    """
+    _move_watermarks(messages, read=False)
+
+
+def rebuild_conversation_summaries(conversations=None, batch_size=500):
+    """
+    Recompute last-message snapshots and unread counters from the messages table
+    for `conversations` (all conversations by default). Returns the number rewritten.
+    """
+    if conversations is None:
+        conversations = Conversation.objects.all()
+
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    rows = conversations.order_by().annotate(
+        latest_id=Subquery(latest.values('id')[:1]),
+        client_unread=Count('messages', filter=(
+            Q(messages__id__gt=F('client_last_read_id')) & ~Q(messages__sender=F('client'))
+        )),
+        freelancer_unread=Count('messages', filter=(
+            Q(messages__id__gt=F('freelancer_last_read_id')) & ~Q(messages__sender=F('freelancer'))
+        )),
+    )
+
+    fields = [
+        'last_message', 'last_message_preview', 'last_message_sender', 'last_message_at',
+        'client_unread_count', 'freelancer_unread_count',
+    ]
+    total = 0
+    batch = []
+
+    def flush():
+        latest_messages = Message.objects.in_bulk([c.latest_id for c in batch if c.latest_id])
+        unread = 0
+        for conversation in batch:
+            unread += (
+                conversation.client_unread + conversation.freelancer_unread
+                - conversation.client_unread_count - conversation.freelancer_unread_count
+            )
+            message = latest_messages.get(conversation.latest_id)
+            conversation.last_message = message
+            conversation.last_message_preview = message_preview(message.content) if message else ''
+            conversation.last_message_sender_id = message.sender_id if message else None
+            conversation.last_message_at = message.created_at if message else None
+            conversation.client_unread_count = conversation.client_unread
+            conversation.freelancer_unread_count = conversation.freelancer_unread
+        with transaction.atomic():
+            Conversation.objects.bulk_update(batch, fields)
+            counters.add({counters.UNREAD: unread})
+
+    for conversation in rows.iterator(chunk_size=batch_size):
+        batch.append(conversation)
+        if len(batch) >= batch_size:
+            flush()
+            total += len(batch)
+            batch = []
+    if batch:
+        flush()
+        total += len(batch)
+    return total
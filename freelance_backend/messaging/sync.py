@@ -0,0 +1,92 @@
+"""
+Delta sync for reconnecting clients.
+
+A sync cursor is a position in two monotonic streams: conversations keyed on
+(updated_at, id) - which moves on new messages and read-watermark changes - and
+messages keyed on id. Each call returns only what changed after the cursor, in
+bounded pages, plus the cursor to resume from.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import Conversation, Message
+
+CONVERSATION_PAGE_SIZE = 100
+MESSAGE_PAGE_SIZE = 200
+
+# Clients offline for longer than this are told to refetch everything instead
+RESYNC_AFTER = timedelta(days=7)
+
+
+class InvalidSyncCursor(ValueError):
+    pass
+
+
+def encode_cursor(updated_at, conversation_id, message_id):
+    micros = int(updated_at.timestamp() * 1_000_000)
+    return f'{micros}-{conversation_id}-{message_id}'
+
+
+def decode_cursor(cursor):
+    try:
+        micros, conversation_id, message_id = (int(part) for part in cursor.split('-'))
+        updated_at = datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise InvalidSyncCursor(f'Invalid sync cursor: {cursor}')
+    return updated_at, conversation_id, message_id
+
+
+def current_cursor():
+    """A cursor pointing at 'now', handed out with full-resync responses"""
+    last_message_id = Message.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    return encode_cursor(timezone.now(), 0, last_message_id)
+
+
+def sync_changes(user, cursor):
+    """
+    Return everything visible to `user` that changed after `cursor`:
+    {'conversations', 'messages', 'cursor', 'has_more', 'full_resync'}.
+    A missing or too-old cursor yields full_resync=True and a fresh cursor.
+    """
+    if not cursor:
+        return {'full_resync': True, 'cursor': current_cursor()}
+
+    updated_at, conversation_id, message_id = decode_cursor(cursor)
+    if updated_at < timezone.now() - RESYNC_AFTER:
+        return {'full_resync': True, 'cursor': current_cursor()}
+
+    mine = Conversation.objects.filter(Q(client=user) | Q(freelancer=user))
+
+    conversations = list(
+        mine.filter(
+            Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=conversation_id)
+        ).select_related('client', 'freelancer', 'last_message_sender')
+        .order_by('updated_at', 'id')[:CONVERSATION_PAGE_SIZE + 1]
+    )
+    more_conversations = len(conversations) > CONVERSATION_PAGE_SIZE
+    conversations = conversations[:CONVERSATION_PAGE_SIZE]
+
+    messages = list(
+        Message.objects.filter(
+            conversation__in=mine.values('id'),
+            id__gt=message_id
+        ).select_related('conversation', 'sender').prefetch_related('attachments')
+        .order_by('id')[:MESSAGE_PAGE_SIZE + 1]
+    )
+    more_messages = len(messages) > MESSAGE_PAGE_SIZE
+    messages = messages[:MESSAGE_PAGE_SIZE]
+
+    if conversations:
+        updated_at, conversation_id = conversations[-1].updated_at, conversations[-1].id
+    if messages:
+        message_id = messages[-1].id
+
+    return {
+        'full_resync': False,
+        'conversations': conversations,
+        'messages': messages,
+        'cursor': encode_cursor(updated_at, conversation_id, message_id),
+        'has_more': more_conversations or more_messages,
+    }
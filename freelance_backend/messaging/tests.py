@@ -1,3 +1,766 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from freelance_platform.testing import QueryPlanTestMixin
+from stats import counters
+from . import outbox, uploads, views
+from .events import get_broker
+from .models import AttachmentUpload, Conversation, Message, MessageAttachment, OutboxEvent
+from .serializers import MessageAttachmentSerializer
+from .summary import (
+    mark_conversation_read, mark_messages_read, mark_messages_unread, rebuild_conversation_summaries,
+    record_new_message,
+)
+from .sync import RESYNC_AFTER, encode_cursor, sync_changes
+from .websocket import WEBSOCKET_PATH, websocket_application
+
+
+class MessagingQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The inbox, history and sync endpoints must stay on index range scans as the tables grow"""
+
+    @classmethod
+    def setUpTestData(cls):
+        clients = User.objects.bulk_create([
+            User(username=f'client{i}', email=f'client{i}@example.com', role='client')
+            for i in range(5)
+        ])
+        freelancers = User.objects.bulk_create([
+            User(username=f'freelancer{i}', email=f'freelancer{i}@example.com', role='freelancer')
+            for i in range(20)
+        ])
+        conversations = Conversation.objects.bulk_create([
+            Conversation(client=client, freelancer=freelancer)
+            for client in clients
+            for freelancer in freelancers
+        ])
+        Message.objects.bulk_create([
+            Message(
+                conversation=conversation,
+                sender=conversation.client if i % 2 else conversation.freelancer,
+                content=f'Seeded message {i}',
+            )
+            for conversation in conversations
+            for i in range(12)
+        ])
+        rebuild_conversation_summaries()
+        cls.client_user = clients[0]
+        cls.freelancer_user = freelancers[0]
+        cls.conversation = conversations[0]
+
+    def test_conversation_list(self):
+        # The participant OR is answered from both (participant, updated_at) indexes;
+        # merging the two result sets needs a sort bounded by one user's conversations
+        view = views.ConversationListView.as_view()
+        for user in (self.client_user, self.freelancer_user):
+            with self.subTest(role=user.role):
+                self.assertQueryPlansUseIndexes(view, '/api/messaging/conversations/', user, allow_temp_sort=True)
+
+    def test_conversation_messages(self):
+        path = f'/api/messaging/conversations/{self.conversation.id}/messages/'
+        newest = self.conversation.messages.order_by('-id').first()
+        for query in ('', f'?before={newest.id}', f'?after={newest.id - 6}'):
+            with self.subTest(query=query):
+                self.assertQueryPlansUseIndexes(
+                    views.conversation_messages, f'{path}{query}', self.client_user,
+                    conversation_id=self.conversation.id,
+                )
+
+    def test_unread_count(self):
+        self.assertQueryPlansUseIndexes(views.unread_messages_count, '/api/messaging/unread-count/', self.client_user)
+
+    def test_sync(self):
+        cursor = encode_cursor(timezone.now() - timedelta(hours=1), 0, Message.objects.order_by('id')[100].id)
+        # A fresh cursor takes the incremental path, not the full-resync shortcut
+        self.assertFalse(sync_changes(self.client_user, cursor)['full_resync'])
+        # As with the conversation list, merging the participant OR sorts one user's conversations
+        self.assertQueryPlansUseIndexes(
+            views.sync, f'/api/messaging/sync/?since={cursor}', self.client_user, allow_temp_sort=True,
+        )
+
+
+class MessageHistoryTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        self.outsider = User.objects.create(username='outsider', email='outsider@example.com', role='client')
+        self.conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        self.messages = [
+            Message.objects.create(conversation=self.conversation, sender=self.client_user, content=f'Message {i}')
+            for i in range(7)
+        ]
+        # Ties on created_at are broken by id
+        Message.objects.filter(id__in=[m.id for m in self.messages[1:4]]).update(created_at=self.messages[1].created_at)
+        self.path = f'/api/messaging/conversations/{self.conversation.id}/messages/'
+        self.api = APIClient()
+        self.api.force_authenticate(self.freelancer)
+
+    def page(self, **params):
+        response = self.api.get(self.path, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def ids(self, *positions):
+        return [self.messages[i].id for i in positions]
+
+    def test_walks_back_and_forward_newest_first(self):
+        page = self.page(limit=3)
+        self.assertEqual([m['id'] for m in page['results']], self.ids(6, 5, 4))
+        self.assertTrue(page['has_more'])
+        page = self.page(limit=3, before=page['before'])
+        self.assertEqual([m['id'] for m in page['results']], self.ids(3, 2, 1))
+        page = self.page(limit=3, before=page['before'])
+        self.assertEqual(([m['id'] for m in page['results']], page['has_more']), (self.ids(0), False))
+
+        page = self.page(limit=3, after=self.messages[0].id)
+        self.assertEqual([m['id'] for m in page['results']], self.ids(3, 2, 1))
+        self.assertTrue(page['has_more'])
+        page = self.page(limit=3, after=page['after'])
+        self.assertEqual(([m['id'] for m in page['results']], page['has_more']), (self.ids(6, 5, 4), False))
+
+    def test_bad_cursors(self):
+        other = Conversation.objects.create(client=self.outsider, freelancer=self.freelancer)
+        elsewhere = Message.objects.create(conversation=other, sender=self.outsider, content='Elsewhere')
+        for params in ({'before': 'x'}, {'after': elsewhere.id}, {'before': 1, 'after': 2}):
+            with self.subTest(params=params):
+                self.assertEqual(self.api.get(self.path, params).status_code, 400)
+        self.api.force_authenticate(self.outsider)
+        self.assertEqual(self.api.get(self.path).status_code, 404)
+
+    def test_conversation_detail_embeds_the_latest_page(self):
+        Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=self.client_user, content='Older') for _ in range(30)
+        ])
+        Message.objects.filter(content='Older').update(created_at=self.messages[0].created_at - timedelta(days=1))
+        data = self.api.get(f'/api/messaging/conversations/{self.conversation.id}/').data
+        # The latest 30, oldest first as the chat renders them
+        self.assertEqual(len(data['messages']), 30)
+        self.assertEqual([m['id'] for m in data['messages'][-7:]], self.ids(0, 1, 2, 3, 4, 5, 6))
+        self.assertTrue(data['messages_has_more'])
+        self.assertEqual(data['messages_before'], data['messages'][0]['id'])
+        self.assertEqual(data['last_message']['id'], self.messages[6].id)
+
+
+# Outbox events are drained by the test itself rather than a thread woken on commit
+@override_settings(OUTBOX_LOCAL_WORKER=False)
+class ConversationSummaryTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        self.conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        self.api = APIClient()
+
+    def send(self, sender, content):
+        self.api.force_authenticate(sender)
+        response = self.api.post(f'/api/messaging/conversations/{self.conversation.id}/send/', {'content': content})
+        self.assertEqual(response.status_code, 201, response.data)
+        outbox.drain()
+        return Message.objects.get(id=response.data['id'])
+
+    def listing(self, user):
+        self.api.force_authenticate(user)
+        return {row['id']: row for row in self.api.get('/api/messaging/conversations/').data['results']}
+
+    def test_snapshot_and_unread_counters(self):
+        self.send(self.client_user, 'First')
+        self.send(self.client_user, 'Second')
+        self.send(self.freelancer, 'x' * 300)
+
+        row = self.listing(self.freelancer)[self.conversation.id]
+        self.assertEqual(row['unread_count'], 2)
+        self.assertEqual(row['last_message']['sender'], 'freelancer@example.com')
+        self.assertEqual(row['last_message']['content'], 'x' * Conversation.PREVIEW_LENGTH)
+        self.assertEqual(self.listing(self.client_user)[self.conversation.id]['unread_count'], 1)
+
+    def test_list_queries_do_not_grow_with_conversations(self):
+        self.send(self.client_user, 'Hello')
+        self.api.force_authenticate(self.freelancer)
+        with CaptureQueriesContext(connection) as one:
+            self.api.get('/api/messaging/conversations/')
+        for i in range(5):
+            client = User.objects.create(username=f'client{i}', email=f'client{i}@example.com', role='client')
+            conversation = Conversation.objects.create(client=client, freelancer=self.freelancer)
+            Message.objects.create(conversation=conversation, sender=client, content='Hi')
+        rebuild_conversation_summaries()
+        with self.assertNumQueries(len(one)):
+            rows = self.api.get('/api/messaging/conversations/').data['results']
+        self.assertEqual(len(rows), 6)
+
+    def test_late_delivery_keeps_the_newest_snapshot(self):
+        older = Message.objects.create(conversation=self.conversation, sender=self.client_user, content='Older')
+        newer = Message.objects.create(conversation=self.conversation, sender=self.client_user, content='Newer')
+        record_new_message(self.conversation, newer)
+        record_new_message(self.conversation, older)
+        self.conversation.refresh_from_db()
+        self.assertEqual((self.conversation.last_message_id, self.conversation.freelancer_unread_count), (newer.id, 2))
+
+    def test_rebuild_corrects_drift(self):
+        self.send(self.client_user, 'Hello')
+        message = self.send(self.freelancer, 'Hi back')
+        Conversation.objects.update(
+            last_message=None, last_message_preview='', client_unread_count=9, freelancer_unread_count=0,
+        )
+        self.assertEqual(rebuild_conversation_summaries(), 1)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message_id, message.id)
+        self.assertEqual(self.conversation.last_message_preview, 'Hi back')
+        self.assertEqual((self.conversation.client_unread_count, self.conversation.freelancer_unread_count), (1, 1))
+
+
+@override_settings(OUTBOX_LOCAL_WORKER=False)
+class ReadWatermarkTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        self.conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        self.api = APIClient()
+
+    def send(self, sender, content='Hello'):
+        message = Message.objects.create(conversation=self.conversation, sender=sender, content=content)
+        outbox.enqueue('message.created', {'message_id': message.id})
+        return message
+
+    def unread(self, user):
+        self.api.force_authenticate(user)
+        return self.api.get('/api/messaging/unread-count/').data['unread_count']
+
+    def open_conversation(self, user):
+        self.api.force_authenticate(user)
+        return self.api.get(f'/api/messaging/conversations/{self.conversation.id}/').data
+
+    def test_opening_a_conversation_reads_it(self):
+        first, second = self.send(self.client_user), self.send(self.client_user)
+        own = self.send(self.freelancer)
+        outbox.drain()
+        self.assertEqual((self.unread(self.freelancer), self.unread(self.client_user)), (2, 1))
+
+        data = self.open_conversation(self.freelancer)
+        self.assertEqual([m['is_read'] for m in data['messages']], [True, True, False])
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.freelancer_last_read_id, second.id)
+        self.assertEqual((self.unread(self.freelancer), self.unread(self.client_user)), (0, 1))
+        self.assertEqual(OutboxEvent.objects.filter(topic='conversation.read').count(), 1)
+
+        # Nothing new to read: no write and no read receipt
+        self.open_conversation(self.freelancer)
+        self.assertEqual(OutboxEvent.objects.filter(topic='conversation.read').count(), 1)
+        self.assertEqual(list(Message.objects.unread().values_list('id', flat=True)), [own.id])
+        self.assertEqual(list(Message.objects.read().order_by('id').values_list('id', flat=True)), [first.id, second.id])
+
+    def test_read_before_delivery_is_not_counted(self):
+        self.send(self.client_user)
+        # Opened before the outbox counted the message
+        self.open_conversation(self.freelancer)
+        outbox.drain()
+        self.assertEqual(self.unread(self.freelancer), 0)
+        self.assertEqual(counters.reconcile(fix=False), [])
+
+    def test_marking_unread_pulls_the_watermark_back(self):
+        messages = [self.send(self.client_user) for _ in range(3)]
+        outbox.drain()
+        self.open_conversation(self.freelancer)
+
+        mark_messages_unread(Message.objects.filter(id=messages[1].id))
+        # Watermarks are prefixes: everything after the message is unread again too
+        self.assertEqual(self.unread(self.freelancer), 2)
+        self.assertEqual(list(Message.objects.unread().values_list('id', flat=True)), [messages[1].id, messages[2].id])
+        mark_messages_read(Message.objects.filter(id=messages[2].id))
+        self.assertEqual(self.unread(self.freelancer), 0)
+        self.assertEqual(counters.reconcile(fix=False), [])
+
+
+@override_settings(OUTBOX_LOCAL_WORKER=False)
+class WebSocketTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        self.outsider = User.objects.create(username='outsider', email='outsider@example.com', role='client')
+        self.conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+
+    def connect(self, user=None, query_string='', headers=(), path=WEBSOCKET_PATH):
+        if user is not None:
+            query_string = f'token={AccessToken.for_user(user)}'
+        return ApplicationCommunicator(websocket_application, {
+            'type': 'websocket', 'path': path, 'query_string': query_string.encode(), 'headers': list(headers),
+        })
+
+    async def accepted(self, communicator):
+        await communicator.send_input({'type': 'websocket.connect'})
+        self.assertEqual(await communicator.receive_output(1), {'type': 'websocket.accept'})
+        return json.loads((await communicator.receive_output(1))['text'])
+
+    async def frame(self, communicator):
+        return json.loads((await communicator.receive_output(1))['text'])
+
+    def send(self, sender, content):
+        # Runs the outbox handler and the commit hooks publishing its events
+        with self.captureOnCommitCallbacks(execute=True):
+            message = Message.objects.create(conversation=self.conversation, sender=sender, content=content)
+            outbox.enqueue('message.created', {'message_id': message.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.drain()
+        return message
+
+    def test_rejects_missing_and_invalid_tokens(self):
+        async def run():
+            for communicator in (
+                self.connect(),
+                self.connect(query_string='token=not-a-jwt'),
+                self.connect(self.client_user, path='/ws/elsewhere/'),
+            ):
+                await communicator.send_input({'type': 'websocket.connect'})
+                self.assertEqual(await communicator.receive_output(1), {'type': 'websocket.close'})
+        async_to_sync(run)()
+
+    def test_bearer_header_and_ping(self):
+        async def run():
+            token = AccessToken.for_user(self.freelancer)
+            communicator = self.connect(headers=[(b'authorization', f'Bearer {token}'.encode())])
+            self.assertEqual(await self.accepted(communicator), {'type': 'unread.count', 'unread_count': 0})
+            await communicator.send_input({'type': 'websocket.receive', 'text': '{"type": "ping"}'})
+            self.assertEqual(await self.frame(communicator), {'type': 'pong'})
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(1)
+        async_to_sync(run)()
+        self.assertEqual(get_broker()._subscriptions, {})
+
+    def test_messages_fan_out_to_participants_only(self):
+        async def run():
+            freelancer, client, outsider = (self.connect(user) for user in (self.freelancer, self.client_user, self.outsider))
+            for communicator in (freelancer, client, outsider):
+                await self.accepted(communicator)
+
+            message = await sync_to_async(self.send)(self.client_user, 'Hello')
+            for communicator in (freelancer, client):
+                event = await self.frame(communicator)
+                self.assertEqual((event['type'], event['message']['id']), ('message.new', message.id))
+            self.assertEqual(await self.frame(freelancer), {'type': 'unread.count', 'unread_count': 1})
+            self.assertTrue(await outsider.receive_nothing(0.2))
+            self.assertTrue(await client.receive_nothing(0.2))
+            for communicator in (freelancer, client, outsider):
+                await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await communicator.wait(1)
+        async_to_sync(run)()
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        self.outsider = User.objects.create(username='outsider', email='outsider@example.com', role='client')
+        self.conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        self.api = APIClient()
+        self.api.force_authenticate(self.freelancer)
+
+    def sync(self, since=None):
+        response = self.api.get('/api/messaging/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def send(self, conversation, sender, content='Hello'):
+        message = Message.objects.create(conversation=conversation, sender=sender, content=content)
+        record_new_message(conversation, message)
+        return message
+
+    def test_missing_old_and_invalid_cursors(self):
+        self.assertTrue(self.sync()['full_resync'])
+        stale = encode_cursor(timezone.now() - RESYNC_AFTER - timedelta(minutes=1), 0, 0)
+        self.assertTrue(self.sync(stale)['full_resync'])
+        self.assertEqual(self.api.get('/api/messaging/sync/', {'since': 'not-a-cursor'}).status_code, 400)
+
+    def test_pages_through_changes_since_the_cursor(self):
+        self.send(self.conversation, self.client_user, 'Before the cursor')
+        cursor = self.sync()['cursor']
+
+        sent = [self.send(self.conversation, self.client_user, f'Message {i}') for i in range(5)]
+        other = Conversation.objects.create(client=self.outsider, freelancer=self.freelancer)
+        sent.append(self.send(other, self.outsider, 'New conversation'))
+        self.send(Conversation.objects.create(client=self.outsider, freelancer=User.objects.create(
+            username='stranger', email='stranger@example.com', role='freelancer',
+        )), self.outsider, 'Not visible')
+
+        seen_messages, seen_conversations = [], set()
+        with mock.patch('messaging.sync.MESSAGE_PAGE_SIZE', 2):
+            while True:
+                page = self.sync(cursor)
+                self.assertFalse(page['full_resync'])
+                seen_messages += [message['id'] for message in page['messages']]
+                seen_conversations |= {conversation['id'] for conversation in page['conversations']}
+                cursor = page['cursor']
+                if not page['has_more']:
+                    break
+        self.assertEqual(seen_messages, [message.id for message in sent])
+        self.assertEqual(seen_conversations, {self.conversation.id, other.id})
+
+        # Caught up: nothing until the next change, then just that change
+        self.assertEqual((self.sync(cursor)['messages'], self.sync(cursor)['conversations']), ([], []))
+        # A read receipt moves the conversation, carrying the new watermark
+        mark_conversation_read(self.conversation, self.freelancer)
+        page = self.sync(cursor)
+        self.assertEqual(page['messages'], [])
+        self.assertEqual(
+            [(c['id'], c['freelancer_last_read_id']) for c in page['conversations']],
+            [(self.conversation.id, sent[4].id)],
+        )
+
+
+@override_settings(OUTBOX_LOCAL_WORKER=False)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        handlers = mock.patch.dict(outbox._handlers, {'test.flaky': self.flaky})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def flaky(self, payload):
+        # Writes, then fails until the payload's number of failures is used up
+        self.calls.append(payload)
+        counters.add({'outbox-test': 1})
+        if len(self.calls) <= payload['failures']:
+            raise RuntimeError('Delivery failed')
+
+    def applied(self):
+        return counters.totals().get('outbox-test', 0)
+
+    def test_only_committed_writes_enqueue(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            outbox.enqueue('test.flaky', {'failures': 0})
+            raise RuntimeError
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        with override_settings(OUTBOX_LOCAL_WORKER=True), self.captureOnCommitCallbacks() as callbacks:
+            outbox.enqueue('test.flaky', {'failures': 0})
+        self.assertEqual(callbacks, [outbox.local_worker.wake])
+
+    def test_failures_retry_with_backoff_and_apply_once(self):
+        event = outbox.enqueue('test.flaky', {'failures': 2})
+        before = timezone.now()
+        self.assertEqual(outbox.process_batch(), 0)
+        event.refresh_from_db()
+        self.assertEqual((event.attempts, event.processed_at), (1, None))
+        self.assertIn('Delivery failed', event.last_error)
+        self.assertGreaterEqual(event.available_at, before + timedelta(seconds=2))
+        # The failed attempt's write was rolled back with it
+        self.assertEqual(self.applied(), 0)
+
+        # Not retried before its backoff is up
+        self.assertEqual(outbox.drain(), 0)
+        self.assertEqual(len(self.calls), 1)
+
+        for attempts, backoff in ((2, 4), (3, None)):
+            OutboxEvent.objects.filter(id=event.id).update(available_at=timezone.now())
+            before = timezone.now()
+            outbox.process_batch()
+            event.refresh_from_db()
+            self.assertEqual(event.attempts, attempts)
+            if backoff:
+                self.assertGreaterEqual(event.available_at, before + timedelta(seconds=backoff))
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(self.applied(), 1)
+        self.assertEqual(outbox.drain(), 0)
+
+    def test_gives_up_after_max_attempts(self):
+        event = outbox.enqueue('test.flaky', {'failures': outbox.MAX_ATTEMPTS})
+        unknown = outbox.enqueue('test.unknown', {})
+        for _ in range(outbox.MAX_ATTEMPTS + 1):
+            OutboxEvent.objects.update(available_at=timezone.now())
+            outbox.process_batch()
+        event.refresh_from_db()
+        self.assertEqual((event.attempts, event.processed_at), (outbox.MAX_ATTEMPTS, None))
+        self.assertEqual(len(self.calls), outbox.MAX_ATTEMPTS)
+        unknown.refresh_from_db()
+        self.assertIn('No outbox handler registered', unknown.last_error)
+
+    def test_purge_processed(self):
+        old, recent = (outbox.enqueue('test.flaky', {'failures': 0}) for _ in range(2))
+        unprocessed = outbox.enqueue('test.unknown', {})
+        outbox.drain()
+        OutboxEvent.objects.filter(id=old.id).update(processed_at=timezone.now() - timedelta(days=8))
+        self.assertEqual(outbox.purge_processed(timedelta(days=7)), 1)
+        self.assertEqual(set(OutboxEvent.objects.values_list('id', flat=True)), {recent.id, unprocessed.id})
+
+
+class AttachmentFileTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        self.outsider = User.objects.create(username='outsider', email='outsider@example.com', role='client')
+        conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        message = Message.objects.create(conversation=conversation, sender=self.client_user, content='Brief attached')
+        self.attachment = MessageAttachment.objects.create(
+            message=message, filename='brief.pdf', file_size=9,
+            file=default_storage.save('message_attachments/blob', io.BytesIO(b'%PDF-data')),
+        )
+        self.path = f'/api/messaging/attachments/{self.attachment.id}/'
+        self.api = APIClient()
+
+    def test_participants_and_signed_urls_only(self):
+        self.assertEqual(self.api.get(self.path).status_code, 404)
+        self.api.force_authenticate(self.outsider)
+        self.assertEqual(self.api.get(self.path).status_code, 404)
+
+        self.api.force_authenticate(self.freelancer)
+        response = self.api.get(self.path, headers={'Range': 'bytes=1-3'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'PDF')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="brief.pdf"')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        url = MessageAttachmentSerializer(self.attachment).data['url']
+        self.assertEqual(APIClient().get(url).status_code, 200)
+
+
+class _FailingStream:
+    """A request body whose connection drops after `fail_after` bytes"""
+
+    def __init__(self, data, fail_after):
+        self.stream = io.BytesIO(data[:fail_after])
+
+    def read(self, size):
+        block = self.stream.read(size)
+        if not block:
+            raise OSError('Connection reset')
+        return block
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(uploads._hashers.clear)
+
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        self.message = Message.objects.create(conversation=conversation, sender=self.client_user, content='Files')
+        self.data = bytes(range(256)) * 1000
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def start(self, size=None, filename='report.pdf'):
+        response = self.api.post('/api/messaging/uploads/', {'filename': filename, 'size': size or len(self.data)})
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def put(self, upload_id, offset, body):
+        return self.api.put(
+            f'/api/messaging/uploads/{upload_id}/?offset={offset}', data=body, content_type='application/octet-stream',
+        )
+
+    def complete(self, upload_id):
+        return self.api.post(f'/api/messaging/uploads/{upload_id}/complete/', {'message_id': self.message.id})
+
+    def upload(self, data):
+        upload_id = self.start(len(data))
+        self.assertEqual(self.put(upload_id, 0, data).status_code, 200)
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 201, response.data)
+        return MessageAttachment.objects.get(id=response.data['id'])
+
+    def test_resume_from_received_size_on_another_worker(self):
+        upload_id = self.start()
+        self.assertEqual(self.put(upload_id, 0, self.data[:100_000]).data['received_size'], 100_000)
+        # A retried chunk that already landed is refused with the offset to resume from
+        response = self.put(upload_id, 0, self.data[:100_000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.api.get(f'/api/messaging/uploads/{upload_id}/').data['received_size'], 100_000)
+        self.assertEqual(self.complete(upload_id).status_code, 409)
+
+        # Another worker has no running hash and rebuilds it from the part file
+        uploads._hashers.clear()
+        self.assertEqual(self.put(upload_id, 100_000, self.data[100_000:]).status_code, 200)
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 201, response.data)
+        attachment = MessageAttachment.objects.get(id=response.data['id'])
+        self.assertEqual(attachment.sha256, hashlib.sha256(self.data).hexdigest())
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), self.data)
+        self.assertFalse(AttachmentUpload.objects.exists())
+        self.assertEqual(list(uploads.upload_dir().iterdir()), [])
+
+    def test_failed_chunk_keeps_the_hash_consistent(self):
+        upload_id = self.start()
+        self.put(upload_id, 0, self.data[:100_000])
+        upload = AttachmentUpload.objects.get(id=upload_id)
+        rest = self.data[100_000:]
+        # Drops after more than one block has been written and hashed
+        with self.assertRaises(OSError):
+            uploads.append_chunk(upload_id, self.client_user, 100_000, _FailingStream(rest, 150_000), len(rest))
+        # A body shorter than its Content-Length
+        with self.assertRaises(uploads.UploadError):
+            uploads.append_chunk(upload_id, self.client_user, 100_000, io.BytesIO(rest[:100_000]), len(rest))
+        upload.refresh_from_db()
+        self.assertEqual(upload.received_size, 100_000)
+
+        self.assertEqual(self.put(upload_id, 100_000, self.data[100_000:]).status_code, 200)
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 201, response.data)
+        attachment = MessageAttachment.objects.get(id=response.data['id'])
+        self.assertEqual(attachment.sha256, hashlib.sha256(self.data).hexdigest())
+
+    def test_identical_files_share_one_blob(self):
+        first = self.upload(self.data)
+        second = self.upload(self.data)
+        other = self.upload(self.data[::-1])
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.file.name, other.file.name)
+        self.assertEqual(len(default_storage.listdir(os.path.dirname(first.file.name))[1]), 1)
+
+    def test_limits_and_ownership(self):
+        too_big = {'filename': 'huge.bin', 'size': settings.ATTACHMENT_MAX_SIZE + 1}
+        self.assertEqual(self.api.post('/api/messaging/uploads/', too_big).status_code, 413)
+        upload_id = self.start(10)
+        self.assertEqual(self.put(upload_id, 0, b'x' * 11).status_code, 400)
+
+        self.api.force_authenticate(self.freelancer)
+        self.assertEqual(self.put(upload_id, 0, b'x' * 10).status_code, 404)
+        self.assertEqual(self.api.delete(f'/api/messaging/uploads/{upload_id}/').status_code, 404)
+
+        self.api.force_authenticate(self.client_user)
+        self.assertEqual(self.api.delete(f'/api/messaging/uploads/{upload_id}/').status_code, 204)
+        self.assertEqual(list(uploads.upload_dir().iterdir()), [])
+
+
+    def test_cleanup_discards_abandoned_uploads(self):
+        abandoned, active = self.start(), self.start()
+        self.put(abandoned, 0, self.data[:1000])
+        AttachmentUpload.objects.filter(id=abandoned).update(updated_at=timezone.now() - timedelta(hours=25))
+        # Left behind by an upload whose row is gone
+        orphan = uploads.upload_dir() / f'{uuid.uuid4()}.part'
+        orphan.write_bytes(b'x')
+        old = (timezone.now() - timedelta(hours=25)).timestamp()
+        os.utime(orphan, (old, old))
+
+        out = io.StringIO()
+        call_command('cleanup_uploads', stdout=out)
+        self.assertIn('Discarded 1 abandoned uploads', out.getvalue())
+        self.assertEqual(list(AttachmentUpload.objects.values_list('id', flat=True)), [uuid.UUID(active)])
+        self.assertEqual(sorted(uploads.upload_dir().iterdir()), [uploads.upload_dir() / f'{active}.part'])
+        # The active upload carries on
+        self.assertEqual(self.put(active, 0, self.data).status_code, 200)
+
+class MessageSearchTests(TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        self.outsider = User.objects.create(username='outsider', email='outsider@example.com', role='client')
+        self.conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        other = Conversation.objects.create(client=self.outsider, freelancer=self.freelancer)
+        self.older = self.send(self.conversation, 'The invoice for the logo design is attached')
+        self.newer = self.send(self.conversation, 'Paid the Invoice, thanks for the design work')
+        self.send(self.conversation, 'Unrelated small talk')
+        self.send(other, 'Another invoice for a logo design')
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def send(self, conversation, content):
+        return Message.objects.create(conversation=conversation, sender=conversation.freelancer, content=content)
+
+    def search(self, query, **params):
+        response = self.api.get('/api/messaging/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_ranked_and_highlighted_matches_in_own_conversations(self):
+        page = self.search('invoice')
+        ids = [hit['message']['id'] for hit in page['results']]
+        self.assertEqual(sorted(ids), sorted([self.older.id, self.newer.id]))
+        self.assertIn('<mark>invoice</mark>', page['results'][ids.index(self.older.id)]['highlight'].lower())
+        ranks = [hit['rank'] for hit in page['results']]
+        self.assertEqual(ranks, sorted(ranks))
+
+        # Every term must match, the last one as a prefix
+        self.assertEqual([hit['message']['id'] for hit in self.search('logo desi')['results']], [self.older.id])
+        self.assertEqual(self.search('"; DROP TABLE')['results'], [])
+
+    def test_cursor_pages(self):
+        first = self.search('design', limit=1)
+        second = self.search('design', limit=1, cursor=first['next'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            {hit['message']['id'] for hit in first['results'] + second['results']}, {self.older.id, self.newer.id},
+        )
+        self.assertEqual(self.api.get('/api/messaging/search/', {'q': 'design', 'cursor': 'x'}).status_code, 400)
+        self.assertEqual(self.api.get('/api/messaging/search/').status_code, 400)
+
+    def test_index_follows_edits_and_deletes(self):
+        Message.objects.filter(id=self.newer.id).update(content='Rewritten entirely')
+        self.older.delete()
+        self.assertEqual(self.search('invoice')['results'], [])
+        self.assertEqual([hit['message']['id'] for hit in self.search('rewritten')['results']], [self.newer.id])
+
+    def test_fallback_without_a_full_text_backend(self):
+        with mock.patch('messaging.search.get_backend', return_value=None):
+            page = self.search('invoice desi', limit=1)
+            self.assertEqual([hit['message']['id'] for hit in page['results']], [self.newer.id])
+            self.assertIn('<mark>Invoice</mark>', page['results'][0]['highlight'])
+
+            page = self.search('invoice desi', limit=1, cursor=page['next'])
+            self.assertEqual([hit['message']['id'] for hit in page['results']], [self.older.id])
+            self.assertIsNone(page['next'])
+
+
+class ReadWatermarkMigrationTests(TransactionTestCase):
+    before = [('messaging', '0003_conversation_summary')]
+    after = [('messaging', '0004_read_watermarks')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_flags_become_watermarks_and_back(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('accounts', 'User')
+        Conversation = apps.get_model('messaging', 'Conversation')
+        Message = apps.get_model('messaging', 'Message')
+        client = User.objects.create(username='client', email='client@example.com', role='client')
+        freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        conversation = Conversation.objects.create(client=client, freelancer=freelancer)
+        flags = [(freelancer, True), (client, True), (freelancer, False), (client, True), (freelancer, False)]
+        messages = [
+            Message.objects.create(conversation=conversation, sender=sender, content='Hello', is_read=is_read)
+            for sender, is_read in flags
+        ]
+
+        apps = self.migrate(self.after)
+        conversation = apps.get_model('messaging', 'Conversation').objects.get(id=conversation.id)
+        # The client has read up to their first unread message; the freelancer everything
+        self.assertEqual(conversation.client_last_read_id, messages[2].id - 1)
+        self.assertEqual(conversation.freelancer_last_read_id, messages[4].id)
+
+        apps = self.migrate(self.before)
+        restored = apps.get_model('messaging', 'Message').objects.order_by('id').values_list('is_read', flat=True)
+        self.assertEqual(list(restored), [is_read for sender, is_read in flags])
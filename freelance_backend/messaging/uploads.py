@@ -0,0 +1,225 @@
+"""
+Chunked, resumable attachment uploads.
+
+1. start_upload() creates an AttachmentUpload session for a file of known size.
+2. append_chunk() streams one request body straight to the session's part file on
+   disk in small blocks and feeds the same blocks to a running SHA-256, so neither
+   the file nor a whole chunk is ever held in worker memory. A client that lost its
+   connection asks for the session's received_size and resumes from there.
+3. finish_upload() attaches the completed file to a message. Blobs are content
+   addressed by SHA-256: if an identical file was uploaded before, the existing blob
+   is reused and the part file is discarded.
+
+Running hashes live in process memory keyed by upload id. When a chunk lands on a
+different worker (or after a restart) the hash is rebuilt once from the part file.
+
+Uploads that are never finished are discarded, part file included, by
+discard_expired() (`manage.py cleanup_uploads`, run from cron) once they have gone
+settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS without a chunk.
+"""
+import hashlib
+import os
+import threading
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttachmentUpload, MessageAttachment
+
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A request that does not fit the upload's current state; carries the HTTP status to return"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class _PartFile(File):
+    # FileSystemStorage moves files exposing temporary_file_path() instead of copying them
+    def temporary_file_path(self):
+        return self.name
+
+
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def upload_dir():
+    # Resolved on every call so that MEDIA_ROOT overrides (tests, benchmarks) move it too
+    path = Path(settings.ATTACHMENT_UPLOAD_TEMP_DIR or Path(settings.MEDIA_ROOT) / 'attachment_uploads')
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def part_path(upload):
+    return upload_dir() / f'{upload.id}.part'
+
+
+def _hasher_for(upload):
+    """The running SHA-256 of the first received_size bytes of the part file"""
+    with _hashers_lock:
+        cached = _hashers.get(upload.id)
+    if cached and cached[0] == upload.received_size:
+        return cached[1]
+
+    hasher = hashlib.sha256()
+    path = part_path(upload)
+    if upload.received_size:
+        with open(path, 'rb') as part:
+            remaining = upload.received_size
+            while remaining:
+                block = part.read(min(BLOCK_SIZE, remaining))
+                if not block:
+                    raise UploadError('Upload data is missing; restart the upload', status_code=409)
+                hasher.update(block)
+                remaining -= len(block)
+    return hasher
+
+
+def _remember_hasher(upload, hasher):
+    with _hashers_lock:
+        _hashers[upload.id] = (upload.received_size, hasher)
+
+
+def _forget_hasher(upload):
+    with _hashers_lock:
+        _hashers.pop(upload.id, None)
+
+
+def start_upload(user, filename, total_size):
+    max_size = settings.ATTACHMENT_MAX_SIZE
+    if total_size <= 0:
+        raise UploadError('size must be positive')
+    if total_size > max_size:
+        raise UploadError(f'Attachments are limited to {max_size} bytes', status_code=413)
+    upload = AttachmentUpload.objects.create(
+        uploader=user,
+        filename=os.path.basename(filename)[:255] or 'attachment',
+        total_size=total_size,
+    )
+    part_path(upload).touch()
+    return upload
+
+
+def append_chunk(upload_id, user, offset, stream, length):
+    """
+    Append `length` bytes read from `stream` at `offset`. Offsets must match the bytes
+    already received, which makes retries of a chunk that did land detectable.
+    """
+    if length > settings.ATTACHMENT_CHUNK_MAX_SIZE:
+        raise UploadError(f'Chunks are limited to {settings.ATTACHMENT_CHUNK_MAX_SIZE} bytes', status_code=413)
+
+    with transaction.atomic():
+        upload = _locked_upload(upload_id, user)
+        if offset != upload.received_size:
+            raise UploadError(f'Expected offset {upload.received_size}', status_code=409)
+        if upload.received_size + length > upload.total_size:
+            raise UploadError('Chunk runs past the declared size')
+
+        # A copy, so a chunk that fails halfway leaves the cached hash at received_size
+        hasher = _hasher_for(upload).copy()
+        path = part_path(upload)
+        written = 0
+        with open(path, 'r+b') as part:
+            part.seek(offset)
+            while written < length:
+                block = stream.read(min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                part.write(block)
+                hasher.update(block)
+                written += len(block)
+            # Drop anything left over from an earlier, interrupted write
+            part.truncate()
+        if written != length:
+            # Leave received_size untouched; the client retries from the same offset
+            raise UploadError('Chunk body shorter than Content-Length')
+
+        upload.received_size += written
+        upload.save(update_fields=['received_size', 'updated_at'])
+        _remember_hasher(upload, hasher)
+    return upload
+
+
+def finish_upload(upload_id, user, message):
+    """Attach a completed upload to `message`, reusing an identical stored blob if one exists"""
+    with transaction.atomic():
+        upload = _locked_upload(upload_id, user)
+        if not upload.is_complete:
+            raise UploadError(f'Upload incomplete: {upload.received_size}/{upload.total_size} bytes', status_code=409)
+
+        digest = _hasher_for(upload).hexdigest()
+        path = part_path(upload)
+        existing = MessageAttachment.objects.filter(sha256=digest).exclude(file='').first()
+        if existing and default_storage.exists(existing.file.name):
+            blob_name = existing.file.name
+            path.unlink(missing_ok=True)
+        else:
+            extension = os.path.splitext(upload.filename)[1].lower()
+            with open(path, 'rb') as part:
+                blob_name = default_storage.save(
+                    f'message_attachments/{digest[:2]}/{digest}{extension}',
+                    _PartFile(part, name=str(path)),
+                )
+            path.unlink(missing_ok=True)
+
+        attachment = MessageAttachment.objects.create(
+            message=message,
+            file=blob_name,
+            filename=upload.filename,
+            file_size=upload.total_size,
+            sha256=digest,
+        )
+        upload.delete()
+    _forget_hasher(upload)
+    return attachment
+
+
+def discard_upload(upload):
+    part_path(upload).unlink(missing_ok=True)
+    _forget_hasher(upload)
+    upload.delete()
+
+
+def discard_expired(max_idle=None):
+    """
+    Discard the uploads that have gone `max_idle` (default
+    settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS) without a chunk, and part files left
+    without an upload, e.g. by a deleted uploader; returns the number of uploads
+    """
+    if max_idle is None:
+        max_idle = timedelta(hours=settings.ATTACHMENT_UPLOAD_EXPIRY_HOURS)
+    cutoff = timezone.now() - max_idle
+    discarded = 0
+    for upload_id in AttachmentUpload.objects.filter(updated_at__lt=cutoff).values_list('id', flat=True):
+        with transaction.atomic():
+            # Checked again under the lock, in case a chunk just arrived
+            upload = AttachmentUpload.objects.select_for_update().filter(id=upload_id, updated_at__lt=cutoff).first()
+            if upload is not None:
+                discard_upload(upload)
+                discarded += 1
+
+    for path in upload_dir().glob('*.part'):
+        try:
+            upload_id = uuid.UUID(path.stem)
+        except ValueError:
+            continue
+        if path.stat().st_mtime < cutoff.timestamp() and not AttachmentUpload.objects.filter(id=upload_id).exists():
+            path.unlink(missing_ok=True)
+    return discarded
+
+
+def _locked_upload(upload_id, user):
+    try:
+        return AttachmentUpload.objects.select_for_update().get(id=upload_id, uploader=user)
+    except AttachmentUpload.DoesNotExist:
+        raise UploadError('Upload not found', status_code=404)
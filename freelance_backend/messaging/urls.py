@@ -5,6 +5,13 @@ urlpatterns = [
     path('conversations/', views.ConversationListView.as_view(), name='conversation-list'),
     path('conversations/start/', views.start_conversation, name='start-conversation'),
     path('conversations/<int:pk>/', views.ConversationDetailView.as_view(), name='conversation-detail'),
+    path('conversations/<int:conversation_id>/messages/', views.conversation_messages, name='conversation-messages'),
     path('conversations/<int:conversation_id>/send/', views.send_message, name='send-message'),
     path('unread-count/', views.unread_messages_count, name='unread-messages-count'),
+    path('sync/', views.sync, name='messaging-sync'),
+    path('search/', views.search, name='message-search'),
+    path('uploads/', views.start_attachment_upload, name='attachment-upload-start'),
+    path('uploads/<uuid:upload_id>/', views.attachment_upload, name='attachment-upload'),
+    path('uploads/<uuid:upload_id>/complete/', views.complete_attachment_upload, name='attachment-upload-complete'),
+    path('attachments/<int:pk>/', views.attachment_file, name='message-attachment-file'),
 ] 
\ No newline at end of file
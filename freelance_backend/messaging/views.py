@@ -1,12 +1,23 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from django.db import transaction
 from django.db.models import Q
-from .models import Conversation, Message
-from .serializers import ConversationSerializer, ConversationListSerializer, MessageSerializer
+from .models import AttachmentUpload, Conversation, Message, MessageAttachment
+from . import outbox, uploads
+from . import search as message_search
+from .pagination import InvalidCursor, paginate_messages, parse_page_size
+from .serializers import (
+    AttachmentUploadSerializer, ConversationSerializer, ConversationListSerializer,
+    MessageAttachmentSerializer, MessageSerializer, SyncConversationSerializer, SyncMessageSerializer,
+)
+from .summary import mark_conversation_read, total_unread_count
+from .sync import InvalidSyncCursor, sync_changes
 from accounts.models import User
+from freelance_platform import media
 
 class ConversationListView(generics.ListAPIView):
     """List all conversations for the current user"""
@@ -17,7 +28,7 @@ class ConversationListView(generics.ListAPIView):
         user = self.request.user
         return Conversation.objects.filter(
             Q(client=user) | Q(freelancer=user)
-        ).prefetch_related('messages')
+        ).select_related('client', 'freelancer', 'last_message_sender')
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -56,7 +67,7 @@ def start_conversation(request):
     return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
 class ConversationDetailView(generics.RetrieveAPIView):
-    """Get a specific conversation with all messages"""
+    """Get a specific conversation with its latest page of messages"""
     serializer_class = ConversationSerializer
     permission_classes = [IsAuthenticated]
     
@@ -64,20 +75,64 @@ class ConversationDetailView(generics.RetrieveAPIView):
         user = self.request.user
         return Conversation.objects.filter(
             Q(client=user) | Q(freelancer=user)
-        ).prefetch_related('messages__sender')
+        ).select_related('client', 'freelancer')
     
     def retrieve(self, request, *args, **kwargs):
         conversation = self.get_object()
         
         # Mark messages as read for the current user
-        Message.objects.filter(
-            conversation=conversation,
-            is_read=False
-        ).exclude(sender=request.user).update(is_read=True)
+        if mark_conversation_read(conversation, request.user):
+            outbox.enqueue('conversation.read', {
+                'conversation_id': conversation.id,
+                'reader_id': request.user.id,
+            })
         
         serializer = self.get_serializer(conversation)
         return Response(serializer.data)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def conversation_messages(request, conversation_id):
+    """
+    Cursor-paginated message history, newest first.
+    
+    Query params:
+    - before: message id; return messages older than it
+    - after: message id; return messages newer than it
+    - limit: page size (default 30, max 100)
+    """
+    user = request.user
+    try:
+        conversation = Conversation.objects.filter(
+            Q(client=user) | Q(freelancer=user)
+        ).get(id=conversation_id)
+    except Conversation.DoesNotExist:
+        return Response({'error': 'Conversation not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    before = request.query_params.get('before')
+    after = request.query_params.get('after')
+    if before and after:
+        return Response({'error': 'Use either before or after, not both'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Going through the related manager reuses `conversation` for each message's is_read
+    queryset = conversation.messages.select_related('sender').prefetch_related('attachments')
+    try:
+        page = paginate_messages(
+            queryset,
+            before=before or None,
+            after=after or None,
+            limit=parse_page_size(request.query_params.get('limit')),
+        )
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'results': MessageSerializer(page['messages'], many=True).data,
+        'has_more': page['has_more'],
+        'before': page['before'],
+        'after': page['after'],
+    })
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def send_message(request, conversation_id):
@@ -94,14 +149,14 @@ def send_message(request, conversation_id):
     if not content:
         return Response({'error': 'Message content is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    message = Message.objects.create(
-        conversation=conversation,
-        sender=request.user,
-        content=content
-    )
-    
-    # Update conversation timestamp
-    conversation.save()
+    with transaction.atomic():
+        message = Message.objects.create(
+            conversation=conversation,
+            sender=request.user,
+            content=content
+        )
+        # Counters, last-message snapshot and push notifications are delivered from the outbox
+        outbox.enqueue('message.created', {'message_id': message.id})
     
     serializer = MessageSerializer(message)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -110,12 +165,159 @@ def send_message(request, conversation_id):
 @permission_classes([IsAuthenticated])
 def unread_messages_count(request):
     """Get count of unread messages for the current user"""
-    user = request.user
-    unread_count = Message.objects.filter(
-        conversation__in=Conversation.objects.filter(
-            Q(client=user) | Q(freelancer=user)
-        ),
-        is_read=False
-    ).exclude(sender=user).count()
+    # Summed from the per-participant counters: O(conversations), never touches messages
+    unread_count = total_unread_count(request.user)
     
     return Response({'unread_count': unread_count})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync(request):
+    """
+    Delta sync for reconnecting clients: conversations (with read watermarks) and
+    messages changed after ?since=<cursor>. Keep calling with the returned cursor
+    while has_more is true. full_resync=true means the cursor is missing or too old;
+    refetch the conversation list and continue from the returned cursor.
+    """
+    try:
+        changes = sync_changes(request.user, request.query_params.get('since'))
+    except InvalidSyncCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if changes['full_resync']:
+        return Response({'full_resync': True, 'cursor': changes['cursor']})
+    
+    return Response({
+        'full_resync': False,
+        'conversations': SyncConversationSerializer(
+            changes['conversations'], many=True, context={'request': request}
+        ).data,
+        'messages': SyncMessageSerializer(changes['messages'], many=True).data,
+        'cursor': changes['cursor'],
+        'has_more': changes['has_more'],
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request):
+    """
+    Full-text search across the current user's conversations, best match first.
+    
+    Query params:
+    - q: search text; the last word is prefix-matched
+    - cursor: the `next` value from the previous page
+    - limit: page size (default 20, max 50)
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        page = message_search.search_messages(
+            request.user,
+            query,
+            cursor=request.query_params.get('cursor'),
+            limit=parse_page_size(
+                request.query_params.get('limit'),
+                default=message_search.DEFAULT_PAGE_SIZE,
+                maximum=message_search.MAX_PAGE_SIZE,
+            ),
+        )
+    except message_search.InvalidSearchCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'results': [
+            {
+                'message': SyncMessageSerializer(message).data,
+                'highlight': snippet,
+                'rank': rank,
+            }
+            for message, rank, snippet in page['results']
+        ],
+        'next': page['next'],
+    })
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_attachment_upload(request):
+    """
+    Start a chunked attachment upload.
+    
+    Body: {"filename": "...", "size": total bytes}. Then PUT each chunk as the raw
+    request body to uploads/<id>/?offset=<bytes already sent>, and finally POST
+    {"message_id": ...} to uploads/<id>/complete/.
+    """
+    filename = request.data.get('filename')
+    try:
+        size = int(request.data.get('size'))
+    except (TypeError, ValueError):
+        return Response({'error': 'size is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if not filename:
+        return Response({'error': 'filename is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        upload = uploads.start_upload(request.user, filename, size)
+    except uploads.UploadError as e:
+        return Response({'error': str(e)}, status=e.status_code)
+    
+    data = AttachmentUploadSerializer(upload).data
+    data['chunk_size'] = settings.ATTACHMENT_CHUNK_MAX_SIZE
+    return Response(data, status=status.HTTP_201_CREATED)
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def attachment_upload(request, upload_id):
+    """Check progress (GET), append a chunk (PUT) or abandon (DELETE) an attachment upload"""
+    if request.method == 'PUT':
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'offset is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # Read the raw stream; touching request.data would buffer the whole body
+            upload = uploads.append_chunk(upload_id, request.user, offset, request.stream, length)
+        except uploads.UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return Response(AttachmentUploadSerializer(upload).data)
+    
+    upload = AttachmentUpload.objects.filter(id=upload_id, uploader=request.user).first()
+    if upload is None:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    if request.method == 'DELETE':
+        uploads.discard_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(AttachmentUploadSerializer(upload).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def complete_attachment_upload(request, upload_id):
+    """Attach a fully uploaded file to one of the current user's messages"""
+    try:
+        message = Message.objects.get(id=request.data.get('message_id'), sender=request.user)
+    except (Message.DoesNotExist, ValueError, TypeError):
+        return Response({'error': 'Message not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        attachment = uploads.finish_upload(upload_id, request.user, message)
+    except uploads.UploadError as e:
+        return Response({'error': str(e)}, status=e.status_code)
+    return Response(MessageAttachmentSerializer(attachment).data, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def attachment_file(request, pk):
+    """Download an attachment, with Range support; for conversation participants or a signed `url`"""
+    attachment = MessageAttachment.objects.filter(pk=pk).select_related('message__conversation').only(
+        'id', 'file', 'filename', 'message__conversation__client_id', 'message__conversation__freelancer_id',
+    ).first()
+    allowed = attachment is not None and (
+        media.has_valid_signature(request, 'attachment', attachment.pk)
+        or (request.user.is_authenticated and request.user.id in (
+            attachment.message.conversation.client_id, attachment.message.conversation.freelancer_id,
+        ))
+    )
+    if not allowed:
+        return Response({'error': 'Attachment not found'}, status=status.HTTP_404_NOT_FOUND)
+    return media.serve_file(request, attachment.file.name, filename=attachment.filename, as_attachment=True)
@@ -0,0 +1,99 @@
+"""
+WebSocket push endpoint for messaging events, mounted at WEBSOCKET_PATH by
+freelance_platform.asgi alongside the regular Django ASGI application.
+
+Clients authenticate with the same SimpleJWT access token as the REST API, either
+as ?token=<access> (browsers cannot set headers on WebSocket handshakes) or as an
+"Authorization: Bearer <access>" header. Once connected they receive JSON frames:
+- {"type": "unread.count", "unread_count": n} on connect and whenever it changes
+- {"type": "message.new", "conversation_id": id, "message": {...}}
+- {"type": "message.read", "conversation_id": id, "reader_id": id, "last_read_id": id}
+Sending {"type": "ping"} is answered with {"type": "pong"}.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .events import get_broker
+from .summary import total_unread_count
+
+WEBSOCKET_PATH = '/ws/messaging/'
+
+
+def _raw_token(scope):
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    if token:
+        return token[0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0] == 'Bearer':
+                return parts[1]
+    return None
+
+
+@sync_to_async
+def authenticate(scope):
+    raw_token = _raw_token(scope)
+    if not raw_token:
+        return None
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def _send_json(send, payload):
+    await send({'type': 'websocket.send', 'text': json.dumps(payload, cls=DjangoJSONEncoder)})
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI application for websocket scopes"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    user = await authenticate(scope) if scope['path'] == WEBSOCKET_PATH else None
+    if user is None:
+        # Closing before accept rejects the handshake with HTTP 403
+        await send({'type': 'websocket.close'})
+        return
+
+    # Subscribe before the initial count so no change can slip in between
+    subscription = get_broker().subscribe(user.id)
+    await send({'type': 'websocket.accept'})
+    receive_task = asyncio.ensure_future(receive())
+    event_task = asyncio.ensure_future(subscription.get())
+    try:
+        unread_count = await sync_to_async(total_unread_count)(user.id)
+        await _send_json(send, {'type': 'unread.count', 'unread_count': unread_count})
+
+        while True:
+            done, _ = await asyncio.wait({receive_task, event_task}, return_when=asyncio.FIRST_COMPLETED)
+
+            if event_task in done:
+                await _send_json(send, event_task.result())
+                event_task = asyncio.ensure_future(subscription.get())
+
+            if receive_task in done:
+                message = receive_task.result()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message['type'] == 'websocket.receive':
+                    try:
+                        payload = json.loads(message.get('text') or '{}')
+                    except ValueError:
+                        payload = {}
+                    if isinstance(payload, dict) and payload.get('type') == 'ping':
+                        await _send_json(send, {'type': 'pong'})
+                receive_task = asyncio.ensure_future(receive())
+    finally:
+        subscription.close()
+        for task in (receive_task, event_task):
+            task.cancel()
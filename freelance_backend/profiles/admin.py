@@ -1,8 +1,11 @@
 from django.contrib import admin
+from django.utils import timezone
 from unfold.admin import ModelAdmin, TabularInline
 from unfold.contrib.filters.admin import RangeDateFilter, ChoicesDropdownFilter
 from unfold.decorators import display
-from .models import Profile, VideoDemo
+from .models import Profile, RankingConfig, VideoDemo
+from . import videos
+from .scores import schedule_refresh
 
 class VideoDemoInline(TabularInline):
     model = VideoDemo
@@ -71,19 +74,23 @@ class ProfileAdmin(ModelAdmin):
     
     @admin.action(description='Reset ratings for selected profiles')
     def reset_ratings(self, request, queryset):
-        updated = queryset.update(rating=None)
+        updated = queryset.update(rating=None, updated_at=timezone.now())
+        # QuerySet.update() sends no signals
+        schedule_refresh(queryset.values_list('user_id', flat=True))
         self.message_user(request, f'{updated} profile ratings were reset.')
     
     @admin.action(description='Mark as featured (set high rating)')
     def mark_as_featured(self, request, queryset):
-        updated = queryset.update(rating=5.0)
+        updated = queryset.update(rating=5.0, updated_at=timezone.now())
+        schedule_refresh(queryset.values_list('user_id', flat=True))
         self.message_user(request, f'{updated} profiles marked as featured.')
 
 @admin.register(VideoDemo)
 class VideoDemoAdmin(ModelAdmin):
-    list_display = ['title', 'profile', 'get_user_role', 'is_public', 'get_file_size', 'created_at']
+    list_display = ['title', 'profile', 'get_user_role', 'is_public', 'processing_status', 'get_file_size', 'created_at']
     list_filter = [
         'is_public',
+        'processing_status',
         ('created_at', RangeDateFilter),
         'profile__user__role'
     ]
@@ -104,28 +111,42 @@ class VideoDemoAdmin(ModelAdmin):
         ('File & Visibility', {
             'fields': ('video_file', 'is_public')
         }),
+        ('Processing', {
+            'fields': ('processing_status', 'thumbnail', 'duration', 'width', 'height', 'file_size'),
+            'classes': ['collapse']
+        }),
         ('Timestamps', {
             'fields': ('created_at',),
             'classes': ['collapse']
         }),
     )
     
-    readonly_fields = ['created_at']
+    readonly_fields = ['processing_status', 'thumbnail', 'duration', 'width', 'height', 'file_size', 'created_at']
     
     # Custom display methods
     @display(description="User Role", ordering="profile__user__role")
     def get_user_role(self, obj):
         return obj.profile.user.role.title()
     
-    @display(description="File Size")
+    @display(description="File Size", ordering="file_size")
     def get_file_size(self, obj):
-        if obj.video_file:
-            size = obj.video_file.size
+        # Recorded by profiles.videos, so the changelist doesn't stat every file
+        size = obj.file_size
+        if size is not None:
             if size < 1024 * 1024:  # Less than 1MB
                 return f"{size / 1024:.1f} KB"
             else:  # 1MB or more
                 return f"{size / (1024 * 1024):.1f} MB"
-        return "No file"
+        return "Not processed"
+    
+    def save_model(self, request, obj, form, change):
+        if 'video_file' not in form.changed_data:
+            return super().save_model(request, obj, form, change)
+        previous_name = form.initial.get('video_file').name if form.initial.get('video_file') else None
+        obj.processing_status, obj.thumbnail, obj.thumbnail_renditions = 'pending', None, {}
+        obj.duration = obj.width = obj.height = obj.file_size = None
+        super().save_model(request, obj, form, change)
+        videos.schedule_processing(obj, previous_name)
     
     # Custom actions
     actions = ['make_public', 'make_private']
@@ -133,9 +154,33 @@ class VideoDemoAdmin(ModelAdmin):
     @admin.action(description='Make selected videos public')
     def make_public(self, request, queryset):
         updated = queryset.update(is_public=True)
+        schedule_refresh(queryset.values_list('profile__user_id', flat=True))
         self.message_user(request, f'{updated} videos made public.')
     
     @admin.action(description='Make selected videos private')
     def make_private(self, request, queryset):
         updated = queryset.update(is_public=False)
+        schedule_refresh(queryset.values_list('profile__user_id', flat=True))
         self.message_user(request, f'{updated} videos made private.')
+
+@admin.register(RankingConfig)
+class RankingConfigAdmin(ModelAdmin):
+    list_display = ['version', 'is_active', 'notes', 'created_at']
+    list_filter = ['is_active']
+    ordering = ['-version']
+    readonly_fields = ['created_at']
+    
+    fieldsets = (
+        ('Version', {
+            'fields': ('version', 'is_active', 'notes')
+        }),
+        ('Settings', {
+            'fields': ('settings',),
+            'description': 'Overrides for any subset of profiles.ranking.DEFAULT_CONFIG; '
+                           'saving queues a rebuild of every freelancer score.'
+        }),
+        ('Timestamps', {
+            'fields': ('created_at',),
+            'classes': ['collapse']
+        }),
+    )
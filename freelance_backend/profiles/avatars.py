@@ -0,0 +1,157 @@
+"""
+Avatar uploads and renditions.
+
+Requests only check the upload's image header and store it as sent; decoding and
+resizing happen off-request in a small thread pool (settings.AVATAR_RENDER_WORKERS;
+Pillow releases the GIL while it decodes and resamples). Each avatar gets square
+renditions at RENDITION_SIZES in JPEG and WebP, named after the original
+(avatars/7/avatar_x1y2.png -> avatars/7/avatar_x1y2-128.jpg). JPEGs are decoded in
+draft mode at the smallest DCT scale that still covers the largest rendition, so a
+12-megapixel photo never expands to full size in memory.
+
+Profile.avatar_renditions records which original the renditions belong to;
+until they exist, serializers fall back to the original. Jobs that don't fit the
+pool's queue, or die with the process, are picked up by `manage.py render_avatars`.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from freelance_platform.background import BoundedPool
+from . import leaderboards
+from .models import Profile
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = (64, 128, 512)
+# The avatar_url size list endpoints ask ProfileSerializer for
+LIST_AVATAR_SIZE = 128
+FORMATS = {
+    'jpeg': ('.jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('.webp', {'quality': 80, 'method': 4}),
+}
+ALLOWED_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+
+
+class InvalidAvatar(ValueError):
+    pass
+
+
+def validate_upload(file):
+    """
+    Check an uploaded avatar from its header alone (nothing is decoded) and return
+    the file extension for its real format.
+    """
+    if file.size > settings.AVATAR_MAX_SIZE:
+        raise InvalidAvatar(f'Avatar must be at most {settings.AVATAR_MAX_SIZE // (1024 * 1024)} MB')
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise InvalidAvatar('Avatar is not a readable image')
+    finally:
+        file.seek(0)
+    if image_format not in ALLOWED_FORMATS:
+        raise InvalidAvatar(f'Unsupported avatar format: {image_format}')
+    if width * height > settings.AVATAR_MAX_PIXELS:
+        raise InvalidAvatar('Avatar dimensions are too large')
+    return ALLOWED_FORMATS[image_format]
+
+
+def rendition_name(source_name, size, image_format):
+    base, _ = os.path.splitext(source_name)
+    return f'{base}-{size}{FORMATS[image_format][0]}'
+
+
+def rendition_urls(profile):
+    """{size: {format: url}} for the profile's current avatar, or None until they're rendered"""
+    renditions = profile.avatar_renditions or {}
+    if not profile.avatar or renditions.get('source') != profile.avatar.name:
+        return None
+    return {
+        size: {
+            image_format: default_storage.url(rendition_name(profile.avatar.name, size, image_format))
+            for image_format in FORMATS
+        }
+        for size in renditions.get('sizes', [])
+    }
+
+
+def render_renditions(profile_id, source_name):
+    """Write every rendition of `source_name` and record them, unless the avatar changed meanwhile"""
+    largest = max(RENDITION_SIZES)
+    with default_storage.open(source_name, 'rb') as file:
+        with Image.open(file) as image:
+            # JPEG only: decode at a reduced scale that's still at least `largest` on each side
+            image.draft('RGB', (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, 'white')
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode == 'L':
+                image = image.convert('RGB')
+            square = ImageOps.fit(image, (min(image.size),) * 2)
+
+    current = square
+    for size in sorted(RENDITION_SIZES, reverse=True):
+        # Each size is resampled from the previous one, which is cheaper and just as sharp
+        current = current.resize((size, size), Image.Resampling.LANCZOS) if current.width > size else current
+        for image_format, (_, options) in FORMATS.items():
+            name = rendition_name(source_name, size, image_format)
+            output = ContentFile(b'')
+            current.save(output, format=image_format.upper(), **options)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, output)
+
+    updated = Profile.objects.filter(pk=profile_id, avatar=source_name).update(
+        avatar_renditions={'source': source_name, 'sizes': list(RENDITION_SIZES)},
+    )
+    if updated:
+        # Cached leaderboards still point at the original
+        leaderboards.invalidate()
+    else:
+        delete_avatar_files(source_name, include_source=False)
+    return bool(updated)
+
+
+def delete_avatar_files(source_name, include_source=True):
+    """Remove an avatar's renditions (and the original) from storage"""
+    names = [rendition_name(source_name, size, image_format) for size in RENDITION_SIZES for image_format in FORMATS]
+    if include_source:
+        names.append(source_name)
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('Could not delete avatar file %s', name)
+
+
+render_pool = BoundedPool(
+    render_renditions, lambda: settings.AVATAR_RENDER_WORKERS, 'avatar-render',
+)
+
+
+def replace_avatar(profile, file, extension):
+    """
+    Store `file` as the profile's new avatar (saved by the caller) and, once that
+    commits, render it and delete the previous one
+    """
+    previous = profile.avatar.name if profile.avatar else None
+    profile.avatar.save(f'avatar{extension}', file, save=False)
+    profile.avatar_renditions = {}
+    source_name, profile_id = profile.avatar.name, profile.pk
+
+    def after_commit():
+        if previous and previous != source_name:
+            delete_avatar_files(previous)
+        render_pool.submit(profile_id, source_name)
+    transaction.on_commit(after_commit)
@@ -0,0 +1,14 @@
+"""Outbox handlers for profile side effects; registered on import by ProfilesConfig.ready"""
+from messaging import outbox
+from . import scores
+
+
+@outbox.handler(scores.REFRESH_TOPIC)
+def refresh_freelancer_scores(payload):
+    scores.refresh_scores(payload['user_ids'])
+
+
+@outbox.handler(scores.REBUILD_TOPIC)
+def rebuild_freelancer_scores(payload):
+    # Fans out instead of rebuilding inside this event's transaction
+    scores.queue_rebuild_batches()
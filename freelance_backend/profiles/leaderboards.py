@@ -0,0 +1,167 @@
+"""
+Cached leaderboard responses.
+
+The top, newcomer and featured endpoints return the same few profiles to every
+visitor, so their serialized responses are cached:
+
+- An entry holds the data, the leaderboard version it was computed at and a
+  freshness deadline (settings.LEADERBOARD_CACHE_TTL). invalidate() bumps the shared
+  version, which makes every entry stale at once; profiles.scores calls it after
+  each commit that rewrites FreelancerScore rows, i.e. after profile, proposal,
+  project status and video demo changes.
+- Single-flight: when an entry is stale or missing, only the caller that wins a
+  short cache.add() lock recomputes it. The others serve the stale entry if there
+  is one, or wait briefly for the winner's result, so a miss under load costs one
+  recomputation instead of one per request.
+- stats() reports this process's hits, misses and recompute times for monitoring.
+
+Entries and locks are shared between processes only if the cache backend is (e.g.
+Redis or Memcached); with LocMemCache both are per process.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'leaderboards:version'
+# Longest a recomputation may hold its lock before another caller may take over
+LOCK_TIMEOUT = 10
+# How long callers with nothing to serve wait for another caller's recomputation
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.02
+
+
+def _cache():
+    return caches[getattr(settings, 'LEADERBOARD_CACHE', 'default')]
+
+
+def _ttl():
+    return getattr(settings, 'LEADERBOARD_CACHE_TTL', 300)
+
+
+class LeaderboardStats:
+    """Thread-safe per-process counters and recompute timings, per leaderboard"""
+
+    EVENTS = ('hits', 'stale_hits', 'misses', 'coalesced', 'wait_timeouts')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = defaultdict(lambda: dict.fromkeys(self.EVENTS, 0))
+            self._recomputes = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': None})
+            self._invalidations = 0
+
+    def record(self, name, event):
+        with self._lock:
+            self._counters[name][event] += 1
+
+    def record_recompute(self, name, seconds):
+        milliseconds = seconds * 1000
+        with self._lock:
+            timing = self._recomputes[name]
+            timing['count'] += 1
+            timing['total_ms'] += milliseconds
+            timing['max_ms'] = max(timing['max_ms'], milliseconds)
+            timing['last_ms'] = milliseconds
+
+    def record_invalidation(self):
+        with self._lock:
+            self._invalidations += 1
+
+    def snapshot(self):
+        with self._lock:
+            leaderboards = {}
+            for name in sorted(set(self._counters) | set(self._recomputes)):
+                counters = dict(self._counters[name])
+                timing = dict(self._recomputes[name])
+                served = counters['hits'] + counters['stale_hits'] + counters['coalesced']
+                requests = served + counters['misses'] + counters['wait_timeouts']
+                timing['avg_ms'] = timing['total_ms'] / timing['count'] if timing['count'] else None
+                leaderboards[name] = {
+                    **counters,
+                    'requests': requests,
+                    'hit_ratio': served / requests if requests else None,
+                    'recompute': timing,
+                }
+            return {'invalidations': self._invalidations, 'leaderboards': leaderboards}
+
+
+_stats = LeaderboardStats()
+
+
+def stats():
+    return _stats.snapshot()
+
+
+def _current_version(cache):
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so a version key lost to eviction never repeats an old version
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Mark every cached leaderboard stale"""
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        _current_version(cache)
+    _stats.record_invalidation()
+
+
+def _recompute(cache, key, name, version, compute):
+    started = time.perf_counter()
+    data = compute()
+    _stats.record_recompute(name, time.perf_counter() - started)
+    # Kept past its freshness deadline so it can be served while the next recomputation runs;
+    # stored at the version read before computing, so an invalidation during it still wins
+    ttl = _ttl()
+    cache.set(key, {'version': version, 'fresh_until': time.time() + ttl, 'data': data}, timeout=ttl * 2)
+    return data
+
+
+def get(name, variant, compute):
+    """
+    Return the cached data for leaderboard `name` (`variant` separates responses that
+    differ per request, e.g. by host), calling `compute()` at most once across
+    concurrent callers when it is stale or missing.
+    """
+    cache = _cache()
+    key = f'leaderboards:{name}:{variant}'
+    version = _current_version(cache)
+    entry = cache.get(key)
+    if entry is not None and entry['version'] == version and entry['fresh_until'] > time.time():
+        _stats.record(name, 'hits')
+        return entry['data']
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, True, timeout=LOCK_TIMEOUT):
+        _stats.record(name, 'misses')
+        try:
+            return _recompute(cache, key, name, version, compute)
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        _stats.record(name, 'stale_hits')
+        return entry['data']
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] >= version:
+            _stats.record(name, 'coalesced')
+            return entry['data']
+
+    # The lock holder is stuck or died; don't keep this request waiting on it
+    _stats.record(name, 'wait_timeouts')
+    return _recompute(cache, key, name, version, compute)
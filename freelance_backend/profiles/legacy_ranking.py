@@ -0,0 +1,329 @@
+"""
+The ranking querysets as the endpoints evaluated them before scores were
+materialized: one annotate() with nested Case/Cast expressions per ranking.
+
+Kept only as the reference implementation for the ranking parity tests and as the
+baseline of `manage.py benchmark_ranking`; nothing serves requests from here.
+They return every eligible profile in ranking order, unsliced.
+
+Known differences from profiles.ranking, which are bugs fixed there:
+- `skills__len` is a JSON key lookup (skills->'len'), not the array length, so
+  every profile gets the skills completeness points and no diversity points;
+- `avatar=''` is false for NULL avatars, so a missing avatar still scores;
+- featured counts proposals and video demos through the same join, so a
+  freelancer with several demos has every proposal count multiplied.
+"""
+from datetime import timedelta
+
+from django.db import models
+from django.db.models import Case, Count, DecimalField, F, Q, Value, When
+from django.db.models.functions import Cast
+
+from .models import Profile
+
+
+def top_freelancers(now):
+    thirty_days_ago = now - timedelta(days=30)
+    
+    return Profile.objects.filter(
+        user__role='freelancer'
+    ).annotate(
+        # Core metrics
+        completed_projects=Count('user__proposals__project', 
+                               filter=Q(user__proposals__project__status='completed')),
+        total_proposals=Count('user__proposals'),
+        accepted_proposals=Count('user__proposals', 
+                               filter=Q(user__proposals__project__status__in=['in_progress', 'completed'])),
+        recent_activity=Count('user__proposals', 
+                            filter=Q(user__proposals__created_at__gte=thirty_days_ago)),
+        
+        # Calculate success rate (accepted proposals / total proposals)
+        success_rate=Case(
+            When(total_proposals=0, then=Value(0.0)),
+            default=F('accepted_proposals') * 100.0 / F('total_proposals'),
+            output_field=DecimalField(max_digits=5, decimal_places=2)
+        ),
+        
+        # Profile completeness score (0-100)
+        profile_completeness=Case(
+            When(bio='', then=Value(0)),
+            default=Value(20)  # Has bio
+        ) + Case(
+            When(skills__len=0, then=Value(0)),
+            default=Value(20)  # Has skills
+        ) + Case(
+            When(hourly_rate__isnull=True, then=Value(0)),
+            default=Value(20)  # Has hourly rate
+        ) + Case(
+            When(location='', then=Value(0)),
+            default=Value(20)  # Has location
+        ) + Case(
+            When(avatar='', then=Value(0)),
+            default=Value(20)  # Has avatar
+        ),
+        
+        # Calculate composite score (0-100)
+        composite_score=(
+            # Rating score (40% weight): (rating/5) * 40
+            Cast(F('rating'), DecimalField()) / Cast(Value(5.0), DecimalField()) * Cast(Value(40.0), DecimalField()) +
+            
+            # Experience score (25% weight): min(completed_projects/10, 1) * 25
+            Case(
+                When(completed_projects__gte=10, then=Value(25.0)),
+                default=Cast(F('completed_projects'), DecimalField()) * Cast(Value(2.5), DecimalField()),
+                output_field=DecimalField(max_digits=5, decimal_places=2)
+            ) +
+            
+            # Success rate score (20% weight): (success_rate/100) * 20
+            Cast(F('success_rate'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(20.0), DecimalField()) +
+            
+            # Recent activity bonus (10% weight): has recent activity gets full points
+            Case(
+                When(recent_activity__gt=0, then=Value(10.0)),
+                default=Value(0.0),
+                output_field=DecimalField(max_digits=5, decimal_places=2)
+            ) +
+            
+            # Profile completeness (5% weight): (completeness/100) * 5
+            Cast(F('profile_completeness'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(5.0), DecimalField())
+        )
+    ).filter(
+        # Minimum requirements for top freelancers
+        rating__gte=3.5,  # At least 3.5 rating
+        total_proposals__gte=1,  # At least 1 proposal submitted
+    ).order_by('-composite_score', '-rating', '-completed_projects')
+
+
+def newcomer_freelancers(now):
+    ninety_days_ago = now - timedelta(days=90)
+    
+    return Profile.objects.filter(
+        user__role='freelancer',
+        user__date_joined__gte=ninety_days_ago
+    ).annotate(
+        # Activity metrics
+        total_proposals=Count('user__proposals'),
+        early_proposals=Count('user__proposals', 
+                            filter=Q(user__proposals__created_at__lte=F('user__date_joined') + timedelta(days=7))),
+        accepted_proposals=Count('user__proposals', 
+                               filter=Q(user__proposals__project__status__in=['in_progress', 'completed'])),
+        
+        # Days since joining (for recency calculation) - simplified approach
+        days_since_joining=Case(
+            When(user__date_joined__gte=now - timedelta(days=1), then=Value(1)),
+            When(user__date_joined__gte=now - timedelta(days=7), then=Value(7)),
+            When(user__date_joined__gte=now - timedelta(days=30), then=Value(30)),
+            When(user__date_joined__gte=now - timedelta(days=60), then=Value(60)),
+            default=Value(90),
+            output_field=models.IntegerField()
+        ),
+        
+        # Profile completeness (same as top freelancers)
+        profile_completeness=Case(
+            When(bio='', then=Value(0)),
+            default=Value(20)
+        ) + Case(
+            When(skills__len=0, then=Value(0)),
+            default=Value(20)
+        ) + Case(
+            When(hourly_rate__isnull=True, then=Value(0)),
+            default=Value(20)
+        ) + Case(
+            When(location='', then=Value(0)),
+            default=Value(20)
+        ) + Case(
+            When(avatar='', then=Value(0)),
+            default=Value(20)
+        ),
+        
+        # Calculate newcomer score (0-100)
+        newcomer_score=(
+            # Recency score (30% weight): newer = higher score
+            Case(
+                When(days_since_joining__lte=7, then=Value(30.0)),
+                When(days_since_joining__lte=30, then=Value(25.0)),
+                When(days_since_joining__lte=60, then=Value(15.0)),
+                default=Value(5.0),
+                output_field=DecimalField(max_digits=5, decimal_places=2)
+            ) +
+            
+            # Early activity score (25% weight): proposals within first week
+            Case(
+                When(early_proposals__gte=3, then=Value(25.0)),
+                When(early_proposals__gte=1, then=Value(15.0)),
+                When(total_proposals__gte=1, then=Value(10.0)),
+                default=Value(0.0),
+                output_field=DecimalField(max_digits=5, decimal_places=2)
+            ) +
+            
+            # Profile quality score (25% weight)
+            Cast(F('profile_completeness'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(25.0), DecimalField()) +
+            
+            # Initial success score (20% weight)
+            Case(
+                When(accepted_proposals__gte=1, then=Value(20.0)),
+                When(total_proposals__gte=3, then=Value(10.0)),
+                When(total_proposals__gte=1, then=Value(5.0)),
+                default=Value(0.0),
+                output_field=DecimalField(max_digits=5, decimal_places=2)
+            )
+        )
+    ).filter(
+        # Basic quality filters
+        profile_completeness__gte=40,  # At least 40% profile completion
+    ).order_by('-newcomer_score', '-user__date_joined')
+
+
+def featured_freelancers(now):
+    thirty_days_ago = now - timedelta(days=30)
+    ninety_days_ago = now - timedelta(days=90)
+    
+    return Profile.objects.filter(
+        user__role='freelancer'
+    ).annotate(
+        # Core performance metrics
+        completed_projects=Count('user__proposals__project', 
+                               filter=Q(user__proposals__project__status='completed')),
+        total_proposals=Count('user__proposals'),
+        accepted_proposals=Count('user__proposals', 
+                               filter=Q(user__proposals__project__status__in=['in_progress', 'completed'])),
+        recent_proposals=Count('user__proposals', 
+                             filter=Q(user__proposals__created_at__gte=thirty_days_ago)),
+        consistent_activity=Count('user__proposals', 
+                                filter=Q(user__proposals__created_at__gte=ninety_days_ago)),
+        
+        # Portfolio and professional presence
+        video_demos_count=Count('video_demos', filter=Q(video_demos__is_public=True)),
+        
+        # Success and completion rates
+        success_rate=Case(
+            When(total_proposals=0, then=Value(0.0)),
+            default=Cast(F('accepted_proposals'), DecimalField()) * Cast(Value(100.0), DecimalField()) / Cast(F('total_proposals'), DecimalField()),
+            output_field=DecimalField(max_digits=5, decimal_places=2)
+        ),
+        
+        completion_rate=Case(
+            When(accepted_proposals=0, then=Value(0.0)),
+            default=Cast(F('completed_projects'), DecimalField()) * Cast(Value(100.0), DecimalField()) / Cast(F('accepted_proposals'), DecimalField()),
+            output_field=DecimalField(max_digits=5, decimal_places=2)
+        ),
+        
+        # High-demand skills count (simplified - in production, use more sophisticated matching)
+        high_demand_skills_count=Case(
+            When(skills__icontains='react', then=Value(1)),
+            default=Value(0)
+        ) + Case(
+            When(skills__icontains='python', then=Value(1)),
+            default=Value(0)
+        ) + Case(
+            When(skills__icontains='javascript', then=Value(1)),
+            default=Value(0)
+        ) + Case(
+            When(skills__icontains='design', then=Value(1)),
+            default=Value(0)
+        ),
+        
+        # Profile completeness
+        profile_completeness=Case(
+            When(bio='', then=Value(0)),
+            default=Value(20)
+        ) + Case(
+            When(skills__len=0, then=Value(0)),
+            default=Value(20)
+        ) + Case(
+            When(hourly_rate__isnull=True, then=Value(0)),
+            default=Value(20)
+        ) + Case(
+            When(location='', then=Value(0)),
+            default=Value(20)
+        ) + Case(
+            When(avatar='', then=Value(0)),
+            default=Value(20)
+        ),
+        
+        # Calculate featured score (0-100)
+        featured_score=(
+            # Overall Performance (30% weight)
+            (
+                # Rating component (40% of performance score)
+                Cast(F('rating'), DecimalField()) / Cast(Value(5.0), DecimalField()) * Cast(Value(12.0), DecimalField()) +
+                
+                # Success rate component (35% of performance score)
+                Cast(F('success_rate'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(10.5), DecimalField()) +
+                
+                # Experience component (25% of performance score)
+                Case(
+                    When(completed_projects__gte=5, then=Value(7.5)),
+                    default=Cast(F('completed_projects'), DecimalField()) * Cast(Value(1.5), DecimalField()),
+                    output_field=DecimalField(max_digits=5, decimal_places=2)
+                )
+            ) +
+            
+            # Market Demand (25% weight)
+            (
+                # High-demand skills bonus
+                Cast(F('high_demand_skills_count'), DecimalField()) * Cast(Value(5.0), DecimalField()) +
+                
+                # Competitive pricing (if hourly rate is reasonable)
+                Case(
+                    When(hourly_rate__isnull=True, then=Value(0.0)),
+                    When(hourly_rate__lte=50, then=Value(10.0)),
+                    When(hourly_rate__lte=100, then=Value(7.5)),
+                    default=Value(5.0),
+                    output_field=DecimalField(max_digits=5, decimal_places=2)
+                ) +
+                
+                # Category diversity bonus
+                Case(
+                    When(skills__len__gte=5, then=Value(10.0)),
+                    When(skills__len__gte=3, then=Value(5.0)),
+                    default=Value(0.0),
+                    output_field=DecimalField(max_digits=5, decimal_places=2)
+                )
+            ) +
+            
+            # Reliability (20% weight)
+            (
+                # Completion rate
+                Cast(F('completion_rate'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(10.0), DecimalField()) +
+                
+                # Consistent activity
+                Case(
+                    When(consistent_activity__gte=3, then=Value(10.0)),
+                    When(consistent_activity__gte=1, then=Value(5.0)),
+                    default=Value(0.0),
+                    output_field=DecimalField(max_digits=5, decimal_places=2)
+                )
+            ) +
+            
+            # Professional Presence (15% weight)
+            (
+                # Profile completeness
+                Cast(F('profile_completeness'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(10.0), DecimalField()) +
+                
+                # Portfolio demos
+                Case(
+                    When(video_demos_count__gte=2, then=Value(5.0)),
+                    When(video_demos_count__gte=1, then=Value(2.5)),
+                    default=Value(0.0),
+                    output_field=DecimalField(max_digits=5, decimal_places=2)
+                )
+            ) +
+            
+            # Client Satisfaction (10% weight) - simplified for now
+            (
+                # Recent activity bonus (indicates client demand)
+                Case(
+                    When(recent_proposals__gte=2, then=Value(10.0)),
+                    When(recent_proposals__gte=1, then=Value(5.0)),
+                    default=Value(0.0),
+                    output_field=DecimalField(max_digits=5, decimal_places=2)
+                )
+            )
+        )
+    ).filter(
+        # Quality thresholds for featured status
+        rating__gte=3.0,  # Minimum rating
+        total_proposals__gte=1,  # Has submitted proposals
+        profile_completeness__gte=60,  # Well-completed profile
+    ).order_by('-featured_score', '-rating', '-completed_projects')
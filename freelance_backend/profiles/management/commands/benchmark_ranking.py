@@ -0,0 +1,138 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import User
+from profiles import legacy_ranking, ranking
+from profiles.models import Profile, VideoDemo
+from projects.models import Project, ProjectProposal
+
+LEADERBOARDS = (
+    ('top', legacy_ranking.top_freelancers, 10),
+    ('newcomer', legacy_ranking.newcomer_freelancers, 10),
+    ('featured', legacy_ranking.featured_freelancers, 6),
+)
+SKILLS = ['React', 'Python', 'JavaScript', 'UI Design', 'Django', 'Go', 'Copywriting', 'SEO']
+INSERT_BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the three leaderboards: the original annotate() expressions against '
+        'the vectorized ranking engine. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                            help='Numbers of freelancers to benchmark at')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the best is reported')
+        parser.add_argument('--skip-legacy-above', type=int, default=None,
+                            help='Skip the annotate() baseline above this many freelancers')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        seeded = 0
+        self.stdout.write(f"{'freelancers':>12} {'annotate()':>12} {'fetch':>10} {'compute':>10} {'engine':>10} {'speedup':>8}")
+        for size in sorted(options['sizes']):
+            self.seed(seeded, size, now, rng)
+            seeded = size
+
+            legacy = None
+            if options['skip_legacy_above'] is None or size <= options['skip_legacy_above']:
+                legacy = self.best_of(options['repeat'], lambda: [
+                    list(queryset(now)[:limit]) for _, queryset, limit in LEADERBOARDS
+                ])
+
+            config = ranking.DEFAULT_CONFIG
+            profiles = Profile.objects.filter(user__role='freelancer')
+            fetch = self.best_of(options['repeat'], lambda: ranking.fetch_metrics(profiles, now, config))
+            metrics = ranking.fetch_metrics(profiles, now, config)
+
+            def compute():
+                results = ranking.compute_scores(metrics, config, now)
+                return [ranking.top_n(results[name], limit) for name, _, limit in LEADERBOARDS]
+            compute_time = self.best_of(options['repeat'], compute)
+
+            engine = fetch + compute_time
+            self.stdout.write(
+                f'{size:>12,} {self.format(legacy):>12} {self.format(fetch):>10} '
+                f'{self.format(compute_time):>10} {self.format(engine):>10} '
+                f"{(f'{legacy / engine:.1f}x' if legacy else '-'):>8}"
+            )
+
+    def best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def format(self, seconds):
+        if seconds is None:
+            return 'skipped'
+        if seconds < 1:
+            return f'{seconds * 1000:.1f}ms'
+        return f'{seconds:.2f}s'
+
+    def seed(self, start, stop, now, rng):
+        """Add freelancers start..stop-1 with profiles, proposals and demos"""
+        clients = list(User.objects.filter(role='client', username__startswith='bench-client'))
+        if not clients:
+            clients = User.objects.bulk_create([
+                User(username=f'bench-client{i}', email=f'bench-client{i}@example.com', role='client', password='!')
+                for i in range(100)
+            ])
+            statuses = [choice for choice, _ in Project.STATUS_CHOICES]
+            Project.objects.bulk_create([
+                Project(title=f'Project {i}', description='Benchmark', category='other',
+                        status=statuses[i % len(statuses)], client=clients[i % len(clients)])
+                for i in range(2000)
+            ])
+        project_ids = list(Project.objects.values_list('id', flat=True))
+
+        for batch_start in range(start, stop, INSERT_BATCH):
+            batch = range(batch_start, min(batch_start + INSERT_BATCH, stop))
+            users = User.objects.bulk_create([
+                User(username=f'bench{i}', email=f'bench{i}@example.com', role='freelancer', password='!',
+                     date_joined=now - timedelta(days=rng.randint(0, 400)))
+                for i in batch
+            ])
+            profiles = Profile.objects.bulk_create([
+                Profile(
+                    user=user,
+                    bio='Benchmark freelancer' if rng.random() < 0.8 else '',
+                    skills=rng.sample(SKILLS, rng.randint(0, 6)),
+                    hourly_rate=rng.choice([None, 25, 60, 120]),
+                    location='Remote' if rng.random() < 0.7 else '',
+                    avatar=f'avatars/{user.id}/avatar.jpg' if rng.random() < 0.5 else '',
+                    rating=round(rng.uniform(0, 5), 2),
+                )
+                for user in users
+            ])
+            ProjectProposal.objects.bulk_create([
+                ProjectProposal(
+                    project_id=project_id, freelancer=user, message='Benchmark', proposed_budget=100,
+                    timeline='1 week',
+                )
+                for user in users
+                for project_id in rng.sample(project_ids, rng.randint(0, 5))
+            ])
+            VideoDemo.objects.bulk_create([
+                VideoDemo(profile=profile, title='Demo', video_file='videos/demo.mp4', category='other')
+                for profile in profiles
+                for _ in range(rng.randint(0, 2))
+            ])
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from profiles.models import VideoDemo
+from profiles.videos import process_demo
+
+
+class Command(BaseCommand):
+    help = (
+        'Extract metadata and thumbnails for video demos still pending, e.g. uploaded before '
+        'processing existed or whose background job was dropped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help='Also retry demos whose processing failed')
+        parser.add_argument('--all', action='store_true', help='Reprocess every demo')
+
+    def handle(self, *args, **options):
+        demos = VideoDemo.objects.exclude(video_file='').only('id', 'video_file').order_by('id')
+        if not options['all']:
+            statuses = ['pending', 'failed'] if options['failed'] else ['pending']
+            demos = demos.filter(processing_status__in=statuses)
+        results = {'ready': 0, 'failed': 0, None: 0}
+        for demo in demos.iterator(chunk_size=500):
+            status = process_demo(demo.id, demo.video_file.name)
+            results[status] += 1
+            if status == 'failed':
+                self.stderr.write(f'Video demo {demo.id} ({demo.video_file.name}) failed; see the log')
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {results['ready']} video demos, {results['failed']} failed, {results[None]} skipped."
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from profiles.scores import BATCH_SIZE, rebuild_scores, refresh_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the materialized freelancer ranking scores. Schedule it periodically '
+        '(e.g. hourly) so the time-window metrics age out.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only refresh the given freelancer user id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['user_ids']:
+            total = refresh_scores(options['user_ids'])
+        else:
+            total = rebuild_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed scores for {total} freelancers.'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from profiles.avatars import render_renditions, rendition_urls
+from profiles.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the avatar renditions that are missing, e.g. for avatars uploaded before '
+        'renditions existed or whose background job was dropped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render every avatar, not just missing ones')
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.exclude(avatar='').exclude(avatar__isnull=True).only(
+            'id', 'avatar', 'avatar_renditions',
+        ).order_by('id')
+        rendered = failed = 0
+        for profile in profiles.iterator(chunk_size=500):
+            if not options['all'] and rendition_urls(profile) is not None:
+                continue
+            try:
+                render_renditions(profile.id, profile.avatar.name)
+                rendered += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Profile {profile.id} ({profile.avatar.name}): {e}')
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} avatars, {failed} failed.'))
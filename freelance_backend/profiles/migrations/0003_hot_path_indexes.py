@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_alter_profile_avatar'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-rating'], name='profile_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videodemo',
+            index=models.Index(fields=['-created_at'], name='videodemo_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='videodemo',
+            index=models.Index(fields=['profile', '-created_at'], name='videodemo_profile_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FreelancerScore',
+            fields=[
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='profiles.profile')),
+                ('rating', models.DecimalField(decimal_places=2, default=0.0, max_digits=3)),
+                ('joined_at', models.DateTimeField()),
+                ('total_proposals', models.PositiveIntegerField(default=0)),
+                ('accepted_proposals', models.PositiveIntegerField(default=0)),
+                ('completed_projects', models.PositiveIntegerField(default=0)),
+                ('early_proposals', models.PositiveIntegerField(default=0)),
+                ('recent_proposals', models.PositiveIntegerField(default=0)),
+                ('consistent_activity', models.PositiveIntegerField(default=0)),
+                ('success_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('completion_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('profile_completeness', models.PositiveSmallIntegerField(default=0)),
+                ('video_demos_count', models.PositiveIntegerField(default=0)),
+                ('top_score', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('newcomer_score', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('featured_score', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('top_score__isnull', False)), fields=['-top_score', '-rating', '-completed_projects'], name='score_top_idx'), models.Index(condition=models.Q(('newcomer_score__isnull', False)), fields=['-newcomer_score', '-joined_at'], name='score_newcomer_idx'), models.Index(condition=models.Q(('featured_score__isnull', False)), fields=['-featured_score', '-rating', '-completed_projects'], name='score_featured_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_ranking_config'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['updated_at'], name='profile_updated_idx'),
+        ),
+    ]
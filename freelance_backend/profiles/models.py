@@ -1,11 +1,14 @@
+import os
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 def user_avatar_path(instance, filename):
-    """Generate upload path for user avatars: avatars/user_id/avatar.jpg"""
-    return f'avatars/{instance.user.id}/avatar.jpg'
+    """Generate upload path for user avatars: avatars/user_id/avatar.<ext of the upload>"""
+    extension = os.path.splitext(filename)[1].lower() or '.jpg'
+    return f'avatars/{instance.user.id}/avatar{extension}'
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -16,20 +19,44 @@ class Profile(models.Model):
     location = models.CharField(max_length=255, blank=True)
     website = models.URLField(blank=True)
     avatar = models.ImageField(upload_to=user_avatar_path, null=True, blank=True)
+    # {'source': avatar name, 'sizes': [...]} once profiles.avatars has rendered it
+    avatar_renditions = models.JSONField(default=dict, blank=True)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     total_projects = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['-rating'], name='profile_rating_idx'),
+            # Incremental sync of the matching index (projects.matching)
+            models.Index(fields=['updated_at'], name='profile_updated_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.email} Profile"
 
 class VideoDemo(models.Model):
+    PROCESSING_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='video_demos')
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     video_file = models.FileField(upload_to='videos/')
+    # Generated by profiles.videos: the poster at the largest THUMBNAIL_WIDTHS, plus
+    # {'source': video name, 'widths': [...]} for the other renditions
     thumbnail = models.ImageField(upload_to='thumbnails/', null=True, blank=True)
+    thumbnail_renditions = models.JSONField(default=dict, blank=True)
+    # Probed from the video file in the background
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_STATUS_CHOICES, default='pending')
+    duration = models.FloatField(null=True, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
     category = models.CharField(max_length=50)
     tags = models.JSONField(default=list, blank=True)
     is_public = models.BooleanField(default=True)
@@ -37,6 +64,87 @@ class VideoDemo(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='videodemo_created_idx'),
+            models.Index(fields=['profile', '-created_at'], name='videodemo_profile_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.profile.user.email}"
+
+class FreelancerScore(models.Model):
+    """
+    Materialized ranking metrics and scores for one freelancer, maintained by profiles.scores.
+    A score is NULL when the freelancer does not meet that ranking's minimum requirements.
+    """
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, primary_key=True, related_name='score')
+    rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    joined_at = models.DateTimeField()
+    
+    # Metrics (see RANKING_ALGORITHMS.md)
+    total_proposals = models.PositiveIntegerField(default=0)
+    accepted_proposals = models.PositiveIntegerField(default=0)
+    completed_projects = models.PositiveIntegerField(default=0)
+    early_proposals = models.PositiveIntegerField(default=0)
+    recent_proposals = models.PositiveIntegerField(default=0)
+    consistent_activity = models.PositiveIntegerField(default=0)
+    success_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    completion_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    profile_completeness = models.PositiveSmallIntegerField(default=0)
+    video_demos_count = models.PositiveIntegerField(default=0)
+    
+    top_score = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    newcomer_score = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    featured_score = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    ranking_version = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            # One partial index per ranking, in the ranking's ORDER BY, so each endpoint
+            # reads its top N straight off an index of eligible freelancers only
+            models.Index(
+                fields=['-top_score', '-rating', '-completed_projects'],
+                condition=models.Q(top_score__isnull=False),
+                name='score_top_idx',
+            ),
+            models.Index(
+                fields=['-newcomer_score', '-joined_at'],
+                condition=models.Q(newcomer_score__isnull=False),
+                name='score_newcomer_idx',
+            ),
+            models.Index(
+                fields=['-featured_score', '-rating', '-completed_projects'],
+                condition=models.Q(featured_score__isnull=False),
+                name='score_featured_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Scores for profile {self.profile_id}"
+
+class RankingConfig(models.Model):
+    """
+    A versioned set of ranking weights and thresholds. `settings` overrides any subset
+    of profiles.ranking.DEFAULT_CONFIG; the newest active version is used.
+    """
+    version = models.PositiveIntegerField(unique=True)
+    settings = models.JSONField(default=dict, blank=True)
+    is_active = models.BooleanField(default=False)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-version']
+    
+    def __str__(self):
+        return f"Ranking v{self.version}{' (active)' if self.is_active else ''}"
+    
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        from .ranking import merge_config
+        
+        try:
+            merge_config(self.settings)
+        except ValueError as e:
+            raise ValidationError({'settings': str(e)})
@@ -0,0 +1,294 @@
+"""
+Vectorized ranking engine for the freelancer leaderboards.
+
+fetch_metrics() pulls the raw per-freelancer metrics in one query and returns them
+as NumPy column arrays; compute_scores() then evaluates the top, newcomer and
+featured scores for every freelancer at once with array arithmetic.
+
+Weights and thresholds come from a RankingConfig: DEFAULT_CONFIG unless an active
+RankingConfig row overrides some of its values, so rankings can be tuned from the
+admin without a deploy. Tier tables are lists of [threshold, points], checked in
+order; the first tier met wins.
+"""
+import copy
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import (
+    BooleanField, Count, DateTimeField, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery,
+)
+from django.db.models.functions import Cast, Coalesce
+
+from projects.models import ProjectProposal
+from .models import RankingConfig, VideoDemo
+
+DEFAULT_VERSION = 0
+SCORES = ('top', 'newcomer', 'featured')
+DAY = 86400.0
+
+DEFAULT_CONFIG = {
+    'metrics': {
+        'accepted_project_statuses': ['in_progress', 'completed'],
+        'early_days': 7,
+        'recent_days': 30,
+        'consistent_days': 90,
+    },
+    'completeness': {
+        # Points per filled-in profile field, out of 100
+        'bio': 20, 'skills': 20, 'hourly_rate': 20, 'location': 20, 'avatar': 20,
+    },
+    'top': {
+        'min_rating': 3.5,
+        'min_proposals': 1,
+        'rating_weight': 40,
+        'experience_weight': 25,
+        'experience_cap': 10,
+        'success_weight': 20,
+        'recent_activity_points': 10,
+        'completeness_weight': 5,
+    },
+    'newcomer': {
+        'window_days': 90,
+        'min_completeness': 40,
+        # [max days since joining, points]
+        'recency_points': [[7, 30], [30, 25], [60, 15], [90, 5]],
+        'early_proposal_points': [[3, 25], [1, 15]],
+        'any_proposal_points': 10,
+        'completeness_weight': 25,
+        'accepted_points': 20,
+        'proposal_points': [[3, 10], [1, 5]],
+    },
+    'featured': {
+        'min_rating': 3.0,
+        'min_proposals': 1,
+        'min_completeness': 60,
+        'rating_weight': 12,
+        'success_weight': 10.5,
+        'experience_weight': 7.5,
+        'experience_cap': 5,
+        'high_demand_terms': ['react', 'python', 'javascript', 'design'],
+        'high_demand_points': 5,
+        # [max hourly rate, points]; rates above every tier get the default
+        'hourly_rate_points': [[50, 10], [100, 7.5]],
+        'hourly_rate_default_points': 5,
+        'skill_count_points': [[5, 10], [3, 5]],
+        'completion_weight': 10,
+        'consistency_points': [[3, 10], [1, 5]],
+        'completeness_weight': 10,
+        'demo_points': [[2, 5], [1, 2.5]],
+        'recent_proposal_points': [[2, 10], [1, 5]],
+    },
+}
+
+
+def merge_config(overrides, base=DEFAULT_CONFIG):
+    """`base` with `overrides` applied on top; unknown keys are rejected"""
+    merged = copy.deepcopy(base)
+    for key, value in (overrides or {}).items():
+        if key not in merged:
+            raise ValueError(f'Unknown ranking setting: {key}')
+        if isinstance(merged[key], dict):
+            if not isinstance(value, dict):
+                raise ValueError(f'Ranking setting {key} must be an object')
+            merged[key] = merge_config(value, merged[key])
+        else:
+            merged[key] = value
+    return merged
+
+
+def get_active_config():
+    """Return (version, config) for the newest active RankingConfig, or the defaults"""
+    active = RankingConfig.objects.filter(is_active=True).order_by('-version').first()
+    if active is None:
+        return DEFAULT_VERSION, copy.deepcopy(DEFAULT_CONFIG)
+    return active.version, merge_config(active.settings)
+
+
+def fetch_metrics(profiles, now, config):
+    """
+    One query over `profiles` (a Profile queryset) returning a dict of column arrays.
+    Proposal and demo counts are correlated subqueries, so they cannot fan out.
+    """
+    windows = config['metrics']
+    proposals = ProjectProposal.objects.filter(freelancer=OuterRef('user_id')).order_by().values('freelancer')
+
+    def proposal_count(*conditions):
+        counted = proposals.filter(*conditions).annotate(count=Count('id')).values('count')
+        return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+    demos = VideoDemo.objects.filter(profile=OuterRef('pk'), is_public=True).order_by().values('profile')
+
+    rows = profiles.order_by().annotate(
+        # Floats straight from the database skip the per-row Decimal conversion
+        rating_value=Cast('rating', FloatField()),
+        hourly_rate_value=Cast('hourly_rate', FloatField()),
+        # Computed once per freelancer rather than once per proposal in the subquery
+        early_cutoff=ExpressionWrapper(
+            F('user__date_joined') + timedelta(days=windows['early_days']), output_field=DateTimeField()
+        ),
+        has_bio=ExpressionWrapper(~Q(bio=''), output_field=BooleanField()),
+        has_location=ExpressionWrapper(~Q(location=''), output_field=BooleanField()),
+        has_avatar=ExpressionWrapper(~Q(avatar='') & Q(avatar__isnull=False), output_field=BooleanField()),
+        total_proposals=proposal_count(),
+        accepted_proposals=proposal_count(Q(project__status__in=windows['accepted_project_statuses'])),
+        completed_projects=proposal_count(Q(project__status='completed')),
+        early_proposals=proposal_count(Q(created_at__lte=OuterRef('early_cutoff'))),
+        recent_proposals=proposal_count(Q(created_at__gte=now - timedelta(days=windows['recent_days']))),
+        consistent_activity=proposal_count(Q(created_at__gte=now - timedelta(days=windows['consistent_days']))),
+        video_demos_count=Coalesce(
+            Subquery(demos.annotate(count=Count('id')).values('count'), output_field=IntegerField()), 0
+        ),
+    ).values_list(
+        'id', 'user_id', 'rating_value', 'user__date_joined', 'hourly_rate_value', 'skills',
+        'has_bio', 'has_location', 'has_avatar',
+        'total_proposals', 'accepted_proposals', 'completed_projects',
+        'early_proposals', 'recent_proposals', 'consistent_activity', 'video_demos_count',
+    )
+
+    columns = list(zip(*rows)) or [()] * 16
+    (profile_ids, user_ids, ratings, joined, hourly_rates, skills,
+     has_bio, has_location, has_avatar, *counts) = columns
+    skills = [value if isinstance(value, list) else [] for value in skills]
+    high_demand_terms = [term.lower() for term in config['featured']['high_demand_terms']]
+
+    metrics = {
+        'profile_id': np.array(profile_ids, dtype=np.int64),
+        'user_id': np.array(user_ids, dtype=np.int64),
+        'rating': np.array(ratings, dtype=np.float64),
+        'joined_at': np.array([value.timestamp() for value in joined], dtype=np.float64),
+        # NaN marks a missing hourly rate
+        'hourly_rate': np.array([np.nan if value is None else value for value in hourly_rates], dtype=np.float64),
+        'has_bio': np.array(has_bio, dtype=bool),
+        'has_location': np.array(has_location, dtype=bool),
+        'has_avatar': np.array(has_avatar, dtype=bool),
+        'skill_count': np.array([len(value) for value in skills], dtype=np.int64),
+        # Substring matches, so e.g. 'UI Design' counts towards 'design'
+        'high_demand_skills': np.array([
+            sum(term in text for term in high_demand_terms)
+            for text in (' '.join(map(str, value)).lower() for value in skills)
+        ], dtype=np.int64),
+    }
+    for name, values in zip(
+        ('total_proposals', 'accepted_proposals', 'completed_projects',
+         'early_proposals', 'recent_proposals', 'consistent_activity', 'video_demos_count'),
+        counts,
+    ):
+        metrics[name] = np.array(values, dtype=np.int64)
+    return metrics
+
+
+def _at_least(values, tiers, default=0.0):
+    """Points of the first [minimum, points] tier that `values` reach"""
+    return np.select([values >= minimum for minimum, _ in tiers], [points for _, points in tiers], default)
+
+
+def _at_most(values, tiers, default=0.0):
+    """Points of the first [maximum, points] tier that `values` stay within"""
+    return np.select([values <= maximum for maximum, _ in tiers], [points for _, points in tiers], default)
+
+
+def _ratio(numerator, denominator):
+    """numerator * 100 / denominator, 0 where the denominator is 0"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator * 100.0 / denominator, 0.0)
+
+
+def compute_scores(metrics, config, now):
+    """
+    Evaluate every score for every freelancer in `metrics`. Returns a dict with the
+    derived metrics plus one float array per score, NaN where the freelancer misses
+    that ranking's minimum requirements.
+    """
+    weights = config['completeness']
+    completeness = (
+        metrics['has_bio'] * weights['bio']
+        + (metrics['skill_count'] > 0) * weights['skills']
+        + ~np.isnan(metrics['hourly_rate']) * weights['hourly_rate']
+        + metrics['has_location'] * weights['location']
+        + metrics['has_avatar'] * weights['avatar']
+    ).astype(np.float64)
+    success_rate = _ratio(metrics['accepted_proposals'], metrics['total_proposals'])
+    completion_rate = _ratio(metrics['completed_projects'], metrics['accepted_proposals'])
+    rating = metrics['rating']
+    total = metrics['total_proposals']
+    completed = metrics['completed_projects']
+
+    top = config['top']
+    top_score = (
+        rating / 5 * top['rating_weight']
+        + np.minimum(completed / top['experience_cap'], 1) * top['experience_weight']
+        + success_rate / 100 * top['success_weight']
+        + (metrics['recent_proposals'] > 0) * top['recent_activity_points']
+        + completeness / 100 * top['completeness_weight']
+    )
+    top_eligible = (rating >= top['min_rating']) & (total >= top['min_proposals'])
+
+    newcomer = config['newcomer']
+    age_days = (now.timestamp() - metrics['joined_at']) / DAY
+    early = metrics['early_proposals']
+    early_activity = np.select(
+        [early >= minimum for minimum, _ in newcomer['early_proposal_points']] + [total >= 1],
+        [points for _, points in newcomer['early_proposal_points']] + [newcomer['any_proposal_points']],
+        0.0,
+    )
+    initial_success = np.select(
+        [metrics['accepted_proposals'] >= 1] + [total >= minimum for minimum, _ in newcomer['proposal_points']],
+        [newcomer['accepted_points']] + [points for _, points in newcomer['proposal_points']],
+        0.0,
+    )
+    newcomer_score = (
+        _at_most(age_days, newcomer['recency_points'])
+        + early_activity
+        + completeness / 100 * newcomer['completeness_weight']
+        + initial_success
+    )
+    newcomer_eligible = (age_days <= newcomer['window_days']) & (completeness >= newcomer['min_completeness'])
+
+    featured = config['featured']
+    hourly_rate = metrics['hourly_rate']
+    pricing = np.where(
+        np.isnan(hourly_rate),
+        0.0,
+        _at_most(np.nan_to_num(hourly_rate), featured['hourly_rate_points'], featured['hourly_rate_default_points']),
+    )
+    featured_score = (
+        # Overall performance
+        rating / 5 * featured['rating_weight']
+        + success_rate / 100 * featured['success_weight']
+        + np.minimum(completed / featured['experience_cap'], 1) * featured['experience_weight']
+        # Market demand
+        + metrics['high_demand_skills'] * featured['high_demand_points']
+        + pricing
+        + _at_least(metrics['skill_count'], featured['skill_count_points'])
+        # Reliability
+        + completion_rate / 100 * featured['completion_weight']
+        + _at_least(metrics['consistent_activity'], featured['consistency_points'])
+        # Professional presence
+        + completeness / 100 * featured['completeness_weight']
+        + _at_least(metrics['video_demos_count'], featured['demo_points'])
+        # Client satisfaction
+        + _at_least(metrics['recent_proposals'], featured['recent_proposal_points'])
+    )
+    featured_eligible = (
+        (rating >= featured['min_rating'])
+        & (total >= featured['min_proposals'])
+        & (completeness >= featured['min_completeness'])
+    )
+
+    return {
+        'profile_completeness': completeness,
+        'success_rate': success_rate,
+        'completion_rate': completion_rate,
+        'top': np.where(top_eligible, top_score, np.nan),
+        'newcomer': np.where(newcomer_eligible, newcomer_score, np.nan),
+        'featured': np.where(featured_eligible, featured_score, np.nan),
+    }
+
+
+def top_n(scores, n):
+    """Indices of the `n` highest non-NaN scores, best first (ties broken by position)"""
+    eligible = np.flatnonzero(~np.isnan(scores))
+    if len(eligible) > n:
+        # argpartition is O(len); only the kept candidates get fully sorted
+        eligible = eligible[np.argpartition(-scores[eligible], n - 1)[:n]]
+    return eligible[np.lexsort((eligible, -scores[eligible]))]
@@ -0,0 +1,155 @@
+"""
+Materialized freelancer ranking scores.
+
+The top, newcomer and featured rankings (RANKING_ALGORITHMS.md) are computed by the
+vectorized engine in profiles.ranking and stored in FreelancerScore, so the ranking
+endpoints are top-N reads of a partial index instead of multi-join aggregates over
+every profile.
+
+Rows are refreshed:
+- incrementally: profiles.signals schedules a refresh of the affected freelancers
+  through the outbox whenever a proposal, project, profile, demo or user changes;
+- fully: `manage.py refresh_freelancer_scores`, and through the outbox whenever a
+  RankingConfig changes. Run the command periodically (e.g. hourly), since the
+  7/30/90-day windows age out without any row changing.
+
+Full rebuilds commit batch by batch. Through the outbox, the rebuild event only
+queues a refresh event per batch, so no single outbox transaction holds the
+SQLite write lock for the whole table.
+
+Every refresh invalidates the cached leaderboard responses (profiles.leaderboards).
+"""
+import math
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from messaging import outbox
+from . import leaderboards, ranking
+from .models import FreelancerScore, Profile
+
+REFRESH_TOPIC = 'freelancer_scores.refresh'
+REBUILD_TOPIC = 'freelancer_scores.rebuild'
+BATCH_SIZE = 2000
+
+_TWO_PLACES = Decimal('0.01')
+
+
+def _decimal(value):
+    if value is None or math.isnan(value):
+        return None
+    return Decimal(repr(value)).quantize(_TWO_PLACES)
+
+
+_COUNT_FIELDS = (
+    'total_proposals', 'accepted_proposals', 'completed_projects', 'early_proposals',
+    'recent_proposals', 'consistent_activity', 'video_demos_count',
+)
+
+
+def _build_scores(metrics, results, version, now):
+    # Plain Python values: database adapters don't accept NumPy scalars
+    columns = {name: values.tolist() for name, values in {**metrics, **results}.items()}
+    scores = []
+    for i, profile_id in enumerate(columns['profile_id']):
+        scores.append(FreelancerScore(
+            profile_id=profile_id,
+            rating=_decimal(columns['rating'][i]),
+            joined_at=datetime.fromtimestamp(columns['joined_at'][i], tz=dt_timezone.utc),
+            profile_completeness=int(columns['profile_completeness'][i]),
+            success_rate=_decimal(columns['success_rate'][i]),
+            completion_rate=_decimal(columns['completion_rate'][i]),
+            top_score=_decimal(columns['top'][i]),
+            newcomer_score=_decimal(columns['newcomer'][i]),
+            featured_score=_decimal(columns['featured'][i]),
+            ranking_version=version,
+            computed_at=now,
+            **{name: columns[name][i] for name in _COUNT_FIELDS},
+        ))
+    return scores
+
+
+_UPDATE_FIELDS = [
+    field.name for field in FreelancerScore._meta.concrete_fields if not field.primary_key
+]
+
+
+def refresh_scores(user_ids, now=None, config=None):
+    """
+    Recompute the scores of the given users. Users who are no longer freelancers
+    lose their row. `config` is a (version, settings) pair, the active one by default.
+    Returns the number of rows written.
+    """
+    now = now or timezone.now()
+    version, settings = config or ranking.get_active_config()
+    user_ids = list(user_ids)
+
+    metrics = ranking.fetch_metrics(
+        Profile.objects.filter(user_id__in=user_ids, user__role='freelancer'), now, settings
+    )
+    results = ranking.compute_scores(metrics, settings, now)
+    scores = _build_scores(metrics, results, version, now)
+
+    FreelancerScore.objects.bulk_create(
+        scores, update_conflicts=True, unique_fields=['profile'], update_fields=_UPDATE_FIELDS,
+    )
+    FreelancerScore.objects.filter(profile__user_id__in=user_ids).exclude(
+        profile__in=metrics['profile_id'].tolist()
+    ).delete()
+    # After commit, so a leaderboard recomputed in between can't cache the old scores as current
+    transaction.on_commit(leaderboards.invalidate)
+    return len(scores)
+
+
+def _freelancer_batches(batch_size):
+    """Every freelancer's user id, in lists of up to `batch_size`, after dropping non-freelancers' rows"""
+    FreelancerScore.objects.exclude(profile__user__role='freelancer').delete()
+    user_ids = Profile.objects.filter(user__role='freelancer').order_by('user_id').values_list('user_id', flat=True)
+    batch = []
+    for user_id in user_ids.iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def rebuild_scores(batch_size=BATCH_SIZE):
+    """
+    Recompute every freelancer's scores, each batch in its own transaction (unless
+    called inside one); returns the number of rows written
+    """
+    now = timezone.now()
+    config = ranking.get_active_config()
+    total = 0
+    for batch in _freelancer_batches(batch_size):
+        with transaction.atomic():
+            total += refresh_scores(batch, now, config)
+    return total
+
+
+def queue_rebuild_batches(batch_size=BATCH_SIZE):
+    """
+    The outbox side of a rebuild: queue a refresh event per batch of freelancers,
+    each processed in its own short transaction. Returns the number of batches.
+    """
+    batches = 0
+    for batch in _freelancer_batches(batch_size):
+        outbox.enqueue(REFRESH_TOPIC, {'user_ids': batch})
+        batches += 1
+    return batches
+
+
+def schedule_refresh(user_ids):
+    """Queue a refresh of the given users' scores; runs once the current transaction commits"""
+    user_ids = sorted({user_id for user_id in user_ids if user_id})
+    if user_ids:
+        outbox.enqueue(REFRESH_TOPIC, {'user_ids': user_ids})
+
+
+def schedule_rebuild():
+    """Queue a full rebuild, e.g. after the ranking configuration changed"""
+    outbox.enqueue(REBUILD_TOPIC, {})
@@ -1,40 +1,94 @@
+from django.urls import reverse
 from rest_framework import serializers
+from freelance_platform import media
+from .avatars import RENDITION_SIZES, rendition_urls
 from .models import Profile, VideoDemo
+from .videos import thumbnail_urls
 from accounts.serializers import UserSerializer
 
 class ProfileSerializer(serializers.ModelSerializer):
+    """
+    `avatar_url` is the rendition fitting context['avatar_size'] (the largest by
+    default); list views pass a small size so they don't ship full-size avatars.
+    """
     user = UserSerializer(read_only=True)
     avatar_url = serializers.SerializerMethodField()
+    avatar_urls = serializers.SerializerMethodField()
     
     class Meta:
         model = Profile
         fields = [
             'id', 'user', 'headline', 'bio', 'skills', 'hourly_rate',
-            'location', 'website', 'avatar', 'avatar_url', 'rating', 'total_projects',
+            'location', 'website', 'avatar', 'avatar_url', 'avatar_urls', 'rating', 'total_projects',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ('id', 'user', 'rating', 'total_projects', 'created_at', 'updated_at')
+        # Uploaded avatars are validated and stored by the views (see profiles.avatars)
+        read_only_fields = ('id', 'user', 'avatar', 'rating', 'total_projects', 'created_at', 'updated_at')
+    
+    def _absolute(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
     
     def get_avatar_url(self, obj):
-        """Return the full URL for the avatar image"""
-        if obj.avatar:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)
-            return obj.avatar.url
-        return None
+        """Return the full URL of the avatar rendition for the requested size, or the original until rendered"""
+        if not obj.avatar:
+            return None
+        renditions = rendition_urls(obj)
+        if not renditions:
+            return self._absolute(obj.avatar.url)
+        wanted = self.context.get('avatar_size', max(RENDITION_SIZES))
+        size = min((size for size in renditions if size >= wanted), default=max(renditions))
+        return self._absolute(renditions[size]['jpeg'])
+    
+    def get_avatar_urls(self, obj):
+        """{size: {'jpeg': url, 'webp': url}} for every rendition, e.g. for srcset; null until rendered"""
+        renditions = rendition_urls(obj)
+        if not renditions:
+            return None
+        return {
+            str(size): {image_format: self._absolute(url) for image_format, url in urls.items()}
+            for size, urls in renditions.items()
+        }
 
 class VideoDemoSerializer(serializers.ModelSerializer):
     profile_name = serializers.CharField(source='profile.user.name', read_only=True)
+    video_url = serializers.SerializerMethodField()
+    thumbnail_urls = serializers.SerializerMethodField()
     
     class Meta:
         model = VideoDemo
         fields = [
             'id', 'profile', 'profile_name', 'title', 'description',
-            'video_file', 'thumbnail', 'category', 'tags', 'is_public',
-            'created_at'
+            'video_file', 'video_url', 'thumbnail', 'thumbnail_urls', 'category', 'tags', 'is_public',
+            'processing_status', 'duration', 'width', 'height', 'file_size', 'created_at'
         ]
-        read_only_fields = ('id', 'profile', 'created_at')
+        # Thumbnails and metadata are generated by profiles.videos
+        read_only_fields = (
+            'id', 'profile', 'thumbnail', 'processing_status', 'duration', 'width', 'height', 'file_size',
+            'created_at',
+        )
+        # Upload only: the raw /media/ URL would bypass video_demo_file's access checks
+        extra_kwargs = {'video_file': {'write_only': True}}
+    
+    def get_video_url(self, obj):
+        """
+        Streaming URL with Range support. Private demos get a signed URL, and only
+        when serialized for their owner; anyone else gets None.
+        """
+        if not obj.video_file:
+            return None
+        request = self.context.get('request')
+        url = reverse('video-demo-file', args=[obj.pk])
+        if not obj.is_public:
+            user = getattr(request, 'user', None)
+            if not (user and user.is_authenticated and obj.profile.user_id == user.id):
+                return None
+            url = f'{url}?{media.signed_query("video-demo", obj.pk)}'
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_thumbnail_urls(self, obj):
+        """{width: {'jpeg': url, 'webp': url}} once processed, else None"""
+        return thumbnail_urls(obj)
     
     def create(self, validated_data):
         # Set the profile to the current user's profile
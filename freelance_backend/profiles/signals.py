@@ -0,0 +1,51 @@
+"""Keeps FreelancerScore rows current; connected on import by ProfilesConfig.ready"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from projects.models import Project, ProjectProposal
+from .models import Profile, RankingConfig, VideoDemo
+from .scores import schedule_rebuild, schedule_refresh
+
+
+@receiver(post_save, sender=ProjectProposal)
+@receiver(post_delete, sender=ProjectProposal)
+def proposal_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_refresh([instance.freelancer_id])
+
+
+@receiver(post_save, sender=Project)
+def project_changed(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # A new project has no proposals yet; otherwise only its status feeds the scores
+    if raw or created or (update_fields is not None and 'status' not in update_fields):
+        return
+    schedule_refresh(instance.proposals.values_list('freelancer_id', flat=True))
+
+
+@receiver(post_save, sender=Profile)
+def profile_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_refresh([instance.user_id])
+
+
+@receiver(post_save, sender=VideoDemo)
+@receiver(post_delete, sender=VideoDemo)
+def video_demo_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_refresh(Profile.objects.filter(id=instance.profile_id).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Role and join date feed the scores; skip e.g. last_login updates
+    if raw or created or (update_fields is not None and not {'role', 'date_joined'} & set(update_fields)):
+        return
+    schedule_refresh([instance.id])
+
+
+@receiver(post_save, sender=RankingConfig)
+@receiver(post_delete, sender=RankingConfig)
+def ranking_config_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_rebuild()
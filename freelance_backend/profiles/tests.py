@@ -1,3 +1,590 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import math
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.models import User
+from messaging import outbox
+from messaging.models import OutboxEvent
+from freelance_platform.testing import QueryPlanTestMixin
+from projects.models import Project, ProjectProposal
+from . import avatars, leaderboards, legacy_ranking, ranking, scores, videos, views
+from .models import FreelancerScore, Profile, RankingConfig, VideoDemo
+from .scores import rebuild_scores, refresh_scores
+from .serializers import ProfileSerializer, VideoDemoSerializer
+
+
+class ProfileQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The list endpoints must stay on index scans as the tables grow"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([
+            User(username=f'freelancer{i}', email=f'freelancer{i}@example.com', role='freelancer')
+            for i in range(50)
+        ])
+        profiles = Profile.objects.bulk_create([
+            Profile(
+                user=user, headline=f'Freelancer {i}', bio='Seeded', location='Remote',
+                skills=['python'], rating=i % 5,
+            )
+            for i, user in enumerate(users)
+        ])
+        VideoDemo.objects.bulk_create([
+            VideoDemo(
+                profile=profile,
+                title=f'Demo {i}',
+                video_file=f'videos/demo{i}.mp4',
+                category='web-development',
+                is_public=i % 3 != 0,
+            )
+            for profile in profiles
+            for i in range(4)
+        ])
+        rebuild_scores()
+        cls.user = users[0]
+
+    def setUp(self):
+        # A cached leaderboard would answer without running the queries under test
+        cache.clear()
+
+    def test_profile_list(self):
+        # The directory is an unfiltered walk of the table that stops at the page LIMIT
+        self.assertQueryPlansUseIndexes(
+            views.ProfileListView.as_view(), '/api/profiles/', self.user, allow_scans=('profiles_profile',),
+        )
+
+    def test_video_demo_list(self):
+        # The page walks videodemo_created_idx to its LIMIT; the paginator's COUNT of
+        # public-or-own demos has to visit every row either way
+        for sql in self.call_view(views.VideoDemoListCreateView.as_view(), '/api/profiles/demos/', self.user):
+            allow_scans = ('profiles_videodemo',) if sql.startswith('SELECT COUNT(*)') else ()
+            self.assertFalse(self.plan_problems(sql, allow_scans), sql)
+
+    def test_rankings(self):
+        # Each ranking is a top-N read of its partial index on FreelancerScore
+        for view, path in (
+            (views.top_freelancers, '/api/profiles/top-freelancers/'),
+            (views.newcomer_freelancers, '/api/profiles/newcomers/'),
+            (views.featured_freelancers, '/api/profiles/featured/'),
+        ):
+            with self.subTest(path=path):
+                self.assertQueryPlansUseIndexes(view, path, self.user)
+
+
+class RankingEngineTests(TestCase):
+    """The vectorized engine must reproduce the original annotate() rankings"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        client = User.objects.create(username='client', email='client@example.com', role='client')
+        statuses = [choice for choice, _ in Project.STATUS_CHOICES]
+        projects = Project.objects.bulk_create([
+            Project(title=f'Project {i}', description='Seeded', category='other',
+                    status=statuses[i % len(statuses)], client=client)
+            for i in range(12)
+        ])
+        # Join dates sit between the recency tiers' boundaries
+        joined_days_ago = [3, 15, 45, 75, 150]
+        skill_sets = [['React'], ['Python', 'UI Design'], ['Copywriting'], ['JavaScript', 'Go']]
+        users = User.objects.bulk_create([
+            User(username=f'freelancer{i}', email=f'freelancer{i}@example.com', role='freelancer',
+                 date_joined=cls.now - timedelta(days=joined_days_ago[i % len(joined_days_ago)]))
+            for i in range(40)
+        ])
+        # Stays clear of the legacy bugs listed in profiles.legacy_ranking: every profile
+        # has one or two skills, no avatar is NULL, and only freelancers with at most one
+        # proposal have a demo (i % 7 proposals each, below)
+        profiles = Profile.objects.bulk_create([
+            Profile(
+                user=user,
+                bio='Seeded' if i % 4 else '',
+                skills=skill_sets[i % len(skill_sets)],
+                hourly_rate=[None, 30, 75, 150][i % 4],
+                location='Remote' if i % 3 else '',
+                avatar=f'avatars/{user.id}/avatar.jpg' if i % 2 else '',
+                rating=Decimal(i % 11) / 2,
+            )
+            for i, user in enumerate(users)
+        ])
+        VideoDemo.objects.bulk_create([
+            VideoDemo(profile=profile, title='Demo', video_file='videos/demo.mp4', category='other')
+            for i, profile in enumerate(profiles) if i % 7 <= 1
+        ])
+        ProjectProposal.objects.bulk_create([
+            ProjectProposal(project=project, freelancer=user, message='Seeded', proposed_budget=100, timeline='1 week')
+            for i, user in enumerate(users)
+            for project in projects[i % 5:i % 5 + i % 7]
+        ])
+        # Spread proposal ages across the 30 and 90 day windows
+        proposal_ids = list(ProjectProposal.objects.order_by('id').values_list('id', flat=True))
+        for days, ids in ((45, proposal_ids[::3]), (120, proposal_ids[1::5])):
+            ProjectProposal.objects.filter(id__in=ids).update(created_at=cls.now - timedelta(days=days))
+
+    def engine_scores(self, config=ranking.DEFAULT_CONFIG):
+        metrics = ranking.fetch_metrics(Profile.objects.filter(user__role='freelancer'), self.now, config)
+        return metrics, ranking.compute_scores(metrics, config, self.now)
+
+    def assertScoresMatch(self, expected, metrics, scores):
+        engine = {
+            profile_id: score
+            for profile_id, score in zip(metrics['profile_id'].tolist(), scores.tolist())
+            if not math.isnan(score)
+        }
+        self.assertTrue(expected, 'fixture produced no eligible freelancers')
+        self.assertEqual(set(engine), set(expected))
+        for profile_id, score in expected.items():
+            self.assertAlmostEqual(engine[profile_id], float(score), places=6, msg=f'profile {profile_id}')
+
+    def test_parity_with_annotate_rankings(self):
+        metrics, results = self.engine_scores()
+        for name, queryset, annotation in (
+            ('top', legacy_ranking.top_freelancers, 'composite_score'),
+            ('newcomer', legacy_ranking.newcomer_freelancers, 'newcomer_score'),
+            ('featured', legacy_ranking.featured_freelancers, 'featured_score'),
+        ):
+            with self.subTest(ranking=name):
+                expected = dict(queryset(self.now).values_list('id', annotation))
+                self.assertScoresMatch(expected, metrics, results[name])
+
+    def test_top_n_matches_annotate_order(self):
+        metrics, results = self.engine_scores()
+        profile_ids = metrics['profile_id']
+        expected = list(legacy_ranking.top_freelancers(self.now).values_list('composite_score', flat=True)[:10])
+        ranked = [results['top'][i] for i in ranking.top_n(results['top'], 10)]
+        self.assertEqual(len(ranked), len(expected))
+        for engine_score, legacy_score in zip(ranked, expected):
+            self.assertAlmostEqual(engine_score, float(legacy_score), places=6)
+        self.assertEqual(len(set(profile_ids[ranking.top_n(results['top'], 10)].tolist())), len(ranked))
+
+    def test_config_overrides(self):
+        config = ranking.merge_config({'top': {'recent_activity_points': 0, 'min_rating': 0}})
+        metrics, default = self.engine_scores()
+        _, tuned = self.engine_scores(config)
+        eligible = ~np.isnan(default['top'])
+        bonus = (metrics['recent_proposals'] > 0) * 10.0
+        np.testing.assert_allclose(tuned['top'][eligible], default['top'][eligible] - bonus[eligible])
+        self.assertGreater(np.count_nonzero(~np.isnan(tuned['top'])), np.count_nonzero(eligible))
+
+    def test_unknown_setting_rejected(self):
+        with self.assertRaises(ValueError):
+            ranking.merge_config({'top': {'rating_wieght': 50}})
+
+    @override_settings(OUTBOX_LOCAL_WORKER=False)
+    def test_outbox_rebuild_fans_out_into_batches(self):
+        OutboxEvent.objects.all().delete()
+        FreelancerScore.objects.all().delete()
+        scores.schedule_rebuild()
+        self.assertEqual(outbox.process_batch(), 1)
+        # The rebuild event wrote no scores in its own transaction, only queued a refresh
+        self.assertFalse(FreelancerScore.objects.exists())
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(FreelancerScore.objects.count(), 40)
+
+        FreelancerScore.objects.all().delete()
+        self.assertEqual(scores.queue_rebuild_batches(batch_size=15), 3)
+        self.assertEqual(outbox.drain(), 3)
+        self.assertEqual(FreelancerScore.objects.count(), 40)
+
+    def test_refresh_records_config_version(self):
+        RankingConfig.objects.create(version=2, settings={'top': {'rating_weight': 50}}, is_active=True)
+        rebuild_scores()
+        self.assertFalse(FreelancerScore.objects.exclude(ranking_version=2).exists())
+        self.assertTrue(FreelancerScore.objects.filter(top_score__isnull=False).exists())
+
+
+class LeaderboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.freelancers = User.objects.bulk_create([
+            User(username=f'ranked{i}', email=f'ranked{i}@example.com', role='freelancer')
+            for i in range(5)
+        ])
+        Profile.objects.bulk_create([
+            Profile(user=user, bio='Seeded', location='Remote', skills=['python'], rating=i + 1)
+            for i, user in enumerate(cls.freelancers)
+        ])
+        client = User.objects.create(username='ranking-client', email='ranking-client@example.com', role='client')
+        project = Project.objects.create(title='Project', description='Seeded', category='other', client=client)
+        ProjectProposal.objects.bulk_create([
+            ProjectProposal(project=project, freelancer=user, message='Hi', proposed_budget=100, timeline='1 week')
+            for user in cls.freelancers
+        ])
+        rebuild_scores()
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'secret', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        leaderboards._stats.reset()
+        self.client = APIClient()
+
+    def test_repeat_requests_served_from_cache(self):
+        first = self.client.get('/api/profiles/top-freelancers/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/profiles/top-freelancers/')
+        self.assertEqual(first.json(), second.json())
+        stats = leaderboards.stats()['leaderboards']['top']
+        self.assertEqual((stats['misses'], stats['hits'], stats['recompute']['count']), (1, 1, 1))
+
+    def test_score_refresh_invalidates(self):
+        self.client.get('/api/profiles/top-freelancers/')
+        # Rated 1, below the top ranking's minimum until now
+        freelancer = self.freelancers[0]
+        Profile.objects.filter(user=freelancer).update(rating=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_scores([freelancer.id])
+        response = self.client.get('/api/profiles/top-freelancers/')
+        self.assertEqual(response.json()[0]['user']['id'], freelancer.id)
+        self.assertEqual(leaderboards.stats()['leaderboards']['top']['misses'], 2)
+
+    @override_settings(OUTBOX_LOCAL_WORKER=False)
+    def test_admin_status_action_invalidates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.drain()
+        self.client.get('/api/profiles/top-freelancers/')
+        leaderboards._stats.reset()
+
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'secret'))
+        project = Project.objects.get()
+        response = self.client.post('/admin/projects/project/', {
+            'action': 'mark_as_in_progress', '_selected_action': [project.id],
+        })
+        self.assertEqual(response.status_code, 302)
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.drain()
+        self.assertEqual(leaderboards.stats()['invalidations'], 1)
+        self.client.get('/api/profiles/top-freelancers/')
+        self.assertEqual(leaderboards.stats()['leaderboards']['top']['misses'], 1)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return ['result']
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(leaderboards.get('test', 'host', compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['result']] * 8)
+        self.assertEqual(leaderboards.stats()['leaderboards']['test']['coalesced'], 7)
+
+    def test_stale_entry_served_while_recomputing(self):
+        leaderboards.get('test', 'host', lambda: 'old')
+        leaderboards.invalidate()
+        cache.add('leaderboards:test:host:lock', True)  # another caller is recomputing
+        self.assertEqual(leaderboards.get('test', 'host', lambda: 'new'), 'old')
+        cache.delete('leaderboards:test:host:lock')
+        self.assertEqual(leaderboards.get('test', 'host', lambda: 'new'), 'new')
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.client.force_authenticate(self.freelancers[0])
+        self.assertEqual(self.client.get('/api/profiles/leaderboards/stats/').status_code, 403)
+        self.client.force_authenticate(self.admin)
+        self.client.get('/api/profiles/featured/')
+        response = self.client.get('/api/profiles/leaderboards/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['leaderboards']['featured']['misses'], 1)
+
+
+class AvatarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='avatar', email='avatar@example.com', role='freelancer')
+        cls.profile = Profile.objects.create(user=cls.user, bio='Seeded')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def image_bytes(self, size=(900, 600), image_format='PNG'):
+        output = io.BytesIO()
+        Image.new('RGB', size, 'teal').save(output, format=image_format)
+        return output.getvalue()
+
+    def upload(self, content, name='me.png'):
+        # Rendering is scheduled on commit, which TestCase never reaches; tests render directly
+        return self.client.put(
+            '/api/profiles/me/update/', {'avatar': SimpleUploadedFile(name, content), 'bio': 'New'},
+            format='multipart',
+        )
+
+    def test_upload_is_stored_as_sent_and_rendered_later(self):
+        content = self.image_bytes()
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 200)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.bio, 'New')
+        self.assertTrue(self.profile.avatar.name.endswith('.png'))
+        with self.profile.avatar.open('rb') as file:
+            self.assertEqual(file.read(), content)
+        # Until rendered, the original is served
+        self.assertIsNone(response.json()['avatar_urls'])
+        self.assertTrue(response.json()['avatar_url'].endswith(self.profile.avatar.url))
+
+        self.assertTrue(avatars.render_renditions(self.profile.id, self.profile.avatar.name))
+        self.profile.refresh_from_db()
+        for size in avatars.RENDITION_SIZES:
+            for image_format in avatars.FORMATS:
+                with default_storage.open(avatars.rendition_name(self.profile.avatar.name, size, image_format)) as file:
+                    self.assertEqual(Image.open(file).size, (size, size))
+
+        detail = ProfileSerializer(self.profile).data
+        listed = ProfileSerializer(self.profile, context={'avatar_size': avatars.LIST_AVATAR_SIZE}).data
+        self.assertTrue(detail['avatar_url'].endswith('-512.jpg'))
+        self.assertTrue(listed['avatar_url'].endswith('-128.jpg'))
+        self.assertEqual(set(detail['avatar_urls']), {'64', '128', '512'})
+
+    def test_base64_upload_still_supported(self):
+        encoded = base64.b64encode(self.image_bytes(image_format='JPEG')).decode()
+        response = self.client.put(
+            '/api/profiles/me/update/', {'avatar_data': f'data:image/jpeg;base64,{encoded}'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.avatar.name.endswith('.jpg'))
+
+    def test_rejects_non_images(self):
+        response = self.upload(b'<html>not an image</html>', name='me.png')
+        self.assertEqual(response.status_code, 400)
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.avatar)
+
+    def test_profile_detail_accepts_an_avatar(self):
+        response = self.client.patch(
+            f'/api/profiles/{self.profile.id}/', {'avatar': SimpleUploadedFile('me.png', self.image_bytes())},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.avatar.name.endswith('.png'))
+
+        response = self.client.patch(
+            f'/api/profiles/{self.profile.id}/', {'avatar': SimpleUploadedFile('me.png', b'not an image')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Invalid image data', response.json()['error'])
+
+    def test_stale_render_is_discarded(self):
+        self.upload(self.image_bytes())
+        self.profile.refresh_from_db()
+        first = self.profile.avatar.name
+        self.upload(self.image_bytes(size=(300, 300)))
+        self.assertFalse(avatars.render_renditions(self.profile.id, first))
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.avatar_renditions, {})
+
+
+class VideoDemoFileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', email='owner@example.com', role='freelancer')
+        cls.other = User.objects.create(username='other', email='other@example.com', role='freelancer')
+        cls.profile = Profile.objects.create(user=cls.owner)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.content = bytes(range(256)) * 40
+        self.public = VideoDemo.objects.create(
+            profile=self.profile, title='Public', category='other',
+            video_file=default_storage.save('videos/public.mp4', io.BytesIO(self.content)),
+        )
+        self.private = VideoDemo.objects.create(
+            profile=self.profile, title='Private', category='other', is_public=False,
+            video_file=default_storage.save('videos/private.mp4', io.BytesIO(self.content)),
+        )
+        self.client = APIClient()
+
+    def get(self, demo, **headers):
+        response = self.client.get(f'/api/profiles/demos/{demo.id}/file/', headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_and_ranged_responses(self):
+        response, body = self.get(self.public)
+        self.assertEqual((response.status_code, body), (200, self.content))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+
+        for header, start, end in (('bytes=100-199', 100, 199), ('bytes=10000-', 10000, 10239), ('bytes=-40', 10200, 10239)):
+            with self.subTest(header=header):
+                response, body = self.get(self.public, Range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(body, self.content[start:end + 1])
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{len(self.content)}')
+                self.assertEqual(int(response['Content-Length']), end - start + 1)
+
+        response, _ = self.get(self.public, Range='bytes=99999-')
+        self.assertEqual((response.status_code, response['Content-Range']), (416, f'bytes */{len(self.content)}'))
+
+    def test_conditional_requests(self):
+        etag = self.get(self.public)[0]['ETag']
+        self.assertEqual(self.get(self.public, If_None_Match=etag)[0].status_code, 304)
+        self.assertEqual(self.get(self.public, Range='bytes=0-9', If_Range=etag)[0].status_code, 206)
+        # A stale copy gets the whole file instead of a range of the new one
+        self.assertEqual(self.get(self.public, Range='bytes=0-9', If_Range='"stale"')[0].status_code, 200)
+
+    def test_private_demos(self):
+        self.assertEqual(self.get(self.private)[0].status_code, 404)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.get(self.private)[0].status_code, 404)
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.get(self.private)[0].status_code, 200)
+
+        # The owner's listing carries a signed URL that works without the bearer token
+        listed = {demo['id']: demo for demo in self.client.get('/api/profiles/demos/').json()['results']}
+        video_url = listed[self.private.id]['video_url']
+        anonymous = APIClient()
+        self.assertEqual(anonymous.get(video_url).status_code, 200)
+        self.assertEqual(anonymous.get(video_url.replace('sig=', 'sig=x')).status_code, 404)
+        self.assertNotIn('sig=', listed[self.public.id]['video_url'])
+        self.assertNotIn('video_file', listed[self.public.id])
+
+    def test_private_demos_are_hidden_from_others(self):
+        self.client.force_authenticate(self.other)
+        listed = self.client.get('/api/profiles/demos/').json()['results']
+        self.assertEqual([demo['id'] for demo in listed], [self.public.id])
+
+        # Nor is a private demo signed when serialized for someone else
+        request = APIRequestFactory().get('/api/profiles/demos/')
+        request.user = self.other
+        self.assertIsNone(VideoDemoSerializer(self.private, context={'request': request}).data['video_url'])
+        self.assertIsNone(VideoDemoSerializer(self.private).data['video_url'])
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel')
+    def test_proxy_offload(self):
+        response, body = self.get(self.public, Range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/videos/public.mp4')
+        self.assertEqual(body, b'')
+
+
+# Keeps the score refresh queued by the upload from waking the outbox thread on commit
+@override_settings(OUTBOX_LOCAL_WORKER=False)
+class VideoProcessingTests(TestCase):
+    """ffmpeg isn't needed to test the pipeline: probe and poster extraction are patched"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='video', email='video@example.com', role='freelancer')
+        cls.profile = Profile.objects.create(user=cls.user)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def patch_ffmpeg(self):
+        probe = mock.patch.object(videos, 'probe', return_value={'duration': 12.5, 'width': 1920, 'height': 1080})
+        poster = mock.patch.object(videos, 'extract_poster', return_value=Image.new('RGB', (640, 360), 'navy'))
+        for patcher in (probe, poster):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def upload(self):
+        with mock.patch.object(videos.process_pool, 'submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/profiles/demos/', {
+                    'title': 'Demo', 'category': 'other',
+                    'video_file': SimpleUploadedFile('demo.mp4', b'\x00' * 2048, content_type='video/mp4'),
+                }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        demo = VideoDemo.objects.get(pk=response.json()['id'])
+        submit.assert_called_once_with(demo.id, demo.video_file.name)
+        return response, demo
+
+    def test_upload_is_processed_in_the_background(self):
+        self.patch_ffmpeg()
+        response, demo = self.upload()
+        self.assertEqual(response.json()['processing_status'], 'pending')
+        self.assertIsNone(response.json()['thumbnail_urls'])
+
+        self.assertEqual(videos.process_demo(demo.id, demo.video_file.name), 'ready')
+        demo.refresh_from_db()
+        self.assertEqual((demo.duration, demo.width, demo.height, demo.file_size), (12.5, 1920, 1080, 2048))
+        with default_storage.open(videos.thumbnail_name(demo.id, demo.video_file.name, 320, 'webp')) as file:
+            self.assertEqual(Image.open(file).size, (320, 180))
+
+        # The listing reports everything from the row, even with the video gone from storage
+        default_storage.delete(demo.video_file.name)
+        item = self.client.get('/api/profiles/demos/').json()['results'][0]
+        self.assertEqual(item['processing_status'], 'ready')
+        self.assertEqual(item['file_size'], 2048)
+        self.assertTrue(item['thumbnail'].endswith(videos.thumbnail_name(demo.id, demo.video_file.name, 640, 'jpeg')))
+        self.assertEqual(set(item['thumbnail_urls']), {'320', '640'})
+
+    def test_results_for_a_replaced_video_are_dropped(self):
+        self.patch_ffmpeg()
+        _, demo = self.upload()
+        stale_name = demo.video_file.name
+        demo.video_file = default_storage.save('videos/other.mp4', io.BytesIO(b'\x00'))
+        demo.save()
+
+        self.assertIsNone(videos.process_demo(demo.id, stale_name))
+        demo.refresh_from_db()
+        self.assertEqual(demo.processing_status, 'pending')
+        self.assertFalse(default_storage.exists(videos.thumbnail_name(demo.id, stale_name, 320, 'jpeg')))
+
+    @override_settings(FFPROBE_BINARY='/nonexistent/ffprobe')
+    def test_unprobeable_videos_fail_and_are_retried_by_the_command(self):
+        _, demo = self.upload()
+        out = io.StringIO()
+        call_command('process_video_demos', stdout=out, stderr=io.StringIO())
+        demo.refresh_from_db()
+        self.assertEqual((demo.processing_status, demo.file_size), ('failed', 2048))
+        self.assertIn('1 failed', out.getvalue())
+
+        self.patch_ffmpeg()
+        call_command('process_video_demos', stdout=out)
+        self.assertEqual(VideoDemo.objects.get(pk=demo.pk).processing_status, 'failed')
+        call_command('process_video_demos', '--failed', stdout=out)
+        self.assertEqual(VideoDemo.objects.get(pk=demo.pk).processing_status, 'ready')
+
+    def test_parse_probe(self):
+        output = json.dumps({
+            'streams': [{'width': 1920, 'height': 1080, 'side_data_list': [{'rotation': -90}]}],
+            'format': {'duration': '31.0166'},
+        })
+        self.assertEqual(videos.parse_probe(output), {'duration': 31.017, 'width': 1080, 'height': 1920})
+        with self.assertRaises(videos.VideoProcessingError):
+            videos.parse_probe(json.dumps({'streams': [], 'format': {}}))
@@ -9,6 +9,8 @@ urlpatterns = [
     path('top-freelancers/', views.top_freelancers, name='top-freelancers'),
     path('newcomers/', views.newcomer_freelancers, name='newcomer-freelancers'),
     path('featured/', views.featured_freelancers, name='featured-freelancers'),
+    path('leaderboards/stats/', views.leaderboard_stats, name='leaderboard-stats'),
     path('demos/', views.VideoDemoListCreateView.as_view(), name='video-demo-list-create'),
     path('demos/<int:pk>/', views.VideoDemoDetailView.as_view(), name='video-demo-detail'),
+    path('demos/<int:pk>/file/', views.video_demo_file, name='video-demo-file'),
 ] 
\ No newline at end of file
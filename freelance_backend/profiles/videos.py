@@ -0,0 +1,203 @@
+"""
+Video demo metadata and thumbnails.
+
+Uploads are stored as sent; once the demo commits, a background job (the same kind
+of bounded pool as avatars, settings.VIDEO_PROCESS_WORKERS) runs ffprobe for
+duration, resolution and size, has ffmpeg decode one poster frame (seeking to
+POSTER_OFFSET of the way in, capped at POSTER_MAX_SECONDS, so only a few GOPs are
+read), and writes it at THUMBNAIL_WIDTHS in JPEG and WebP. The results live on the
+VideoDemo row, so listings never open the video file.
+
+A demo stays `pending` until processed, and becomes `failed` when the file can't
+be probed (ffprobe/ffmpeg missing or the file isn't a video). Results are written
+only if the demo still has the same video, so a job racing a re-upload is dropped.
+Jobs that don't fit the queue or die with the process are picked up by
+`manage.py process_video_demos`, which also runs the jobs inline for local use.
+"""
+import json
+import logging
+import os
+import subprocess
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+
+from freelance_platform.background import BoundedPool
+from .models import VideoDemo
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_WIDTHS = (320, 640)
+FORMATS = {
+    'jpeg': ('.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('.webp', {'quality': 78, 'method': 4}),
+}
+POSTER_OFFSET = 0.1
+POSTER_MAX_SECONDS = 5.0
+# Kills ffprobe/ffmpeg stuck on a malformed file
+COMMAND_TIMEOUT = 60
+
+
+class VideoProcessingError(Exception):
+    pass
+
+
+def _run(args):
+    try:
+        return subprocess.run(args, capture_output=True, check=True, timeout=COMMAND_TIMEOUT).stdout
+    except FileNotFoundError:
+        raise VideoProcessingError(f'{args[0]} is not installed')
+    except subprocess.CalledProcessError as e:
+        raise VideoProcessingError(e.stderr.decode(errors='replace').strip()[-500:] or f'{args[0]} failed')
+    except subprocess.TimeoutExpired:
+        raise VideoProcessingError(f'{args[0]} timed out')
+
+
+def parse_probe(output):
+    """{'duration', 'width', 'height'} from ffprobe's JSON output, as displayed (rotation applied)"""
+    data = json.loads(output or b'{}')
+    streams = data.get('streams') or []
+    if not streams:
+        raise VideoProcessingError('No video stream')
+    stream = streams[0]
+    width, height = stream.get('width'), stream.get('height')
+    if not width or not height:
+        raise VideoProcessingError('Video stream has no dimensions')
+
+    rotation = stream.get('tags', {}).get('rotate')
+    for side_data in stream.get('side_data_list', []):
+        rotation = side_data.get('rotation', rotation)
+    if rotation is not None and int(float(rotation)) % 180:
+        width, height = height, width
+
+    duration = stream.get('duration') or data.get('format', {}).get('duration')
+    return {
+        'duration': round(float(duration), 3) if duration not in (None, 'N/A') else None,
+        'width': int(width),
+        'height': int(height),
+    }
+
+
+def probe(path):
+    return parse_probe(_run([
+        settings.FFPROBE_BINARY, '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height,duration:stream_tags=rotate:stream_side_data=rotation:format=duration',
+        '-of', 'json', path,
+    ]))
+
+
+def extract_poster(path, duration):
+    """
+    One frame, already scaled to the largest thumbnail width, as a Pillow image.
+    `-ss` before `-i` seeks on keyframes in the demuxer instead of decoding up to
+    the offset.
+    """
+    offset = min((duration or 0) * POSTER_OFFSET, POSTER_MAX_SECONDS)
+    largest = max(THUMBNAIL_WIDTHS)
+    output = _run([
+        settings.FFMPEG_BINARY, '-v', 'error', '-ss', f'{offset:.3f}', '-i', path,
+        '-frames:v', '1', '-an', '-vf', f"scale='min({largest},iw)':-2",
+        '-f', 'image2pipe', '-c:v', 'png', '-',
+    ])
+    if not output:
+        raise VideoProcessingError('No frame decoded')
+    image = Image.open(BytesIO(output))
+    image.load()
+    return image.convert('RGB')
+
+
+def thumbnail_name(demo_id, source_name, width, image_format):
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return f'thumbnails/{demo_id}/{stem}-{width}{FORMATS[image_format][0]}'
+
+
+def thumbnail_urls(demo):
+    """{width: {format: url}} for the demo's current video, or None until processed"""
+    renditions = demo.thumbnail_renditions or {}
+    if not demo.video_file or renditions.get('source') != demo.video_file.name:
+        return None
+    return {
+        width: {
+            image_format: default_storage.url(thumbnail_name(demo.id, demo.video_file.name, width, image_format))
+            for image_format in FORMATS
+        }
+        for width in renditions.get('widths', [])
+    }
+
+
+def _write_thumbnails(demo_id, source_name, poster):
+    current = poster
+    for width in sorted(THUMBNAIL_WIDTHS, reverse=True):
+        if current.width > width:
+            current = current.resize((width, max(1, round(current.height * width / current.width))),
+                                     Image.Resampling.LANCZOS)
+        for image_format, (_, options) in FORMATS.items():
+            name = thumbnail_name(demo_id, source_name, width, image_format)
+            output = ContentFile(b'')
+            current.save(output, format=image_format.upper(), **options)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name, output)
+
+
+def delete_thumbnails(demo_id, source_name):
+    for width in THUMBNAIL_WIDTHS:
+        for image_format in FORMATS:
+            name = thumbnail_name(demo_id, source_name, width, image_format)
+            try:
+                default_storage.delete(name)
+            except OSError:
+                logger.warning('Could not delete thumbnail %s', name)
+
+
+def process_demo(demo_id, source_name):
+    """
+    Probe `source_name` and write its thumbnails and metadata to the demo, unless
+    its video changed meanwhile. Returns the new processing status, or None if the
+    result was dropped.
+    """
+    current = VideoDemo.objects.filter(pk=demo_id, video_file=source_name)
+    fields = {'file_size': None}
+    try:
+        fields['file_size'] = default_storage.size(source_name)
+        path = default_storage.path(source_name)
+        metadata = probe(path)
+        poster = extract_poster(path, metadata['duration'])
+        _write_thumbnails(demo_id, source_name, poster)
+    except (VideoProcessingError, OSError, NotImplementedError) as e:
+        logger.warning('Processing video demo %s (%s) failed: %s', demo_id, source_name, e)
+        fields['processing_status'] = 'failed'
+    else:
+        fields.update(
+            metadata,
+            processing_status='ready',
+            thumbnail=thumbnail_name(demo_id, source_name, max(THUMBNAIL_WIDTHS), 'jpeg'),
+            thumbnail_renditions={'source': source_name, 'widths': list(THUMBNAIL_WIDTHS)},
+        )
+
+    if current.update(**fields):
+        return fields['processing_status']
+    if fields['processing_status'] == 'ready':
+        delete_thumbnails(demo_id, source_name)
+    return None
+
+
+process_pool = BoundedPool(process_demo, lambda: settings.VIDEO_PROCESS_WORKERS, 'video-process')
+
+
+def schedule_processing(demo, previous_name=None):
+    """
+    Process `demo`'s video in the background once the current transaction commits,
+    deleting the thumbnails of `previous_name` (the video it replaced)
+    """
+    demo_id, source_name = demo.pk, demo.video_file.name
+
+    def after_commit():
+        if previous_name and previous_name != source_name:
+            delete_thumbnails(demo_id, previous_name)
+        process_pool.submit(demo_id, source_name)
+    transaction.on_commit(after_commit)
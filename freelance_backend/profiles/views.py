@@ -1,15 +1,21 @@
+import base64
+
 from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.response import Response
-from django.db import models
-from django.db.models import Avg, Count, Q, Sum, Case, When, F, Value, DecimalField
-from django.db.models.functions import Cast
+from django.core.files.base import ContentFile
+from django.db import models, transaction
 from django.utils import timezone
 from datetime import timedelta
-import math
-from .models import Profile, VideoDemo
+from freelance_platform import media
+from skills.models import ProfileSkill
+from skills.sync import parse_skill_filter
+from . import avatars, leaderboards, videos
+from .models import FreelancerScore, Profile, VideoDemo
+from .ranking import get_active_config
 from .serializers import ProfileSerializer, VideoDemoSerializer
 
 class ProfileListView(generics.ListAPIView):
@@ -17,7 +23,15 @@ class ProfileListView(generics.ListAPIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
     
     def get_queryset(self):
-        return Profile.objects.select_related('user').all()
+        queryset = Profile.objects.select_related('user').all()
+        # ?skills=python,react: profiles listing any of them, matched through the normalized index
+        skill_ids = parse_skill_filter(self.request.query_params.getlist('skills'))
+        if skill_ids is not None:
+            queryset = queryset.filter(pk__in=ProfileSkill.objects.filter(skill_id__in=skill_ids).values('profile_id'))
+        return queryset
+    
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'avatar_size': avatars.LIST_AVATAR_SIZE}
 
 class ProfileDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProfileSerializer
@@ -30,7 +44,7 @@ class ProfileDetailView(generics.RetrieveUpdateDestroyAPIView):
         # Only allow the profile owner to update
         if self.get_object().user != self.request.user:
             raise PermissionError("You can only update your own profile")
-        serializer.save()
+        _save_profile(serializer, self.request.FILES.get('avatar'))
     
     def perform_destroy(self, instance):
         # Only allow the profile owner to delete
@@ -47,12 +61,26 @@ class MyProfileView(generics.RetrieveUpdateAPIView):
         profile, created = Profile.objects.get_or_create(user=self.request.user)
         return profile
 
+    def perform_update(self, serializer):
+        _save_profile(serializer, self.request.FILES.get('avatar'))
+
+def _save_profile(serializer, avatar):
+    """Save a validated ProfileSerializer, storing `avatar` (an uploaded file or None) as the new avatar"""
+    with transaction.atomic():
+        if avatar is not None:
+            try:
+                extension = avatars.validate_upload(avatar)
+            except avatars.InvalidAvatar as e:
+                raise ValidationError({'error': f'Invalid image data: {str(e)}'})
+            avatars.replace_avatar(serializer.instance, avatar, extension)
+        serializer.save()
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def my_profile(request):
     """Get the current user's profile"""
     try:
-        profile = Profile.objects.get(user=request.user)
+        profile = Profile.objects.select_related('user').get(user=request.user)
         serializer = ProfileSerializer(profile, context={'request': request})
         return Response(serializer.data)
     except Profile.DoesNotExist:
@@ -61,64 +89,47 @@ def my_profile(request):
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def update_my_profile(request):
-    """Update the current user's profile"""
+    """
+    Update the current user's profile. A new avatar can be sent as a multipart
+    `avatar` file or, as before, base64 `avatar_data` in JSON; it is rendered
+    in the background (see profiles.avatars).
+    """
     try:
         profile = Profile.objects.get(user=request.user)
-        
-        # Handle base64 image upload
-        if 'avatar_data' in request.data:
-            import base64
-            import io
-            from django.core.files.base import ContentFile
-            from PIL import Image
-            
-            try:
-                # Extract base64 data
-                avatar_data = request.data['avatar_data']
-                if avatar_data.startswith('data:image'):
-                    # Remove data URL prefix
-                    format, imgstr = avatar_data.split(';base64,')
-                    ext = format.split('/')[-1]
-                else:
-                    imgstr = avatar_data
-                    ext = 'jpg'
-                
-                # Decode base64
-                img_data = base64.b64decode(imgstr)
-                
-                # Create image file
-                img = Image.open(io.BytesIO(img_data))
-                
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Save to BytesIO
-                output = io.BytesIO()
-                img.save(output, format='JPEG', quality=85, optimize=True)
-                output.seek(0)
-                
-                # Create filename - the upload_to function will handle the path
-                filename = 'avatar.jpg'
-                
-                # Save to profile
-                profile.avatar.save(
-                    filename,
-                    ContentFile(output.getvalue()),
-                    save=False
-                )
-                
-            except Exception as e:
-                return Response({'error': f'Invalid image data: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Update other profile fields
-        serializer = ProfileSerializer(profile, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     except Profile.DoesNotExist:
         return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    avatar = request.FILES.get('avatar')
+    if avatar is None and request.data.get('avatar_data'):
+        try:
+            avatar_data = request.data['avatar_data']
+            if avatar_data.startswith('data:image'):
+                # Remove data URL prefix
+                avatar_data = avatar_data.split(';base64,', 1)[1]
+            avatar = ContentFile(base64.b64decode(avatar_data, validate=True))
+        except (AttributeError, IndexError, ValueError) as e:
+            return Response({'error': f'Invalid image data: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = ProfileSerializer(profile, data=request.data, partial=True, context={'request': request})
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    _save_profile(serializer, avatar)
+    return Response(serializer.data)
+
+def _ranked_profiles(queryset, limit):
+    """Profiles for the top `limit` FreelancerScore rows of an already-ordered queryset"""
+    return [score.profile for score in queryset.select_related('profile__user')[:limit]]
+
+def _cached_leaderboard(request, name, limit, get_queryset):
+    """Serialized top `limit` profiles of `get_queryset()`, served through profiles.leaderboards"""
+    def compute():
+        profiles = _ranked_profiles(get_queryset(), limit)
+        return list(ProfileSerializer(
+            profiles, many=True, context={'request': request, 'avatar_size': avatars.LIST_AVATAR_SIZE},
+        ).data)
+    # avatar_url is absolute, so each host gets its own entry
+    return Response(leaderboards.get(name, request.build_absolute_uri('/'), compute))
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -130,79 +141,14 @@ def top_freelancers(request):
     - Success Rate (20% weight): Percentage of accepted proposals
     - Recent Activity (10% weight): Active in last 30 days gets bonus
     - Profile Completeness (5% weight): Complete profiles rank higher
-    """
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    
-    freelancers = Profile.objects.filter(
-        user__role='freelancer'
-    ).annotate(
-        # Core metrics
-        completed_projects=Count('user__proposals__project', 
-                               filter=Q(user__proposals__project__status='completed')),
-        total_proposals=Count('user__proposals'),
-        accepted_proposals=Count('user__proposals', 
-                               filter=Q(user__proposals__project__status__in=['in_progress', 'completed'])),
-        recent_activity=Count('user__proposals', 
-                            filter=Q(user__proposals__created_at__gte=thirty_days_ago)),
-        
-        # Calculate success rate (accepted proposals / total proposals)
-        success_rate=Case(
-            When(total_proposals=0, then=Value(0.0)),
-            default=F('accepted_proposals') * 100.0 / F('total_proposals'),
-            output_field=DecimalField(max_digits=5, decimal_places=2)
-        ),
-        
-        # Profile completeness score (0-100)
-        profile_completeness=Case(
-            When(bio='', then=Value(0)),
-            default=Value(20)  # Has bio
-        ) + Case(
-            When(skills__len=0, then=Value(0)),
-            default=Value(20)  # Has skills
-        ) + Case(
-            When(hourly_rate__isnull=True, then=Value(0)),
-            default=Value(20)  # Has hourly rate
-        ) + Case(
-            When(location='', then=Value(0)),
-            default=Value(20)  # Has location
-        ) + Case(
-            When(avatar='', then=Value(0)),
-            default=Value(20)  # Has avatar
-        ),
-        
-        # Calculate composite score (0-100)
-        composite_score=(
-            # Rating score (40% weight): (rating/5) * 40
-            Cast(F('rating'), DecimalField()) / Cast(Value(5.0), DecimalField()) * Cast(Value(40.0), DecimalField()) +
-            
-            # Experience score (25% weight): min(completed_projects/10, 1) * 25
-            Case(
-                When(completed_projects__gte=10, then=Value(25.0)),
-                default=Cast(F('completed_projects'), DecimalField()) * Cast(Value(2.5), DecimalField()),
-                output_field=DecimalField(max_digits=5, decimal_places=2)
-            ) +
-            
-            # Success rate score (20% weight): (success_rate/100) * 20
-            Cast(F('success_rate'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(20.0), DecimalField()) +
-            
-            # Recent activity bonus (10% weight): has recent activity gets full points
-            Case(
-                When(recent_activity__gt=0, then=Value(10.0)),
-                default=Value(0.0),
-                output_field=DecimalField(max_digits=5, decimal_places=2)
-            ) +
-            
-            # Profile completeness (5% weight): (completeness/100) * 5
-            Cast(F('profile_completeness'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(5.0), DecimalField())
-        )
-    ).filter(
-        # Minimum requirements for top freelancers
-        rating__gte=3.5,  # At least 3.5 rating
-        total_proposals__gte=1,  # At least 1 proposal submitted
-    ).order_by('-composite_score', '-rating', '-completed_projects')[:10]
     
-    serializer = ProfileSerializer(freelancers, many=True, context={'request': request})
-    return Response(serializer.data)
+    Scores are precomputed in FreelancerScore (see profiles.scores) and the
+    response is cached (see profiles.leaderboards).
+    """
+    return _cached_leaderboard(request, 'top', 10, lambda: (
+        FreelancerScore.objects.filter(top_score__isnull=False)
+        .order_by('-top_score', '-rating', '-completed_projects')
+    ))
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -213,88 +159,19 @@ def newcomer_freelancers(request):
     - Early Activity (25% weight): Proposals submitted soon after joining
     - Profile Quality (25% weight): Complete and professional profiles
     - Initial Success (20% weight): Early wins and positive responses
-    """
-    ninety_days_ago = timezone.now() - timedelta(days=90)  # Extended to 90 days for more candidates
-    thirty_days_ago = timezone.now() - timedelta(days=30)
     
-    newcomers = Profile.objects.filter(
-        user__role='freelancer',
-        user__date_joined__gte=ninety_days_ago
-    ).annotate(
-        # Activity metrics
-        total_proposals=Count('user__proposals'),
-        early_proposals=Count('user__proposals', 
-                            filter=Q(user__proposals__created_at__lte=F('user__date_joined') + timedelta(days=7))),
-        accepted_proposals=Count('user__proposals', 
-                               filter=Q(user__proposals__project__status__in=['in_progress', 'completed'])),
-        
-        # Days since joining (for recency calculation) - simplified approach
-        days_since_joining=Case(
-            When(user__date_joined__gte=timezone.now() - timedelta(days=1), then=Value(1)),
-            When(user__date_joined__gte=timezone.now() - timedelta(days=7), then=Value(7)),
-            When(user__date_joined__gte=timezone.now() - timedelta(days=30), then=Value(30)),
-            When(user__date_joined__gte=timezone.now() - timedelta(days=60), then=Value(60)),
-            default=Value(90),
-            output_field=models.IntegerField()
-        ),
-        
-        # Profile completeness (same as top freelancers)
-        profile_completeness=Case(
-            When(bio='', then=Value(0)),
-            default=Value(20)
-        ) + Case(
-            When(skills__len=0, then=Value(0)),
-            default=Value(20)
-        ) + Case(
-            When(hourly_rate__isnull=True, then=Value(0)),
-            default=Value(20)
-        ) + Case(
-            When(location='', then=Value(0)),
-            default=Value(20)
-        ) + Case(
-            When(avatar='', then=Value(0)),
-            default=Value(20)
-        ),
-        
-        # Calculate newcomer score (0-100)
-        newcomer_score=(
-            # Recency score (30% weight): newer = higher score
-            Case(
-                When(days_since_joining__lte=7, then=Value(30.0)),
-                When(days_since_joining__lte=30, then=Value(25.0)),
-                When(days_since_joining__lte=60, then=Value(15.0)),
-                default=Value(5.0),
-                output_field=DecimalField(max_digits=5, decimal_places=2)
-            ) +
-            
-            # Early activity score (25% weight): proposals within first week
-            Case(
-                When(early_proposals__gte=3, then=Value(25.0)),
-                When(early_proposals__gte=1, then=Value(15.0)),
-                When(total_proposals__gte=1, then=Value(10.0)),
-                default=Value(0.0),
-                output_field=DecimalField(max_digits=5, decimal_places=2)
-            ) +
-            
-            # Profile quality score (25% weight)
-            Cast(F('profile_completeness'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(25.0), DecimalField()) +
-            
-            # Initial success score (20% weight)
-            Case(
-                When(accepted_proposals__gte=1, then=Value(20.0)),
-                When(total_proposals__gte=3, then=Value(10.0)),
-                When(total_proposals__gte=1, then=Value(5.0)),
-                default=Value(0.0),
-                output_field=DecimalField(max_digits=5, decimal_places=2)
-            )
-        )
-    ).filter(
-        # Basic quality filters
-        profile_completeness__gte=40,  # At least 40% profile completion
-    ).order_by('-newcomer_score', '-user__date_joined')[:10]
-    
-    serializer = ProfileSerializer(newcomers, many=True, context={'request': request})
-    return Response(serializer.data)
+    Scores are precomputed in FreelancerScore (see profiles.scores) and the
+    response is cached (see profiles.leaderboards).
+    """
+    def get_queryset():
+        _, config = get_active_config()
+        return FreelancerScore.objects.filter(
+            newcomer_score__isnull=False,
+            # Rows refresh periodically; don't show anyone who aged out since
+            joined_at__gte=timezone.now() - timedelta(days=config['newcomer']['window_days']),
+        ).order_by('-newcomer_score', '-joined_at')
+
+    return _cached_leaderboard(request, 'newcomer', 10, get_queryset)
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -308,199 +185,85 @@ def featured_freelancers(request):
     - Client Satisfaction (10% weight): Repeat clients + positive feedback patterns
     
     This creates a balanced mix of established performers and rising stars.
+    Scores are precomputed in FreelancerScore (see profiles.scores) and the
+    response is cached (see profiles.leaderboards).
     """
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    ninety_days_ago = timezone.now() - timedelta(days=90)
-    
-    # High-demand skill categories (can be made configurable)
-    high_demand_skills = [
-        'react', 'python', 'javascript', 'node.js', 'aws', 'machine learning',
-        'ui/ux design', 'mobile development', 'data analysis', 'digital marketing'
-    ]
-    
-    featured = Profile.objects.filter(
-        user__role='freelancer'
-    ).annotate(
-        # Core performance metrics
-        completed_projects=Count('user__proposals__project', 
-                               filter=Q(user__proposals__project__status='completed')),
-        total_proposals=Count('user__proposals'),
-        accepted_proposals=Count('user__proposals', 
-                               filter=Q(user__proposals__project__status__in=['in_progress', 'completed'])),
-        recent_proposals=Count('user__proposals', 
-                             filter=Q(user__proposals__created_at__gte=thirty_days_ago)),
-        consistent_activity=Count('user__proposals', 
-                                filter=Q(user__proposals__created_at__gte=ninety_days_ago)),
-        
-        # Portfolio and professional presence
-        video_demos_count=Count('video_demos', filter=Q(video_demos__is_public=True)),
-        
-        # Success and completion rates
-        success_rate=Case(
-            When(total_proposals=0, then=Value(0.0)),
-            default=Cast(F('accepted_proposals'), DecimalField()) * Cast(Value(100.0), DecimalField()) / Cast(F('total_proposals'), DecimalField()),
-            output_field=DecimalField(max_digits=5, decimal_places=2)
-        ),
-        
-        completion_rate=Case(
-            When(accepted_proposals=0, then=Value(0.0)),
-            default=Cast(F('completed_projects'), DecimalField()) * Cast(Value(100.0), DecimalField()) / Cast(F('accepted_proposals'), DecimalField()),
-            output_field=DecimalField(max_digits=5, decimal_places=2)
-        ),
-        
-        # High-demand skills count (simplified - in production, use more sophisticated matching)
-        high_demand_skills_count=Case(
-            When(skills__icontains='react', then=Value(1)),
-            default=Value(0)
-        ) + Case(
-            When(skills__icontains='python', then=Value(1)),
-            default=Value(0)
-        ) + Case(
-            When(skills__icontains='javascript', then=Value(1)),
-            default=Value(0)
-        ) + Case(
-            When(skills__icontains='design', then=Value(1)),
-            default=Value(0)
-        ),
-        
-        # Profile completeness
-        profile_completeness=Case(
-            When(bio='', then=Value(0)),
-            default=Value(20)
-        ) + Case(
-            When(skills__len=0, then=Value(0)),
-            default=Value(20)
-        ) + Case(
-            When(hourly_rate__isnull=True, then=Value(0)),
-            default=Value(20)
-        ) + Case(
-            When(location='', then=Value(0)),
-            default=Value(20)
-        ) + Case(
-            When(avatar='', then=Value(0)),
-            default=Value(20)
-        ),
-        
-        # Calculate featured score (0-100)
-        featured_score=(
-            # Overall Performance (30% weight)
-            (
-                # Rating component (40% of performance score)
-                Cast(F('rating'), DecimalField()) / Cast(Value(5.0), DecimalField()) * Cast(Value(12.0), DecimalField()) +
-                
-                # Success rate component (35% of performance score)
-                Cast(F('success_rate'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(10.5), DecimalField()) +
-                
-                # Experience component (25% of performance score)
-                Case(
-                    When(completed_projects__gte=5, then=Value(7.5)),
-                    default=Cast(F('completed_projects'), DecimalField()) * Cast(Value(1.5), DecimalField()),
-                    output_field=DecimalField(max_digits=5, decimal_places=2)
-                )
-            ) +
-            
-            # Market Demand (25% weight)
-            (
-                # High-demand skills bonus
-                Cast(F('high_demand_skills_count'), DecimalField()) * Cast(Value(5.0), DecimalField()) +
-                
-                # Competitive pricing (if hourly rate is reasonable)
-                Case(
-                    When(hourly_rate__isnull=True, then=Value(0.0)),
-                    When(hourly_rate__lte=50, then=Value(10.0)),
-                    When(hourly_rate__lte=100, then=Value(7.5)),
-                    default=Value(5.0),
-                    output_field=DecimalField(max_digits=5, decimal_places=2)
-                ) +
-                
-                # Category diversity bonus
-                Case(
-                    When(skills__len__gte=5, then=Value(10.0)),
-                    When(skills__len__gte=3, then=Value(5.0)),
-                    default=Value(0.0),
-                    output_field=DecimalField(max_digits=5, decimal_places=2)
-                )
-            ) +
-            
-            # Reliability (20% weight)
-            (
-                # Completion rate
-                Cast(F('completion_rate'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(10.0), DecimalField()) +
-                
-                # Consistent activity
-                Case(
-                    When(consistent_activity__gte=3, then=Value(10.0)),
-                    When(consistent_activity__gte=1, then=Value(5.0)),
-                    default=Value(0.0),
-                    output_field=DecimalField(max_digits=5, decimal_places=2)
-                )
-            ) +
-            
-            # Professional Presence (15% weight)
-            (
-                # Profile completeness
-                Cast(F('profile_completeness'), DecimalField()) / Cast(Value(100.0), DecimalField()) * Cast(Value(10.0), DecimalField()) +
-                
-                # Portfolio demos
-                Case(
-                    When(video_demos_count__gte=2, then=Value(5.0)),
-                    When(video_demos_count__gte=1, then=Value(2.5)),
-                    default=Value(0.0),
-                    output_field=DecimalField(max_digits=5, decimal_places=2)
-                )
-            ) +
-            
-            # Client Satisfaction (10% weight) - simplified for now
-            (
-                # Recent activity bonus (indicates client demand)
-                Case(
-                    When(recent_proposals__gte=2, then=Value(10.0)),
-                    When(recent_proposals__gte=1, then=Value(5.0)),
-                    default=Value(0.0),
-                    output_field=DecimalField(max_digits=5, decimal_places=2)
-                )
-            )
-        )
-    ).filter(
-        # Quality thresholds for featured status
-        rating__gte=3.0,  # Minimum rating
-        total_proposals__gte=1,  # Has submitted proposals
-        profile_completeness__gte=60,  # Well-completed profile
-    ).order_by('-featured_score', '-rating', '-completed_projects')[:6]
-    
-    serializer = ProfileSerializer(featured, many=True, context={'request': request})
-    return Response(serializer.data)
+    return _cached_leaderboard(request, 'featured', 6, lambda: (
+        FreelancerScore.objects.filter(featured_score__isnull=False)
+        .order_by('-featured_score', '-rating', '-completed_projects')
+    ))
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def leaderboard_stats(request):
+    """Leaderboard cache hits, misses and recompute times for this process"""
+    return Response(leaderboards.stats())
+
+def visible_demos(user):
+    """Public demos plus, for a signed-in user, their own private ones"""
+    demos = VideoDemo.objects.select_related('profile__user')
+    if user.is_authenticated:
+        # profile_id rather than profile__user keeps the page query walking
+        # videodemo_created_idx in order instead of joining before the LIMIT
+        own = Profile.objects.filter(user=user).values('id')
+        return demos.filter(models.Q(is_public=True) | models.Q(profile_id__in=own))
+    return demos.filter(is_public=True)
 
 class VideoDemoListCreateView(generics.ListCreateAPIView):
     serializer_class = VideoDemoSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return VideoDemo.objects.select_related('profile__user').all()
+        return visible_demos(self.request.user)
     
     def perform_create(self, serializer):
         profile, created = Profile.objects.get_or_create(user=self.request.user)
-        serializer.save(profile=profile)
+        demo = serializer.save(profile=profile)
+        # Metadata and thumbnails are extracted off-request
+        videos.schedule_processing(demo)
 
 class VideoDemoDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = VideoDemoSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     
     def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return VideoDemo.objects.filter(
-                models.Q(is_public=True) | models.Q(profile__user=self.request.user)
-            ).select_related('profile__user')
-        return VideoDemo.objects.filter(is_public=True).select_related('profile__user')
+        return visible_demos(self.request.user)
     
     def perform_update(self, serializer):
         # Only allow owner to update
         if self.get_object().profile.user != self.request.user:
             raise PermissionError("You can only update your own demos")
-        serializer.save()
+        if 'video_file' not in serializer.validated_data:
+            serializer.save()
+            return
+        previous_name = serializer.instance.video_file.name
+        demo = serializer.save(
+            processing_status='pending', thumbnail=None, thumbnail_renditions={},
+            duration=None, width=None, height=None, file_size=None,
+        )
+        videos.schedule_processing(demo, previous_name)
     
     def perform_destroy(self, instance):
         # Only allow owner to delete
         if instance.profile.user != self.request.user:
             raise PermissionError("You can only delete your own demos")
         instance.delete()
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def video_demo_file(request, pk):
+    """
+    Stream a demo's video with Range support. Same rules as VideoDemoDetailView:
+    public demos for anyone, private ones for their owner (or a signed video_url).
+    """
+    demo = VideoDemo.objects.filter(pk=pk).select_related('profile').only(
+        'id', 'video_file', 'is_public', 'profile__user_id',
+    ).first()
+    allowed = demo is not None and (
+        demo.is_public
+        or (request.user.is_authenticated and demo.profile.user_id == request.user.id)
+        or media.has_valid_signature(request, 'video-demo', demo.pk)
+    )
+    if not allowed or not demo.video_file:
+        return Response({'error': 'Demo not found'}, status=status.HTTP_404_NOT_FOUND)
+    return media.serve_file(request, demo.video_file.name, public=demo.is_public)
@@ -1,7 +1,10 @@
 from django.contrib import admin
+from django.utils import timezone
 from unfold.admin import ModelAdmin, TabularInline
 from unfold.contrib.filters.admin import RangeDateFilter, ChoicesDropdownFilter
 from unfold.decorators import display
+from profiles.scores import schedule_refresh
+from stats import counters
 from .models import Project, ProjectProposal
 
 class ProjectProposalInline(TabularInline):
@@ -52,19 +55,25 @@ class ProjectAdmin(ModelAdmin):
     # Custom actions
     actions = ['mark_as_open', 'mark_as_closed', 'mark_as_in_progress']
     
+    def _set_status(self, queryset, status):
+        updated = counters.update(queryset, status=status, updated_at=timezone.now())
+        # QuerySet.update() sends no signals, so the proposers' scores are refreshed here
+        schedule_refresh(ProjectProposal.objects.filter(project__in=queryset).values_list('freelancer_id', flat=True))
+        return updated
+    
     @admin.action(description='Mark selected projects as Open')
     def mark_as_open(self, request, queryset):
-        updated = queryset.update(status='open')
+        updated = self._set_status(queryset, 'open')
         self.message_user(request, f'{updated} projects marked as Open.')
     
     @admin.action(description='Mark selected projects as In Progress')
     def mark_as_in_progress(self, request, queryset):
-        updated = queryset.update(status='in_progress')
+        updated = self._set_status(queryset, 'in_progress')
         self.message_user(request, f'{updated} projects marked as In Progress.')
     
     @admin.action(description='Mark selected projects as Closed')
     def mark_as_closed(self, request, queryset):
-        updated = queryset.update(status='closed')
+        updated = self._set_status(queryset, 'closed')
         self.message_user(request, f'{updated} projects marked as Closed.')
 
 @admin.register(ProjectProposal)
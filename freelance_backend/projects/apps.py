@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    # SQLite drops the FTS triggers whenever a migration remakes projects_project;
+    # re-create them (idempotently) once migrations have finished
+    from django.db import connections
+    from .search import install_search_index
+
+    connection = connections[using]
+    if 'projects_project' not in connection.introspection.table_names():
+        return
+    with connection.schema_editor() as schema_editor:
+        install_search_index(schema_editor)
 
 
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+    
+    def ready(self):
+        from . import matching  # noqa: F401  registers the matching index's delete receivers
+        
+        post_migrate.connect(ensure_search_index, sender=self)
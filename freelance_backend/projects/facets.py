@@ -0,0 +1,136 @@
+"""
+Facet counts for the project browser.
+
+One grouped query counts the projects matching the non-facet filters (search,
+skills) per (category, status, budget bucket) cell; each facet's counts are then
+summed from those cells with the other facets' selections applied but not its own,
+so picking a category still shows how many projects every other category has.
+Labels and order come from Project.CATEGORY_CHOICES / STATUS_CHOICES, and every
+choice is listed, with zero counts included.
+
+Responses are cached for settings.PROJECT_FACETS_CACHE_TTL seconds under a key
+built from the normalized filters, and not invalidated on writes: counts may lag
+new projects by up to the TTL.
+"""
+import hashlib
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Value, When
+
+from .models import Project
+
+# (key, label, lower bound inclusive, upper bound exclusive); NULL budgets are 'unspecified'
+BUDGET_BUCKETS = (
+    ('under-500', 'Under $500', None, 500),
+    ('500-1000', '$500 - $1,000', 500, 1000),
+    ('1000-5000', '$1,000 - $5,000', 1000, 5000),
+    ('5000-plus', '$5,000+', 5000, None),
+    ('unspecified', 'Not specified', None, None),
+)
+FACETS = ('category', 'status', 'budget')
+CACHE_PREFIX = 'project-facets:'
+
+
+class InvalidFacet(ValueError):
+    pass
+
+
+def _budget_condition(lower, upper):
+    if lower is None and upper is None:
+        return {'budget__isnull': True}
+    condition = {}
+    if lower is not None:
+        condition['budget__gte'] = lower
+    if upper is not None:
+        condition['budget__lt'] = upper
+    return condition
+
+
+def budget_bucket():
+    """Expression naming each project's budget bucket"""
+    return Case(
+        *[When(**_budget_condition(lower, upper), then=Value(key)) for key, _, lower, upper in BUDGET_BUCKETS],
+        output_field=CharField(),
+    )
+
+
+def filter_budget(queryset, key):
+    """Projects in budget bucket `key`"""
+    for bucket_key, _, lower, upper in BUDGET_BUCKETS:
+        if bucket_key == key:
+            return queryset.filter(**_budget_condition(lower, upper))
+    raise InvalidFacet(f'Unknown budget bucket: {key}')
+
+
+def _choices():
+    return {
+        'category': Project.CATEGORY_CHOICES,
+        'status': Project.STATUS_CHOICES,
+        'budget': [(key, label) for key, label, _, _ in BUDGET_BUCKETS],
+    }
+
+
+def parse_selection(params):
+    """{facet: value} for the facet filters present in `params`, validated against the choices"""
+    selection = {}
+    for facet, choices in _choices().items():
+        value = params.get(facet)
+        if not value:
+            continue
+        if value not in dict(choices):
+            raise InvalidFacet(f'Unknown {facet}: {value}')
+        selection[facet] = value
+    return selection
+
+
+def cache_key(selection, search='', skill_ids=None):
+    normalized = {
+        'selection': selection,
+        'search': ' '.join(search.lower().split()),
+        'skills': sorted(skill_ids) if skill_ids is not None else None,
+    }
+    digest = hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+    return CACHE_PREFIX + digest
+
+
+def count_facets(queryset, selection):
+    """
+    Facet counts for `queryset` (already narrowed by the non-facet filters) under
+    the facet `selection`: {'total': n, facet: [{'value', 'label', 'count'}]}
+    """
+    cells = Counter()
+    rows = queryset.order_by().values('category', 'status', bucket=budget_bucket()).annotate(count=Count('id'))
+    for row in rows:
+        cells[row['category'], row['status'], row['bucket']] += row['count']
+
+    counts = {facet: Counter() for facet in FACETS}
+    total = 0
+    for cell, count in cells.items():
+        values = dict(zip(FACETS, cell))
+        mismatched = [facet for facet in FACETS if facet in selection and values[facet] != selection[facet]]
+        if not mismatched:
+            total += count
+        # A facet's own selection doesn't narrow its counts
+        for facet in FACETS:
+            if not [other for other in mismatched if other != facet]:
+                counts[facet][values[facet]] += count
+
+    return {
+        'total': total,
+        **{
+            facet: [{'value': value, 'label': label, 'count': counts[facet][value]} for value, label in choices]
+            for facet, choices in _choices().items()
+        },
+    }
+
+
+def cached_facets(queryset, selection, search='', skill_ids=None):
+    key = cache_key(selection, search, skill_ids)
+    facets = cache.get(key)
+    if facets is None:
+        facets = count_facets(queryset, selection)
+        cache.set(key, facets, getattr(settings, 'PROJECT_FACETS_CACHE_TTL', 30))
+    return facets
@@ -0,0 +1,379 @@
+"""
+Freelancer-project matching.
+
+Each process keeps an in-memory index of every freelancer profile and every open
+project: the normalized skill ids (skills.ProfileSkill / ProjectSkill) as inverted
+lists, plus hourly rate, rating and budget columns as NumPy arrays. A query scores
+all candidates sharing a skill in one vectorized pass:
+
+    score = WEIGHTS['skills'] * skill_match + WEIGHTS['rate'] * rate_fit
+            + WEIGHTS['rating'] * rating / 5          (freelancer matches only)
+
+- skill_match is the share of the project's skills the freelancer has, each skill
+  weighted by its rarity among freelancers (inverse document frequency), so a
+  shared niche skill counts for more than a shared common one.
+- rate_fit compares the freelancer's hourly rate with the rate the project's budget
+  affords over REFERENCE_HOURS: 1 when within it, falling off in proportion above
+  it, and NEUTRAL_FIT when either side is unknown.
+
+The index loads on first use and then picks up changes incrementally: queries
+re-read the profiles and projects whose updated_at moved since the last sync
+(at most every settings.MATCHING_SYNC_INTERVAL seconds), and deletes in this
+process are applied by signal. Results are re-checked against the database before
+they are returned, and the whole index reloads every FULL_RELOAD_INTERVAL to drop
+anything deleted elsewhere. Reloads are built on a background thread and swapped in
+whole, so queries keep using the previous index meanwhile; only the very first load
+happens in a request, since until then there is nothing to serve.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from freelance_platform.background import BoundedPool
+from profiles.models import Profile
+from skills.models import ProfileSkill, ProjectSkill
+from .models import Project
+
+WEIGHTS = {'skills': 0.7, 'rate': 0.2, 'rating': 0.1}
+REFERENCE_HOURS = 40
+NEUTRAL_FIT = 0.5
+# Rows whose updated_at falls this far behind the watermark are re-read, so a
+# transaction that committed late is not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+FULL_RELOAD_INTERVAL = 600
+# Re-derive the skill weights once this share of freelancers changed since
+REWEIGHT_FRACTION = 0.1
+
+
+class _Rows:
+    """One side of the index: ids, skill sets and numeric columns, with per-skill inverted lists"""
+
+    def __init__(self, columns):
+        self.row_of = {}
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self.columns = {name: np.zeros(0, dtype=np.float64) for name in columns}
+        self.skills = []
+        self.postings = defaultdict(set)
+        self._posting_arrays = {}
+        self._free = []
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def _grow(self):
+        size = max(1024, len(self.ids) * 2)
+        extra = size - len(self.ids)
+        self._free.extend(range(size - 1, len(self.ids) - 1, -1))
+        self.ids = np.concatenate([self.ids, np.zeros(extra, dtype=np.int64)])
+        self.active = np.concatenate([self.active, np.zeros(extra, dtype=bool)])
+        for name, values in self.columns.items():
+            self.columns[name] = np.concatenate([values, np.full(extra, np.nan)])
+        self.skills.extend([frozenset()] * extra)
+
+    def _set_skills(self, row, skill_ids):
+        old = self.skills[row]
+        for skill_id in old - skill_ids:
+            self.postings[skill_id].discard(row)
+            self._posting_arrays.pop(skill_id, None)
+        for skill_id in skill_ids - old:
+            self.postings[skill_id].add(row)
+            self._posting_arrays.pop(skill_id, None)
+        self.skills[row] = skill_ids
+
+    def upsert(self, obj_id, skill_ids, **values):
+        row = self.row_of.get(obj_id)
+        if row is None:
+            if not self._free:
+                self._grow()
+            row = self._free.pop()
+            self.row_of[obj_id] = row
+            self.ids[row] = obj_id
+            self.active[row] = True
+        self._set_skills(row, frozenset(skill_ids))
+        for name, value in values.items():
+            self.columns[name][row] = np.nan if value is None else float(value)
+        return row
+
+    def remove(self, obj_id):
+        row = self.row_of.pop(obj_id, None)
+        if row is None:
+            return
+        self._set_skills(row, frozenset())
+        self.active[row] = False
+        for values in self.columns.values():
+            values[row] = np.nan
+        self._free.append(row)
+
+    def rows_with(self, skill_id):
+        rows = self._posting_arrays.get(skill_id)
+        if rows is None:
+            rows = self._posting_arrays[skill_id] = np.fromiter(
+                self.postings.get(skill_id, ()), dtype=np.int64
+            )
+        return rows
+
+
+def _rate_fit(hourly_rates, budgets):
+    """Vectorized rate/budget fit; either argument may be a scalar"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fit = np.minimum(1.0, np.divide(budgets, REFERENCE_HOURS) / np.asarray(hourly_rates, dtype=np.float64))
+    # NaN where the rate or budget is unknown
+    fit = np.atleast_1d(fit)
+    fit[np.isnan(fit)] = NEUTRAL_FIT
+    return fit
+
+
+def _top(scores, ids, k):
+    """Row positions of the k best scores, best first; ties go to the newest (highest id)"""
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+    else:
+        keep = np.arange(len(scores))
+    return keep[np.lexsort((-ids[keep], -scores[keep]))]
+
+
+class MatchingIndex:
+    # What load() swaps in from a freshly built index
+    _STATE = ('freelancers', 'projects', '_marks', '_weights', '_changes_since_weighting')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held while building, so reloads never overlap
+        self._build_lock = threading.Lock()
+        self._loaded_at = None
+        self._synced_at = 0.0
+        self._reloading = False
+        # Rows deleted while a build runs, removed again once it is swapped in
+        self._deleted_during_build = None
+        self._reload_pool = BoundedPool(self._reload, lambda: 1, 'matching-reload', max_queued=1)
+        self._reset()
+
+    def _reset(self):
+        self.freelancers = _Rows(['hourly_rate', 'rating'])
+        # 'needed' is the total weight of each project's skills, the denominator of its skill match
+        self.projects = _Rows(['budget', 'needed'])
+        self._marks = {}
+        self._weights = {}
+        self._changes_since_weighting = 0
+
+    # Loading and syncing
+
+    def _read_profiles(self, queryset):
+        rows = list(queryset.values_list('id', 'user__role', 'hourly_rate', 'rating', 'updated_at'))
+        skills = defaultdict(set)
+        for profile_id, skill_id in ProfileSkill.objects.filter(
+            profile_id__in=[row[0] for row in rows]
+        ).values_list('profile_id', 'skill_id').iterator(chunk_size=10000):
+            skills[profile_id].add(skill_id)
+        for profile_id, role, hourly_rate, rating, _ in rows:
+            if role == 'freelancer':
+                self.freelancers.upsert(profile_id, skills[profile_id], hourly_rate=hourly_rate, rating=rating or 0)
+            else:
+                self.freelancers.remove(profile_id)
+        self._changes_since_weighting += len(rows)
+        return max((row[4] for row in rows), default=None)
+
+    def _read_projects(self, queryset):
+        rows = list(queryset.values_list('id', 'status', 'budget', 'updated_at'))
+        skills = defaultdict(set)
+        for project_id, skill_id in ProjectSkill.objects.filter(
+            project_id__in=[row[0] for row in rows if row[1] == 'open']
+        ).values_list('project_id', 'skill_id').iterator(chunk_size=10000):
+            skills[project_id].add(skill_id)
+        for project_id, status, budget, _ in rows:
+            if status == 'open':
+                needed = sum(self.skill_weight(skill_id) for skill_id in skills[project_id])
+                self.projects.upsert(project_id, skills[project_id], budget=budget, needed=needed)
+            else:
+                self.projects.remove(project_id)
+        return max((row[3] for row in rows), default=None)
+
+    def _advance(self, name, mark):
+        if mark is not None and (self._marks.get(name) is None or mark > self._marks[name]):
+            self._marks[name] = mark
+
+    def _build(self):
+        """Fill this index, which nothing else uses yet, from the database"""
+        # Loaded in id order in chunks so the IN lists stay bounded
+        for model, read, name, queryset in (
+            (Profile, self._read_profiles, 'profiles', Profile.objects.all()),
+            (Project, self._read_projects, 'projects', Project.objects.filter(status='open')),
+        ):
+            self._marks[name] = None
+            last_id = 0
+            while True:
+                chunk = queryset.filter(id__gt=last_id).order_by('id')[:10000]
+                ids = list(chunk.values_list('id', flat=True))
+                if not ids:
+                    break
+                self._advance(name, read(model.objects.filter(id__in=ids)))
+                last_id = ids[-1]
+        self._reweight()
+
+    def load(self):
+        """(Re)build the whole index from the database and swap it in; queries use the old one until then"""
+        with self._build_lock:
+            self._load()
+
+    def _load(self):
+        # Called holding _build_lock
+        started = time.monotonic()
+        with self._lock:
+            self._deleted_during_build = {'freelancers': set(), 'projects': set()}
+        try:
+            fresh = MatchingIndex()
+            fresh._build()
+            with self._lock:
+                for name in self._STATE:
+                    setattr(self, name, getattr(fresh, name))
+                for side, obj_ids in self._deleted_during_build.items():
+                    for obj_id in obj_ids:
+                        getattr(self, side).remove(obj_id)
+                # Whatever changed during the build is re-read by the next sync
+                self._loaded_at = self._synced_at = started
+        finally:
+            with self._lock:
+                self._deleted_during_build = None
+
+    def _reload(self):
+        try:
+            self.load()
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def forget(self, side, obj_id):
+        """Drop a deleted freelancer or project ('freelancers' or 'projects'), also from a build in progress"""
+        with self._lock:
+            getattr(self, side).remove(obj_id)
+            if self._deleted_during_build is not None:
+                self._deleted_during_build[side].add(obj_id)
+
+    def sync(self, force=False):
+        """
+        Pick up changes since the last sync. Loads the index on first use and starts a
+        background reload once it is FULL_RELOAD_INTERVAL old.
+        """
+        if self._loaded_at is None:
+            with self._build_lock:
+                if self._loaded_at is None:
+                    self._load()
+                    return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._loaded_at > FULL_RELOAD_INTERVAL and not self._reloading:
+                self._reloading = self._reload_pool.submit() is not None
+            if not force and now - self._synced_at < getattr(settings, 'MATCHING_SYNC_INTERVAL', 1.0):
+                return
+            for name, read, model in (
+                ('profiles', self._read_profiles, Profile),
+                ('projects', self._read_projects, Project),
+            ):
+                mark = self._marks.get(name)
+                queryset = model.objects.all() if mark is None else model.objects.filter(
+                    updated_at__gte=mark - SYNC_OVERLAP
+                )
+                self._advance(name, read(queryset))
+            if self._changes_since_weighting > REWEIGHT_FRACTION * max(len(self.freelancers), 1):
+                self._reweight()
+            self._synced_at = now
+
+    def _reweight(self):
+        total = len(self.freelancers)
+        self._weights = {
+            skill_id: math.log1p(total / (1 + len(rows)))
+            for skill_id, rows in self.freelancers.postings.items()
+        }
+        needed = np.zeros(len(self.projects.ids))
+        for skill_id, rows in self.projects.postings.items():
+            needed[self.projects.rows_with(skill_id)] += self.skill_weight(skill_id)
+        self.projects.columns['needed'] = needed
+        self._changes_since_weighting = 0
+
+    def skill_weight(self, skill_id):
+        # Skills no freelancer had at the last weighting are as rare as it gets
+        return self._weights.get(skill_id) or math.log1p(len(self.freelancers))
+
+    # Queries
+
+    def _skill_match(self, side, skill_ids, denominator):
+        """Weighted share of `skill_ids` each row of `side` has, over every row in the index"""
+        skill_ids = [skill_id for skill_id in skill_ids if len(side.rows_with(skill_id))]
+        if not skill_ids or not denominator:
+            return np.zeros(len(side.ids))
+        rows = [side.rows_with(skill_id) for skill_id in skill_ids]
+        weights = np.concatenate([
+            np.full(len(hits), self.skill_weight(skill_id)) for skill_id, hits in zip(skill_ids, rows)
+        ])
+        return np.bincount(np.concatenate(rows), weights=weights, minlength=len(side.ids)) / denominator
+
+    def match_freelancers(self, skill_ids, budget, k):
+        """[(profile id, score, skill match, rate fit)] for the k best freelancers for a project"""
+        with self._lock:
+            side = self.freelancers
+            total_weight = sum(self.skill_weight(skill_id) for skill_id in skill_ids)
+            skill_match = self._skill_match(side, skill_ids, total_weight)
+            # Without skills to go on, every freelancer is a candidate
+            candidates = np.flatnonzero(skill_match > 0) if skill_ids else np.flatnonzero(side.active)
+            if not len(candidates):
+                return []
+            rate_fit = _rate_fit(side.columns['hourly_rate'][candidates], np.nan if budget is None else float(budget))
+            rating = side.columns['rating'][candidates] / 5
+            scores = (
+                WEIGHTS['skills'] * skill_match[candidates] + WEIGHTS['rate'] * rate_fit + WEIGHTS['rating'] * rating
+            )
+            best = _top(scores, side.ids[candidates], k)
+            return [
+                (int(side.ids[candidates[i]]), float(scores[i]), float(skill_match[candidates[i]]), float(rate_fit[i]))
+                for i in best
+            ]
+
+    def recommend_projects(self, skill_ids, hourly_rate, k, exclude=()):
+        """[(project id, score, skill match, budget fit)] for the k open projects best fitting a freelancer"""
+        with self._lock:
+            side = self.projects
+            covered = self._skill_match(side, skill_ids, 1.0)
+            candidates = np.flatnonzero(covered > 0)
+            if exclude:
+                candidates = candidates[~np.isin(side.ids[candidates], list(exclude))]
+            if not len(candidates):
+                return []
+            skill_match = covered[candidates] / side.columns['needed'][candidates]
+            budget_fit = _rate_fit(np.nan if hourly_rate is None else float(hourly_rate), side.columns['budget'][candidates])
+            scores = (WEIGHTS['skills'] * skill_match + WEIGHTS['rate'] * budget_fit) / (WEIGHTS['skills'] + WEIGHTS['rate'])
+            best = _top(scores, side.ids[candidates], k)
+            return [
+                (int(side.ids[candidates[i]]), float(scores[i]), float(skill_match[i]), float(budget_fit[i]))
+                for i in best
+            ]
+
+    def freelancer_skills(self, profile_id):
+        with self._lock:
+            row = self.freelancers.row_of.get(profile_id)
+            return None if row is None else self.freelancers.skills[row]
+
+    def project_skills(self, project_id):
+        with self._lock:
+            row = self.projects.row_of.get(project_id)
+            return None if row is None else self.projects.skills[row]
+
+
+index = MatchingIndex()
+
+
+@receiver(post_delete, sender=Profile)
+def profile_deleted(sender, instance, **kwargs):
+    index.forget('freelancers', instance.id)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    index.forget('projects', instance.id)
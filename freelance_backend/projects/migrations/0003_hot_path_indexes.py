@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_projectproposal_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-created_at'], name='project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'category', '-created_at'], name='project_status_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', '-created_at'], name='project_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['category', '-created_at'], name='project_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['client', '-created_at'], name='project_client_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectproposal',
+            index=models.Index(fields=['freelancer', 'status'], name='proposal_freelancer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectproposal',
+            index=models.Index(fields=['freelancer', '-created_at'], name='proposal_freelancer_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectproposal',
+            index=models.Index(fields=['project', 'created_at'], name='proposal_project_created_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from projects.search import get_backend
+
+    backend = get_backend(schema_editor.connection.vendor)
+    if backend is None:
+        return
+    backend.install(schema_editor)
+    if schema_editor.connection.vendor == 'sqlite':
+        # Index the projects that existed before the triggers
+        for statement in backend.rebuild_statements():
+            schema_editor.execute(statement)
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for trigger in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS projects_project_fts_{trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS projects_project_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS projects_project_document_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_budget_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
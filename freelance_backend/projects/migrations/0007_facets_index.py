@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_project_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['category', 'status', 'budget'], name='project_facets_idx'),
+        ),
+    ]
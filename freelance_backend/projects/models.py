@@ -34,6 +34,20 @@ class Project(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Project browsing: newest first, optionally filtered by status and/or category
+            models.Index(fields=['-created_at'], name='project_created_idx'),
+            # ?ordering=budget / -budget, e.g. keyset pages (freelance_platform.pagination)
+            models.Index(fields=['-budget'], name='project_budget_idx'),
+            # Covers the grouped facet count (projects.facets), so it reads no table rows
+            models.Index(fields=['category', 'status', 'budget'], name='project_facets_idx'),
+            models.Index(fields=['status', 'category', '-created_at'], name='project_status_category_idx'),
+            models.Index(fields=['status', '-created_at'], name='project_status_created_idx'),
+            models.Index(fields=['category', '-created_at'], name='project_category_created_idx'),
+            models.Index(fields=['client', '-created_at'], name='project_client_created_idx'),
+            # Incremental sync of the matching index (projects.matching)
+            models.Index(fields=['updated_at'], name='project_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.client.email}"
@@ -55,6 +69,11 @@ class ProjectProposal(models.Model):
     
     class Meta:
         unique_together = ['project', 'freelancer']
+        indexes = [
+            models.Index(fields=['freelancer', 'status'], name='proposal_freelancer_status_idx'),
+            models.Index(fields=['freelancer', '-created_at'], name='proposal_freelancer_recent_idx'),
+            models.Index(fields=['project', 'created_at'], name='proposal_project_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.freelancer.email} - {self.project.title} ({self.status})"
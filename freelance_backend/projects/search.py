@@ -0,0 +1,189 @@
+"""
+Full-text project search, ranked by relevance.
+
+Title, skills and description are weighted TITLE_WEIGHT > SKILLS_WEIGHT >
+DESCRIPTION_WEIGHT. Every term must match, and the last one is a prefix so results
+update while typing. The backend is picked from the database vendor:
+- SQLite: an FTS5 table (projects_project_fts) filled by AFTER INSERT/UPDATE/DELETE
+  triggers on projects_project, ranked with bm25(). It stores its own copy of the
+  text because the skills JSON is decoded into words (json_each) on the way in.
+- PostgreSQL: a GIN index on a weighted tsvector expression, ranked with ts_rank().
+Both keep the index in sync inside the database, so bulk writes and cascading
+deletes are covered as well as save()/delete().
+
+search_projects() narrows a Project queryset (with whatever category/status
+filters it already has) to matches, annotated with `search_rank` (lower is
+better). SQLite drops the triggers when a migration remakes projects_project, so
+install() is idempotent and also runs on post_migrate (see ProjectsConfig.ready).
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'projects_project_fts'
+TITLE_WEIGHT = 10.0
+SKILLS_WEIGHT = 4.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _terms(query):
+    return _TERM_RE.findall(query.lower())
+
+
+class SearchBackend:
+    """Interface for project search backends; ranks are 'lower is better'"""
+
+    def install(self, schema_editor):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def match_sql(self, query):
+        """(sql, params) selecting the ids of matching projects, or None if `query` has no terms"""
+        raise NotImplementedError
+
+    def rank_sql(self, query):
+        """(sql, params) for the rank of the projects_project row in scope"""
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    # Skills as space-separated words; NULL for anything that isn't a JSON array
+    SKILLS = "(SELECT group_concat(value, ' ') FROM json_each({row}.skills) WHERE json_valid({row}.skills))"
+
+    def _match_expression(self, query):
+        # Quote every term so user input can never be parsed as FTS5 syntax
+        terms = _terms(query)
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def _insert(self, row):
+        return (
+            f'INSERT INTO {FTS_TABLE}(rowid, title, skills, description) '
+            f'SELECT {row}.id, {row}.title, {self.SKILLS.format(row=row)}, {row}.description'
+        )
+
+    def install(self, schema_editor):
+        for statement in (
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                title, skills, description,
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )""",
+            f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON projects_project BEGIN
+                {self._insert('new')};
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON projects_project BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+                AFTER UPDATE OF title, skills, description ON projects_project BEGIN
+                DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+                {self._insert('new')};
+            END""",
+        ):
+            schema_editor.execute(statement)
+
+    def rebuild_statements(self):
+        return [f'DELETE FROM {FTS_TABLE}', f'{self._insert("projects_project")} FROM projects_project']
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            for statement in self.rebuild_statements():
+                cursor.execute(statement)
+
+    def match_sql(self, query):
+        expression = self._match_expression(query)
+        if expression is None:
+            return None
+        return f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression]
+
+    def rank_sql(self, query):
+        # A rowid lookup into the FTS index, so it costs the same for every matched row
+        return (
+            f'SELECT bm25({FTS_TABLE}, %s, %s, %s) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "projects_project"."id"',
+            [TITLE_WEIGHT, SKILLS_WEIGHT, DESCRIPTION_WEIGHT, self._match_expression(query)],
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    INDEX = 'projects_project_document_fts'
+    DOCUMENT = (
+        "setweight(to_tsvector('english', {row}.title), 'A') || "
+        "setweight(jsonb_to_tsvector('english', {row}.skills, '[\"string\"]'), 'B') || "
+        "setweight(to_tsvector('english', {row}.description), 'C')"
+    )
+
+    def _tsquery(self, query):
+        terms = _terms(query)
+        if not terms:
+            return None
+        terms[-1] += ':*'
+        return ' & '.join(terms)
+
+    def _weights(self):
+        # ts_rank takes weights for D, C, B, A, each at most 1
+        return '{0.1, %s, %s, 1.0}' % (DESCRIPTION_WEIGHT / TITLE_WEIGHT, SKILLS_WEIGHT / TITLE_WEIGHT)
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.INDEX} ON projects_project "
+            f"USING GIN (({self.DOCUMENT.format(row='projects_project')}))"
+        )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {self.INDEX}')
+
+    def match_sql(self, query):
+        tsquery = self._tsquery(query)
+        if tsquery is None:
+            return None
+        return (
+            f"SELECT p.id FROM projects_project p WHERE {self.DOCUMENT.format(row='p')} @@ to_tsquery('english', %s)",
+            [tsquery],
+        )
+
+    def rank_sql(self, query):
+        return (
+            f"-ts_rank(%s::float4[], {self.DOCUMENT.format(row='projects_project')}, "
+            f"to_tsquery('english', %s))::double precision",
+            [self._weights(), self._tsquery(query)],
+        )
+
+
+def get_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    if vendor == 'sqlite':
+        return SQLiteFTS5Backend()
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return None
+
+
+def install_search_index(schema_editor):
+    backend = get_backend(schema_editor.connection.vendor)
+    if backend is not None:
+        backend.install(schema_editor)
+
+
+def search_projects(queryset, query):
+    """
+    `queryset` narrowed to projects matching `query` and annotated with
+    `search_rank`, or None when the database has no search backend
+    """
+    backend = get_backend()
+    if backend is None:
+        return None
+    match = backend.match_sql(query)
+    if match is None:
+        return queryset.none()
+    rank_sql, rank_params = backend.rank_sql(query)
+    return queryset.filter(id__in=RawSQL(*match)).annotate(search_rank=RawSQL(rank_sql, rank_params))
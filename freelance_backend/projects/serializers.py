@@ -20,7 +20,8 @@ class ProjectSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 class ProjectDetailSerializer(ProjectSerializer):
-    proposals_count = serializers.IntegerField(source='proposals.count', read_only=True)
+    # Annotated by ProjectDetailView
+    proposals_count = serializers.IntegerField(read_only=True)
     client = UserSerializer(read_only=True)
     
     class Meta(ProjectSerializer.Meta):
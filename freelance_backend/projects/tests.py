@@ -1,3 +1,435 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from freelance_platform.pagination import KeysetPagination
+from freelance_platform.testing import QueryPlanTestMixin
+from messaging import outbox
+from profiles.models import FreelancerScore, Profile
+from . import matching, views
+from .models import Project, ProjectProposal
+
+
+class ProjectQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The list endpoints must stay on index range scans as the tables grow"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clients = User.objects.bulk_create([
+            User(username=f'client{i}', email=f'client{i}@example.com', role='client')
+            for i in range(10)
+        ])
+        cls.freelancers = User.objects.bulk_create([
+            User(username=f'freelancer{i}', email=f'freelancer{i}@example.com', role='freelancer')
+            for i in range(20)
+        ])
+        statuses = [choice for choice, _ in Project.STATUS_CHOICES]
+        categories = [choice for choice, _ in Project.CATEGORY_CHOICES]
+        projects = Project.objects.bulk_create([
+            Project(
+                title=f'Project {i}',
+                description='Seeded project',
+                budget=100 + i,
+                category=categories[i % len(categories)],
+                status=statuses[i % len(statuses)],
+                client=cls.clients[i % len(cls.clients)],
+            )
+            for i in range(400)
+        ])
+        # Spread creation times so ordering has real work to do
+        now = timezone.now()
+        for i, project in enumerate(projects):
+            project.created_at = now - timedelta(hours=i * 7 % 400)
+        Project.objects.bulk_update(projects, ['created_at'])
+
+        ProjectProposal.objects.bulk_create([
+            ProjectProposal(
+                project=project,
+                freelancer=freelancer,
+                message='Seeded proposal',
+                proposed_budget=90,
+                timeline='1 week',
+                status='accepted' if (i + j) % 5 == 0 else 'pending',
+            )
+            for i, project in enumerate(projects)
+            for j, freelancer in enumerate(cls.freelancers[:4])
+        ])
+        cls.project = projects[0]
+
+    def test_project_list(self):
+        view = views.ProjectListCreateView.as_view()
+        for query in ('', '?status=open', '?category=web-development', '?status=open&category=web-development'):
+            with self.subTest(query=query):
+                self.assertQueryPlansUseIndexes(view, f'/api/projects/{query}', self.clients[0])
+
+    def test_project_list_keyset_pages(self):
+        view = views.ProjectListCreateView.as_view()
+        api = APIClient()
+        api.force_authenticate(self.clients[0])
+        for query in ('cursor=', 'cursor=&status=open', 'cursor=&ordering=-budget', 'cursor=&ordering=created_at'):
+            with self.subTest(query=query):
+                # A page deep into the list must still be a single index range read
+                url = f'/api/projects/?{query}'
+                for _ in range(3):
+                    url = api.get(url).json()['next']
+                path = url[url.index('/api/'):]
+                self.assertQueryPlansUseIndexes(view, path, self.clients[0])
+
+    def test_project_search(self):
+        # Matches come from the FTS index; only ranking them needs a sort
+        view = views.ProjectListCreateView.as_view()
+        for query in ('?search=proj', '?search=seeded&status=open', '?search=seeded&cursor='):
+            with self.subTest(query=query):
+                self.assertQueryPlansUseIndexes(view, f'/api/projects/{query}', self.clients[0], allow_temp_sort=True)
+
+    def test_project_facets(self):
+        # One grouped read of the covering index; grouping by budget bucket needs a sort
+        cache.clear()
+        self.assertQueryPlansUseIndexes(
+            views.project_facets, '/api/projects/facets/?status=open', self.clients[0], allow_temp_sort=True,
+        )
+
+    def test_project_proposals(self):
+        self.assertQueryPlansUseIndexes(
+            views.ProjectProposalListCreateView.as_view(),
+            f'/api/projects/{self.project.id}/proposals/', self.clients[0],
+            project_id=self.project.id,
+        )
+
+    def test_my_projects(self):
+        self.assertQueryPlansUseIndexes(views.my_projects, '/api/projects/my-projects/', self.clients[0])
+
+    def test_my_proposals(self):
+        self.assertQueryPlansUseIndexes(views.my_proposals, '/api/projects/my-proposals/', self.freelancers[0])
+
+    def test_my_active_projects(self):
+        for user in (self.clients[0], self.freelancers[0]):
+            with self.subTest(role=user.role):
+                self.assertQueryPlansUseIndexes(views.my_active_projects, '/api/projects/my-active-projects/', user)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        projects = Project.objects.bulk_create([
+            Project(
+                title=f'Project {i}', description='Seeded', category='other', client=cls.client_user,
+                # Repeated budgets and creation times, and some NULL budgets, exercise the id tiebreak
+                budget=None if i % 7 == 0 else 100 * (i % 4),
+            )
+            for i in range(53)
+        ])
+        now = timezone.now()
+        for i, project in enumerate(projects):
+            project.created_at = now - timedelta(hours=i // 3)
+        Project.objects.bulk_update(projects, ['created_at'])
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def walk(self, url, link='next'):
+        ids, pages = [], 0
+        while url:
+            body = self.api.get(url).json()
+            self.assertNotIn('count', body)
+            ids += [project['id'] for project in body['results']]
+            url, pages = body[link], pages + 1
+        return ids, pages
+
+    def test_pages_follow_the_ordering_and_tiebreak(self):
+        orderings = {
+            '': Project.objects.order_by('-created_at', 'id'),
+            '&ordering=created_at': Project.objects.order_by('created_at', '-id'),
+            '&ordering=-budget': Project.objects.order_by(F('budget').desc(nulls_last=True), 'id'),
+            '&ordering=budget': Project.objects.order_by(F('budget').asc(nulls_first=True), '-id'),
+        }
+        for query, expected in orderings.items():
+            with self.subTest(query=query):
+                ids, pages = self.walk(f'/api/projects/?cursor={query}')
+                self.assertEqual(ids, list(expected.values_list('id', flat=True)))
+                self.assertEqual(pages, 3)
+
+    def test_previous_links_walk_back(self):
+        first = self.api.get('/api/projects/?cursor=').json()
+        self.assertIsNone(first['previous'])
+        last = self.api.get(self.api.get(first['next']).json()['next']).json()
+        self.assertIsNone(last['next'])
+        ids, _ = self.walk(last['previous'], link='previous')
+        expected = list(Project.objects.order_by('-created_at', 'id').values_list('id', flat=True)[:40])
+        self.assertEqual(sorted(ids), sorted(expected))
+
+    def test_new_rows_do_not_shift_pages(self):
+        first = self.api.get('/api/projects/?cursor=').json()
+        Project.objects.create(title='Newest', description='New', category='other', client=self.client_user)
+        second = self.api.get(first['next']).json()
+        ids = [p['id'] for p in first['results'] + second['results']]
+        self.assertEqual(ids, list(Project.objects.order_by('-created_at', 'id').values_list('id', flat=True)[1:41]))
+
+    def test_invalid_cursors(self):
+        next_link = self.api.get('/api/projects/?cursor=').json()['next']
+        token = next_link.split('cursor=')[1]
+        self.assertEqual(self.api.get('/api/projects/?cursor=garbage').status_code, 404)
+        # A cursor is only valid for the ordering it came from
+        self.assertEqual(self.api.get(f'/api/projects/?cursor={token}&ordering=budget').status_code, 404)
+
+    def test_page_numbers_remain_the_default(self):
+        body = self.api.get('/api/projects/?page=2').json()
+        self.assertEqual(body['count'], 53)
+        self.assertEqual(len(body['results']), 20)
+
+
+class ProjectSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        cls.projects = {}
+        for key, title, skills, description, status in (
+            ('title', 'Django REST backend', [], 'An API for a shop', 'open'),
+            ('skills', 'Shop API', ['Django', 'PostgreSQL'], 'Backend work', 'open'),
+            ('description', 'Shop backend', [], 'Built with Django and Celery', 'open'),
+            ('closed', 'Django migration', [], 'Upgrade', 'completed'),
+            ('other', 'Logo design', ['Figma'], 'A logo for a café', 'open'),
+        ):
+            cls.projects[key] = Project.objects.create(
+                title=title, description=description, skills=skills, status=status,
+                category='web-development', client=cls.client_user,
+            )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def search(self, query):
+        response = self.api.get(f'/api/projects/?search={query}')
+        self.assertEqual(response.status_code, 200)
+        return [project['id'] for project in response.json()['results']]
+
+    def test_ranked_by_field_weight_and_combined_with_filters(self):
+        expected = [self.projects[key].id for key in ('title', 'skills', 'description')]
+        self.assertEqual(self.search('django&status=open'), expected)
+        # Prefix match; both title matches outrank the rest
+        matches = self.search('djan')
+        self.assertEqual(set(matches[:2]), {self.projects['title'].id, self.projects['closed'].id})
+        self.assertEqual(matches[2:], expected[1:])
+        self.assertEqual(self.search('postgres'), [self.projects['skills'].id])
+        self.assertEqual(self.search('cafe'), [self.projects['other'].id])
+        self.assertEqual(self.search('django shop&ordering=-created_at'), expected[::-1])
+        self.assertEqual(self.search('%22%29OR*'), [])
+
+    def test_index_follows_writes(self):
+        project = self.projects['other']
+        project.skills = ['Django']
+        project.save()
+        self.assertIn(project.id, self.search('django'))
+        Project.objects.filter(pk=project.pk).update(title='Illustration')
+        self.assertEqual(self.search('illustration'), [project.id])
+        project.delete()
+        self.assertEqual(self.search('illustration'), [])
+
+    def test_keyset_pages_by_relevance(self):
+        with mock.patch.object(KeysetPagination, 'page_size', 1):
+            page = self.api.get('/api/projects/?search=django&cursor=').json()
+            ids = [p['id'] for p in page['results']]
+            while page['next']:
+                page = self.api.get(page['next']).json()
+                ids += [p['id'] for p in page['results']]
+        self.assertEqual(ids, self.search('django'))
+        self.assertEqual(len(ids), 4)
+
+
+class ProjectFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        Project.objects.bulk_create([
+            Project(title=f'Project {i}', description='Seeded', client=cls.client_user, category=category,
+                    status=project_status, budget=budget)
+            for i, (category, project_status, budget) in enumerate([
+                ('web-development', 'open', 300),
+                ('web-development', 'open', 2500),
+                ('web-development', 'completed', 800),
+                ('graphic-design', 'open', None),
+                ('graphic-design', 'in_progress', 7000),
+                ('writing-translation', 'open', 500),
+            ])
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def facets(self, query=''):
+        response = self.api.get(f'/api/projects/facets/{query}')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        return body['total'], {
+            facet: {item['value']: item['count'] for item in body[facet] if item['count']}
+            for facet in ('category', 'status', 'budget')
+        }
+
+    def test_counts_exclude_each_facets_own_selection(self):
+        total, counts = self.facets('?category=web-development&status=open')
+        self.assertEqual(total, 2)
+        # Other categories among open projects; other statuses among web-development ones
+        self.assertEqual(counts['category'], {'web-development': 2, 'graphic-design': 1, 'writing-translation': 1})
+        self.assertEqual(counts['status'], {'open': 2, 'completed': 1})
+        self.assertEqual(counts['budget'], {'under-500': 1, '1000-5000': 1})
+
+        total, counts = self.facets('?budget=unspecified')
+        self.assertEqual((total, counts['category']), (1, {'graphic-design': 1}))
+        self.assertEqual(counts['budget'], {'under-500': 1, '500-1000': 2, '1000-5000': 1, '5000-plus': 1, 'unspecified': 1})
+
+    def test_every_choice_is_listed(self):
+        body = self.api.get('/api/projects/facets/').json()
+        self.assertEqual([item['value'] for item in body['category']], [value for value, _ in Project.CATEGORY_CHOICES])
+        self.assertEqual([item['label'] for item in body['status']], [label for _, label in Project.STATUS_CHOICES])
+
+    def test_matches_the_list_endpoint(self):
+        total, _ = self.facets('?status=open&budget=under-500&search=project')
+        listed = self.api.get('/api/projects/?status=open&budget=under-500&search=project').json()
+        self.assertEqual(total, listed['count'])
+        self.assertEqual(self.api.get('/api/projects/?budget=lots').status_code, 400)
+        self.assertEqual(self.api.get('/api/projects/facets/?status=lost').status_code, 400)
+
+    def test_cached_per_normalized_filter(self):
+        self.facets('?status=open&search=Project')
+        with self.assertNumQueries(0):
+            self.facets('?search=project%20&status=open')
+        Project.objects.create(title='New', description='New', client=self.client_user, category='other')
+        # Counts may lag writes by up to the TTL
+        self.assertEqual(self.facets('?status=open&search=project')[0], 4)
+        self.assertEqual(self.facets('?status=open')[0], 5)
+
+
+@override_settings(MATCHING_SYNC_INTERVAL=0)
+class MatchingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        cls.other_client = User.objects.create(username='other', email='other@example.com', role='client')
+        cls.freelancers = {}
+        for name, skills, rate, rating in (
+            ('django_dev', ['Python', 'Django', 'PostgreSQL'], 40, 4.5),
+            ('python_dev', ['python3'], 45, 4.0),
+            ('pricey_dev', ['Python', 'Django', 'PostgreSQL'], 200, 4.5),
+            ('designer', ['Figma'], 30, 5.0),
+        ):
+            user = User.objects.create(username=name, email=f'{name}@example.com', role='freelancer')
+            Profile.objects.create(user=user, skills=skills, hourly_rate=rate, rating=rating)
+            cls.freelancers[name] = user
+        cls.project = Project.objects.create(
+            title='API', description='Django API', category='web-development', client=cls.client_user,
+            skills=['Python', 'Django', 'Postgres'], budget=2000,
+        )
+
+    def setUp(self):
+        matching.index.load()
+        self.api = APIClient()
+
+    def matches(self):
+        self.api.force_authenticate(self.client_user)
+        response = self.api.get(f'/api/projects/{self.project.id}/matches/')
+        self.assertEqual(response.status_code, 200)
+        return [match['profile']['user']['id'] for match in response.json()['results']]
+
+    def test_freelancers_ranked_by_skills_then_rate(self):
+        names = {user.id: name for name, user in self.freelancers.items()}
+        self.assertEqual([names[user_id] for user_id in self.matches()], ['django_dev', 'pricey_dev', 'python_dev'])
+
+    def test_only_the_projects_client_sees_matches(self):
+        self.api.force_authenticate(self.other_client)
+        self.assertEqual(self.api.get(f'/api/projects/{self.project.id}/matches/').status_code, 403)
+
+    def test_index_follows_changes(self):
+        designer = self.freelancers['designer']
+        profile = designer.profile
+        profile.skills = ['Python', 'Django', 'PostgreSQL']
+        profile.save()
+        self.assertIn(designer.id, self.matches())
+
+        self.freelancers['django_dev'].profile.delete()
+        self.assertNotIn(self.freelancers['django_dev'].id, self.matches())
+
+    def test_full_reload_runs_in_the_background(self):
+        self.addCleanup(setattr, matching.index, '_reloading', False)
+        matching.index._loaded_at -= matching.FULL_RELOAD_INTERVAL + 1
+        in_request = mock.patch.object(matching.MatchingIndex, 'load', side_effect=AssertionError('reloaded in a request'))
+        with mock.patch.object(matching.index._reload_pool, 'submit') as submit, in_request:
+            # Served from the old index while the reload is queued, and queued once
+            self.assertEqual(len(self.matches()), 3)
+            self.assertEqual(len(self.matches()), 3)
+        submit.assert_called_once_with()
+
+    def test_deletes_during_a_reload_are_not_lost(self):
+        profile = self.freelancers['django_dev'].profile
+        profile_id = profile.id
+        build = matching.MatchingIndex._build
+
+        def build_then_delete(fresh):
+            build(fresh)
+            # Deleted after the new index read it, before it was swapped in
+            profile.delete()
+
+        with mock.patch.object(matching.MatchingIndex, '_build', build_then_delete):
+            matching.index.load()
+        self.assertIsNone(matching.index.freelancer_skills(profile_id))
+
+    def test_recommended_projects(self):
+        closed = Project.objects.create(
+            title='Old', description='x', category='other', client=self.client_user, skills=['Python'], status='completed',
+        )
+        applied = Project.objects.create(title='Applied', description='x', category='other', client=self.client_user, skills=['Python'])
+        ProjectProposal.objects.create(
+            project=applied, freelancer=self.freelancers['python_dev'], message='Hi', proposed_budget=100, timeline='1 week',
+        )
+        unrelated = Project.objects.create(title='Logo', description='x', category='other', client=self.client_user, skills=['Figma'])
+
+        self.api.force_authenticate(self.freelancers['python_dev'])
+        response = self.api.get('/api/projects/recommended/')
+        self.assertEqual(response.status_code, 200)
+        ids = [result['project']['id'] for result in response.json()['results']]
+        self.assertEqual(ids, [self.project.id])
+        self.assertNotIn(closed.id, ids)
+        self.assertNotIn(unrelated.id, ids)
+
+        self.api.force_authenticate(self.client_user)
+        self.assertEqual(self.api.get('/api/projects/recommended/').status_code, 403)
+
+
+# Score refreshes queued by the admin are drained by the test itself
+@override_settings(OUTBOX_LOCAL_WORKER=False)
+class ProjectAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        client = User.objects.create(username='client', email='client@example.com', role='client')
+        cls.freelancer = User.objects.create(username='dev', email='dev@example.com', role='freelancer')
+        Profile.objects.create(user=cls.freelancer, skills=['Python'], rating=4)
+        cls.project = Project.objects.create(title='API', description='x', category='other', client=client)
+        ProjectProposal.objects.create(
+            project=cls.project, freelancer=cls.freelancer, message='Hi', proposed_budget=100, timeline='1 week',
+        )
+        # Leaves no refresh from creating the fixtures pending
+        outbox.drain()
+
+    def test_status_actions_refresh_proposers_scores(self):
+        score = FreelancerScore.objects.get(profile__user=self.freelancer)
+        self.assertEqual(score.accepted_proposals, 0)
+
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/projects/project/', {
+            'action': 'mark_as_in_progress', '_selected_action': [self.project.id],
+        })
+        self.assertEqual(response.status_code, 302)
+        outbox.drain()
+        score.refresh_from_db()
+        self.assertEqual(score.accepted_proposals, 1)
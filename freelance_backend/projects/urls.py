@@ -3,7 +3,10 @@ from . import views
 
 urlpatterns = [
     path('', views.ProjectListCreateView.as_view(), name='project-list-create'),
+    path('facets/', views.project_facets, name='project-facets'),
     path('<int:pk>/', views.ProjectDetailView.as_view(), name='project-detail'),
+    path('<int:pk>/matches/', views.project_matches, name='project-matches'),
+    path('recommended/', views.recommended_projects, name='recommended-projects'),
     path('<int:project_id>/proposals/', views.ProjectProposalListCreateView.as_view(), name='project-proposals'),
     path('proposals/', views.ProposalListCreateView.as_view(), name='proposal-list-create'),
     path('my-projects/', views.my_projects, name='my-projects'),
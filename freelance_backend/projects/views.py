@@ -1,33 +1,94 @@
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from rest_framework import generics, status, filters
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import Count, Q
 from django_filters.rest_framework import DjangoFilterBackend
+from messaging.pagination import parse_page_size
+from profiles.avatars import LIST_AVATAR_SIZE
+from profiles.models import Profile
+from profiles.serializers import ProfileSerializer
+from skills.models import ProjectSkill
+from skills.sync import parse_skill_filter
+from . import facets, matching, search
 from .models import Project, ProjectProposal
 from .serializers import ProjectSerializer, ProjectDetailSerializer, ProjectProposalSerializer
 
 # Create your views here.
 
+class ProjectSearchFilter(filters.SearchFilter):
+    """
+    ?search= through the full-text index (projects.search), best match first unless
+    ?ordering= is given. Falls back to SearchFilter's LIKE lookups on databases
+    without a search backend. Goes after OrderingFilter so it can replace the
+    default ordering.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        matches = search.search_projects(queryset, query)
+        if matches is None:
+            return super().filter_queryset(request, queryset, view)
+        if not request.query_params.get(filters.OrderingFilter.ordering_param):
+            matches = matches.order_by('search_rank', '-created_at')
+        return matches
+
 class ProjectListCreateView(generics.ListCreateAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProjectSearchFilter]
     filterset_fields = ['category', 'status']
-    search_fields = ['title', 'description', 'skills']
+    search_fields = ['title', 'description', 'skill_links__skill__name']
     ordering_fields = ['created_at', 'budget']
     ordering = ['-created_at']
     
     def get_queryset(self):
-        return Project.objects.select_related('client').all()
+        queryset = Project.objects.select_related('client').all()
+        # ?skills=python,react: projects needing any of them, matched through the normalized index
+        skill_ids = parse_skill_filter(self.request.query_params.getlist('skills'))
+        if skill_ids is not None:
+            queryset = queryset.filter(pk__in=ProjectSkill.objects.filter(skill_id__in=skill_ids).values('project_id'))
+        # ?budget=<bucket>, as counted by the facets endpoint
+        budget = self.request.query_params.get('budget')
+        if budget:
+            try:
+                queryset = facets.filter_budget(queryset, budget)
+            except facets.InvalidFacet as e:
+                raise ValidationError({'budget': [str(e)]})
+        return queryset
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def project_facets(request):
+    """
+    Category, status and budget-bucket counts for the project list's current filters
+    (see projects.facets). Takes the list's query params: category, status, budget,
+    search and skills.
+    """
+    try:
+        selection = facets.parse_selection(request.query_params)
+    except facets.InvalidFacet as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    skill_ids = parse_skill_filter(request.query_params.getlist('skills'))
+    queryset = Project.objects.all()
+    if skill_ids is not None:
+        queryset = queryset.filter(pk__in=ProjectSkill.objects.filter(skill_id__in=skill_ids).values('project_id'))
+    queryset = ProjectSearchFilter().filter_queryset(request, queryset, ProjectListCreateView)
+    
+    search_query = request.query_params.get(ProjectSearchFilter.search_param, '')
+    return Response(facets.cached_facets(queryset, selection, search_query, skill_ids))
 
 class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProjectDetailSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Project.objects.select_related('client').prefetch_related('proposals')
+        return Project.objects.select_related('client').annotate(proposals_count=Count('proposals'))
     
     def perform_update(self, serializer):
         # Only allow the client who posted the project to update it
@@ -48,7 +109,7 @@ class ProjectProposalListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         project_id = self.kwargs.get('project_id')
         if project_id:
-            return ProjectProposal.objects.filter(project_id=project_id).select_related('freelancer', 'project')
+            return ProjectProposal.objects.filter(project_id=project_id).select_related('freelancer', 'project').order_by('created_at')
         return ProjectProposal.objects.select_related('freelancer', 'project').all()
     
     def perform_create(self, serializer):
@@ -79,7 +140,7 @@ def my_projects(request):
     if request.user.role != 'client':
         return Response({'error': 'Only clients can view their projects'}, status=status.HTTP_403_FORBIDDEN)
     
-    projects = Project.objects.filter(client=request.user).order_by('-created_at')
+    projects = Project.objects.filter(client=request.user).select_related('client').order_by('-created_at')
     serializer = ProjectSerializer(projects, many=True)
     return Response(serializer.data)
 
@@ -90,7 +151,7 @@ def my_proposals(request):
     if request.user.role != 'freelancer':
         return Response({'error': 'Only freelancers can view their proposals'}, status=status.HTTP_403_FORBIDDEN)
     
-    proposals = ProjectProposal.objects.filter(freelancer=request.user).select_related('project').order_by('-created_at')
+    proposals = ProjectProposal.objects.filter(freelancer=request.user).select_related('project', 'freelancer').order_by('-created_at')
     serializer = ProjectProposalSerializer(proposals, many=True)
     return Response(serializer.data)
 
@@ -103,7 +164,7 @@ def my_active_projects(request):
         projects = Project.objects.filter(
             client=request.user,
             status__in=['open', 'in_progress']
-        ).order_by('-created_at')
+        ).select_related('client').order_by('-created_at')
     elif request.user.role == 'freelancer':
         # For freelancers, get projects where they have accepted proposals
         # First get the accepted proposals for this freelancer
@@ -116,9 +177,94 @@ def my_active_projects(request):
         projects = Project.objects.filter(
             id__in=accepted_proposals,
             status='in_progress'
-        ).order_by('-created_at')
+        ).select_related('client').order_by('-created_at')
     else:
         return Response({'error': 'Invalid user role'}, status=status.HTTP_403_FORBIDDEN)
     
     serializer = ProjectSerializer(projects, many=True)
     return Response(serializer.data)
+
+
+MATCHES_DEFAULT_LIMIT = 20
+MATCHES_MAX_LIMIT = 100
+# Extra candidates asked of the index in case some were deleted or closed since its last sync
+MATCHES_SLACK = 10
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def project_matches(request, pk):
+    """
+    Freelancers who best fit one of the current user's projects (see projects.matching)
+    
+    Query params:
+    - limit: number of matches (default 20, max 100)
+    """
+    project = get_object_or_404(Project, pk=pk)
+    if project.client_id != request.user.id:
+        return Response({'error': 'You can only view matches for your own projects'}, status=status.HTTP_403_FORBIDDEN)
+    
+    limit = parse_page_size(request.query_params.get('limit'), MATCHES_DEFAULT_LIMIT, MATCHES_MAX_LIMIT)
+    matching.index.sync()
+    skill_ids = matching.index.project_skills(project.id)
+    if skill_ids is None:
+        # Only open projects are indexed
+        skill_ids = set(project.skill_links.values_list('skill_id', flat=True))
+    matches = matching.index.match_freelancers(skill_ids, project.budget, limit + MATCHES_SLACK)
+    
+    profiles = Profile.objects.filter(
+        id__in=[profile_id for profile_id, *_ in matches], user__role='freelancer'
+    ).select_related('user').in_bulk()
+    results = [
+        {
+            'profile': ProfileSerializer(
+                profiles[profile_id], context={'request': request, 'avatar_size': LIST_AVATAR_SIZE},
+            ).data,
+            'score': round(score, 4),
+            'skill_match': round(skill_match, 4),
+            'rate_fit': round(rate_fit, 4),
+        }
+        for profile_id, score, skill_match, rate_fit in matches
+        if profile_id in profiles
+    ]
+    return Response({'project': project.id, 'results': results[:limit]})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def recommended_projects(request):
+    """
+    Open projects that best fit the current freelancer, leaving out ones already
+    proposed to (see projects.matching)
+    
+    Query params:
+    - limit: number of projects (default 20, max 100)
+    """
+    if request.user.role != 'freelancer':
+        return Response({'error': 'Only freelancers can get project recommendations'}, status=status.HTTP_403_FORBIDDEN)
+    profile = Profile.objects.filter(user=request.user).only('id', 'hourly_rate').first()
+    if profile is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    limit = parse_page_size(request.query_params.get('limit'), MATCHES_DEFAULT_LIMIT, MATCHES_MAX_LIMIT)
+    matching.index.sync()
+    skill_ids = matching.index.freelancer_skills(profile.id)
+    if skill_ids is None:
+        skill_ids = set(profile.skill_links.values_list('skill_id', flat=True))
+    proposed = set(ProjectProposal.objects.filter(freelancer=request.user).values_list('project_id', flat=True))
+    recommendations = matching.index.recommend_projects(
+        skill_ids, profile.hourly_rate, limit + MATCHES_SLACK, exclude=proposed,
+    )
+    
+    projects = Project.objects.filter(
+        id__in=[project_id for project_id, *_ in recommendations], status='open'
+    ).select_related('client').in_bulk()
+    results = [
+        {
+            'project': ProjectSerializer(projects[project_id]).data,
+            'score': round(score, 4),
+            'skill_match': round(skill_match, 4),
+            'budget_fit': round(budget_fit, 4),
+        }
+        for project_id, score, skill_match, budget_fit in recommendations
+        if project_id in projects
+    ]
+    return Response({'results': results[:limit]})
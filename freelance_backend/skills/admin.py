@@ -0,0 +1,43 @@
+from django.contrib import admin
+from django.db.models import Count
+from unfold.admin import ModelAdmin, TabularInline
+from unfold.decorators import display
+from .models import Skill, SkillAlias
+from .sync import normalize_skill
+
+class SkillAliasInline(TabularInline):
+    model = SkillAlias
+    extra = 0
+    fields = ['alias']
+
+@admin.register(Skill)
+class SkillAdmin(ModelAdmin):
+    list_display = ['name', 'slug', 'get_profiles_count', 'get_projects_count', 'created_at']
+    search_fields = ['name', 'slug', 'aliases__alias']
+    readonly_fields = ['created_at']
+    inlines = [SkillAliasInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            profiles_count=Count('profile_links', distinct=True),
+            projects_count=Count('project_links', distinct=True),
+        )
+    
+    def save_model(self, request, obj, form, change):
+        obj.slug = normalize_skill(obj.slug)
+        super().save_model(request, obj, form, change)
+    
+    def save_formset(self, request, form, formset, change):
+        for alias in formset.save(commit=False):
+            alias.alias = normalize_skill(alias.alias)
+            alias.save()
+        for alias in formset.deleted_objects:
+            alias.delete()
+    
+    @display(description="Profiles", ordering="profiles_count")
+    def get_profiles_count(self, obj):
+        return obj.profiles_count
+    
+    @display(description="Projects", ordering="projects_count")
+    def get_projects_count(self, obj):
+        return obj.projects_count
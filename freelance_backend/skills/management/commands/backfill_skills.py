@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from profiles.models import Profile
+from projects.models import Project
+from skills.models import Skill
+from skills.sync import sync_profile_skills, sync_project_skills
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the normalized skill links from Profile.skills and Project.skills. Run it '
+        'after bulk imports, which skip the save signals, and after adding skill aliases.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--prune', action='store_true',
+                            help='Delete skills that nothing links to any more and that have no aliases')
+
+    def handle(self, *args, **options):
+        for label, model, sync in (
+            ('profiles', Profile, sync_profile_skills),
+            ('projects', Project, sync_project_skills),
+        ):
+            total = 0
+            batch = []
+            for owner in model.objects.only('id', 'skills').order_by('id').iterator(chunk_size=options['batch_size']):
+                batch.append(owner)
+                if len(batch) >= options['batch_size']:
+                    total += self.sync_batch(sync, batch)
+                    batch = []
+            total += self.sync_batch(sync, batch)
+            self.stdout.write(f'Synced skills for {total} {label}.')
+
+        if options['prune']:
+            pruned, _ = Skill.objects.filter(
+                profile_links__isnull=True, project_links__isnull=True, aliases__isnull=True,
+            ).delete()
+            self.stdout.write(f'Pruned {pruned} unused skills.')
+        self.stdout.write(self.style.SUCCESS(f'{Skill.objects.count()} skills indexed.'))
+
+    def sync_batch(self, sync, batch):
+        with transaction.atomic():
+            sync(batch)
+        return len(batch)
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Canonical name -> common alternative spellings (already normalized)
+ALIASES = {
+    'JavaScript': ['js', 'javascript es6', 'es6', 'ecmascript'],
+    'TypeScript': ['ts'],
+    'React': ['reactjs', 'react.js', 'react js'],
+    'React Native': ['react-native', 'reactnative'],
+    'Vue.js': ['vue', 'vuejs', 'vue js'],
+    'Angular': ['angularjs', 'angular.js'],
+    'Node.js': ['node', 'nodejs', 'node js'],
+    'Next.js': ['next', 'nextjs'],
+    'Python': ['python3', 'python 3', 'py'],
+    'Django': ['django rest framework', 'drf'],
+    'PostgreSQL': ['postgres', 'psql'],
+    'MongoDB': ['mongo'],
+    'Golang': ['go', 'go lang'],
+    'C#': ['c sharp', 'csharp'],
+    'C++': ['cpp'],
+    'UI/UX Design': ['ui/ux', 'ux/ui', 'ui ux', 'ui/ux designer'],
+    'Machine Learning': ['ml'],
+    'Search Engine Optimization': ['seo'],
+    'Amazon Web Services': ['aws'],
+}
+
+
+def seed_aliases(apps, schema_editor):
+    Skill = apps.get_model('skills', 'Skill')
+    SkillAlias = apps.get_model('skills', 'SkillAlias')
+    for name, aliases in ALIASES.items():
+        skill, _ = Skill.objects.get_or_create(slug=name.casefold(), defaults={'name': name})
+        for alias in aliases:
+            SkillAlias.objects.get_or_create(alias=alias, defaults={'skill': skill})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_aliases, migrations.RunPython.noop),
+    ]
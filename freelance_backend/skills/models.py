@@ -0,0 +1,58 @@
+from django.db import models
+
+MAX_SKILL_LENGTH = 100
+
+class Skill(models.Model):
+    """A canonical skill; `slug` is its normalized lookup key (see skills.sync.normalize_skill)"""
+    name = models.CharField(max_length=MAX_SKILL_LENGTH)
+    slug = models.CharField(max_length=MAX_SKILL_LENGTH, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['slug']
+    
+    def __str__(self):
+        return self.name
+
+class SkillAlias(models.Model):
+    """Another spelling of a skill, e.g. 'reactjs' for React; `alias` is normalized like Skill.slug"""
+    alias = models.CharField(max_length=MAX_SKILL_LENGTH, unique=True)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='aliases')
+    
+    class Meta:
+        verbose_name_plural = 'skill aliases'
+        ordering = ['alias']
+    
+    def __str__(self):
+        return f"{self.alias} -> {self.skill.name}"
+
+class ProfileSkill(models.Model):
+    # Both directions are covered by the unique constraint and the (skill, profile) index
+    profile = models.ForeignKey('profiles.Profile', on_delete=models.CASCADE, related_name='skill_links', db_index=False)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='profile_links', db_index=False)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['profile', 'skill'], name='unique_profile_skill'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', 'profile'], name='profileskill_skill_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.profile_id}: {self.skill_id}"
+
+class ProjectSkill(models.Model):
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, related_name='skill_links', db_index=False)
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='project_links', db_index=False)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'skill'], name='unique_project_skill'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', 'project'], name='projectskill_skill_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.project_id}: {self.skill_id}"
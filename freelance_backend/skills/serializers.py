@@ -0,0 +1,10 @@
+from rest_framework import serializers
+from .models import Skill
+
+class SkillSerializer(serializers.ModelSerializer):
+    profiles_count = serializers.IntegerField(read_only=True)
+    projects_count = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Skill
+        fields = ['id', 'name', 'slug', 'profiles_count', 'projects_count']
@@ -0,0 +1,23 @@
+"""Keeps the skill links in step with Profile.skills and Project.skills; connected by SkillsConfig.ready"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from profiles.models import Profile
+from projects.models import Project
+from .sync import sync_profile_skills, sync_project_skills
+
+
+def _skills_saved(raw, update_fields):
+    return not raw and (update_fields is None or 'skills' in update_fields)
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if _skills_saved(raw, update_fields):
+        sync_profile_skills([instance])
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if _skills_saved(raw, update_fields):
+        sync_project_skills([instance])
@@ -0,0 +1,104 @@
+"""
+Normalized skill index.
+
+Profile.skills and Project.skills stay free-form JSON lists (that is what the API
+reads and writes); ProfileSkill and ProjectSkill mirror them as links to canonical
+Skill rows so skill filters, counts and joins are indexed lookups.
+
+Names are matched case- and whitespace-insensitively and through SkillAlias, so
+'ReactJS', 'react.js' and 'React' link to one skill once the aliases exist. Links
+are synced by skills.signals on save; bulk writes bypass the signals, so run
+`manage.py backfill_skills` after them (and after adding aliases).
+"""
+import re
+from collections import defaultdict
+
+from .models import MAX_SKILL_LENGTH, ProfileSkill, ProjectSkill, Skill, SkillAlias
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_skill(name):
+    """Lookup key for a skill name: trimmed, single-spaced and case-folded"""
+    return _WHITESPACE.sub(' ', name).strip().casefold()[:MAX_SKILL_LENGTH]
+
+
+def skill_keys(names):
+    """Normalized keys of a JSON skills list in first-seen order, skipping blanks and non-strings"""
+    keys = {}
+    for name in names if isinstance(names, list) else []:
+        if isinstance(name, str):
+            key = normalize_skill(name)
+            if key:
+                keys.setdefault(key, _WHITESPACE.sub(' ', name).strip()[:MAX_SKILL_LENGTH])
+    return keys
+
+
+def resolve_skill_ids(names, create=True):
+    """
+    Map each name's normalized key to its Skill id, following aliases. Unknown
+    skills are created (named as first written) unless `create` is False, in
+    which case they are left out.
+    """
+    keys = skill_keys(list(names))
+    if not keys:
+        return {}
+    resolved = dict(SkillAlias.objects.filter(alias__in=keys).values_list('alias', 'skill_id'))
+    remaining = [key for key in keys if key not in resolved]
+    resolved.update(Skill.objects.filter(slug__in=remaining).values_list('slug', 'id'))
+
+    missing = [key for key in remaining if key not in resolved]
+    if missing and create:
+        # ignore_conflicts: a concurrent save may have created the same skill
+        Skill.objects.bulk_create([Skill(name=keys[key], slug=key) for key in missing], ignore_conflicts=True)
+        resolved.update(Skill.objects.filter(slug__in=missing).values_list('slug', 'id'))
+    return resolved
+
+
+def _sync_links(link_model, owner_field, owners):
+    owners = list(owners)
+    if not owners:
+        return
+    keys_by_owner = {owner.pk: skill_keys(owner.skills) for owner in owners}
+    resolved = resolve_skill_ids(
+        name for keys in keys_by_owner.values() for name in keys.values()
+    )
+    wanted = {
+        (owner_id, resolved[key]) for owner_id, keys in keys_by_owner.items() for key in keys
+        if key in resolved
+    }
+    owner_id_field = f'{owner_field}_id'
+    existing = set(link_model.objects.filter(
+        **{f'{owner_id_field}__in': list(keys_by_owner)}
+    ).values_list(owner_id_field, 'skill_id'))
+
+    stale = defaultdict(list)
+    for owner_id, skill_id in existing - wanted:
+        stale[owner_id].append(skill_id)
+    for owner_id, skill_ids in stale.items():
+        link_model.objects.filter(**{owner_id_field: owner_id, 'skill_id__in': skill_ids}).delete()
+    link_model.objects.bulk_create([
+        link_model(**{owner_id_field: owner_id, 'skill_id': skill_id})
+        for owner_id, skill_id in sorted(wanted - existing)
+    ], ignore_conflicts=True)
+
+
+def sync_profile_skills(profiles):
+    """Make the ProfileSkill links of `profiles` match their skills lists"""
+    _sync_links(ProfileSkill, 'profile', profiles)
+
+
+def sync_project_skills(projects):
+    """Make the ProjectSkill links of `projects` match their skills lists"""
+    _sync_links(ProjectSkill, 'project', projects)
+
+
+def parse_skill_filter(values):
+    """
+    Skill ids for a `skills` query parameter (repeatable and/or comma-separated).
+    Returns None when the parameter is absent; names matching no skill are dropped.
+    """
+    names = [name for value in values for name in value.split(',')]
+    if not names:
+        return None
+    return sorted(set(resolve_skill_ids(names, create=False).values()))
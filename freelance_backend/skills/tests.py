@@ -0,0 +1,133 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from freelance_platform.testing import QueryPlanTestMixin
+from profiles.models import Profile
+from profiles import views as profile_views
+from projects.models import Project
+from projects import views as project_views
+from . import views
+from .models import ProfileSkill, ProjectSkill, Skill
+from .sync import normalize_skill, resolve_skill_ids
+
+
+class SkillSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        cls.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+
+    def linked(self, owner):
+        return sorted(owner.skill_links.values_list('skill__slug', flat=True))
+
+    def test_normalization_and_aliases(self):
+        self.assertEqual(normalize_skill('  Machine \t Learning '), 'machine learning')
+        ids = resolve_skill_ids(['ReactJS', 'react.js', 'React', ' REACT '])
+        self.assertEqual(len(set(ids.values())), 1)
+        self.assertEqual(Skill.objects.get(id=ids['reactjs']).name, 'React')
+
+    def test_unknown_skills_keep_first_spelling(self):
+        resolve_skill_ids(['Figma Prototyping', 'figma prototyping'])
+        self.assertEqual(Skill.objects.get(slug='figma prototyping').name, 'Figma Prototyping')
+        self.assertEqual(resolve_skill_ids(['Nonexistent'], create=False), {})
+
+    def test_links_follow_saves(self):
+        profile = Profile.objects.create(user=self.freelancer, skills=['Python', 'py', 'JS', 42, ''])
+        self.assertEqual(self.linked(profile), ['javascript', 'python'])
+
+        profile.skills = ['Python', 'Go']
+        profile.save()
+        self.assertEqual(self.linked(profile), ['golang', 'python'])
+
+        project = Project.objects.create(
+            title='API', description='Build it', category='other', client=self.client_user, skills=['Django'],
+        )
+        self.assertEqual(self.linked(project), ['django'])
+
+    def test_project_links_follow_updates(self):
+        project = Project.objects.create(
+            title='API', description='Build it', category='other', client=self.client_user, skills=['Django', 'py'],
+        )
+        self.assertEqual(self.linked(project), ['django', 'python'])
+
+        project.skills = ['Python', 'Postgres']
+        project.save()
+        self.assertEqual(self.linked(project), ['postgresql', 'python'])
+        self.assertEqual(ProjectSkill.objects.filter(project=project).count(), 2)
+
+        # Saves that leave skills out of update_fields don't touch the links
+        project.skills = ['Go']
+        project.save(update_fields=['title'])
+        self.assertEqual(self.linked(project), ['postgresql', 'python'])
+
+        project.skills = []
+        project.save(update_fields=['skills'])
+        self.assertFalse(ProjectSkill.objects.filter(project=project).exists())
+
+    def test_backfill_after_bulk_create(self):
+        Profile.objects.bulk_create([Profile(user=self.freelancer, skills=['Vue', 'SEO'])])
+        Project.objects.bulk_create([
+            Project(title='Site', description='Build it', category='other', client=self.client_user, skills=['vuejs'])
+        ])
+        self.assertFalse(ProfileSkill.objects.exists())
+        call_command('backfill_skills', verbosity=0, stdout=StringIO())
+        self.assertEqual(self.linked(Profile.objects.get()), ['search engine optimization', 'vue.js'])
+        self.assertEqual(self.linked(Project.objects.get()), ['vue.js'])
+
+    def test_skill_filters(self):
+        Profile.objects.create(user=self.freelancer, skills=['Python'])
+        Project.objects.create(title='API', description='x', category='other', client=self.client_user, skills=['python3'])
+        Project.objects.create(title='Site', description='x', category='other', client=self.client_user, skills=['React'])
+        api = APIClient()
+        api.force_authenticate(self.client_user)
+
+        titles = [project['title'] for project in api.get('/api/projects/?skills=PYTHON').json()['results']]
+        self.assertEqual(titles, ['API'])
+        titles = [project['title'] for project in api.get('/api/projects/?skills=python,reactjs').json()['results']]
+        self.assertEqual(sorted(titles), ['API', 'Site'])
+        self.assertEqual(api.get('/api/projects/?skills=cobol').json()['results'], [])
+        self.assertEqual(len(api.get('/api/profiles/?skills=py').json()['results']), 1)
+
+        skills = {skill['slug']: skill for skill in api.get('/api/skills/?search=Py').json()['results']}
+        self.assertEqual(list(skills), ['python'])
+        self.assertEqual((skills['python']['profiles_count'], skills['python']['projects_count']), (1, 1))
+
+
+class SkillQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """Skill filters and counts must be index lookups"""
+
+    @classmethod
+    def setUpTestData(cls):
+        names = ['Python', 'React', 'Django', 'Go', 'Figma', 'SEO', 'Copywriting', 'Swift']
+        cls.user = User.objects.create(username='client', email='client@example.com', role='client')
+        freelancers = User.objects.bulk_create([
+            User(username=f'freelancer{i}', email=f'freelancer{i}@example.com', role='freelancer')
+            for i in range(100)
+        ])
+        Profile.objects.bulk_create([
+            Profile(user=user, skills=[names[i % 8], names[i * 3 % 8]]) for i, user in enumerate(freelancers)
+        ])
+        Project.objects.bulk_create([
+            Project(title=f'Project {i}', description='x', category='other', client=cls.user,
+                    skills=[names[i % 8], names[i * 5 % 8]])
+            for i in range(300)
+        ])
+        call_command('backfill_skills', verbosity=0, stdout=StringIO())
+
+    def test_skill_filters(self):
+        # The matching ids come off the (skill, owner) index; ordering the matches needs a sort
+        self.assertQueryPlansUseIndexes(
+            project_views.ProjectListCreateView.as_view(), '/api/projects/?skills=python,go', self.user,
+            allow_temp_sort=True,
+        )
+        self.assertQueryPlansUseIndexes(
+            profile_views.ProfileListView.as_view(), '/api/profiles/?skills=python', self.user,
+            allow_scans=('profiles_profile',),
+        )
+
+    def test_skill_list(self):
+        self.assertQueryPlansUseIndexes(views.SkillListView.as_view(), '/api/skills/?search=py', self.user)
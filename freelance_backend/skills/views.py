@@ -0,0 +1,27 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import generics
+from rest_framework.permissions import AllowAny
+from .models import ProfileSkill, ProjectSkill, Skill
+from .serializers import SkillSerializer
+from .sync import normalize_skill
+
+def _link_count(link_model):
+    counted = link_model.objects.filter(skill=OuterRef('pk')).order_by().values('skill').annotate(count=Count('skill'))
+    return Coalesce(Subquery(counted.values('count'), output_field=IntegerField()), 0)
+
+class SkillListView(generics.ListAPIView):
+    """Canonical skills with how many profiles and projects list them; ?search= matches name prefixes"""
+    serializer_class = SkillSerializer
+    permission_classes = [AllowAny]
+    
+    def get_queryset(self):
+        queryset = Skill.objects.annotate(
+            profiles_count=_link_count(ProfileSkill),
+            projects_count=_link_count(ProjectSkill),
+        )
+        prefix = normalize_skill(self.request.query_params.get('search', ''))
+        if prefix:
+            # A range on the unique slug index; LIKE 'x%' can't use it on SQLite
+            queryset = queryset.filter(slug__gte=prefix, slug__lt=prefix + '\U0010ffff')
+        return queryset
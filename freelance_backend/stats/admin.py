@@ -0,0 +1,17 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+
+from .models import DailyPlatformStats
+
+
+@admin.register(DailyPlatformStats)
+class DailyPlatformStatsAdmin(ModelAdmin):
+    """Read-only: rows are written by `manage.py rollup_platform_stats`"""
+    list_display = ['date', 'new_users', 'new_projects', 'new_proposals', 'new_messages', 'total_users', 'computed_at']
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,232 @@
+"""
+Write-through platform counters: O(1) totals for the admin dashboard and stats.
+
+Each PlatformCounter row holds one total, keyed '<prefix>' or '<prefix>:<value>':
+users by role, projects and proposals by status, conversations, messages, and
+'messages:unread' (the sum of every conversation's unread counters). The
+receivers below move them on create, delete and change of the counted field,
+inside the transaction doing the write, so a rolled-back write leaves them
+alone. Increments are single-row UPDATE ... SET value = value + n statements,
+taken in key order so concurrent writers can't deadlock on them.
+
+Writes that skip the model signals have to go through this module:
+- QuerySet.update() of a counted field: use counters.update(queryset, ...)
+- the unread counters are moved with add(), by messaging.summary
+- bulk_create() and raw SQL: run `manage.py reconcile_platform_counters`, which
+  recomputes every counter from the tables and reports the drift it corrected.
+
+Messages deleted along with their conversation (its own delete, or a user's or
+project's cascading to it) are subtracted by the conversation in one step, not
+one counter UPDATE per message.
+
+Models are named by label so that migrations can run compute()/reconcile()
+against their historical models.
+"""
+from collections import Counter
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, QuerySet, Sum
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+MESSAGES = 'messages'
+UNREAD = f'{MESSAGES}:unread'
+
+# Stands in for a counted field that was deferred when the instance was loaded
+_UNKNOWN = object()
+
+
+@dataclass(frozen=True)
+class Counted:
+    model: str
+    prefix: str
+    # Counted per value of this field, if any
+    field: str = None
+
+    def key(self, value=None):
+        return f'{self.prefix}:{value}' if self.field else self.prefix
+
+
+COUNTED = (
+    Counted('accounts.User', 'users', 'role'),
+    Counted('projects.Project', 'projects', 'status'),
+    Counted('projects.ProjectProposal', 'proposals', 'status'),
+    Counted('messaging.Conversation', 'conversations'),
+    Counted('messaging.Message', MESSAGES),
+)
+
+
+def _counted(model):
+    label = model._meta.label
+    return next((counted for counted in COUNTED if counted.model == label), None)
+
+
+def add(deltas, get_model=apps.get_model):
+    """Add {key: delta} to the counters, in the current transaction"""
+    PlatformCounter = get_model('stats.PlatformCounter')
+    with transaction.atomic():
+        for key in sorted(deltas):
+            delta = deltas[key]
+            if not delta or PlatformCounter.objects.filter(key=key).update(value=F('value') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    PlatformCounter.objects.create(key=key, value=delta)
+            except IntegrityError:
+                # Created by a concurrent writer in the meantime
+                PlatformCounter.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def totals():
+    """{key: value} for every counter, in one query"""
+    PlatformCounter = apps.get_model('stats.PlatformCounter')
+    return dict(PlatformCounter.objects.values_list('key', 'value'))
+
+
+def total(counts, prefix):
+    """The total for `prefix` from totals(), summed over its values for a counted field"""
+    return counts.get(prefix, 0) + sum(value for key, value in counts.items() if key.startswith(f'{prefix}:'))
+
+
+def update(queryset, **fields):
+    """
+    queryset.update(**fields), moving the counters of a counted field along; the
+    new value of that field has to be a constant
+    """
+    counted = _counted(queryset.model)
+    if counted is None or counted.field is None or counted.field not in fields:
+        return queryset.update(**fields)
+
+    with transaction.atomic():
+        # Locked so the rows can't change between counting and updating them
+        previous = Counter(queryset.select_for_update().order_by().values_list(counted.field, flat=True))
+        updated = queryset.update(**fields)
+        deltas = Counter({counted.key(value): -count for value, count in previous.items()})
+        deltas[counted.key(fields[counted.field])] += sum(previous.values())
+        add(deltas)
+    return updated
+
+
+def compute(get_model=apps.get_model):
+    """Every counter's value, counted from the tables"""
+    counts = {}
+    for counted in COUNTED:
+        objects = get_model(counted.model).objects.order_by()
+        if counted.field is None:
+            counts[counted.key()] = objects.count()
+            continue
+        for row in objects.values(counted.field).annotate(count=Count('pk')):
+            counts[counted.key(row[counted.field])] = row['count']
+    counts[UNREAD] = get_model('messaging.Conversation').objects.aggregate(
+        unread=Sum('client_unread_count') + Sum('freelancer_unread_count'),
+    )['unread'] or 0
+    return counts
+
+
+def reconcile(fix=True, get_model=apps.get_model):
+    """
+    Recompute every counter and, if `fix`, store the result; returns the drifted
+    ones as [(key, stored, actual)]
+    """
+    PlatformCounter = get_model('stats.PlatformCounter')
+    with transaction.atomic():
+        # Holding the counter rows keeps writers from moving them while the tables are counted
+        stored = dict(PlatformCounter.objects.select_for_update().values_list('key', 'value'))
+        actual = compute(get_model)
+        changed = {key: value for key, value in actual.items() if stored.get(key) != value}
+        changed.update({key: 0 for key in stored.keys() - actual.keys() if stored[key]})
+        if fix and changed:
+            PlatformCounter.objects.bulk_create(
+                [PlatformCounter(key=key, value=value) for key, value in changed.items()],
+                update_conflicts=True, unique_fields=['key'], update_fields=['value'],
+            )
+    return [(key, stored.get(key, 0), value) for key, value in sorted(changed.items()) if stored.get(key, 0) != value]
+
+
+def _value(instance, counted):
+    return instance.__dict__.get(counted.field, _UNKNOWN)
+
+
+@receiver(post_init, sender='accounts.User')
+@receiver(post_init, sender='projects.Project')
+@receiver(post_init, sender='projects.ProjectProposal')
+def remember_counted_value(sender, instance, **kwargs):
+    instance._counted_value = _value(instance, _counted(sender))
+
+
+@receiver(pre_save, sender='accounts.User')
+@receiver(pre_save, sender='projects.Project')
+@receiver(pre_save, sender='projects.ProjectProposal')
+def load_counted_value(sender, instance, **kwargs):
+    # Loaded deferred, then assigned: the stored value is needed to move its counter
+    counted = _counted(sender)
+    if instance._counted_value is _UNKNOWN and counted.field in instance.__dict__ and not instance._state.adding:
+        instance._counted_value = sender._base_manager.filter(pk=instance.pk).values_list(
+            counted.field, flat=True,
+        ).first()
+
+
+@receiver(post_save, sender='accounts.User')
+@receiver(post_save, sender='projects.Project')
+@receiver(post_save, sender='projects.ProjectProposal')
+@receiver(post_save, sender='messaging.Conversation')
+@receiver(post_save, sender='messaging.Message')
+def counted_saved(sender, instance, created, update_fields=None, **kwargs):
+    counted = _counted(sender)
+    deltas = Counter()
+    if counted.field is None:
+        if created:
+            deltas[counted.key()] += 1
+    else:
+        value = _value(instance, counted)
+        written = value is not _UNKNOWN and (update_fields is None or counted.field in update_fields)
+        if created:
+            deltas[counted.key(value)] += 1
+        elif written and instance._counted_value != value:
+            deltas[counted.key(instance._counted_value)] -= 1
+            deltas[counted.key(value)] += 1
+        if written:
+            instance._counted_value = value
+    if created and sender._meta.label == 'messaging.Conversation':
+        deltas[UNREAD] += instance.client_unread_count + instance.freelancer_unread_count
+    add(deltas)
+
+
+@receiver(pre_delete, sender='messaging.Conversation')
+def load_unread(sender, instance, **kwargs):
+    # The in-memory counters may be stale: the outbox and read path move them with UPDATEs.
+    # Its messages are counted here too, before the cascade deletes them.
+    client_unread, freelancer_unread, messages = sender._base_manager.filter(pk=instance.pk).annotate(
+        message_count=Count('messages'),
+    ).values_list('client_unread_count', 'freelancer_unread_count', 'message_count').first() or (0, 0, 0)
+    instance._unread = client_unread + freelancer_unread
+    instance._message_count = messages
+
+
+def _deleted_directly(sender, origin):
+    """Whether delete() was called on this model, rather than cascaded to it"""
+    return isinstance(origin, sender) or (isinstance(origin, QuerySet) and origin.model is sender)
+
+
+@receiver(post_delete, sender='accounts.User')
+@receiver(post_delete, sender='projects.Project')
+@receiver(post_delete, sender='projects.ProjectProposal')
+@receiver(post_delete, sender='messaging.Conversation')
+@receiver(post_delete, sender='messaging.Message')
+def counted_deleted(sender, instance, origin=None, **kwargs):
+    if sender._meta.label == 'messaging.Message' and not _deleted_directly(sender, origin):
+        # Cascaded from its conversation's delete, which subtracts all of them at once
+        return
+    counted = _counted(sender)
+    deltas = Counter()
+    if counted.field is None:
+        deltas[counted.key()] -= 1
+    else:
+        value = instance._counted_value
+        deltas[counted.key(_value(instance, counted) if value is _UNKNOWN else value)] -= 1
+    if sender._meta.label == 'messaging.Conversation':
+        deltas[UNREAD] -= instance._unread
+        deltas[MESSAGES] -= instance._message_count
+    add(deltas)
@@ -0,0 +1,106 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from freelance_platform import benchmark
+from freelance_platform.seeding import Scale, seed
+
+SIZES = {
+    'small': Scale(clients=100, freelancers=400, projects=1_000, conversations=2_000, messages=20_000),
+    'medium': Scale(),
+    'large': Scale(clients=2_000, freelancers=8_000, projects=20_000, conversations=50_000, messages=1_000_000),
+}
+PASSWORD = 'bench-Pass-123'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every API endpoint in-process against seeded datasets: latency percentiles, '
+        'throughput, queries and memory per endpoint. Runs against a throwaway test database; '
+        'with --baseline, fails on regressions beyond --threshold.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'],
+                            help='Datasets to benchmark against (see SIZES)')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first')
+        parser.add_argument('--memory-requests', type=int, default=3,
+                            help='Requests per endpoint traced for peak memory')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', metavar='ROUTE_NAME',
+                            help='Only benchmark this route (repeatable)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Fraction by which latency or memory may exceed the baseline (default 0.2)')
+
+    def handle(self, *args, **options):
+        routes = benchmark.ROUTES
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - benchmark.route_names()
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+            routes = [route for route in routes if route.name in options['endpoints']]
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)['results']
+
+        results = []
+        for size in options['sizes']:
+            results += self.run_size(size, routes, options)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'created_at': timezone.now().isoformat(),
+                    'requests': options['requests'],
+                    'warmup': options['warmup'],
+                    'seed': options['seed'],
+                    'results': results,
+                }, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is not None:
+            regressions = benchmark.compare(results, baseline, options['threshold'])
+            for size, endpoint, metric, old, new in regressions:
+                self.stdout.write(self.style.WARNING(f'{size} {endpoint}: {metric} {old} -> {new}'))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) beyond the baseline")
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def run_size(self, size, routes, options):
+        self.stdout.write(f'\n{size}: seeding...')
+        media_root = tempfile.mkdtemp()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # The outbox worker thread would compete with the requests being timed
+            with override_settings(
+                MEDIA_ROOT=media_root, OUTBOX_LOCAL_WORKER=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            ):
+                seed(SIZES[size], seed=options['seed'], password=PASSWORD)
+                self.stdout.write(
+                    f"{'endpoint':<44} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8} {'queries':>8} {'memory':>10}"
+                )
+                results = benchmark.run(
+                    PASSWORD, routes, options['requests'], options['warmup'], options['memory_requests'],
+                    log=self.write_result,
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+        return [{'size': size, **result} for result in results]
+
+    def write_result(self, result):
+        self.stdout.write(
+            f"{result['endpoint']:<44} {result['p50_ms']:>7.2f}ms {result['p95_ms']:>7.2f}ms "
+            f"{result['p99_ms']:>7.2f}ms {result['throughput_rps']:>8.1f} {result['queries']:>8} "
+            f"{result['peak_memory_kb']:>8.1f}KB"
+        )
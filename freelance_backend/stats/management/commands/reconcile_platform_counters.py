@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from stats.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the platform counters from the tables and report any drift; run '
+        'after bulk imports or raw SQL writes, which bypass the counters.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the drift without correcting it')
+
+    def handle(self, *args, **options):
+        drift = reconcile(fix=not options['dry_run'])
+        for key, stored, actual in drift:
+            self.stdout.write(f'{key}: stored {stored}, actual {actual} ({actual - stored:+d})')
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Platform counters are in step with the tables.'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counter(s) drifted.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{len(drift)} counter(s) corrected.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from stats.rollups import rebuild, rollup
+
+
+class Command(BaseCommand):
+    help = 'Roll up platform activity into daily stats rows for the admin dashboard (run on a schedule)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute every day from scratch, dropping deleted rows from the totals',
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild() if options['rebuild'] else rollup()
+        self.stdout.write(self.style.SUCCESS(f'{written} daily stats row(s) written.'))
@@ -0,0 +1,58 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from freelance_platform.seeding import INSERT_BATCH, Scale, seed
+
+DEFAULTS = Scale()
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill an empty database with a deterministic synthetic platform (users, profiles, '
+        'projects, proposals, conversations, messages) for benchmarks and query-plan checks, '
+        'e.g. --messages 1000000 for a million-message dataset.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same data')
+        parser.add_argument('--clients', type=int, default=DEFAULTS.clients)
+        parser.add_argument('--freelancers', type=int, default=DEFAULTS.freelancers)
+        parser.add_argument('--projects', type=int, default=DEFAULTS.projects)
+        parser.add_argument('--proposals-per-project', type=float, default=DEFAULTS.proposals_per_project,
+                            help='Mean number of proposals per project')
+        parser.add_argument('--conversations', type=int, default=DEFAULTS.conversations)
+        parser.add_argument('--messages', type=int, default=DEFAULTS.messages)
+        parser.add_argument('--days', type=int, default=DEFAULTS.days, help='Days of history to spread the data over')
+        parser.add_argument('--until', type=datetime.date.fromisoformat, default=None,
+                            help='Last day of the history (YYYY-MM-DD); defaults to now. Fix it for identical timestamps.')
+        parser.add_argument('--password', default='seed-password', help='Password of every seeded user')
+        parser.add_argument('--batch-size', type=int, default=INSERT_BATCH)
+
+    def handle(self, *args, **options):
+        scale = Scale(
+            clients=options['clients'],
+            freelancers=options['freelancers'],
+            projects=options['projects'],
+            proposals_per_project=options['proposals_per_project'],
+            conversations=options['conversations'],
+            messages=options['messages'],
+            days=options['days'],
+        )
+        until = None
+        if options['until']:
+            until = timezone.make_aware(datetime.datetime.combine(options['until'], datetime.time.max))
+
+        started = time.perf_counter()
+
+        def log(line):
+            self.stdout.write(f'{time.perf_counter() - started:7.1f}s  {line}')
+
+        try:
+            seed(scale, seed=options['seed'], until=until, password=options['password'],
+                 batch_size=options['batch_size'], log=log)
+        except ValueError as error:
+            raise CommandError(f'{error}; seed an empty database') from error
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s.'))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPlatformStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('new_users', models.PositiveIntegerField(default=0)),
+                ('new_clients', models.PositiveIntegerField(default=0)),
+                ('new_freelancers', models.PositiveIntegerField(default=0)),
+                ('new_admins', models.PositiveIntegerField(default=0)),
+                ('new_projects', models.PositiveIntegerField(default=0)),
+                ('new_proposals', models.PositiveIntegerField(default=0)),
+                ('new_conversations', models.PositiveIntegerField(default=0)),
+                ('new_messages', models.PositiveIntegerField(default=0)),
+                ('project_budget', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('projects_budgeted', models.PositiveIntegerField(default=0)),
+                ('proposal_budget', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_users', models.PositiveIntegerField(default=0)),
+                ('total_clients', models.PositiveIntegerField(default=0)),
+                ('total_freelancers', models.PositiveIntegerField(default=0)),
+                ('total_admins', models.PositiveIntegerField(default=0)),
+                ('total_projects', models.PositiveIntegerField(default=0)),
+                ('total_proposals', models.PositiveIntegerField(default=0)),
+                ('total_conversations', models.PositiveIntegerField(default=0)),
+                ('total_messages', models.PositiveBigIntegerField(default=0)),
+                ('total_project_budget', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_projects_budgeted', models.PositiveIntegerField(default=0)),
+                ('total_proposal_budget', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('projects_open', models.PositiveIntegerField(default=0)),
+                ('projects_in_progress', models.PositiveIntegerField(default=0)),
+                ('projects_completed', models.PositiveIntegerField(default=0)),
+                ('projects_cancelled', models.PositiveIntegerField(default=0)),
+                ('unread_messages', models.PositiveBigIntegerField(default=0)),
+                ('rated_profiles', models.PositiveIntegerField(default=0)),
+                ('avg_freelancer_rating', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('last_user_id', models.PositiveBigIntegerField(default=0)),
+                ('last_project_id', models.PositiveBigIntegerField(default=0)),
+                ('last_proposal_id', models.PositiveBigIntegerField(default=0)),
+                ('last_conversation_id', models.PositiveBigIntegerField(default=0)),
+                ('last_message_id', models.PositiveBigIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'daily platform stats',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:09
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    from stats.counters import reconcile
+
+    # Start the counters from the rows that existed before their receivers
+    reconcile(get_model=apps.get_model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0001_initial'),
+        ('accounts', '0002_alter_user_role'),
+        ('projects', '0007_facets_index'),
+        ('messaging', '0008_conversation_participant_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformCounter',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+from django.db import models
+
+class DailyPlatformStats(models.Model):
+    """
+    One day (settings.TIME_ZONE) of platform activity, written by stats.rollups
+    (`manage.py rollup_platform_stats`). Charts read the daily columns; the admin
+    dashboard adds live activity since the latest row's watermarks to its totals.
+    """
+    date = models.DateField(unique=True)
+    
+    # Created that day
+    new_users = models.PositiveIntegerField(default=0)
+    new_clients = models.PositiveIntegerField(default=0)
+    new_freelancers = models.PositiveIntegerField(default=0)
+    new_admins = models.PositiveIntegerField(default=0)
+    new_projects = models.PositiveIntegerField(default=0)
+    new_proposals = models.PositiveIntegerField(default=0)
+    new_conversations = models.PositiveIntegerField(default=0)
+    new_messages = models.PositiveIntegerField(default=0)
+    project_budget = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    projects_budgeted = models.PositiveIntegerField(default=0)
+    proposal_budget = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # Running totals of the above through the end of the day; deletions are only
+    # reflected after `rollup_platform_stats --rebuild`
+    total_users = models.PositiveIntegerField(default=0)
+    total_clients = models.PositiveIntegerField(default=0)
+    total_freelancers = models.PositiveIntegerField(default=0)
+    total_admins = models.PositiveIntegerField(default=0)
+    total_projects = models.PositiveIntegerField(default=0)
+    total_proposals = models.PositiveIntegerField(default=0)
+    total_conversations = models.PositiveIntegerField(default=0)
+    total_messages = models.PositiveBigIntegerField(default=0)
+    total_project_budget = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_projects_budgeted = models.PositiveIntegerField(default=0)
+    total_proposal_budget = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    
+    # Platform state at computed_at; only kept current on the latest row
+    projects_open = models.PositiveIntegerField(default=0)
+    projects_in_progress = models.PositiveIntegerField(default=0)
+    projects_completed = models.PositiveIntegerField(default=0)
+    projects_cancelled = models.PositiveIntegerField(default=0)
+    unread_messages = models.PositiveBigIntegerField(default=0)
+    rated_profiles = models.PositiveIntegerField(default=0)
+    avg_freelancer_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    
+    # Highest ids rolled up so far (on the latest row): the next run, and the
+    # dashboard's live delta, read only rows above them, as primary key ranges
+    last_user_id = models.PositiveBigIntegerField(default=0)
+    last_project_id = models.PositiveBigIntegerField(default=0)
+    last_proposal_id = models.PositiveBigIntegerField(default=0)
+    last_conversation_id = models.PositiveBigIntegerField(default=0)
+    last_message_id = models.PositiveBigIntegerField(default=0)
+    
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'daily platform stats'
+    
+    def __str__(self):
+        return f"Platform stats for {self.date}"
+
+
+class PlatformCounter(models.Model):
+    """
+    A platform total kept current on write by stats.counters (e.g. 'users:client',
+    'projects:open', 'messages:unread'); `manage.py reconcile_platform_counters`
+    recomputes them from the tables.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
@@ -0,0 +1,207 @@
+"""
+Daily platform rollups.
+
+`manage.py rollup_platform_stats` (run from cron, hourly or nightly) adds a
+DailyPlatformStats row per closed day. It is incremental: each source table is
+read only above the id watermarks stored on the latest row, which is a primary
+key range, and the rows found are counted per day of their creation timestamp.
+A watermark stops below the first row created on a day that is still open, so a
+row whose id is out of creation order is counted late rather than never.
+Stragglers created on an already rolled-up day are added to that day, and the
+running totals after it are carried forward.
+
+Every run also refreshes the latest row's state metrics (projects by status,
+unread messages, ratings). Those are the only full-table aggregates, and they run
+off-request.
+
+live_delta() counts what was created above the latest watermarks with one
+conditional aggregate per table; the admin dashboard adds it to the latest
+row's totals. A dashboard load therefore costs O(days shown + today's rows).
+"""
+import datetime
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import User
+from messaging.models import Conversation, Message
+from profiles.models import Profile
+from projects.models import Project, ProjectProposal
+from .models import DailyPlatformStats
+
+
+@dataclass(frozen=True)
+class Source:
+    model: type
+    created_field: str
+    watermark: str
+    # Daily column -> aggregate over that day's new rows
+    aggregates: dict = field(default_factory=dict)
+
+
+SOURCES = (
+    Source(User, 'date_joined', 'last_user_id', {
+        'new_users': Count('id'),
+        'new_clients': Count('id', filter=Q(role='client')),
+        'new_freelancers': Count('id', filter=Q(role='freelancer')),
+        'new_admins': Count('id', filter=Q(role='admin')),
+    }),
+    Source(Project, 'created_at', 'last_project_id', {
+        'new_projects': Count('id'),
+        'project_budget': Sum('budget'),
+        'projects_budgeted': Count('budget'),
+    }),
+    Source(ProjectProposal, 'created_at', 'last_proposal_id', {
+        'new_proposals': Count('id'),
+        'proposal_budget': Sum('proposed_budget'),
+    }),
+    Source(Conversation, 'created_at', 'last_conversation_id', {
+        'new_conversations': Count('id'),
+    }),
+    Source(Message, 'created_at', 'last_message_id', {
+        'new_messages': Count('id'),
+    }),
+)
+
+# Daily column -> running total column
+TOTALS = {
+    'new_users': 'total_users',
+    'new_clients': 'total_clients',
+    'new_freelancers': 'total_freelancers',
+    'new_admins': 'total_admins',
+    'new_projects': 'total_projects',
+    'new_proposals': 'total_proposals',
+    'new_conversations': 'total_conversations',
+    'new_messages': 'total_messages',
+    'project_budget': 'total_project_budget',
+    'projects_budgeted': 'total_projects_budgeted',
+    'proposal_budget': 'total_proposal_budget',
+}
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _new_rows(source, watermark, until=None):
+    queryset = source.model.objects.filter(id__gt=watermark)
+    if until is not None:
+        queryset = queryset.filter(**{f'{source.created_field}__lt': until})
+    return queryset
+
+
+def live_delta(latest=None):
+    """
+    {daily column: value} for everything created above `latest`'s watermarks
+    (everything, without a rollup yet): one conditional aggregate per table
+    """
+    delta = {}
+    for source in SOURCES:
+        watermark = getattr(latest, source.watermark, 0) if latest else 0
+        values = _new_rows(source, watermark).aggregate(**source.aggregates)
+        delta.update({column: value or 0 for column, value in values.items()})
+    return delta
+
+
+def _snapshot():
+    """Current state metrics for the latest row"""
+    projects = Project.objects.aggregate(
+        projects_open=Count('id', filter=Q(status='open')),
+        projects_in_progress=Count('id', filter=Q(status='in_progress')),
+        projects_completed=Count('id', filter=Q(status='completed')),
+        projects_cancelled=Count('id', filter=Q(status='cancelled')),
+    )
+    unread = Conversation.objects.aggregate(
+        unread=Sum('client_unread_count') + Sum('freelancer_unread_count'),
+    )['unread'] or 0
+    profiles = Profile.objects.aggregate(
+        rated_profiles=Count('id', filter=Q(rating__isnull=False)),
+        avg_freelancer_rating=Avg('rating', filter=Q(user__role='freelancer', rating__isnull=False)),
+    )
+    return {
+        **projects,
+        'unread_messages': unread,
+        'rated_profiles': profiles['rated_profiles'],
+        'avg_freelancer_rating': round(Decimal(profiles['avg_freelancer_rating'] or 0), 2),
+    }
+
+
+@transaction.atomic
+def rollup(today=None):
+    """
+    Roll up every closed day up to (not including) `today`; returns the number of
+    rows written
+    """
+    today = today or timezone.localdate()
+    until = _day_start(today)
+    latest = DailyPlatformStats.objects.select_for_update().order_by('-date').first()
+
+    daily, watermarks = {}, {}
+    for source in SOURCES:
+        watermark = getattr(latest, source.watermark, 0) if latest else 0
+        rows = _new_rows(source, watermark, until)
+        # Ids mostly grow with creation time, but not always (a transaction that
+        # commits late, a backfill): rows above the first one from an open day wait
+        # for a later run, so the watermark never skips a row that wasn't counted
+        ceiling = _new_rows(source, watermark).filter(
+            **{f'{source.created_field}__gte': until}
+        ).aggregate(id=Min('id'))['id']
+        if ceiling is not None:
+            rows = rows.filter(id__lt=ceiling)
+        rows = (
+            rows
+            .annotate(day=TruncDate(source.created_field))
+            .values('day')
+            .annotate(max_id=Max('id'), **source.aggregates)
+            .order_by()
+        )
+        watermarks[source.watermark] = watermark
+        for row in rows:
+            day = daily.setdefault(row['day'], {})
+            for column in source.aggregates:
+                day[column] = row[column] or 0
+            watermarks[source.watermark] = max(watermarks[source.watermark], row['max_id'])
+
+    if latest is None and not daily:
+        return 0
+    # The latest row is always rewritten, to carry the new watermarks and snapshot
+    first_day = min([*daily, latest.date] if latest is not None else daily)
+    last_day = today - datetime.timedelta(days=1)
+    if latest is not None:
+        last_day = max(last_day, latest.date)
+
+    existing = DailyPlatformStats.objects.filter(date__gte=first_day).in_bulk(field_name='date')
+    previous = DailyPlatformStats.objects.filter(date__lt=first_day).order_by('-date').first()
+    written = []
+    day = first_day
+    while day <= last_day:
+        row = existing.get(day) or DailyPlatformStats(date=day)
+        for column, value in daily.get(day, {}).items():
+            setattr(row, column, getattr(row, column) + value)
+        for column, total in TOTALS.items():
+            setattr(row, total, (getattr(previous, total) if previous else 0) + getattr(row, column))
+        written.append(row)
+        previous, day = row, day + datetime.timedelta(days=1)
+
+    latest_row = written[-1]
+    for attname, value in {**watermarks, **_snapshot()}.items():
+        setattr(latest_row, attname, value)
+    for row in written:
+        row.save()
+    return len(written)
+
+
+def rebuild(today=None):
+    """Recompute every row from scratch, e.g. to drop deleted rows from the totals"""
+    with transaction.atomic():
+        DailyPlatformStats.objects.all().delete()
+        return rollup(today)
+
+
+def recent(days):
+    """The latest `days` rows, oldest first"""
+    return list(DailyPlatformStats.objects.order_by('-date')[:days])[::-1]
@@ -0,0 +1,236 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from freelance_platform.admin_dashboard import dashboard_callback
+from freelance_platform.testing import QueryBudgetTestMixin
+from messaging.models import Conversation, Message
+from messaging.summary import mark_conversation_read, mark_conversations_read, record_new_message
+from projects.models import Project, ProjectProposal
+from . import counters, rollups
+from .models import DailyPlatformStats
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.client_user = self.user('client', days_ago=3)
+        self.freelancer = self.user('freelancer', days_ago=1)
+        self.project(days_ago=3, budget=100)
+        self.project(days_ago=1, budget=None)
+
+    def at(self, days_ago):
+        return timezone.now() - timedelta(days=days_ago)
+
+    def user(self, role, days_ago=0):
+        count = User.objects.count()
+        return User.objects.create(
+            username=f'{role}{count}', email=f'{role}{count}@example.com', role=role, date_joined=self.at(days_ago),
+        )
+
+    def project(self, days_ago=0, budget=None, status='open'):
+        project = Project.objects.create(
+            title='Project', description='Description', client=self.client_user, budget=budget, status=status,
+        )
+        Project.objects.filter(id=project.id).update(created_at=self.at(days_ago))
+        return project
+
+    def day(self, days_ago):
+        return DailyPlatformStats.objects.get(date=self.today - timedelta(days=days_ago))
+
+    def test_rollup_fills_every_closed_day(self):
+        self.assertEqual(rollups.rollup(), 3)
+
+        first, gap, last = self.day(3), self.day(2), self.day(1)
+        self.assertEqual((first.new_users, first.new_clients, first.new_projects), (1, 1, 1))
+        self.assertEqual(first.project_budget, Decimal('100'))
+        self.assertEqual((gap.new_users, gap.total_users), (0, 1))
+        self.assertEqual((last.new_freelancers, last.total_users, last.total_projects), (1, 2, 2))
+        self.assertEqual((last.total_project_budget, last.total_projects_budgeted), (Decimal('100'), 1))
+        self.assertEqual(last.projects_open, 2)
+        self.assertEqual(last.last_user_id, self.freelancer.id)
+        self.assertFalse(DailyPlatformStats.objects.filter(date=self.today).exists())
+
+    def test_rollup_is_incremental(self):
+        rollups.rollup()
+        # Already rolled-up rows are not read again
+        User.objects.filter(id=self.client_user.id).update(role='freelancer')
+        straggler = self.project(days_ago=2, budget=50)
+        self.project(days_ago=0)
+
+        self.assertEqual(rollups.rollup(), 2)
+        self.assertEqual(self.day(3).total_clients, 1)
+        self.assertEqual((self.day(2).new_projects, self.day(2).total_projects), (1, 2))
+        self.assertEqual((self.day(1).total_projects, self.day(1).total_project_budget), (3, Decimal('150')))
+        self.assertEqual(self.day(1).last_project_id, straggler.id)
+
+        # A rerun with nothing new rewrites only the latest row
+        self.assertEqual(rollups.rollup(), 1)
+        self.assertEqual(self.day(1).total_projects, 3)
+
+    def test_rows_out_of_id_order_are_counted_once(self):
+        # Created today, but its id comes before one created yesterday
+        self.project(days_ago=0)
+        late = self.project(days_ago=1, budget=10)
+
+        rollups.rollup()
+        self.assertEqual(self.day(1).total_projects, 2)
+        self.assertLess(self.day(1).last_project_id, late.id)
+        self.assertEqual(rollups.live_delta(self.day(1))['new_projects'], 2)
+
+        rollups.rollup(self.today + timedelta(days=1))
+        self.assertEqual((self.day(1).new_projects, self.day(1).total_projects), (2, 3))
+        self.assertEqual((self.day(0).new_projects, self.day(0).total_projects), (1, 4))
+        self.assertEqual(rollups.live_delta(self.day(0))['new_projects'], 0)
+
+    def test_rebuild_drops_deleted_rows(self):
+        rollups.rollup()
+        Project.objects.filter(budget__isnull=True).delete()
+
+        rollups.rebuild()
+        self.assertEqual(self.day(1).total_projects, 1)
+
+    def test_live_delta_counts_rows_above_the_watermarks(self):
+        rollups.rollup()
+        latest = DailyPlatformStats.objects.first()
+        self.user('client')
+        self.project(budget=20)
+
+        delta = rollups.live_delta(latest)
+        self.assertEqual((delta['new_users'], delta['new_clients'], delta['new_messages']), (1, 1, 0))
+        self.assertEqual((delta['new_projects'], delta['project_budget']), (1, Decimal('20')))
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', email='admin@example.com', role='admin', is_staff=True)
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        for i in range(3):
+            Project.objects.create(title=f'Project {i}', description='Description', client=self.client_user, budget=100)
+
+    def dashboard(self):
+        request = RequestFactory().get('/admin/')
+        request.user = self.admin
+        return {stat['title']: stat for stat in dashboard_callback(request, {})['dashboard_stats']}
+
+    def test_query_count_does_not_grow_with_the_tables(self):
+        with self.assertNumQueries(7):
+            self.dashboard()
+        Project.objects.bulk_create([
+            Project(title='More', description='Description', client=self.client_user) for _ in range(20)
+        ])
+        with self.assertNumQueries(7):
+            self.dashboard()
+
+    def test_totals_include_activity_since_the_latest_rollup(self):
+        stats = self.dashboard()
+        self.assertEqual(stats['Platform Overview']['metric'], '2')
+        self.assertEqual(stats['Project Statistics']['metric'], '3')
+        self.assertEqual(stats['Financial Overview']['metric'], '$300')
+
+        # Roll today up as if it were closed; later projects are counted live on top
+        rollups.rollup(today=timezone.localdate() + timedelta(days=1))
+        Project.objects.create(title='Late', description='Description', client=self.client_user, budget=50)
+        stats = self.dashboard()
+        self.assertEqual(stats['Project Statistics']['metric'], '4')
+        self.assertEqual(stats['Project Statistics']['chart']['data']['datasets'][0]['data'], [4, 0, 0])
+        self.assertEqual(stats['Financial Overview']['metric'], '$350')
+        self.assertEqual(stats['Project Growth']['chart']['data']['datasets'][0]['data'], [3])
+
+
+class CounterTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.client_user = User.objects.create(username='client', email='client@example.com', role='client')
+        self.freelancer = User.objects.create(username='freelancer', email='freelancer@example.com', role='freelancer')
+        self.project = Project.objects.create(title='Project', description='Description', client=self.client_user)
+
+    def assertCounters(self, **expected):
+        counts = counters.totals()
+        self.assertEqual({key: counts.get(key.replace('__', ':'), 0) for key in expected}, expected)
+        self.assertEqual(counters.reconcile(fix=False), [])
+
+    def send(self, conversation, sender):
+        message = Message.objects.create(conversation=conversation, sender=sender, content='Hello')
+        record_new_message(conversation, message)
+        return message
+
+    def test_create_change_and_delete(self):
+        self.assertCounters(users__client=1, users__freelancer=1, projects__open=1)
+
+        self.project.status = 'in_progress'
+        self.project.save()
+        proposal = ProjectProposal.objects.create(
+            project=self.project, freelancer=self.freelancer, message='Hi', proposed_budget=10, timeline='1 week',
+        )
+        self.assertCounters(projects__open=0, projects__in_progress=1, proposals__pending=1)
+
+        # Saving other fields, or a deferred status, leaves the counters alone
+        deferred = Project.objects.defer('status').get(id=self.project.id)
+        deferred.title = 'Renamed'
+        deferred.save()
+        self.project.status = 'completed'
+        self.project.save(update_fields=['title'])
+        self.assertCounters(projects__in_progress=1, projects__completed=0)
+
+        proposal.delete()
+        self.client_user.delete()
+        self.assertCounters(users__client=0, projects__in_progress=0, proposals__pending=0)
+
+    def test_queryset_update(self):
+        Project.objects.create(title='Other', description='Description', client=self.client_user, status='completed')
+
+        self.assertEqual(counters.update(Project.objects.all(), status='in_progress'), 2)
+        self.assertCounters(projects__open=0, projects__completed=0, projects__in_progress=2)
+
+    def test_rolled_back_writes_leave_the_counters_alone(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Project.objects.create(title='Gone', description='Description', client=self.client_user)
+            raise RuntimeError
+        self.assertCounters(projects__open=1)
+
+    def test_unread_messages(self):
+        conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        self.send(conversation, self.client_user)
+        self.send(conversation, self.client_user)
+        self.send(conversation, self.freelancer)
+        self.assertCounters(conversations=1, messages=3, messages__unread=3)
+
+        mark_conversation_read(conversation, self.freelancer)
+        self.assertCounters(messages__unread=1)
+        mark_conversations_read(Conversation.objects.all())
+        self.assertCounters(messages__unread=0)
+
+        self.send(conversation, self.client_user)
+        conversation.delete()
+        self.assertCounters(conversations=0, messages=0, messages__unread=0)
+
+    def test_cascaded_message_deletes_are_counted_once(self):
+        conversation = Conversation.objects.create(client=self.client_user, freelancer=self.freelancer)
+        Message.objects.bulk_create([
+            Message(conversation=conversation, sender=self.client_user, content='Hello') for _ in range(200)
+        ])
+        counters.reconcile()
+        message = self.send(conversation, self.freelancer)
+        self.send(Conversation.objects.create(client=self.freelancer, freelancer=self.client_user), self.client_user)
+
+        message.delete()
+        self.assertCounters(messages=201)
+        # Independent of the number of messages, instead of a counter UPDATE for each
+        with self.assertQueryBudget(12, 'Deleting a conversation'):
+            conversation.delete()
+        self.assertCounters(conversations=1, messages=1, messages__unread=1)
+        self.client_user.delete()
+        self.assertCounters(conversations=0, messages=0, messages__unread=0)
+
+    def test_reconcile_reports_and_corrects_drift(self):
+        Project.objects.bulk_create([
+            Project(title='Imported', description='Description', client=self.client_user) for _ in range(3)
+        ])
+
+        self.assertEqual(counters.reconcile(fix=False), [('projects:open', 1, 4)])
+        self.assertEqual(counters.reconcile(), [('projects:open', 1, 4)])
+        self.assertCounters(projects__open=4)